@@ -169,10 +169,10 @@ case "$1" in
     -s|--stats)
         echo "📊 Affichage des statistiques des punchlines..."
         if [ "$USE_PYTHON" = true ]; then
-            cd src && python -c "from utils.punchlines_stats import get_punchlines_stats; get_punchlines_stats()"
+            cd src && python -m utils.punchlines_stats
         else
             check_docker_image
-            docker compose run --rm meme-generator python -c "from src.utils.punchlines_stats import get_punchlines_stats; get_punchlines_stats()"
+            docker compose run --rm -w /app/src meme-generator python -m utils.punchlines_stats
         fi
         echo "✅ Statistiques affichées avec succès."
         ;;
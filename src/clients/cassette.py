@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict, deque
+
+import httpx
+from telegram.request import BaseRequest
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+CASSETTE_MODES = ('off', 'record', 'replay')
+
+# En-têtes de réponse qui ne doivent pas être rejoués (le contenu enregistré est déjà décodé)
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+
+class CassetteMiss(Exception):
+    """Requête absente de la cassette en mode replay"""
+
+
+class Cassette:
+    """
+    Enregistrement et rejeu des échanges avec une API (un fichier JSON Lines par service)
+
+    En mode record, chaque requête est envoyée normalement et le couple
+    requête/réponse est ajouté à la cassette avec sa latence. En mode replay, les
+    réponses sont servies depuis la cassette sans accès réseau: une requête est
+    reconnue à sa clé (méthode et paramètres normalisés), les requêtes identiques
+    recevant les réponses enregistrées dans l'ordre.
+    """
+
+    def __init__(self, path, mode='replay', latency='original'):
+        """
+        Args:
+            path (str): Chemin du fichier de la cassette (.jsonl)
+            mode (str): 'record' (enregistrer, en écrasant la cassette) ou 'replay' (rejouer)
+            latency (str): En replay, 'original' (latences enregistrées), 'none' (immédiat)
+                ou un facteur multiplicatif ('0.5' pour deux fois plus vite)
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Mode de cassette inconnu: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_factor = self._latency_factor(latency)
+        self._lock = threading.Lock()
+        self._entries = defaultdict(deque)
+        self._last = {}
+
+        # Compteurs pour le suivi
+        self.recorded = 0
+        self.replayed = 0
+
+        if mode == 'record':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, 'w', encoding='utf-8').close()
+        else:
+            self._load()
+
+    @staticmethod
+    def _latency_factor(latency):
+        latency = str(latency).strip().lower()
+        if latency == 'original':
+            return 1.0
+        if latency in ('none', '0', ''):
+            return 0.0
+        try:
+            return max(0.0, float(latency))
+        except ValueError:
+            print(f"⚠️ Latence de rejeu invalide ({latency}), latences enregistrées utilisées")
+            return 1.0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"⚠️ Cassette introuvable: {self.path} (toutes les requêtes seront manquantes)")
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry['key']].append(entry)
+        print(f"📼 Cassette chargée: {self.path} ({sum(len(e) for e in self._entries.values())} échange(s))")
+
+    @staticmethod
+    def request_key(request):
+        """
+        Clé d'une requête: empreinte de sa représentation JSON canonique
+
+        Args:
+            request (dict): Requête normalisée (sans secrets ni valeurs aléatoires)
+
+        Returns:
+            str: La clé
+        """
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def find(self, key):
+        """
+        Retourne la prochaine réponse enregistrée pour une clé
+
+        Une fois les réponses d'une clé épuisées, la dernière est resservie (retries).
+
+        Raises:
+            CassetteMiss: Si la requête n'a jamais été enregistrée
+        """
+        with self._lock:
+            queue = self._entries.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            if key not in self._last:
+                print(f"❌ Requête absente de la cassette {self.path} (clé {key[:12]}), à réenregistrer avec CASSETTE_MODE=record")
+                raise CassetteMiss(f"Requête absente de la cassette {self.path} (clé {key[:12]})")
+            self.replayed += 1
+            return self._last[key]
+
+    def record(self, key, request, response, latency):
+        """
+        Ajoute un échange à la cassette
+
+        Args:
+            key (str): Clé de la requête
+            request (dict): Requête normalisée (conservée pour la lisibilité)
+            response (dict): status, headers éventuels et body (texte)
+            latency (float): Durée de l'échange en secondes
+        """
+        entry = {'key': key, 'request': request, 'latency': round(latency, 4), **response}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.recorded += 1
+
+    def replay_delay(self, entry):
+        """Délai à respecter avant de servir une réponse rejouée"""
+        return entry.get('latency', 0) * self.latency_factor
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(service):
+    """
+    Cassette d'un service ('openai', 'telegram') selon CASSETTE_MODE, CASSETTE_DIR et CASSETTE_LATENCY
+
+    Une même cassette est partagée par tous les clients du processus, pour que les
+    réponses soient rejouées dans l'ordre de leur enregistrement.
+
+    Returns:
+        Cassette: La cassette, ou None si CASSETTE_MODE vaut 'off'
+    """
+    mode = os.getenv('CASSETTE_MODE', 'off').strip("'\"").lower()
+    if mode not in CASSETTE_MODES:
+        print(f"⚠️ CASSETTE_MODE invalide ({mode}), cassettes désactivées")
+        return None
+    if mode == 'off':
+        return None
+
+    default_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'cassettes')
+    # Une variable vide (CASSETTE_DIR= dans le .env) désigne le répertoire par défaut
+    directory = (os.getenv('CASSETTE_DIR') or '').strip("'\"") or default_dir
+    path = os.path.join(directory, f"{service}.jsonl")
+    latency = (os.getenv('CASSETTE_LATENCY') or '').strip("'\"") or 'original'
+
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None or cassette.mode != mode:
+            cassette = Cassette(path, mode, latency)
+            _cassettes[path] = cassette
+            print(f"📼 Cassette {service} en mode {mode}: {path}")
+        return cassette
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+    Transport httpx qui enregistre ou rejoue les requêtes (clients OpenAI)
+    """
+
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+
+    @staticmethod
+    def _normalize(request):
+        # Les en-têtes (clé API...) ne font pas partie de la clé et ne sont pas enregistrés
+        body = request.read()
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = body.decode('utf-8', 'replace')
+        return {'method': request.method, 'path': request.url.path, 'body': payload}
+
+    def handle_request(self, request):
+        normalized = self._normalize(request)
+        key = self.cassette.request_key(normalized)
+
+        if self.cassette.mode == 'replay':
+            entry = self.cassette.find(key)
+            time.sleep(self.cassette.replay_delay(entry))
+            return httpx.Response(entry['status'], headers=entry.get('headers', {}),
+                                  content=entry['body'].encode('utf-8'), request=request)
+
+        start = time.monotonic()
+        response = self.transport.handle_request(request)
+        content = response.read()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        self.cassette.record(key, normalized, {
+            'status': response.status_code,
+            'headers': headers,
+            'body': content.decode('utf-8', 'replace')
+        }, time.monotonic() - start)
+        response.close()
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        self.transport.close()
+
+
+class CassetteRequest(BaseRequest):
+    """
+    Couche de requêtes python-telegram-bot qui enregistre ou rejoue les appels à l'API Bot
+
+    Le contenu des fichiers envoyés ne fait pas partie de la clé: une vidéo
+    rendue à nouveau (octets différents) retrouve la réponse enregistrée.
+    """
+
+    def __init__(self, cassette, request):
+        """
+        Args:
+            cassette (Cassette): La cassette utilisée
+            request (BaseRequest): Couche de requêtes réelle (enregistrement)
+        """
+        self.cassette = cassette
+        self.request = request
+
+    @property
+    def read_timeout(self):
+        return self.request.read_timeout
+
+    async def initialize(self):
+        await self.request.initialize()
+
+    async def shutdown(self):
+        await self.request.shutdown()
+
+    @staticmethod
+    def _normalize(url, request_data):
+        # Seule la méthode de l'API est gardée: l'URL contient le token du bot
+        normalized = {'method': url.rstrip('/').rsplit('/', 1)[-1], 'parameters': {}, 'files': []}
+        if request_data is None:
+            return normalized
+
+        parameters = dict(request_data.json_parameters)
+        files = list(request_data.multipart_data.keys()) if request_data.contains_files else []
+        # Les noms des pièces jointes (attach://...) sont aléatoires: remplacés par leur rang
+        for i, name in enumerate(files):
+            reference = f"attach://{name}"
+            if any(reference in value for value in parameters.values()):
+                parameters = {field: value.replace(reference, f"attach://file{i}") for field, value in parameters.items()}
+                files[i] = f"file{i}"
+        normalized['parameters'] = parameters
+        normalized['files'] = files
+        return normalized
+
+    async def do_request(self, url, method, request_data=None, read_timeout=BaseRequest.DEFAULT_NONE,
+                         write_timeout=BaseRequest.DEFAULT_NONE, connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE):
+        normalized = self._normalize(url, request_data)
+        key = self.cassette.request_key(normalized)
+
+        if self.cassette.mode == 'replay':
+            entry = self.cassette.find(key)
+            await asyncio.sleep(self.cassette.replay_delay(entry))
+            return entry['status'], entry['body'].encode('utf-8')
+
+        start = time.monotonic()
+        status, payload = await self.request.do_request(
+            url, method, request_data,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            connect_timeout=connect_timeout,
+            pool_timeout=pool_timeout
+        )
+        self.cassette.record(key, normalized, {
+            'status': status,
+            'body': payload.decode('utf-8', 'replace')
+        }, time.monotonic() - start)
+        return status, payload
@@ -0,0 +1,371 @@
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+import openai
+
+from clients.openai_rate_limiter import OpenAIRateLimiter
+
+# Erreurs temporaires: l'appel est retenté (les autres erreurs sont remontées immédiatement)
+RETRYABLE_STATUS = {408, 409, 429}
+
+# 429 qu'une attente ne résout pas (quota du compte épuisé): jamais retentés
+NON_RETRYABLE_CODES = {'insufficient_quota'}
+
+
+class LatencyTracker:
+    """
+    Latences récentes des appels réussis, par modèle et type d'appel (fenêtre glissante)
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Nombre de latences conservées par modèle et type d'appel
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, key: Tuple[str, str], seconds: float):
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+            self._samples[key].append(seconds)
+
+    def count(self, key: Tuple[str, str]) -> int:
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key: Tuple[str, str], percent: float) -> Optional[float]:
+        """Percentile des latences récentes (None sans mesure)"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(percent / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Nombre de mesures et percentiles (p50, p95, p99) par "modèle/type d'appel\""""
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            f"{model}/{call_type}": {
+                'count': self.count((model, call_type)),
+                'p50': round(self.percentile((model, call_type), 50), 3),
+                'p95': round(self.percentile((model, call_type), 95), 3),
+                'p99': round(self.percentile((model, call_type), 99), 3)
+            }
+            for model, call_type in keys
+        }
+
+
+class CompletionBackend:
+    """
+    Point d'accès partagé des complétions OpenAI (/v1/chat/completions)
+
+    Les appels du client synchrone sont exécutés dans un thread pour ne pas bloquer
+    la boucle d'événements. Les requêtes identiques lancées en même temps sont
+    regroupées (single-flight): la première part vers l'API, les suivantes attendent
+    sa réponse au lieu d'être payées une seconde fois. La table des requêtes en
+    cours est protégée par un verrou, ce qui permet aussi de regrouper les appels
+    venant d'autres threads ou d'autres boucles (remplissage de la réserve).
+
+    L'appel du premier demandeur est exécuté dans une tâche protégée (shield): s'il
+    est annulé, la requête continue et sa réponse est transmise aux suivants.
+
+    Une requête n'est regroupée que si elle est déterministe à l'échelle du
+    produit: au-delà de coalesce_max_temperature (génération créative), deux
+    appelants doivent recevoir deux réponses différentes. Chaque appel peut aussi
+    l'imposer ou l'exclure avec le paramètre coalesce.
+
+    Les latences sont suivies par modèle et type d'appel. Pour les types listés
+    dans hedge_call_types, une requête qui n'a pas répondu après le percentile
+    hedge_percentile de sa latence est doublée: la première réponse est retenue.
+    La requête perdante ne peut pas être interrompue par le client synchrone, sa
+    réponse est ignorée (et sert à mesurer le temps gagné). La part de requêtes
+    doublées est plafonnée par hedge_budget.
+
+    Chaque appel passe par un limiteur adaptatif partagé (budgets par minute lus
+    dans les en-têtes x-ratelimit-*, concurrence AIMD). Les 429, erreurs serveur,
+    timeouts et erreurs de connexion sont retentés avec un délai exponentiel
+    aléatoire (au moins le retry-after de l'API): le client OpenAI doit être créé
+    sans ses propres tentatives (max_retries=0).
+    """
+
+    def __init__(self, client, coalesce: bool = True, coalesce_max_temperature: float = 0.8,
+                 hedge_call_types: Iterable[str] = (), hedge_percentile: float = 95, hedge_budget: float = 0.05,
+                 hedge_min_samples: int = 20, latency_window: int = 200,
+                 limiter: Optional[OpenAIRateLimiter] = None, max_retries: int = 4,
+                 retry_base_delay: float = 0.5, retry_max_delay: float = 20.0):
+        """
+        Args:
+            client: Client OpenAI (voir create_openai_client)
+            coalesce: Regrouper les requêtes identiques en cours
+            coalesce_max_temperature: Température maximum d'une requête regroupée par défaut
+            hedge_call_types: Types d'appel dont les requêtes lentes sont doublées (vide: jamais)
+            hedge_percentile: Percentile de la latence au-delà duquel la requête est doublée
+            hedge_budget: Part maximum des appels qui peuvent être doublés
+            hedge_min_samples: Nombre de latences mesurées avant de doubler des requêtes
+            latency_window: Nombre de latences conservées par modèle et type d'appel
+            limiter: Limiteur de débit partagé (par défaut: un limiteur propre à ce point d'accès)
+            max_retries: Nombre maximum de nouvelles tentatives d'un appel en échec temporaire
+            retry_base_delay: Délai de la première nouvelle tentative (doublé à chaque tentative)
+            retry_max_delay: Délai maximum entre deux tentatives
+        """
+        self.client = client
+        self.coalesce = coalesce
+        self.coalesce_max_temperature = coalesce_max_temperature
+        self.hedge_call_types = set(hedge_call_types)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker(latency_window)
+        self.limiter = limiter or OpenAIRateLimiter()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # Pool de threads dédié: celui d'asyncio est limité à quelques threads sur une petite machine
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2 * self.limiter.max_concurrency,
+            thread_name_prefix='openai-completion'
+        )
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # Tâches des requêtes regroupées (référence forte tant qu'elles sont en cours)
+        self._leaders = set()
+
+        # Suivi: demandes reçues, appels envoyés à l'API et demandes servies par un appel en cours
+        self.requests = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.by_type = {}
+        # Requêtes doublées, celles où le doublon a répondu le premier et temps gagné (secondes)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.time_saved = 0.0
+        # Nouvelles tentatives et appels abandonnés après la dernière tentative
+        self.retries = 0
+        self.failures = 0
+
+    @staticmethod
+    def request_key(request: Dict[str, Any]) -> str:
+        """Clé d'une requête: empreinte de ses paramètres normalisés"""
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _should_coalesce(self, request: Dict[str, Any], coalesce: Optional[bool]) -> bool:
+        if coalesce is not None:
+            return coalesce
+        return self.coalesce and float(request.get('temperature', 1.0)) <= self.coalesce_max_temperature
+
+    def _count(self, call_type: str, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            counters = self.by_type.setdefault(call_type, {'requests': 0, 'calls': 0, 'coalesced': 0})
+            counters[counter] += 1
+
+    async def create(self, call_type: str = 'other', coalesce: Optional[bool] = None,
+                     hedge: Optional[bool] = None, **request):
+        """
+        Crée une complétion (mêmes paramètres que client.chat.completions.create)
+
+        Args:
+            call_type: Type d'appel pour le suivi (generation, evaluation, hashtags...)
+            coalesce: Regrouper avec une requête identique en cours (par défaut: selon la température)
+            hedge: Doubler la requête si elle est lente (par défaut: selon hedge_call_types)
+            **request: Paramètres de la requête
+
+        Returns:
+            La réponse de l'API (partagée entre les appelants regroupés: à ne pas modifier)
+        """
+        self._count(call_type, 'requests')
+        if not self._should_coalesce(request, coalesce):
+            return await self._call(call_type, request, hedge)
+
+        key = self.request_key(request)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self._count(call_type, 'coalesced')
+            # shield: l'annulation d'un appelant n'annule pas la requête des autres
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        # La requête vit dans sa propre tâche: l'annulation du premier demandeur ne
+        # l'interrompt pas, et la réponse est transmise aux suivants quoi qu'il arrive
+        task = asyncio.create_task(self._call(call_type, request, hedge))
+        self._leaders.add(task)
+        task.add_done_callback(lambda task: self._complete(key, future, task))
+        return await asyncio.shield(task)
+
+    def _complete(self, key: str, future: concurrent.futures.Future, task: asyncio.Task):
+        """Transmet le résultat d'une requête regroupée à ses demandeurs et la retire des requêtes en cours"""
+        self._leaders.discard(task)
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if task.cancelled():
+            # Seulement à l'arrêt de la boucle: les demandeurs d'autres boucles ne doivent pas attendre indéfiniment
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    @staticmethod
+    def estimate_tokens(request: Dict[str, Any]) -> int:
+        """Estimation des tokens d'une requête (prompt d'environ 4 caractères par token et max_tokens)"""
+        prompt = sum(len(str(message.get('content') or '')) for message in request.get('messages') or [])
+        return prompt // 4 + int(request.get('max_tokens') or 0)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Délai demandé par l'API (en-têtes retry-after-ms ou retry-after), en secondes"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        for header, factor in (('retry-after-ms', 0.001), ('retry-after', 1.0)):
+            try:
+                return float(response.headers.get(header)) * factor
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Délai avant une nouvelle tentative: exponentiel avec gigue complète, au moins le retry-after"""
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _execute(self, key: Tuple[str, str], request: Dict[str, Any]):
+        """Exécute une requête (dans un thread du pool) avec le limiteur et les nouvelles tentatives"""
+        tokens = self.estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            start = time.monotonic()
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(**request)
+            except openai.APIStatusError as e:
+                quota_exceeded = getattr(e, 'code', None) in NON_RETRYABLE_CODES
+                rate_limited = e.status_code == 429 and not quota_exceeded
+                retry_after = self._retry_after(e)
+                self.limiter.release(e.response.headers, rate_limited=rate_limited, retry_after=retry_after, succeeded=False)
+                if quota_exceeded or (e.status_code not in RETRYABLE_STATUS and e.status_code < 500):
+                    raise
+                error = e
+            except openai.APIConnectionError as e:
+                # Timeouts compris (APITimeoutError)
+                self.limiter.release()
+                retry_after = None
+                error = e
+            except BaseException:
+                self.limiter.release()
+                raise
+            else:
+                self.limiter.release(raw.headers)
+                self.latencies.record(key, time.monotonic() - start)
+                return raw.parse()
+
+            if attempt == self.max_retries:
+                with self._lock:
+                    self.failures += 1
+                raise error
+            with self._lock:
+                self.retries += 1
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def _send(self, key: Tuple[str, str], request: Dict[str, Any]) -> asyncio.Future:
+        """Envoie la requête dans un thread du pool dédié"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, self._execute, key, request)
+
+    def _hedge_delay(self, key: Tuple[str, str], call_type: str, hedge: Optional[bool]) -> Optional[float]:
+        """Délai avant de doubler la requête (None: pas de doublon)"""
+        if hedge is False or (hedge is None and call_type not in self.hedge_call_types):
+            return None
+        if self.latencies.count(key) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(key, self.hedge_percentile)
+
+    def _take_hedge(self) -> bool:
+        """Réserve un doublon si le budget le permet"""
+        # Pas de doublon quand le limiteur retient déjà des appels
+        if self.limiter.in_flight >= int(self.limiter.limit):
+            return False
+        with self._lock:
+            if self.hedges + 1 > self.hedge_budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    async def _call(self, call_type: str, request: Dict[str, Any], hedge: Optional[bool] = None):
+        self._count(call_type, 'calls')
+        key = (str(request.get('model', '')), call_type)
+        delay = self._hedge_delay(key, call_type, hedge)
+
+        primary = self._send(key, request)
+        if delay is None:
+            return await primary
+
+        start = time.monotonic()
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._take_hedge():
+            return await primary
+
+        hedged = self._send(key, request)
+        pending = {primary, hedged}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Une requête en échec n'est retenue que si l'autre échoue aussi
+            winner = next((task for task in done if task.exception() is None), None)
+
+        if winner is None:
+            return primary.result()
+
+        if winner is hedged:
+            won_at = time.monotonic() - start
+            with self._lock:
+                self.hedge_wins += 1
+            if not primary.done():
+                primary.add_done_callback(lambda task: self._record_saving(task, start, won_at))
+        for task in pending:
+            # La réponse de la requête perdante est ignorée (sans avertissement si elle échoue)
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return winner.result()
+
+    def _record_saving(self, task: asyncio.Future, start: float, won_at: float):
+        """Temps gagné par un doublon: fin de la requête initiale moins réponse du doublon"""
+        if task.cancelled() or task.exception() is not None:
+            return
+        with self._lock:
+            self.time_saved += max(0.0, time.monotonic() - start - won_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs de suivi, au total et par type d'appel"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'by_type': {call_type: dict(counters) for call_type, counters in self.by_type.items()},
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'hedge_rate': self.hedges / self.calls if self.calls else 0.0,
+                'time_saved': round(self.time_saved, 3),
+                'retries': self.retries,
+                'failures': self.failures,
+                'latency': self.latencies.summary(),
+                'limiter': self.limiter.stats()
+            }
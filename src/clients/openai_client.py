@@ -1,11 +1,84 @@
 import os
 import re
+import httpx
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from clients.cassette import get_cassette, CassetteTransport
+from clients.completion_backend import CompletionBackend
+from clients.openai_rate_limiter import OpenAIRateLimiter
+
 # Charger les variables d'environnement
 load_dotenv()
 
+def create_openai_client(api_key=None, max_retries=None):
+    """
+    Crée un client OpenAI, dirigé vers OPENAI_BASE_URL si cette variable est définie
+    
+    OPENAI_BASE_URL permet de cibler un serveur compatible (proxy, modèle local ou
+    serveur simulé de tests/fake_openai_server.py) au lieu de l'API d'OpenAI.
+    Avec CASSETTE_MODE=record ou replay, les échanges sont enregistrés ou rejoués.
+    
+    Args:
+        api_key (str, optional): Clé API (par défaut: OPENAI_API_KEY)
+        max_retries (int, optional): Nouvelles tentatives du SDK (par défaut: celles du SDK)
+        
+    Returns:
+        OpenAI: Le client configuré
+    """
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    base_url = os.getenv('OPENAI_BASE_URL', '').strip("'\"") or None
+    cassette = get_cassette('openai')
+    if (base_url or (cassette and cassette.mode == 'replay')) and not api_key:
+        # Un serveur local ou un rejeu n'exige pas de clé, mais le SDK refuse une clé absente
+        api_key = 'local'
+    
+    http_client = httpx.Client(transport=CassetteTransport(cassette)) if cassette else None
+    options = {} if max_retries is None else {'max_retries': max_retries}
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, **options)
+
+_backends = {}
+
+def get_completion_backend(api_key=None):
+    """
+    Retourne le point d'accès partagé des complétions (voir clients/completion_backend.py)
+    
+    Tous les composants qui utilisent la même clé et le même serveur partagent le
+    même point d'accès, ce qui permet de regrouper leurs requêtes identiques.
+    Les nouvelles tentatives sont faites par le point d'accès (limiteur partagé,
+    délais exponentiels): le client est créé sans celles du SDK.
+    Configuration: OPENAI_COALESCE*, OPENAI_HEDGE*, OPENAI_LATENCY_WINDOW,
+    OPENAI_*CONCURRENCY et OPENAI_RETRY*.
+    
+    Args:
+        api_key (str, optional): Clé API (par défaut: OPENAI_API_KEY)
+        
+    Returns:
+        CompletionBackend: Le point d'accès partagé
+    """
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    key = (api_key, os.getenv('OPENAI_BASE_URL', '').strip("'\""))
+    if key not in _backends:
+        _backends[key] = CompletionBackend(
+            create_openai_client(api_key, max_retries=0),
+            coalesce=os.getenv('OPENAI_COALESCE', 'true').strip("'\"").lower() == 'true',
+            coalesce_max_temperature=float(os.getenv('OPENAI_COALESCE_MAX_TEMPERATURE', '0.8')),
+            hedge_call_types=[t.strip() for t in os.getenv('OPENAI_HEDGE_CALL_TYPES', '').strip("'\"").split(',') if t.strip()],
+            hedge_percentile=float(os.getenv('OPENAI_HEDGE_PERCENTILE', '95')),
+            hedge_budget=float(os.getenv('OPENAI_HEDGE_BUDGET', '0.05')),
+            hedge_min_samples=int(os.getenv('OPENAI_HEDGE_MIN_SAMPLES', '20')),
+            latency_window=int(os.getenv('OPENAI_LATENCY_WINDOW', '200')),
+            limiter=OpenAIRateLimiter(
+                initial_concurrency=int(os.getenv('OPENAI_CONCURRENCY', '8')),
+                max_concurrency=int(os.getenv('OPENAI_MAX_CONCURRENCY', '32')),
+                min_concurrency=int(os.getenv('OPENAI_MIN_CONCURRENCY', '1'))
+            ),
+            max_retries=int(os.getenv('OPENAI_RETRY_MAX', '4')),
+            retry_base_delay=float(os.getenv('OPENAI_RETRY_BASE_DELAY', '0.5')),
+            retry_max_delay=float(os.getenv('OPENAI_RETRY_MAX_DELAY', '20'))
+        )
+    return _backends[key]
+
 class OpenAIClient:
     def __init__(self):
         """
@@ -32,7 +105,8 @@ class OpenAIClient:
         print(f"🔧 Modèle utilisé par défaut: {'GPT-3.5-turbo' if self.economy_mode else 'GPT-4'}")
         
         # Importer OpenAI ici pour éviter les problèmes d'importation circulaire
-        self.client = OpenAI(api_key=self.api_key)
+        self.completions = get_completion_backend(self.api_key)
+        self.client = self.completions.client
     
     async def generate_punchline(self, subject=None, context=None, economy_mode=None):
         """
@@ -90,8 +164,6 @@ class OpenAIClient:
                 default_hashtags.append(subject_hashtag)
         
         try:
-            client = OpenAI(api_key=self.api_key)
-            
             if use_economy_mode:
                 # Version économique du prompt améliorée
                 system_content = "Tu es un expert en hashtags viraux et provocants pour les réseaux sociaux."
@@ -105,7 +177,8 @@ class OpenAIClient:
                 model = "gpt-4"
                 max_tokens = 300
             
-            response = client.chat.completions.create(
+            response = await self.completions.create(
+                call_type='hashtags',
                 model=model,
                 messages=[
                     {"role": "system", "content": system_content},
@@ -156,8 +229,6 @@ class OpenAIClient:
         default_description = f"Un regard satirique sur {subject} qui met en lumière les contradictions de notre société."
         
         try:
-            client = OpenAI(api_key=self.api_key)
-            
             if use_economy_mode:
                 # Version économique du prompt améliorée
                 system_content = "Tu es un expert en marketing de contenu satirique et provocant. Ton objectif est de créer des descriptions qui génèrent de l'engagement et des réactions fortes."
@@ -171,7 +242,8 @@ class OpenAIClient:
                 model = "gpt-4"
                 max_tokens = 200
             
-            response = client.chat.completions.create(
+            response = await self.completions.create(
+                call_type='description',
                 model=model,
                 messages=[
                     {"role": "system", "content": system_content},
@@ -310,7 +382,7 @@ Réponds UNIQUEMENT avec la punchline, sans guillemets ni autre texte."""
                 })
             
             # Appeler l'API OpenAI avec le payload
-            response = self.client.chat.completions.create(**payload)
+            response = await self.completions.create(call_type='punchline', **payload)
             
             # Extraire et retourner le texte de la réponse
             return response.choices[0].message.content
@@ -0,0 +1,170 @@
+import re
+import time
+import threading
+
+
+def parse_reset_duration(value):
+    """
+    Convertit un délai des en-têtes x-ratelimit-reset-* ("1s", "6m0s", "20ms") en secondes
+
+    Returns:
+        float: Le délai en secondes (None s'il est illisible)
+    """
+    if not value:
+        return None
+    units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|s|m|h)', str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class OpenAIRateLimiter:
+    """
+    Limiteur adaptatif des appels OpenAI, partagé par tous les threads qui appellent l'API
+
+    Deux mécanismes se combinent:
+    - les budgets de requêtes et de tokens par minute annoncés par l'API
+      (en-têtes x-ratelimit-remaining-* et x-ratelimit-reset-*): quand un budget
+      est épuisé, les appels attendent sa remise à zéro;
+    - une concurrence adaptative (AIMD): le nombre d'appels simultanés augmente
+      d'une unité par fenêtre de réponses réussies et est divisé par deux à
+      chaque 429, puis l'API est laissée au repos pendant le retry-after.
+
+    Les appels sont exécutés dans des threads (voir CompletionBackend): l'attente
+    est bloquante et l'état est protégé par une condition.
+    """
+
+    def __init__(self, initial_concurrency=8, max_concurrency=32, min_concurrency=1):
+        """
+        Args:
+            initial_concurrency (int): Nombre d'appels simultanés au départ
+            max_concurrency (int): Nombre maximum d'appels simultanés
+            min_concurrency (int): Nombre minimum d'appels simultanés
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+        # Budgets annoncés par l'API (None: inconnu)
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+
+        # Suivi
+        self.acquired = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.peak_limit = self.limit
+
+    def _wait_time(self, now, tokens):
+        """Délai imposé par les budgets et le repos après un 429 (<= 0: pas d'attente)"""
+        if self.remaining_requests is not None and now >= self._requests_reset_at:
+            self.remaining_requests = None
+        if self.remaining_tokens is not None and now >= self._tokens_reset_at:
+            self.remaining_tokens = None
+
+        wait = self._blocked_until - now
+        if self.remaining_requests is not None and self.remaining_requests <= 0:
+            wait = max(wait, self._requests_reset_at - now)
+        if self.remaining_tokens is not None and self.remaining_tokens < tokens:
+            wait = max(wait, self._tokens_reset_at - now)
+        return wait
+
+    def acquire(self, tokens=0):
+        """
+        Attend un créneau d'appel (bloquant)
+
+        Args:
+            tokens (int): Estimation des tokens consommés par l'appel (budget par minute)
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+            self.in_flight += 1
+            self.acquired += 1
+            if self.remaining_requests is not None:
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                self.remaining_tokens -= tokens
+            waited = time.monotonic() - start
+            if waited > 0.001:
+                self.throttled += 1
+                self.total_wait += waited
+
+    def release(self, headers=None, rate_limited=False, retry_after=None, succeeded=None):
+        """
+        Libère le créneau d'un appel terminé
+
+        Args:
+            headers: En-têtes de la réponse (x-ratelimit-*), s'il y en a une
+            rate_limited (bool): L'appel a reçu une réponse 429
+            retry_after (float): Délai de repos demandé par l'API, en secondes
+            succeeded (bool): L'appel a réussi (par défaut: s'il y a une réponse);
+                seuls les succès augmentent la concurrence
+        """
+        if succeeded is None:
+            succeeded = headers is not None and not rate_limited
+        with self._condition:
+            now = time.monotonic()
+            self.in_flight = max(0, self.in_flight - 1)
+            if headers is not None:
+                self._update(headers, now)
+
+            if rate_limited:
+                self.rate_limited += 1
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+                # Une seule réduction par rafale de 429
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+            elif succeeded:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+
+            self._condition.notify_all()
+
+    def _update(self, headers, now):
+        """Met à jour les budgets à partir des en-têtes x-ratelimit-*"""
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            reset = parse_reset_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            setattr(self, f'remaining_{kind}', remaining)
+            setattr(self, f'_{kind}_reset_at', now + (reset if reset is not None else 60.0))
+
+    def stats(self):
+        """Compteurs de suivi"""
+        with self._condition:
+            return {
+                'concurrency': round(self.limit, 2),
+                'peak_concurrency': round(self.peak_limit, 2),
+                'in_flight': self.in_flight,
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'rate_limited': self.rate_limited,
+                'total_wait': round(self.total_wait, 3),
+                'remaining_requests': self.remaining_requests,
+                'remaining_tokens': self.remaining_tokens
+            }
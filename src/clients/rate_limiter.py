@@ -0,0 +1,165 @@
+import os
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    Seau à jetons: `rate` jetons par seconde, au plus `capacity` jetons accumulés
+
+    Les réservations sont faites sans verrou (la boucle asyncio est monothread):
+    le solde peut devenir négatif, chaque appelant attend alors son tour dans
+    l'ordre des réservations.
+    """
+
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate (float): Nombre de jetons ajoutés par seconde
+            capacity (float): Nombre maximum de jetons (taille des rafales)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def reserve(self):
+        """
+        Réserve un jeton
+
+        Returns:
+            float: Délai en secondes avant de pouvoir utiliser le jeton
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(wait, self._blocked_until - now)
+
+    def blocked_for(self):
+        """Durée restante du blocage imposé par pause(), en secondes"""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def pause(self, seconds):
+        """
+        Bloque le seau pendant un délai (réponse 429 de l'API)
+
+        Args:
+            seconds (float): Durée du blocage en secondes
+        """
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = min(self._tokens, 0)
+
+    def refund(self):
+        """Rend le jeton d'une réservation abandonnée"""
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class TelegramRateLimiter:
+    """
+    Limiteur de débit d'un bot Telegram, calé sur les limites documentées de l'API:
+    environ 30 messages par seconde au total, 1 message par seconde et par chat,
+    et 20 messages par minute dans un groupe ou un canal.
+    """
+
+    def __init__(self, global_rate=30, chat_rate=1, group_per_minute=20):
+        """
+        Args:
+            global_rate (float): Messages par seconde pour l'ensemble des chats
+            chat_rate (float): Messages par seconde dans un même chat
+            group_per_minute (float): Messages par minute dans un groupe ou un canal
+        """
+        self.chat_rate = chat_rate
+        self.group_per_minute = group_per_minute
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chats = {}
+        self._groups = {}
+
+        # Suivi
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    @staticmethod
+    def is_group(chat_id):
+        """Les groupes et canaux ont un ID négatif (les @noms publics sont des canaux)"""
+        chat_id = str(chat_id)
+        return chat_id.startswith('-') or chat_id.startswith('@')
+
+    def _buckets(self, chat_id):
+        """Seaux à consulter pour un envoi dans un chat"""
+        key = str(chat_id)
+        if key not in self._chats:
+            self._chats[key] = TokenBucket(self.chat_rate, capacity=1)
+        buckets = [self._global, self._chats[key]]
+
+        if self.is_group(chat_id):
+            if key not in self._groups:
+                self._groups[key] = TokenBucket(self.group_per_minute / 60, capacity=self.group_per_minute)
+            buckets.append(self._groups[key])
+
+        return buckets
+
+    async def acquire(self, chat_id):
+        """
+        Attend que le budget permette un envoi dans un chat
+
+        Args:
+            chat_id (str): ID du chat destinataire
+        """
+        buckets = self._buckets(chat_id)
+        wait = max(bucket.reserve() for bucket in buckets)
+        self.acquired += 1
+        if wait > 0:
+            self.throttled += 1
+
+        while wait > 0:
+            self.total_wait += wait
+            await asyncio.sleep(wait)
+            # Un 429 reçu pendant l'attente annule la réservation: rendre ses jetons
+            # et reprendre un tour après le blocage (un seul jeton consommé par envoi)
+            wait = 0.0
+            if any(bucket.blocked_for() > 0 for bucket in buckets):
+                for bucket in buckets:
+                    bucket.refund()
+                wait = max(bucket.reserve() for bucket in buckets)
+
+    def penalize(self, chat_id, retry_after):
+        """
+        Applique le délai imposé par une réponse 429 (RetryAfter)
+
+        Args:
+            chat_id (str): ID du chat concerné (None: tout le bot)
+            retry_after (float): Délai en secondes retourné par Telegram
+        """
+        buckets = [self._global] if chat_id is None else self._buckets(chat_id)[1:]
+        for bucket in buckets:
+            bucket.pause(retry_after)
+
+
+_limiters = {}
+
+
+def get_bot_rate_limiter(bot_id):
+    """
+    Retourne le limiteur partagé d'un bot (configuré par les variables d'environnement)
+
+    Les limites de Telegram s'appliquent par bot: tous les clients d'un même bot
+    partagent le même limiteur.
+
+    Args:
+        bot_id (str): Identifiant du bot
+
+    Returns:
+        TelegramRateLimiter: Le limiteur du bot
+    """
+    if bot_id not in _limiters:
+        _limiters[bot_id] = TelegramRateLimiter(
+            global_rate=float(os.getenv('TELEGRAM_RATE_LIMIT', '30')),
+            chat_rate=float(os.getenv('TELEGRAM_CHAT_RATE_LIMIT', '1')),
+            group_per_minute=float(os.getenv('TELEGRAM_GROUP_RATE_LIMIT', '20'))
+        )
+    return _limiters[bot_id]
@@ -1,8 +1,15 @@
 import os
 import asyncio
+import random
 import time
-from telegram import Bot
-from telegram.error import TelegramError, TimedOut, NetworkError
+from contextlib import ExitStack
+from telegram import Bot, InputFile, InputMediaVideo
+from telegram.request import HTTPXRequest
+from telegram.error import TelegramError, TimedOut, NetworkError, BadRequest, RetryAfter
+from clients.telegram_file_cache import TelegramFileCache
+from clients.rate_limiter import get_bot_rate_limiter
+from clients.cassette import get_cassette, CassetteRequest
+from core.video_metadata import probe_video, RenderedVideo
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
@@ -16,16 +23,42 @@ class TelegramClient:
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         
+        # Plusieurs destinataires possibles, séparés par des virgules (chats, groupes, canaux)
+        self.chat_ids = [c.strip() for c in (self.chat_id or '').split(',') if c.strip()]
+        if self.chat_ids:
+            self.chat_id = self.chat_ids[0]
+        
         # Gérer correctement la valeur booléenne, même si elle est entourée de guillemets
         auto_send_value = os.getenv('TELEGRAM_AUTO_SEND', 'false')
         # Supprimer les guillemets éventuels
         auto_send_value = auto_send_value.strip("'\"")
         self.auto_send = auto_send_value.lower() == 'true'
         
+        # Les file_id ne sont valables que pour le bot qui les a obtenus
+        self.bot_id = self.token.split(':')[0] if self.token else None
+        
+        # Limiteur de débit partagé par tous les envois du bot (limites de l'API Telegram)
+        self.rate_limiter = get_bot_rate_limiter(self.bot_id)
+        self.max_concurrent_sends = max(1, int(os.getenv('TELEGRAM_MAX_CONCURRENT_SENDS', '4')))
+        
+        # Envoi des lots sous forme d'albums (send_media_group, 10 vidéos au plus par album)
+        self.album_mode = os.getenv('TELEGRAM_ALBUM_MODE', 'false').strip("'\"").lower() == 'true'
+        
+        # Cache des file_id pour ne pas renvoyer une vidéo déjà envoyée
+        self.file_cache = None
+        if os.getenv('TELEGRAM_FILE_CACHE', 'true').strip("'\"").lower() == 'true':
+            max_age = os.getenv('TELEGRAM_FILE_CACHE_MAX_AGE_DAYS', '').strip("'\"")
+            try:
+                self.file_cache = TelegramFileCache(max_age_days=float(max_age) if max_age else None)
+            except Exception as e:
+                print(f"⚠️ Cache des file_id Telegram indisponible: {str(e)}")
+        
         # Afficher les paramètres pour le débogage
         print(f"🔍 Configuration Telegram:")
         print(f"  - Token configuré: {'Oui' if self.token and self.token != 'your_telegram_bot_token_here' else 'Non'}")
         print(f"  - Chat ID configuré: {'Oui' if self.chat_id and self.chat_id != 'your_telegram_chat_id_here' else 'Non'}")
+        if len(self.chat_ids) > 1:
+            print(f"  - Nombre de destinataires: {len(self.chat_ids)}")
         print(f"  - Valeur brute de TELEGRAM_AUTO_SEND: '{auto_send_value}'")
         print(f"  - Envoi automatique: {'Activé' if self.auto_send else 'Désactivé'}")
         
@@ -41,7 +74,25 @@ class TelegramClient:
         # Initialiser le bot si les paramètres sont valides
         if self.token and self.token != 'your_telegram_bot_token_here':
             try:
-                self.bot = Bot(token=self.token)
+                # Serveur de l'API Bot: api.telegram.org, serveur local (telegram-bot-api) ou serveur simulé
+                base_url = os.getenv('TELEGRAM_API_BASE_URL', '').strip("'\"").rstrip('/')
+                bot_kwargs = {}
+                if base_url:
+                    if not base_url.endswith('/bot'):
+                        base_url += '/bot'
+                    bot_kwargs['base_url'] = base_url
+                    bot_kwargs['base_file_url'] = base_url[:-len('/bot')] + '/file/bot'
+                    print(f"  - Serveur de l'API Bot: {base_url}")
+                
+                # Un pool d'une seule connexion (valeur par défaut) sérialiserait les envois concurrents
+                request = HTTPXRequest(connection_pool_size=max(8, self.max_concurrent_sends * 2), pool_timeout=30)
+                
+                # Enregistrement ou rejeu des appels à l'API Bot (CASSETTE_MODE)
+                cassette = get_cassette('telegram')
+                if cassette:
+                    request = CassetteRequest(cassette, request)
+                
+                self.bot = Bot(token=self.token, request=request, **bot_kwargs)
                 print("✅ Client Telegram initialisé avec succès.")
             except Exception as e:
                 print(f"❌ Erreur lors de l'initialisation du client Telegram: {str(e)}")
@@ -52,94 +103,482 @@ class TelegramClient:
             self.bot = None
             self.auto_send = False
     
-    async def send_video(self, video_path, caption=None, max_retries=3):
+    async def send_video(self, video, caption=None, max_retries=3, chat_ids=None):
         """
         Envoie une vidéo sur Telegram
         
         Args:
-            video_path (str): Chemin vers la vidéo à envoyer
+            video: Chemin vers la vidéo à envoyer, ou vidéo en mémoire (RenderedVideo, bytes ou objet fichier)
             caption (str, optional): Légende de la vidéo
             max_retries (int, optional): Nombre maximum de tentatives en cas d'erreur
+            chat_ids (list, optional): Destinataires (par défaut: ceux de TELEGRAM_CHAT_ID)
             
         Returns:
-            bool: True si l'envoi a réussi, False sinon
+            bool: True si l'envoi a réussi pour tous les destinataires, False sinon
+        """
+        results = await self.send_video_to_chats(video, caption, max_retries, chat_ids)
+        return bool(results) and all(message_id is not None for message_id in results.values())
+    
+    async def send_video_to_chats(self, video, caption=None, max_retries=3, chat_ids=None, force=False):
         """
+        Envoie une vidéo à plusieurs destinataires en ne la téléversant qu'une fois
+        
+        La vidéo est envoyée au premier destinataire, puis diffusée en parallèle aux
+        autres à partir du file_id retourné par Telegram.
+        
+        Args:
+            video: Chemin vers la vidéo à envoyer, ou vidéo en mémoire (RenderedVideo, bytes ou objet fichier)
+            caption (str, optional): Légende de la vidéo
+            max_retries (int, optional): Nombre maximum de tentatives en cas d'erreur
+            chat_ids (list, optional): Destinataires (par défaut: ceux de TELEGRAM_CHAT_ID)
+            force (bool, optional): Envoyer même si TELEGRAM_AUTO_SEND est désactivé
+            
+        Returns:
+            dict: ID du message envoyé pour chaque destinataire (None en cas d'échec)
+        """
+        chat_ids = list(chat_ids) if chat_ids else list(self.chat_ids)
         # Vérifier si l'envoi est activé
-        if not self.auto_send:
+        if not self.auto_send and not force:
             print("ℹ️ L'envoi sur Telegram est désactivé.")
-            return False
+            return {}
         
         if not self.bot:
             print("❌ Le bot Telegram n'est pas initialisé.")
-            return False
+            return {}
         
-        # Vérifier que le fichier existe
-        if not os.path.exists(video_path):
-            print(f"❌ Erreur: Le fichier vidéo n'existe pas: {video_path}")
-            return False
+        if isinstance(video, str):
+            # Vérifier que le fichier existe
+            if not os.path.exists(video):
+                print(f"❌ Erreur: Le fichier vidéo n'existe pas: {video}")
+                return {}
+            name, size = video, os.path.getsize(video)
+        else:
+            # Vidéo en mémoire: envoyée directement, sans passer par le disque
+            try:
+                video = self._in_memory_video(video)
+            except Exception as e:
+                print(f"❌ Erreur: Impossible de lire la vidéo en mémoire: {str(e)}")
+                return {}
+            name, size = f"{video.filename} (en mémoire)", video.size
         
         # Afficher les informations pour le débogage
         print(f"🔍 Envoi de la vidéo sur Telegram:")
-        print(f"  - Fichier: {video_path}")
-        print(f"  - Taille: {os.path.getsize(video_path) / (1024*1024):.2f} MB")
-        print(f"  - Chat ID: {self.chat_id}")
+        print(f"  - Fichier: {name}")
+        print(f"  - Taille: {size / (1024*1024):.2f} MB")
+        print(f"  - Chat ID: {', '.join(str(c) for c in chat_ids)}")
+        
+        results = {}
+        file_id = None
+        
+        # Téléverser la vidéo une seule fois: le premier destinataire qui la reçoit fournit le file_id
+        remaining = list(chat_ids)
+        while remaining and file_id is None:
+            chat_id = remaining.pop(0)
+            message = await self._deliver(chat_id, video, caption, max_retries)
+            results[chat_id] = message.message_id if message else None
+            if message and message.video:
+                file_id = message.video.file_id
+        
+        # Diffuser aux autres destinataires par file_id, en parallèle
+        if remaining:
+            if file_id:
+                print(f"📡 Diffusion de la vidéo à {len(remaining)} autre(s) destinataire(s) par file_id...")
+            messages = await asyncio.gather(*[
+                self._deliver(chat_id, video, caption, max_retries, file_id=file_id)
+                for chat_id in remaining
+            ])
+            for chat_id, message in zip(remaining, messages):
+                results[chat_id] = message.message_id if message else None
+        
+        if len(chat_ids) > 1:
+            success_count = sum(1 for message_id in results.values() if message_id is not None)
+            print(f"📊 Vidéo envoyée à {success_count}/{len(chat_ids)} destinataire(s)")
+            for chat_id, message_id in results.items():
+                status = f"✅ message {message_id}" if message_id is not None else "❌ échec"
+                print(f"  - {chat_id}: {status}")
+        
+        return results
+    
+    async def _deliver(self, chat_id, video, caption=None, max_retries=3, file_id=None):
+        """
+        Envoie une vidéo dans un chat, en réutilisant le file_id du cache si le même
+        contenu a déjà été envoyé par ce bot
+        
+        Args:
+            chat_id (str): ID du chat destinataire
+            video (str | RenderedVideo): Chemin vers la vidéo à envoyer, ou vidéo en mémoire
+            caption (str, optional): Légende de la vidéo
+            max_retries (int, optional): Nombre maximum de tentatives en cas d'erreur
+            file_id (str, optional): file_id déjà connu pour cette vidéo
+            
+        Returns:
+            telegram.Message: Le message envoyé, ou None en cas d'échec
+        """
+        known_file_id = file_id
+        metadata = None
+        sha256 = None
+        if self.file_cache and not known_file_id:
+            try:
+                if isinstance(video, RenderedVideo):
+                    sha256 = video.sha256
+                else:
+                    sha256 = await asyncio.to_thread(self.file_cache.file_hash, video)
+            except Exception as e:
+                print(f"⚠️ Impossible de calculer l'empreinte de la vidéo, cache désactivé pour cet envoi: {str(e)}")
         
         # Tentatives d'envoi avec gestion des erreurs
         for attempt in range(1, max_retries + 1):
             try:
-                # Envoyer la vidéo
-                print(f"📤 Envoi de la vidéo sur Telegram (tentative {attempt}/{max_retries})...")
-                with open(video_path, 'rb') as video:
-                    message = await self.bot.send_video(
-                        chat_id=self.chat_id,
-                        video=video,
-                        caption=caption,
-                        supports_streaming=True,
-                        parse_mode='Markdown'  # Activer le formatage Markdown
-                    )
-                    print(f"✅ Vidéo envoyée avec succès sur Telegram! Message ID: {message.message_id}")
-                return True
+                message = None
+                
+                # Réutiliser le fichier déjà présent sur les serveurs de Telegram
+                file_id = known_file_id or (self.file_cache.get(sha256, self.bot_id) if sha256 else None)
+                if file_id:
+                    print(f"♻️ Envoi de la vidéo par file_id, sans nouvel upload (tentative {attempt}/{max_retries})...")
+                    message = await self._send_cached(chat_id, sha256, file_id, caption)
+                    if message is None:
+                        known_file_id = None
+                
+                if message is None:
+                    # Envoyer la vidéo
+                    print(f"📤 Envoi de la vidéo sur Telegram (tentative {attempt}/{max_retries})...")
+                    if metadata is None:
+                        if isinstance(video, RenderedVideo):
+                            metadata = video.metadata
+                        else:
+                            metadata = await asyncio.to_thread(probe_video, video)
+                    await self.rate_limiter.acquire(chat_id)
+                    with ExitStack() as stack:
+                        if isinstance(video, RenderedVideo):
+                            upload = InputFile(video.data, filename=video.filename)
+                        else:
+                            upload = stack.enter_context(open(video, 'rb'))
+                        message = await self.bot.send_video(
+                            chat_id=chat_id,
+                            video=upload,
+                            caption=caption,
+                            supports_streaming=True,
+                            parse_mode='Markdown',  # Activer le formatage Markdown
+                            **self._video_attributes(metadata, stack)
+                        )
+                    self._remember_file(sha256, message)
+                
+                print(f"✅ Vidéo envoyée avec succès sur Telegram! Message ID: {message.message_id}")
+                return message
+            except RetryAfter as e:
+                # Limite de débit atteinte: Telegram indique le délai à respecter
+                retry_after = self._retry_after_seconds(e)
+                self.rate_limiter.penalize(chat_id, retry_after)
+                print(f"⚠️ Limite de débit Telegram atteinte (tentative {attempt}/{max_retries}), attente imposée: {retry_after:.0f}s")
+                if attempt < max_retries:
+                    print(f"⏳ Nouvelle tentative dans {retry_after:.0f} secondes...")
+                else:
+                    print(f"❌ Échec après {max_retries} tentatives.")
+                    return None
             except TimedOut as e:
                 # Erreur de timeout, on réessaie
                 print(f"⚠️ Timeout lors de l'envoi de la vidéo (tentative {attempt}/{max_retries}): {str(e)}")
                 if attempt < max_retries:
                     # Attendre un peu plus longtemps à chaque tentative
-                    wait_time = 2 * attempt
-                    print(f"⏳ Nouvelle tentative dans {wait_time} secondes...")
+                    wait_time = self._backoff_delay(attempt, 2)
+                    print(f"⏳ Nouvelle tentative dans {wait_time:.1f} secondes...")
                     await asyncio.sleep(wait_time)
                 else:
                     print(f"❌ Échec après {max_retries} tentatives.")
-                    return False
+                    return None
             except NetworkError as e:
                 # Erreur réseau, on réessaie
                 print(f"⚠️ Erreur réseau lors de l'envoi de la vidéo (tentative {attempt}/{max_retries}): {str(e)}")
                 if attempt < max_retries:
                     # Attendre un peu plus longtemps à chaque tentative
-                    wait_time = 3 * attempt
-                    print(f"⏳ Nouvelle tentative dans {wait_time} secondes...")
+                    wait_time = self._backoff_delay(attempt, 3)
+                    print(f"⏳ Nouvelle tentative dans {wait_time:.1f} secondes...")
                     await asyncio.sleep(wait_time)
                 else:
                     print(f"❌ Échec après {max_retries} tentatives.")
-                    return False
+                    return None
             except TelegramError as e:
                 print(f"❌ Erreur Telegram lors de l'envoi de la vidéo: {str(e)}")
                 # Afficher plus de détails sur l'erreur
                 if hasattr(e, 'message'):
                     print(f"  - Message d'erreur: {e.message}")
-                return False
+                return None
             except Exception as e:
                 print(f"❌ Erreur inattendue lors de l'envoi de la vidéo: {str(e)}")
                 import traceback
                 traceback.print_exc()
-                return False
+                return None
+    
+    async def _send_cached(self, chat_id, sha256, file_id, caption=None):
+        """
+        Envoie une vidéo à partir d'un file_id du cache
+        
+        Si Telegram refuse le file_id (expiré ou inconnu), l'entrée est invalidée et
+        None est retourné pour que l'appelant renvoie le fichier.
+        
+        Returns:
+            telegram.Message: Le message envoyé, ou None si le file_id n'est plus valide
+        """
+        await self.rate_limiter.acquire(chat_id)
+        try:
+            return await self.bot.send_video(
+                chat_id=chat_id,
+                video=file_id,
+                caption=caption,
+                supports_streaming=True,
+                parse_mode='Markdown'
+            )
+        except BadRequest as e:
+            # Les erreurs de légende (Markdown invalide...) ne concernent pas le file_id
+            if 'file' not in str(e).lower():
+                raise
+            print(f"⚠️ file_id refusé par Telegram, le fichier va être renvoyé: {str(e)}")
+            if sha256:
+                self.file_cache.invalidate(sha256, self.bot_id)
+            return None
     
-    async def send_batch_videos(self, results, delay_between_videos=2):
+    @staticmethod
+    def _video_attributes(metadata, stack):
+        """
+        Paramètres d'envoi issus des métadonnées de la vidéo (dimensions, durée, miniature)
+        
+        Les fournir évite à Telegram d'analyser la vidéo avant de pouvoir la lire.
+        
+        Args:
+            metadata (dict): Résultat de probe_video (vide si la vidéo n'a pas pu être lue), la
+                miniature étant un chemin ou son contenu JPEG
+            stack (ExitStack): Contexte qui ferme la miniature après l'envoi
+            
+        Returns:
+            dict: Paramètres à passer à send_video ou InputMediaVideo
+        """
+        if not metadata:
+            return {}
+        
+        attributes = {
+            'width': metadata['width'],
+            'height': metadata['height'],
+            'duration': int(round(metadata['duration']))
+        }
+        thumbnail = metadata.get('thumbnail')
+        if isinstance(thumbnail, bytes):
+            attributes['thumbnail'] = InputFile(thumbnail, filename='thumbnail.jpg')
+        elif thumbnail and os.path.exists(thumbnail):
+            attributes['thumbnail'] = stack.enter_context(open(thumbnail, 'rb'))
+        return attributes
+    
+    @staticmethod
+    def _in_memory_video(video):
+        """
+        Normalise une vidéo en mémoire pour l'envoi
+        
+        Args:
+            video: RenderedVideo, bytes ou objet fichier binaire (io.BytesIO, mmap...)
+            
+        Returns:
+            RenderedVideo: La vidéo (sans métadonnées si elles ne sont pas connues)
+        """
+        if isinstance(video, RenderedVideo):
+            return video
+        if isinstance(video, (bytes, bytearray, memoryview)):
+            return RenderedVideo(data=bytes(video), filename='video.mp4')
+        
+        # Objet fichier: lu depuis le début
+        if hasattr(video, 'seek'):
+            video.seek(0)
+        name = os.path.basename(str(getattr(video, 'name', '') or '')) or 'video.mp4'
+        return RenderedVideo(data=video.read(), filename=name)
+    
+    @staticmethod
+    def _backoff_delay(attempt, base):
+        """
+        Délai exponentiel avec gigue avant une nouvelle tentative
+        
+        La gigue évite que des envois concurrents échoués réessaient tous en même temps.
+        """
+        return base * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+    
+    @staticmethod
+    def _retry_after_seconds(error):
+        """Délai imposé par une erreur RetryAfter, en secondes (entier ou timedelta selon la version)"""
+        retry_after = error.retry_after
+        if hasattr(retry_after, 'total_seconds'):
+            return retry_after.total_seconds()
+        return float(retry_after)
+    
+    def _remember_file(self, sha256, message):
+        """
+        Enregistre dans le cache le file_id de la vidéo d'un message envoyé
+        """
+        if not sha256 or not message or not message.video:
+            return
+        try:
+            self.file_cache.put(
+                sha256,
+                self.bot_id,
+                message.video.file_id,
+                message.video.file_unique_id,
+                message.video.file_size
+            )
+        except Exception as e:
+            print(f"⚠️ Impossible d'enregistrer le file_id dans le cache: {str(e)}")
+    
+    async def send_album(self, videos, chat_ids=None, max_retries=3):
+        """
+        Envoie des vidéos sous forme d'albums (send_media_group), 10 vidéos au plus par album
+        
+        Chaque vidéo garde sa propre légende. Les albums sont téléversés une fois, au
+        premier destinataire, puis diffusés aux autres par file_id. Si un album est
+        refusé, ses vidéos sont envoyées une par une.
+        
+        Args:
+            videos (list): Liste de tuples (chemin de la vidéo, légende)
+            chat_ids (list, optional): Destinataires (par défaut: ceux de TELEGRAM_CHAT_ID)
+            max_retries (int, optional): Nombre maximum de tentatives en cas d'erreur
+            
+        Returns:
+            list: Pour chaque vidéo, True si elle a été envoyée à tous les destinataires
+        """
+        chat_ids = list(chat_ids) if chat_ids else list(self.chat_ids)
+        if not self.bot or not chat_ids:
+            print("❌ Le bot Telegram n'est pas initialisé ou aucun chat n'est configuré.")
+            return [False] * len(videos)
+        
+        delivered = [os.path.exists(path) for path, _ in videos]
+        for (path, _), exists in zip(videos, delivered):
+            if not exists:
+                print(f"❌ Erreur: Le fichier vidéo n'existe pas: {path}")
+        indices = [i for i, exists in enumerate(delivered) if exists]
+        
+        # Empreintes pour le cache des file_id
+        hashes = [None] * len(videos)
+        if self.file_cache:
+            for i in indices:
+                try:
+                    hashes[i] = await asyncio.to_thread(self.file_cache.file_hash, videos[i][0])
+                except Exception as e:
+                    print(f"⚠️ Impossible de calculer l'empreinte de la vidéo: {str(e)}")
+        
+        file_ids = [None] * len(videos)
+        for start in range(0, len(indices), 10):
+            chunk = indices[start:start + 10]
+            print(f"🖼️ Envoi d'un album de {len(chunk)} vidéo(s) à {len(chat_ids)} destinataire(s)...")
+            
+            # Le premier destinataire reçoit les fichiers, les autres les file_id obtenus
+            first = await self._send_album_chunk(chat_ids[0], chunk, videos, hashes, file_ids, max_retries)
+            others = await asyncio.gather(*[
+                self._send_album_chunk(chat_id, chunk, videos, hashes, file_ids, max_retries)
+                for chat_id in chat_ids[1:]
+            ])
+            for results in [first] + list(others):
+                for i, success in zip(chunk, results):
+                    delivered[i] = delivered[i] and success
+        
+        return delivered
+    
+    async def _send_album_chunk(self, chat_id, indices, videos, hashes, file_ids, max_retries=3):
+        """
+        Envoie un album (10 vidéos au plus) dans un chat, avec repli sur des envois individuels
+        
+        Args:
+            chat_id (str): ID du chat destinataire
+            indices (list): Indices des vidéos de l'album dans `videos`
+            videos (list): Liste de tuples (chemin de la vidéo, légende)
+            hashes (list): Empreintes des vidéos (None si inconnues)
+            file_ids (list): file_id connus des vidéos, complétés après l'envoi
+            max_retries (int, optional): Nombre maximum de tentatives en cas d'erreur
+            
+        Returns:
+            list: True ou False pour chaque vidéo de l'album
+        """
+        # Un album contient au moins deux éléments
+        if len(indices) > 1:
+            for attempt in range(1, max_retries + 1):
+                try:
+                    with ExitStack() as stack:
+                        media = []
+                        for i in indices:
+                            path, caption = videos[i]
+                            file_id = file_ids[i] or (self.file_cache.get(hashes[i], self.bot_id) if hashes[i] else None)
+                            attributes = {}
+                            if not file_id:
+                                metadata = await asyncio.to_thread(probe_video, path)
+                                attributes = self._video_attributes(metadata, stack)
+                            media.append(InputMediaVideo(
+                                media=file_id or stack.enter_context(open(path, 'rb')),
+                                caption=caption,
+                                parse_mode='Markdown',
+                                supports_streaming=True,
+                                **attributes
+                            ))
+                        
+                        await self.rate_limiter.acquire(chat_id)
+                        messages = await self.bot.send_media_group(chat_id=chat_id, media=media)
+                    
+                    for i, message in zip(indices, messages):
+                        if message.video and not file_ids[i]:
+                            file_ids[i] = message.video.file_id
+                            self._remember_file(hashes[i], message)
+                    print(f"✅ Album de {len(indices)} vidéo(s) envoyé dans {chat_id}")
+                    return [True] * len(indices)
+                except RetryAfter as e:
+                    retry_after = self._retry_after_seconds(e)
+                    self.rate_limiter.penalize(chat_id, retry_after)
+                    print(f"⚠️ Limite de débit Telegram atteinte pour l'album (tentative {attempt}/{max_retries}), attente imposée: {retry_after:.0f}s")
+                except BadRequest as e:
+                    # Requête refusée (file_id périmé, légende invalide...): inutile de réessayer l'album
+                    print(f"❌ Album refusé par Telegram: {str(e)}")
+                    break
+                except NetworkError as e:
+                    print(f"⚠️ Erreur réseau lors de l'envoi de l'album (tentative {attempt}/{max_retries}): {str(e)}")
+                    if attempt < max_retries:
+                        await asyncio.sleep(self._backoff_delay(attempt, 2))
+                except TelegramError as e:
+                    print(f"❌ Erreur Telegram lors de l'envoi de l'album: {str(e)}")
+                    break
+            
+            print("⚠️ Album non envoyé, envoi des vidéos une par une...")
+        
+        results = []
+        for i in indices:
+            path, caption = videos[i]
+            message = await self._deliver(chat_id, path, caption, max_retries, file_id=file_ids[i])
+            if message and message.video and not file_ids[i]:
+                file_ids[i] = message.video.file_id
+            results.append(message is not None)
+        return results
+    
+    @staticmethod
+    def _batch_caption(result):
+        """
+        Crée la légende d'un mème d'un lot (titre, description et hashtags, en Markdown)
+        """
+        # Créer un message complet avec le sujet, la punchline, la description et les hashtags
+        caption = f"*🎭 L'ARROGANCE!*\n\n"
+        
+        # Ajouter la description si elle existe
+        if 'description' in result:
+            caption += f"{result['description']}\n\n"
+        
+        # Ajouter les hashtags si ils existent
+        if 'hashtags' in result:
+            caption += " ".join(result['hashtags'])
+        
+        return caption
+    
+    async def send_batch_videos(self, results, delay_between_videos=None, as_album=None):
         """
         Envoie plusieurs vidéos sur Telegram
         
+        Les envois sont concurrents (au plus TELEGRAM_MAX_CONCURRENT_SENDS à la fois),
+        le rythme étant donné par le limiteur de débit du bot. En mode album, les vidéos
+        sont regroupées par 10 dans des send_media_group.
+        
         Args:
             results (list): Liste des résultats de génération de mèmes
-            delay_between_videos (int, optional): Délai en secondes entre chaque envoi
+            delay_between_videos (int, optional): Délai minimum en secondes entre deux envois
+                (par défaut: aucun, seul le limiteur de débit s'applique)
+            as_album (bool, optional): Envoyer par albums (par défaut: TELEGRAM_ALBUM_MODE)
             
         Returns:
             int: Nombre de vidéos envoyées avec succès
@@ -148,31 +587,38 @@ class TelegramClient:
             print("ℹ️ L'envoi par lots sur Telegram est désactivé.")
             return 0
         
-        success_count = 0
-        for i, result in enumerate(results):
-            try:
-                print(f"\n[{i+1}/{len(results)}] 📤 Envoi de la vidéo '{result['subject']}' sur Telegram...")
-                
-                # Créer un message complet avec le sujet, la punchline, la description et les hashtags
-                caption = f"*🎭 L'ARROGANCE!*\n\n"
-                
-                # Ajouter la description si elle existe
-                if 'description' in result:
-                    caption += f"{result['description']}\n\n"
-                
-                # Ajouter les hashtags si ils existent
-                if 'hashtags' in result:
-                    caption += " ".join(result['hashtags'])
-                
-                success = await self.send_video(result['video_path'], caption)
-                if success:
-                    success_count += 1
-                
-                # Attendre un peu entre chaque envoi pour éviter les limitations de l'API
-                if i < len(results) - 1:  # Ne pas attendre après le dernier envoi
-                    print(f"⏳ Attente de {delay_between_videos} secondes avant le prochain envoi...")
-                    await asyncio.sleep(delay_between_videos)
-            except Exception as e:
-                print(f"❌ Erreur lors de l'envoi d'une vidéo: {str(e)}")
+        if as_album if as_album is not None else self.album_mode:
+            start_time = time.time()
+            delivered = await self.send_album(
+                [(result['video_path'], self._batch_caption(result)) for result in results]
+            )
+            success_count = sum(1 for success in delivered if success)
+            print(f"📊 {success_count}/{len(results)} vidéo(s) envoyée(s) par albums en {time.time() - start_time:.1f}s")
+            return success_count
+        
+        semaphore = asyncio.Semaphore(1 if delay_between_videos else self.max_concurrent_sends)
+        
+        async def send_one(i, result):
+            async with semaphore:
+                try:
+                    print(f"\n[{i+1}/{len(results)}] 📤 Envoi de la vidéo '{result['subject']}' sur Telegram...")
+                    
+                    success = await self.send_video(result['video_path'], self._batch_caption(result))
+                    
+                    # Délai explicite entre deux envois, si demandé
+                    if delay_between_videos and i < len(results) - 1:
+                        print(f"⏳ Attente de {delay_between_videos} secondes avant le prochain envoi...")
+                        await asyncio.sleep(delay_between_videos)
+                    
+                    return success
+                except Exception as e:
+                    print(f"❌ Erreur lors de l'envoi d'une vidéo: {str(e)}")
+                    return False
+        
+        start_time = time.time()
+        successes = await asyncio.gather(*[send_one(i, result) for i, result in enumerate(results)])
+        success_count = sum(1 for success in successes if success)
         
-        return success_count 
\ No newline at end of file
+        print(f"📊 {success_count}/{len(results)} vidéo(s) envoyée(s) en {time.time() - start_time:.1f}s "
+              f"({self.rate_limiter.throttled} envoi(s) retardé(s) par le limiteur de débit)")
+        return success_count
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+
+class TelegramFileCache:
+    """
+    Cache persistant des file_id Telegram, indexé par empreinte SHA-256 du contenu
+
+    Un file_id n'est valable que pour le bot qui l'a obtenu: les entrées sont donc
+    rangées par (empreinte, identifiant du bot).
+    """
+
+    def __init__(self, db_path=None, max_age_days=None):
+        """
+        Initialise le cache
+
+        Args:
+            db_path (str, optional): Chemin de la base SQLite (par défaut: data/telegram_file_cache.db)
+            max_age_days (float, optional): Âge maximum d'une entrée avant d'être ignorée (None: illimité)
+        """
+        if not db_path:
+            db_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                'data',
+                'telegram_file_cache.db'
+            )
+
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        # Empreintes déjà calculées dans ce processus: (chemin, taille, date de modification) -> sha256
+        self._hashes: Dict[Tuple[str, int, float], str] = {}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS telegram_files (
+                sha256 TEXT NOT NULL,
+                bot_id TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                file_unique_id TEXT,
+                file_size INTEGER,
+                created_at TIMESTAMP NOT NULL,
+                last_used_at TIMESTAMP,
+                PRIMARY KEY (sha256, bot_id)
+            )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def file_hash(self, path):
+        """
+        Calcule l'empreinte SHA-256 d'un fichier (lecture par blocs)
+
+        Args:
+            path (str): Chemin du fichier
+
+        Returns:
+            str: L'empreinte hexadécimale
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        if key in self._hashes:
+            return self._hashes[key]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        self._hashes[key] = digest.hexdigest()
+        return self._hashes[key]
+
+    def get(self, sha256, bot_id):
+        """
+        Retourne le file_id associé à un contenu, s'il existe et n'a pas expiré
+
+        Args:
+            sha256 (str): Empreinte du contenu
+            bot_id (str): Identifiant du bot
+
+        Returns:
+            str: Le file_id, ou None
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT file_id, created_at FROM telegram_files WHERE sha256 = ? AND bot_id = ?",
+                (sha256, bot_id)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            file_id, created_at = row
+            if self.max_age_days is not None:
+                if datetime.fromisoformat(created_at) < datetime.now() - timedelta(days=self.max_age_days):
+                    cursor.execute("DELETE FROM telegram_files WHERE sha256 = ? AND bot_id = ?", (sha256, bot_id))
+                    conn.commit()
+                    return None
+
+            cursor.execute(
+                "UPDATE telegram_files SET last_used_at = ? WHERE sha256 = ? AND bot_id = ?",
+                (datetime.now().isoformat(), sha256, bot_id)
+            )
+            conn.commit()
+            return file_id
+        finally:
+            conn.close()
+
+    def put(self, sha256, bot_id, file_id, file_unique_id=None, file_size=None):
+        """
+        Enregistre le file_id obtenu pour un contenu
+
+        Args:
+            sha256 (str): Empreinte du contenu
+            bot_id (str): Identifiant du bot
+            file_id (str): file_id retourné par Telegram
+            file_unique_id (str, optional): Identifiant unique du fichier
+            file_size (int, optional): Taille du fichier en octets
+        """
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('''
+            INSERT OR REPLACE INTO telegram_files (
+                sha256, bot_id, file_id, file_unique_id, file_size, created_at, last_used_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (sha256, bot_id, file_id, file_unique_id, file_size, now, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def invalidate(self, sha256, bot_id):
+        """
+        Supprime l'entrée d'un contenu (file_id refusé par Telegram)
+
+        Args:
+            sha256 (str): Empreinte du contenu
+            bot_id (str): Identifiant du bot
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("DELETE FROM telegram_files WHERE sha256 = ? AND bot_id = ?", (sha256, bot_id))
+            conn.commit()
+        finally:
+            conn.close()
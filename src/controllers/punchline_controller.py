@@ -1,8 +1,10 @@
 from models.punchline_model import PunchlineModel
+from models.async_punchline_model import AsyncPunchlineModel
 from typing import Dict, List, Any, Optional, Tuple
 import logging
 import os
-from openai import OpenAI
+import asyncio
+from clients.openai_client import get_completion_backend
 import re
 
 # Configure logging
@@ -21,8 +23,13 @@ class PunchlineController:
     def __init__(self):
         """Initialize the punchline controller with model and OpenAI client."""
         self.model = PunchlineModel()
+        
+        # Optional aiosqlite storage so that database I/O never blocks the event loop
+        use_async_storage = os.getenv('ASYNC_STORAGE', 'false').strip("'\"").lower() == 'true'
+        self.async_model = AsyncPunchlineModel(self.model.db_path) if use_async_storage else None
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.client = OpenAI(api_key=self.api_key)
+        self.completions = get_completion_backend(self.api_key)
+        self.client = self.completions.client
         
         # Default number of candidates to generate
         self.default_num_candidates = int(os.getenv('DEFAULT_NUM_CANDIDATES', '3'))
@@ -78,7 +85,10 @@ class PunchlineController:
                 overall_score = self._calculate_overall_score(evaluation)
                 
                 # Store the evaluation
-                self.model.store_evaluation(cleaned_punchline, subject, evaluation, overall_score)
+                if self.async_model:
+                    await self.async_model.store_evaluation(cleaned_punchline, subject, evaluation, overall_score)
+                else:
+                    self.model.store_evaluation(cleaned_punchline, subject, evaluation, overall_score)
                 
                 # Add to evaluated punchlines
                 evaluated_punchlines.append({
@@ -99,7 +109,10 @@ class PunchlineController:
                 best_punchline = max(quality_punchlines, key=lambda x: x['overall_score'])
             
             # Mark the best punchline as selected
-            self.model.mark_as_selected(best_punchline['text'])
+            if self.async_model:
+                await self.async_model.mark_as_selected(best_punchline['text'])
+            else:
+                self.model.mark_as_selected(best_punchline['text'])
             
             # Create metadata
             metadata = {
@@ -138,8 +151,9 @@ class PunchlineController:
             # Create the prompt
             prompt = self._create_generation_prompt(subject, num_candidates, economy_mode)
             
-            # Call OpenAI API - remove await as the client is synchronous
-            response = self.client.chat.completions.create(
+            # Call OpenAI API (run in a thread by the shared completion backend)
+            response = await self.completions.create(
+                call_type='generation',
                 model=model,
                 messages=[
                     {"role": "system", "content": "Tu es un humoriste satirique français spécialisé dans l'humour noir et provocateur."},
@@ -274,8 +288,9 @@ Format: Numérote chaque punchline (1., 2., etc.) et ne donne que les punchlines
             # Create the evaluation prompt
             prompt = self._create_evaluation_prompt(subject, punchline)
             
-            # Call OpenAI API - remove await as the client is synchronous
-            response = self.client.chat.completions.create(
+            # Call OpenAI API (run in a thread by the shared completion backend)
+            response = await self.completions.create(
+                call_type='evaluation',
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "Tu es un expert en humour satirique qui évalue la qualité des punchlines."},
@@ -423,6 +438,46 @@ Donne uniquement les scores sans explication."""
         """
         return self.model.get_evaluation_stats()
     
+    async def get_evaluation_stats_async(self) -> Dict[str, Any]:
+        """
+        Get statistics about punchline evaluations without blocking the event loop.
+        
+        Returns:
+            Dict: Statistics about punchline evaluations
+        """
+        if self.async_model:
+            return await self.async_model.get_evaluation_stats()
+        return await asyncio.to_thread(self.model.get_evaluation_stats)
+    
+    async def get_history(
+        self, 
+        subject: Optional[str] = None, 
+        limit: int = 20, 
+        selected_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the most recent stored punchlines.
+        
+        Args:
+            subject: Only return punchlines about this subject
+            limit: Maximum number of punchlines to return
+            selected_only: Only return selected punchlines
+            
+        Returns:
+            List[Dict]: Stored punchlines, most recent first
+        """
+        model = self.async_model or AsyncPunchlineModel(self.model.db_path)
+        try:
+            return await model.get_history(subject=subject, limit=limit, selected_only=selected_only)
+        finally:
+            if model is not self.async_model:
+                await model.close()
+    
+    async def close(self):
+        """Close the async database connection, if any."""
+        if self.async_model:
+            await self.async_model.close()
+    
     def export_punchlines_for_training(self, output_file: str = None) -> str:
         """
         Export punchlines for training purposes.
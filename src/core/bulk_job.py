@@ -0,0 +1,268 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from core.punchline_prefilter import PunchlinePrefilter
+
+logger = logging.getLogger('bulk_job')
+
+# Point d'accès des requêtes du fichier de traitement par lots
+BATCH_URL = '/v1/chat/completions'
+
+
+def write_batch_requests(path: str, requests: List[Tuple[str, Dict[str, Any]]]):
+    """
+    Écrit un fichier de requêtes au format des traitements par lots du fournisseur (JSONL)
+
+    Args:
+        path: Chemin du fichier
+        requests: Liste de (custom_id, corps de la requête /v1/chat/completions)
+    """
+    temp_path = path + '.part'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for custom_id, body in requests:
+            line = {"custom_id": custom_id, "method": "POST", "url": BATCH_URL, "body": body}
+            f.write(json.dumps(line, ensure_ascii=False) + '\n')
+    os.replace(temp_path, path)
+
+
+def read_batch_results(path: str) -> Dict[str, Optional[str]]:
+    """
+    Lit un fichier de résultats au format des traitements par lots du fournisseur
+
+    Returns:
+        Dict[str, Optional[str]]: Contenu de la réponse par custom_id (None si la requête a échoué)
+    """
+    results = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+                custom_id = result['custom_id']
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"⚠️ Ligne {number} illisible dans {path}")
+                continue
+
+            response = result.get('response') or {}
+            if result.get('error') or response.get('status_code') != 200:
+                error = result.get('error') or response.get('body', {}).get('error')
+                logger.warning(f"⚠️ Requête {custom_id} en échec: {error}")
+                results[custom_id] = None
+                continue
+            try:
+                results[custom_id] = response['body']['choices'][0]['message']['content'].strip()
+            except (KeyError, IndexError, TypeError, AttributeError):
+                logger.warning(f"⚠️ Réponse invalide pour la requête {custom_id}")
+                results[custom_id] = None
+    return results
+
+
+class BulkJob:
+    """
+    Génération hors ligne d'une liste de sujets par fichiers de traitement par lots.
+
+    Le travail avance en deux étapes: les requêtes de génération de tous les sujets,
+    puis celles d'évaluation de toutes les candidates retenues par les filtres de la
+    pipeline. Chaque étape écrit un fichier <étape>_requests.jsonl à soumettre au
+    fournisseur et reprend quand <étape>_results.jsonl est déposé dans le répertoire
+    du travail. L'état est conservé dans job.json: le travail peut être repris à
+    chaque étape, par un autre processus.
+
+    Une requête en échec n'est pas remplacée par une valeur par défaut: le sujet
+    sans génération est ignoré, la candidate sans évaluation est écartée. Les deux
+    sont listés dans l'état ('failed') pour être soumis dans un nouveau travail.
+    """
+
+    STATE_FILE = 'job.json'
+
+    def __init__(self, directory: str, pipeline):
+        """
+        Args:
+            directory: Répertoire du travail (fichiers de requêtes, de résultats et état)
+            pipeline: La pipeline de qualité (prompts, filtres, évaluations et sélection)
+        """
+        self.directory = directory
+        self.pipeline = pipeline
+        self.state_path = os.path.join(directory, self.STATE_FILE)
+        self.state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def exists(self) -> bool:
+        return self.state is not None
+
+    @property
+    def stage(self) -> Optional[str]:
+        return self.state['stage'] if self.state else None
+
+    def requests_path(self, stage: str) -> str:
+        return os.path.join(self.directory, f"{stage}_requests.jsonl")
+
+    def results_path(self, stage: str) -> str:
+        return os.path.join(self.directory, f"{stage}_results.jsonl")
+
+    def _save(self):
+        temp_path = self.state_path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def prepare(self, subjects: List[str], economy_mode: bool = False, num_candidates: Optional[int] = None) -> str:
+        """
+        Crée le travail et écrit les requêtes de génération
+
+        Args:
+            subjects: Les sujets
+            economy_mode: Utiliser le mode économie de tokens
+            num_candidates: Nombre de punchlines par sujet (par défaut: celui de la pipeline)
+
+        Returns:
+            str: Chemin du fichier de requêtes à soumettre
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        subjects = list(dict.fromkeys(subjects))
+        n_candidates = num_candidates or self.pipeline.num_candidates
+
+        requests, mapping = [], {}
+        for i, subject in enumerate(subjects):
+            custom_id = f"gen-{i:05d}"
+            requests.append((custom_id, self.pipeline.generation_request(subject, n_candidates, bool(economy_mode))))
+            mapping[custom_id] = {"subject": subject}
+
+        path = self.requests_path('generation')
+        write_batch_requests(path, requests)
+        self.state = {
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+            "stage": 'generation',
+            "subjects": subjects,
+            "economy_mode": bool(economy_mode),
+            "num_candidates": n_candidates,
+            "requests": mapping,
+            "local_evaluations": [],
+            "selections": [],
+            "rendered": [],
+            "failed": {"generation": [], "evaluation": []}
+        }
+        self._save()
+        logger.info(f"📦 {len(requests)} requête(s) de génération écrites: {path}")
+        return path
+
+    async def advance(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Intègre les résultats disponibles et passe à l'étape suivante
+
+        Returns:
+            La punchline retenue pour chaque sujet (subject, text, evaluation, overall_score)
+            quand le travail est terminé, None s'il attend encore des résultats
+        """
+        if not self.state:
+            raise ValueError(f"Aucun travail dans {self.directory}")
+
+        if self.stage == 'generation':
+            if not os.path.exists(self.results_path('generation')):
+                logger.info(f"⏳ En attente des résultats de génération: {self.results_path('generation')}")
+                return None
+            self._ingest_generation()
+
+        if self.stage == 'evaluation':
+            if self.state['requests'] and not os.path.exists(self.results_path('evaluation')):
+                logger.info(f"⏳ En attente des résultats d'évaluation: {self.results_path('evaluation')}")
+                return None
+            await self._ingest_evaluation()
+
+        return self.state['selections']
+
+    def _ingest_generation(self):
+        """Filtre les candidates générées et écrit les requêtes d'évaluation"""
+        results = read_batch_results(self.results_path('generation'))
+
+        requests, mapping, local_evaluations, failed = [], {}, [], []
+        for custom_id, request in self.state['requests'].items():
+            subject = request['subject']
+            content = results.get(custom_id)
+            if not content:
+                logger.warning(f"⚠️ Aucun résultat de génération pour le sujet '{subject}': sujet ignoré")
+                failed.append(subject)
+                continue
+            # Jamais de punchline de repli soumise à l'évaluation
+            candidates = [p for p in self.pipeline.parse_candidates(subject, content)
+                          if not PunchlinePrefilter.unusable_reason(p)]
+            if not candidates:
+                logger.warning(f"⚠️ Aucune punchline exploitable générée pour le sujet '{subject}': sujet ignoré")
+                failed.append(subject)
+                continue
+            candidates = self.pipeline.filter_candidates(subject, candidates)
+
+            for punchline in candidates:
+                # Les prédictions fiables de l'évaluateur local ne sont pas soumises au LLM
+                prediction = self.pipeline.local_evaluation(subject, punchline)
+                if prediction:
+                    local_evaluations.append({"subject": subject, "punchline": punchline, "evaluation": prediction})
+                    continue
+                eval_id = f"eval-{len(requests):05d}"
+                requests.append((eval_id, self.pipeline.evaluation_request(subject, punchline)))
+                mapping[eval_id] = {"subject": subject, "punchline": punchline}
+
+        if requests:
+            write_batch_requests(self.requests_path('evaluation'), requests)
+            logger.info(f"📦 {len(requests)} requête(s) d'évaluation écrites: {self.requests_path('evaluation')}")
+        self.state.setdefault('failed', {}).update(generation=failed)
+        self.state.update(stage='evaluation', requests=mapping, local_evaluations=local_evaluations)
+        self._save()
+
+    async def _ingest_evaluation(self):
+        """Stocke les évaluations et retient la meilleure punchline de chaque sujet"""
+        results = read_batch_results(self.results_path('evaluation')) if self.state['requests'] else {}
+
+        scored, failed = list(self.state['local_evaluations']), []
+        for custom_id, request in self.state['requests'].items():
+            content = results.get(custom_id)
+            evaluation = None
+            if content is not None:
+                try:
+                    evaluation = self.pipeline.parse_evaluation(content)
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"⚠️ Évaluation {custom_id} illisible: {str(e)}")
+            if evaluation is None:
+                # Pas de scores par défaut: la candidate est écartée de la sélection
+                logger.warning(f"⚠️ Évaluation {custom_id} en échec: punchline écartée ('{request['punchline']}')")
+                failed.append(dict(request, custom_id=custom_id))
+                continue
+            scored.append({"subject": request['subject'], "punchline": request['punchline'], "evaluation": evaluation})
+
+        by_subject = {subject: [] for subject in self.state['subjects']}
+        for item in scored:
+            evaluated = await self.pipeline.record_evaluation(item['subject'], item['punchline'], item['evaluation'])
+            by_subject.setdefault(item['subject'], []).append(evaluated)
+
+        selections = []
+        for subject, evaluated_punchlines in by_subject.items():
+            if not evaluated_punchlines:
+                logger.warning(f"⚠️ Aucune punchline évaluée pour le sujet '{subject}'")
+                continue
+            evaluated_punchlines.sort(key=lambda x: x["overall_score"], reverse=True)
+            text, best = await self.pipeline.select_best_punchline(evaluated_punchlines)
+            selections.append(best)
+
+        self.pipeline.flush()
+        self.state.setdefault('failed', {}).update(evaluation=failed)
+        self.state.update(stage='done', selections=selections)
+        self._save()
+        logger.info(f"✅ Travail terminé: {len(selections)} punchline(s) retenue(s), "
+                    f"{len(self.state['failed'].get('generation', []))} sujet(s) sans génération, "
+                    f"{len(failed)} évaluation(s) en échec")
+
+    def pending_renders(self) -> List[Dict[str, Any]]:
+        """Punchlines retenues dont le mème n'a pas encore été rendu"""
+        rendered = set(self.state['rendered']) if self.state else set()
+        return [s for s in (self.state or {}).get('selections', []) if s['subject'] not in rendered]
+
+    def mark_rendered(self, subject: str):
+        """Enregistre qu'un mème a été rendu (et envoyé) pour un sujet"""
+        self.state['rendered'].append(subject)
+        self._save()
@@ -0,0 +1,180 @@
+import os
+import socket
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
+
+from clients.telegram_client import TelegramClient
+from models.telegram_outbox import TelegramOutbox
+
+logger = logging.getLogger('delivery_worker')
+
+
+class DeliveryWorker:
+    """
+    Worker de livraison des envois Telegram mis en file dans l'outbox
+
+    Les envois réservés sont regroupés par vidéo: chaque vidéo n'est téléversée
+    qu'une fois puis diffusée aux destinataires par file_id. Les échecs sont
+    reprogrammés avec un délai exponentiel jusqu'à max_attempts tentatives.
+
+    Le bail des envois est renouvelé tant que leur lot est en cours (tous les
+    tiers de bail): un téléversement plus long que le bail n'est pas repris
+    par un autre worker.
+    """
+
+    def __init__(
+        self,
+        outbox: Optional[TelegramOutbox] = None,
+        telegram_client: Optional[TelegramClient] = None,
+        batch_size: int = 10,
+        lease_seconds: float = 300,
+        poll_interval: float = 5.0,
+        max_attempts: int = 5,
+        retry_base_delay: float = 30.0,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Args:
+            outbox: L'outbox à traiter (par défaut: data/telegram_outbox.db)
+            telegram_client: Client Telegram utilisé pour les envois
+            batch_size: Nombre d'envois réservés à chaque passe
+            lease_seconds: Durée du bail d'une réservation, après laquelle un autre worker peut la reprendre
+            poll_interval: Délai en secondes entre deux passes quand l'outbox est vide
+            max_attempts: Nombre maximum de tentatives avant l'échec définitif
+            retry_base_delay: Délai en secondes avant la première nouvelle tentative (doublé ensuite)
+            worker_id: Identifiant du worker (par défaut: hôte et PID)
+        """
+        self.outbox = outbox or TelegramOutbox()
+        self.telegram_client = telegram_client or TelegramClient()
+        self.batch_size = max(1, batch_size)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+
+        # Compteurs pour le suivi
+        self.sent = 0
+        self.failed = 0
+
+    @staticmethod
+    def _group_by_video(items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Regroupe les envois par (vidéo, légende), un destinataire au plus une fois par groupe"""
+        groups: List[List[Dict[str, Any]]] = []
+        for item in items:
+            for group in groups:
+                same_video = group[0]['video_path'] == item['video_path'] and group[0]['caption'] == item['caption']
+                if same_video and all(other['chat_id'] != item['chat_id'] for other in group):
+                    group.append(item)
+                    break
+            else:
+                groups.append([item])
+        return groups
+
+    def _record_failure(self, item: Dict[str, Any], error: str, permanent: bool = False):
+        """Reprogramme un envoi en échec, ou le marque en échec définitif"""
+        if permanent or item['attempts'] >= self.max_attempts:
+            if not self.outbox.mark_failed(item['id'], error, worker_id=self.worker_id):
+                logger.warning(f"⚠️ Envoi {item['id']}: bail repris par un autre worker, échec non enregistré")
+                return
+            self.failed += 1
+            logger.error(f"❌ Envoi {item['id']} vers {item['chat_id']} abandonné après {item['attempts']} tentative(s): {error}")
+        else:
+            delay = self.retry_base_delay * 2 ** (item['attempts'] - 1)
+            if not self.outbox.mark_failed(item['id'], error, retry_delay=delay, worker_id=self.worker_id):
+                logger.warning(f"⚠️ Envoi {item['id']}: bail repris par un autre worker, échec non enregistré")
+                return
+            logger.warning(f"⚠️ Envoi {item['id']} vers {item['chat_id']} reprogrammé dans {delay:.0f}s: {error}")
+
+    async def _deliver_group(self, group: List[Dict[str, Any]]):
+        """Envoie une vidéo à tous les destinataires d'un groupe et enregistre les résultats"""
+        video_path = group[0]['video_path']
+        if not os.path.exists(video_path):
+            for item in group:
+                self._record_failure(item, f"Fichier vidéo introuvable: {video_path}", permanent=True)
+            return
+
+        try:
+            results = await self.telegram_client.send_video_to_chats(
+                video_path,
+                group[0]['caption'],
+                chat_ids=[item['chat_id'] for item in group],
+                force=True
+            )
+        except Exception as e:
+            for item in group:
+                self._record_failure(item, str(e))
+            return
+
+        for item in group:
+            message_id = results.get(item['chat_id'])
+            if message_id is not None:
+                if self.outbox.mark_sent(item['id'], message_id, worker_id=self.worker_id):
+                    self.sent += 1
+            else:
+                self._record_failure(item, "Échec de l'envoi Telegram")
+
+    async def run_once(self) -> int:
+        """
+        Réserve et traite un lot d'envois
+
+        Returns:
+            int: Nombre d'envois traités
+        """
+        items = self.outbox.claim(self.batch_size, self.lease_seconds, self.worker_id)
+        if not items:
+            return 0
+
+        logger.info(f"📬 {len(items)} envoi(s) réservé(s) dans l'outbox")
+        heartbeat = asyncio.create_task(self._renew_leases([item['id'] for item in items]))
+        try:
+            await asyncio.gather(*[self._deliver_group(group) for group in self._group_by_video(items)])
+        finally:
+            heartbeat.cancel()
+        return len(items)
+
+    async def _renew_leases(self, item_ids: List[int]):
+        """Prolonge le bail des envois du lot en cours jusqu'à son annulation"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = self.outbox.renew(item_ids, self.lease_seconds, self.worker_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Erreur lors du renouvellement des baux: {str(e)}")
+                continue
+            # Les envois terminés ne sont plus à renouveler
+            item_ids = renewed
+            if not item_ids:
+                return
+
+    async def run(self, once: bool = False):
+        """
+        Traite l'outbox en continu (ou jusqu'à ce qu'elle soit vide si once=True)
+
+        Args:
+            once: S'arrêter dès que l'outbox ne contient plus d'envoi à traiter
+        """
+        if not self.telegram_client.bot:
+            logger.error("❌ Le bot Telegram n'est pas initialisé, aucun envoi possible.")
+            return
+
+        logger.info(f"🚚 Worker de livraison démarré ({self.worker_id})")
+        while not self._stopping:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Erreur lors du traitement de l'outbox: {str(e)}")
+                processed = 0
+
+            if processed == 0:
+                if once:
+                    break
+                await asyncio.sleep(self.poll_interval)
+
+        logger.info(f"🚚 Worker de livraison arrêté ({self.sent} envoyé(s), {self.failed} échec(s) définitif(s))")
+
+    def stop(self):
+        """Demande l'arrêt du worker après la passe en cours"""
+        self._stopping = True
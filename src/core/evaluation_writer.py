@@ -0,0 +1,456 @@
+import os
+import json
+import queue
+import asyncio
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger('evaluation_writer')
+
+
+class EvaluationWriter:
+    """
+    Écriture différée (write-behind) des évaluations de punchlines dans SQLite
+
+    Les opérations sont placées dans une file bornée et écrites par lots par un
+    thread dédié, hors du chemin de sélection. Depuis la boucle d'événements, la
+    mise en file est attendue (store_evaluation_async, mark_as_selected_async):
+    quand la file est pleine, l'appelant attend une place sans bloquer la boucle
+    (contre-pression), et si le thread d'écriture s'est arrêté, l'opération est
+    écrite directement dans un thread. Les méthodes synchrones sont réservées aux
+    appelants hors de la boucle: elles écrivent directement quand la file est pleine.
+
+    Un seul writer est partagé par base de données (voir get_evaluation_writer).
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        db_path: str,
+        max_queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        late_selection_ttl: float = 300.0
+    ):
+        """
+        Initialise et démarre le thread d'écriture
+
+        Args:
+            db_path: Chemin vers la base de données SQLite
+            max_queue_size: Nombre maximum d'opérations en attente avant contre-pression
+            batch_size: Nombre d'opérations écrites par transaction
+            flush_interval: Délai maximum (en secondes) avant l'écriture d'un lot incomplet
+            late_selection_ttl: Durée (en secondes) pendant laquelle une sélection écrite
+                avant l'insertion de sa punchline attend cette insertion
+        """
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue_size))
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._users = 0
+
+        # Sélections écrites directement avant l'insertion de leur punchline (encore en file),
+        # avec leur date: au plus une par place de la file, oubliées après late_selection_ttl
+        self.late_selection_ttl = late_selection_ttl
+        self._late_selections: "OrderedDict[str, float]" = OrderedDict()
+        self._late_lock = threading.Lock()
+
+        # Compteurs pour le suivi
+        self.rows_written = 0
+        self.batches_committed = 0
+        self.direct_writes = 0
+        self.errors = 0
+        self.failure: Optional[BaseException] = None
+
+        self._thread = threading.Thread(target=self._run, name='evaluation-writer', daemon=True)
+        self._thread.start()
+
+        # Garantir l'écriture des données en attente lors d'une sortie propre
+        atexit.register(self.close)
+
+        logger.info(f"🗄️ Écriture différée activée (file: {max_queue_size}, lot: {self.batch_size}, intervalle: {flush_interval}s)")
+
+    def store_evaluation(
+        self,
+        punchline: str,
+        subject: str,
+        evaluation: Dict[str, float],
+        overall_score: float
+    ):
+        """
+        Met en file l'insertion d'une évaluation
+
+        Args:
+            punchline: La punchline évaluée
+            subject: Le sujet de la punchline
+            evaluation: Les scores d'évaluation
+            overall_score: Le score global
+        """
+        self._put(('insert', (
+            punchline,
+            subject,
+            json.dumps(evaluation),
+            overall_score,
+            datetime.now().isoformat(),
+            0  # Non sélectionnée par défaut
+        )))
+
+    def mark_as_selected(self, punchline: str):
+        """
+        Met en file le marquage d'une punchline comme sélectionnée
+
+        L'ordre de la file est respecté: la mise à jour s'applique après les
+        insertions mises en file avant elle.
+
+        Args:
+            punchline: La punchline sélectionnée
+        """
+        self._put(('select', (punchline,)))
+
+    async def store_evaluation_async(
+        self,
+        punchline: str,
+        subject: str,
+        evaluation: Dict[str, float],
+        overall_score: float
+    ):
+        """Met en file l'insertion d'une évaluation depuis la boucle d'événements (voir store_evaluation)"""
+        await self._put_async(('insert', (
+            punchline,
+            subject,
+            json.dumps(evaluation),
+            overall_score,
+            datetime.now().isoformat(),
+            0  # Non sélectionnée par défaut
+        )))
+
+    async def mark_as_selected_async(self, punchline: str):
+        """Met en file le marquage d'une sélection depuis la boucle d'événements (voir mark_as_selected)"""
+        await self._put_async(('select', (punchline,)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attend que toutes les opérations en file soient écrites
+
+        Si le thread d'écriture s'est arrêté, les opérations restées en file sont
+        écrites directement.
+
+        Args:
+            timeout: Délai maximum d'attente en secondes (None: illimité)
+
+        Returns:
+            bool: True si tout a été écrit avant l'expiration du délai (False si le
+            thread d'écriture s'est arrêté sur une erreur)
+        """
+        if not self._thread.is_alive():
+            return self._drain()
+
+        done = threading.Event()
+        try:
+            self._queue.put(('flush', done), timeout=timeout)
+        except queue.Full:
+            return False
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.5):
+            if not self._thread.is_alive():
+                return self._drain()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Écrit les opérations en attente puis arrête le thread d'écriture
+
+        Args:
+            timeout: Délai maximum d'attente en secondes (None: illimité)
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+        if not self._thread.is_alive():
+            # Opérations mises en file après l'arrêt, ou restées après une erreur du thread
+            self._drain()
+
+        logger.info(f"🗄️ Écriture différée arrêtée ({self.rows_written} lignes, {self.batches_committed} lots)")
+
+    def release(self):
+        """Libère le writer pour un utilisateur; le dernier l'arrête (voir get_evaluation_writer)"""
+        with _writers_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def pending(self) -> int:
+        """Nombre approximatif d'opérations en attente"""
+        return self._queue.qsize()
+
+    def _put(self, item: Tuple[str, Any]):
+        """
+        Ajoute une opération dans la file sans jamais bloquer
+
+        Quand la file est pleine, ou si le writer est arrêté, l'opération est écrite
+        directement (une transaction) plutôt que d'attendre ou d'être perdue.
+        """
+        if not self._closed and self._thread.is_alive():
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                logger.warning(f"⚠️ File d'écriture pleine ({self._queue.maxsize}), écriture directe")
+        self._write_now([item])
+
+    async def _put_async(self, item: Tuple[str, Any]):
+        """
+        Ajoute une opération dans la file sans bloquer la boucle d'événements
+
+        Quand la file est pleine, l'attente d'une place est faite dans un thread:
+        l'appelant est ralenti au rythme du thread d'écriture (contre-pression).
+        Si le writer est arrêté, l'opération est écrite directement, dans un thread.
+        """
+        if not self._closed and self._thread.is_alive():
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                logger.warning(f"⚠️ File d'écriture pleine ({self._queue.maxsize}), attente d'une place")
+            if await asyncio.to_thread(self._put_blocking, item):
+                return
+        await asyncio.to_thread(self._write_now, [item])
+
+    def _put_blocking(self, item: Tuple[str, Any]) -> bool:
+        """Attend une place dans la file tant que le thread d'écriture tourne (False s'il s'est arrêté)"""
+        while not self._closed and self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _write_now(self, operations: List[Tuple[str, Any]]) -> bool:
+        """Écrit des opérations depuis le thread appelant, avec sa propre connexion"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Écriture directe impossible: {str(e)}")
+            return False
+        try:
+            self.direct_writes += len(operations)
+            return self._write_batch(conn, operations, direct=True)
+        finally:
+            conn.close()
+
+    def _drain(self) -> bool:
+        """Écrit directement les opérations restées en file après l'arrêt du thread d'écriture"""
+        operations = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                continue
+            if item[0] == 'flush':
+                item[1].set()
+                continue
+            operations.append(item)
+
+        written = self._write_now(operations) if operations else True
+        return written and self.failure is None
+
+    def _run(self):
+        """Boucle du thread d'écriture: regroupe les opérations et les écrit par lots"""
+        try:
+            self._loop()
+        except BaseException as e:
+            self.failure = e
+            logger.error(f"❌ Le thread d'écriture différée s'est arrêté: {str(e)}")
+
+    def _loop(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        pending: List[Tuple[str, Any]] = []
+        waiters: List[threading.Event] = []
+        deadline = None
+        stopping = False
+
+        try:
+            while not stopping:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    stopping = True
+                elif item is not None and item[0] == 'flush':
+                    waiters.append(item[1])
+                elif item is not None:
+                    pending.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                expired = deadline is not None and time.monotonic() >= deadline
+                if pending and (stopping or waiters or expired or len(pending) >= self.batch_size):
+                    self._write_batch(conn, pending)
+                    pending = []
+                    deadline = None
+
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, operations: List[Tuple[str, Any]], direct: bool = False) -> bool:
+        """
+        Écrit un lot d'opérations dans une seule transaction
+
+        Les insertions consécutives sont regroupées en un seul executemany.
+
+        Args:
+            conn: Connexion SQLite du thread d'écriture
+            operations: Opérations à écrire, dans l'ordre de mise en file
+            direct: Écriture directe (hors file): une sélection dont la punchline est
+                encore en file est appliquée lors de son insertion
+
+        Returns:
+            bool: True si le lot a été écrit
+        """
+        try:
+            cursor = conn.cursor()
+            inserts = []
+            late = []
+            for kind, params in operations:
+                if kind == 'insert':
+                    inserts.append(params)
+                    continue
+                if inserts:
+                    self._insert_rows(cursor, inserts)
+                    inserts = []
+                cursor.execute('UPDATE punchlines SET selected = 1 WHERE text = ?', params)
+                if direct and cursor.rowcount == 0:
+                    late.append(params[0])
+            if inserts:
+                self._insert_rows(cursor, inserts)
+
+            # Sélections écrites directement avant l'insertion de leur punchline
+            inserted = {params[0] for kind, params in operations if kind == 'insert'}
+            with self._late_lock:
+                selections = inserted & self._late_selections.keys()
+                for text in selections:
+                    del self._late_selections[text]
+                self._remember_late(late)
+            for text in selections:
+                cursor.execute('UPDATE punchlines SET selected = 1 WHERE text = ?', (text,))
+            conn.commit()
+
+            self.rows_written += sum(1 for kind, _ in operations if kind == 'insert')
+            self.batches_committed += 1
+            return True
+        except Exception as e:
+            conn.rollback()
+            self.errors += 1
+            logger.error(f"❌ Erreur lors de l'écriture différée d'un lot de {len(operations)} opérations: {str(e)}")
+            return False
+
+    def _remember_late(self, texts: List[str]):
+        """
+        Retient des sélections en attente de l'insertion de leur punchline (verrou tenu)
+
+        Seules les insertions encore en file peuvent les appliquer: au plus une par
+        place de la file. Les plus anciennes, et celles qui ont expiré (punchline
+        jamais insérée), sont oubliées.
+        """
+        now = time.monotonic()
+        for text in texts:
+            self._late_selections.pop(text, None)
+            self._late_selections[text] = now
+        while self._late_selections:
+            text, added = next(iter(self._late_selections.items()))
+            if len(self._late_selections) <= self._queue.maxsize and now - added <= self.late_selection_ttl:
+                break
+            del self._late_selections[text]
+
+    @staticmethod
+    def _insert_rows(cursor: sqlite3.Cursor, rows: List[Tuple]):
+        """Insère plusieurs évaluations en une seule instruction"""
+        cursor.executemany('''
+        INSERT INTO punchlines (
+            text, subject, evaluation, overall_score, created_at, selected
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_evaluation_writer(db_path: str, **options) -> EvaluationWriter:
+    """
+    Retourne le writer partagé d'une base de données (un thread d'écriture par base)
+
+    Chaque appel doit être suivi d'un appel à release(): le writer est arrêté quand
+    son dernier utilisateur le libère.
+
+    Args:
+        db_path: Chemin vers la base de données SQLite
+        options: Paramètres du writer s'il doit être créé (voir EvaluationWriter)
+
+    Returns:
+        EvaluationWriter: Le writer de la base
+    """
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer.closed:
+            writer = EvaluationWriter(db_path, **options)
+            _writers[key] = writer
+        writer._users += 1
+    return writer
+
+
+def create_evaluation_writer_from_env(db_path: str) -> Optional[EvaluationWriter]:
+    """
+    Retourne le writer partagé de la base si l'écriture différée est activée (ASYNC_DB_WRITES=true)
+
+    Args:
+        db_path: Chemin vers la base de données SQLite
+
+    Returns:
+        L'EvaluationWriter, ou None si l'écriture différée est désactivée
+    """
+    enabled = os.getenv('ASYNC_DB_WRITES', 'false').strip("'\"").lower() == 'true'
+    if not enabled:
+        return None
+
+    return get_evaluation_writer(
+        db_path,
+        max_queue_size=int(os.getenv('DB_WRITE_QUEUE_SIZE', '1000')),
+        batch_size=int(os.getenv('DB_WRITE_BATCH_SIZE', '50')),
+        flush_interval=float(os.getenv('DB_WRITE_FLUSH_INTERVAL', '1.0'))
+    )
@@ -2,6 +2,8 @@ from clients.openai_client import OpenAIClient
 from core.video_processor import VideoProcessor
 from clients.telegram_client import TelegramClient
 from core.quality_pipeline import QualityPipeline
+from models.telegram_outbox import TelegramOutbox
+import asyncio
 import logging
 import os
 
@@ -20,6 +22,12 @@ class MemeGenerator:
         self.telegram_client = TelegramClient()
         self.quality_pipeline = QualityPipeline()
         
+        # Mode de livraison Telegram: envoi direct, ou mise en file pour le worker de livraison
+        self.delivery_mode = os.getenv('TELEGRAM_DELIVERY_MODE', 'direct').strip("'\"").lower()
+        self.outbox = TelegramOutbox() if self.delivery_mode == 'outbox' else None
+        if self.outbox:
+            logger.info("📬 Livraison Telegram via l'outbox (python delivery_worker.py)")
+        
         # Vérifier si la pipeline de qualité est activée
         self.use_quality_pipeline = os.getenv('USE_QUALITY_PIPELINE', 'true').lower() == 'true'
         
@@ -82,7 +90,15 @@ class MemeGenerator:
                     punchline_metadata = None
             
             # Étape 2 & 3: Ajouter le texte sur la vidéo et l'exporter
-            output_path = await self.video_processor.create_meme(text)
+            rendered = None
+            persist_task = None
+            if self.video_processor.in_memory:
+                # La copie sur disque est écrite en parallèle, l'envoi part de la mémoire
+                rendered = await self.video_processor.create_meme_in_memory(text)
+                output_path = rendered.path
+                persist_task = asyncio.create_task(self.video_processor.persist_video(rendered))
+            else:
+                output_path = await self.video_processor.create_meme(text)
             
             # Déterminer le sujet final (celui fourni ou celui par défaut)
             final_subject = subject if subject else self.openai_client.default_subject
@@ -129,17 +145,64 @@ class MemeGenerator:
                 caption += f"{result['description']}\n\n"
                 caption += " ".join(result['hashtags'])
                 
-                await self.telegram_client.send_video(output_path, caption)
+                if self.outbox:
+                    # La livraison est faite par le worker: la génération n'attend pas l'upload
+                    if persist_task and not await persist_task:
+                        logger.warning("⚠️ Vidéo rendue en mémoire sans copie sur disque (VIDEO_PERSIST), elle ne peut pas être mise en file")
+                    elif self.telegram_client.chat_ids:
+                        result["outbox_ids"] = self.outbox.enqueue(output_path, self.telegram_client.chat_ids, caption)
+                        logger.info(f"📬 Vidéo mise en file pour {len(self.telegram_client.chat_ids)} destinataire(s)")
+                    else:
+                        logger.warning("⚠️ Aucun chat Telegram configuré, la vidéo n'a pas été mise en file")
+                else:
+                    await self.telegram_client.send_video(rendered or output_path, caption)
+            
+            if persist_task:
+                result["video_path"] = await persist_task
             
             return result
         except Exception as e:
             logger.error(f"❌ Erreur lors de la génération du mème: {str(e)}")
             raise e
     
+    def sends_batch_as_album(self, send_to_telegram=None):
+        """
+        Indique si les vidéos d'un lot doivent être envoyées ensemble par albums à la fin
+        du lot (TELEGRAM_ALBUM_MODE, livraison directe) plutôt qu'une par une
+        
+        Args:
+            send_to_telegram (bool, optional): Forcer l'envoi ou non sur Telegram
+            
+        Returns:
+            bool: True si le lot doit être rendu sans envoi puis envoyé par send_batch_albums
+        """
+        should_send = send_to_telegram if send_to_telegram is not None else self.telegram_client.auto_send
+        return bool(should_send and self.telegram_client.album_mode and not self.outbox)
+    
+    async def send_batch_albums(self, results):
+        """
+        Envoie les vidéos d'un lot par albums de 10
+        
+        Args:
+            results (list): Liste des résultats de génération de mèmes
+            
+        Returns:
+            int: Nombre de vidéos envoyées avec succès
+        """
+        album_results = [result for result in results if result.get('video_path')]
+        if len(album_results) < len(results):
+            logger.warning(f"⚠️ {len(results) - len(album_results)} vidéo(s) sans copie sur disque (VIDEO_PERSIST), non envoyée(s) en album")
+        if not album_results:
+            return 0
+        return await self.telegram_client.send_batch_videos(album_results, as_album=True)
+    
     async def generate_batch_memes(self, subjects, economy_mode=None, send_to_telegram=None):
         """
         Génère plusieurs mèmes à partir d'une liste de sujets
         
+        En mode album (TELEGRAM_ALBUM_MODE, livraison directe), les vidéos sont envoyées
+        ensemble à la fin du lot, par albums de 10, au lieu d'être envoyées une par une.
+        
         Args:
             subjects (list): Liste des sujets
             economy_mode (bool, optional): Activer le mode économie de tokens
@@ -151,6 +214,7 @@ class MemeGenerator:
         results = []
         # Déterminer si on doit envoyer les vidéos sur Telegram
         should_send = send_to_telegram if send_to_telegram is not None else self.telegram_client.auto_send
+        send_as_album = self.sends_batch_as_album(should_send)
         
         for i, subject in enumerate(subjects):
             try:
@@ -160,8 +224,9 @@ class MemeGenerator:
                 if economy_mode:
                     logger.info("💰 Mode économie activé: utilisation de GPT-3.5-turbo avec un prompt simplifié")
                 
-                # Générer le mème et l'envoyer immédiatement sur Telegram si configuré
-                result = await self.generate_meme(subject=subject, economy_mode=economy_mode, send_to_telegram=should_send)
+                # Générer le mème et l'envoyer immédiatement sur Telegram si configuré (hors mode album)
+                result = await self.generate_meme(subject=subject, economy_mode=economy_mode,
+                                                  send_to_telegram=should_send and not send_as_album)
                 
                 logger.info(f"✅ Mème généré avec succès!")
                 logger.info(f"📝 Texte: {result['text']}")
@@ -172,6 +237,10 @@ class MemeGenerator:
                 logger.error(f"❌ Erreur lors de la génération du mème pour le sujet '{subject}': {str(e)}")
                 # Continuer avec le sujet suivant
         
+        # Mode album: envoi groupé des vidéos du lot
+        if send_as_album and results:
+            await self.send_batch_albums(results)
+        
         # Si la pipeline de qualité est activée, afficher les statistiques globales
         if self.use_quality_pipeline:
             try:
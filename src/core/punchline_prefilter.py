@@ -0,0 +1,168 @@
+import re
+import logging
+from typing import Dict, List, Any, Optional
+
+from models.punchline_search import tokenize, significant_terms
+
+logger = logging.getLogger('punchline_prefilter')
+
+# Marqueurs de la contradiction attendue par les prompts ("Quand X fait Y, mais Z")
+CONTRADICTION_MARKERS = ('mais', 'alors', 'pourtant', 'tandis')
+
+# Punchlines de repli retournées quand la génération échoue
+FALLBACK_PATTERN = re.compile(r"^quand tout le monde parle de .+ mais lui fait exactement l inverse$")
+
+# Pondération des règles (la somme vaut 1)
+WEIGHTS = {
+    'structure': 0.35,
+    'contradiction': 0.30,
+    'length': 0.20,
+    'subject': 0.15
+}
+
+
+class PunchlinePrefilter:
+    """
+    Pré-filtre local des punchlines candidates, avant l'évaluation payante par le LLM
+
+    Chaque candidate reçoit un score heuristique (structure "Quand...", marqueur de
+    contradiction, longueur, mots du sujet). Les candidates vides, dupliquées, de
+    repli ou sous le score minimum sont écartées, et seules les top_k meilleures
+    sont transmises à l'évaluation.
+
+    Les candidates vides et de repli ne sont jamais évaluées. Si aucune candidate
+    n'atteint le score minimum, les candidates écartées pour leur score sont
+    conservées à la place.
+    """
+
+    def __init__(self, max_length: int = 100, min_score: float = 0.5, top_k: int = 0, duplicate_threshold: float = 0.8):
+        """
+        Args:
+            max_length: Longueur maximum demandée par les prompts (caractères)
+            min_score: Score heuristique minimum pour être évaluée (entre 0 et 1)
+            top_k: Nombre maximum de candidates transmises à l'évaluation (0: toutes)
+            duplicate_threshold: Part de mots caractéristiques communs à partir de laquelle deux candidates sont des doublons
+        """
+        self.max_length = max_length
+        self.min_score = min_score
+        self.top_k = top_k
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def _shares_stem(term: str, terms) -> bool:
+        """Vrai si un mot partage son radical (5 premières lettres) avec l'un des mots donnés"""
+        stem = term[:5]
+        return any(other[:5] == stem for other in terms)
+
+    @staticmethod
+    def unusable_reason(punchline: str) -> Optional[str]:
+        """
+        Raison pour laquelle une candidate ne doit jamais être évaluée (vide ou punchline de repli)
+
+        Returns:
+            Optional[str]: La raison, ou None si la candidate est utilisable
+        """
+        words = tokenize(punchline or '')
+        if not words:
+            return 'vide'
+        if FALLBACK_PATTERN.match(' '.join(words)):
+            return 'punchline de repli'
+        return None
+
+    def score(self, punchline: str, subject: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Score heuristique d'une punchline
+
+        Args:
+            punchline: La punchline candidate
+            subject: Le sujet demandé
+
+        Returns:
+            Dict[str, Any]: score (entre 0 et 1), détail par règle, raison du rejet éventuel
+            (None si acceptée) et 'unusable' (candidate vide ou de repli, jamais évaluée)
+        """
+        unusable = self.unusable_reason(punchline)
+        if unusable:
+            return {'score': 0.0, 'rules': {}, 'rejected': unusable, 'unusable': True}
+
+        words = tokenize(punchline)
+        length = len(punchline.strip())
+        rules = {
+            'structure': 1.0 if words[0] == 'quand' else 0.0,
+            'contradiction': 1.0 if any(marker in words[1:] for marker in CONTRADICTION_MARKERS) else 0.0,
+            # Pleine note sous la longueur maximum, puis décroissance jusqu'à 1,5 fois cette longueur
+            'length': max(0.0, min(1.0, 1 - (length - self.max_length) / (self.max_length / 2))),
+            'subject': 0.0
+        }
+
+        subject_terms = significant_terms(subject or '')
+        if subject_terms:
+            terms = significant_terms(punchline)
+            rules['subject'] = sum(1 for t in subject_terms if self._shares_stem(t, terms)) / len(subject_terms)
+
+        score = sum(WEIGHTS[rule] * value for rule, value in rules.items())
+        rejected = None if score >= self.min_score else f"score heuristique trop faible ({score:.2f})"
+        return {'score': score, 'rules': rules, 'rejected': rejected, 'unusable': False}
+
+    def _is_duplicate(self, terms, kept_terms) -> bool:
+        for other in kept_terms:
+            if not terms and not other:
+                return True
+            union = terms | other
+            if union and len(terms & other) / len(union) >= self.duplicate_threshold:
+                return True
+        return False
+
+    def filter(self, subject: str, candidates: List[str], top_k: Optional[int] = None, keep_all: bool = True) -> List[str]:
+        """
+        Écarte les candidates qui ne respectent pas les règles des prompts et classe les autres
+
+        Args:
+            subject: Le sujet des punchlines
+            candidates: Les punchlines candidates
+            top_k: Nombre maximum de candidates retenues (par défaut: celui du pré-filtre)
+            keep_all: Conserver les candidates écartées pour leur score si aucune ne passe le filtre
+
+        Returns:
+            Les candidates retenues, de la meilleure à la moins bonne (celles écartées pour
+            leur score si aucune ne passe le filtre, jamais les candidates vides ou de repli)
+        """
+        top_k = self.top_k if top_k is None else top_k
+        scored = [(punchline, self.score(punchline, subject)) for punchline in candidates]
+        scored.sort(key=lambda item: item[1]['score'], reverse=True)
+
+        kept, kept_terms, low_scores = [], [], []
+        for punchline, result in scored:
+            if result['rejected']:
+                logger.info(f"🧹 Punchline écartée avant évaluation ({result['rejected']}): '{punchline}'")
+                if not result['unusable']:
+                    low_scores.append(punchline)
+                continue
+            terms = significant_terms(punchline)
+            if self._is_duplicate(terms, kept_terms):
+                logger.info(f"🧹 Punchline écartée avant évaluation (doublon): '{punchline}'")
+                continue
+            kept.append(punchline)
+            kept_terms.append(terms)
+
+        if not kept:
+            if not low_scores:
+                logger.warning("⚠️ Aucune punchline candidate utilisable (vides ou de repli): rien à évaluer.")
+                return []
+            if not keep_all:
+                logger.info("🧹 Aucune punchline candidate ne passe le pré-filtre")
+                return []
+            logger.warning("⚠️ Aucune punchline candidate ne passe le pré-filtre. "
+                           "Conservation des candidates écartées pour leur score.")
+            for punchline in low_scores:
+                terms = significant_terms(punchline)
+                if not self._is_duplicate(terms, kept_terms):
+                    kept.append(punchline)
+                    kept_terms.append(terms)
+
+        if top_k and len(kept) > top_k:
+            logger.info(f"🧹 {len(kept) - top_k} punchline(s) moins bien classée(s) non évaluée(s) (top {top_k})")
+            kept = kept[:top_k]
+
+        logger.info(f"🧹 Pré-filtre: {len(kept)}/{len(candidates)} punchline(s) transmise(s) à l'évaluation")
+        return kept
@@ -0,0 +1,306 @@
+import os
+import json
+import zlib
+import sqlite3
+import logging
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from models.punchline_search import tokenize, significant_terms, STOPWORDS
+
+logger = logging.getLogger('punchline_scorer')
+
+CRITERIA = ('cruaute', 'provocation', 'pertinence', 'concision', 'impact')
+
+# Pondération du score global (identique à QualityPipeline._calculate_overall_score)
+WEIGHTS = np.array([0.30, 0.30, 0.15, 0.15, 0.10])
+
+# Caractéristiques denses ajoutées aux n-grammes hachés
+DENSE_FEATURES = ('biais', 'longueur', 'quand', 'mais', 'sujet')
+
+
+@lru_cache(maxsize=2 ** 18)
+def _hash_feature(feature: str, n_features: int) -> int:
+    """Indice stable (indépendant de PYTHONHASHSEED) d'un n-gramme dans l'espace haché"""
+    return zlib.crc32(feature.encode('utf-8')) % n_features
+
+
+@lru_cache(maxsize=1024)
+def _subject_terms(subject: str) -> frozenset:
+    return frozenset(significant_terms(subject))
+
+
+# Multiplicateurs du hachage polynomial des n-grammes de caractères
+_CHAR_MULTIPLIERS = np.array([pow(1000003, k, 2 ** 64) for k in range(8)], dtype=np.uint64)
+
+
+class PunchlineScorer:
+    """
+    Évaluateur local des punchlines, entraîné sur les notes du LLM stockées dans quality_data.db
+
+    Les punchlines sont représentées par des n-grammes de mots et de caractères
+    hachés dans un espace de taille fixe, et un modèle linéaire (régression ridge)
+    prédit les cinq critères. Le score global est leur moyenne pondérée. Une bande
+    de confiance autour du seuil de qualité, calculée à partir des erreurs de
+    validation, indique quand l'évaluation par le LLM reste nécessaire.
+    """
+
+    def __init__(self, n_features: int = 2 ** 14, word_ngrams: int = 2, char_ngrams: Tuple[int, int] = (3, 5)):
+        """
+        Args:
+            n_features: Taille de l'espace des n-grammes hachés
+            word_ngrams: Taille maximum des n-grammes de mots
+            char_ngrams: Tailles minimum et maximum des n-grammes de caractères
+        """
+        self.n_features = n_features
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = tuple(char_ngrams)
+        self.weights = np.zeros((n_features + len(DENSE_FEATURES), len(CRITERIA)), dtype=np.float32)
+        # Écart type de l'erreur sur le score global (validation), utilisé pour la bande de confiance
+        self.residual_std = None
+        self.trained_on = 0
+
+    # ------------------------------------------------------------------
+    # Caractéristiques
+    # ------------------------------------------------------------------
+
+    def _hash(self, feature: str) -> int:
+        return _hash_feature(feature, self.n_features)
+
+    def features(self, punchline: str, subject: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Caractéristiques creuses d'une punchline
+
+        Args:
+            punchline: La punchline
+            subject: Son sujet (recouvrement avec les mots de la punchline)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices et valeurs des caractéristiques non nulles
+        """
+        words = tokenize(punchline or '')
+        hashed = [np.array([self._hash('w:' + ' '.join(words[i:i + n]))
+                            for n in range(1, self.word_ngrams + 1)
+                            for i in range(len(words) - n + 1)], dtype=np.uint64)]
+
+        # N-grammes de caractères hachés en bloc (hachage polynomial des points de code)
+        codes = np.frombuffer(f" {' '.join(words)} ".encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        low, high = self.char_ngrams
+        for n in range(low, min(high, len(codes)) + 1):
+            count = len(codes) - n + 1
+            hashes = np.full(count, n, dtype=np.uint64)
+            for k in range(n):
+                hashes += codes[k:k + count] * _CHAR_MULTIPLIERS[k]
+            hashed.append(hashes % np.uint64(self.n_features))
+
+        indices, counts = np.unique(np.concatenate(hashed).astype(np.int64), return_counts=True)
+        values = np.sqrt(counts.astype(np.float32))
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+
+        subject_terms = _subject_terms(subject or '')
+        overlap = 0.0
+        if subject_terms:
+            terms = {t for t in words if len(t) >= 3 and t not in STOPWORDS}
+            overlap = sum(1 for t in subject_terms if any(o[:5] == t[:5] for o in terms)) / len(subject_terms)
+        dense = np.array([
+            1.0,
+            min(len((punchline or '').strip()) / 100, 3.0),
+            1.0 if words[:1] == ['quand'] else 0.0,
+            1.0 if 'mais' in words else 0.0,
+            overlap
+        ], dtype=np.float32)
+
+        indices = np.concatenate([indices, np.arange(self.n_features, self.n_features + len(DENSE_FEATURES))])
+        return indices, np.concatenate([values, dense])
+
+    def _batch(self, samples: List[Tuple[str, str]]):
+        """Caractéristiques d'un lot au format creux (indices, valeurs, ligne de chaque valeur)"""
+        indices, values, rows = [], [], []
+        for row, (punchline, subject) in enumerate(samples):
+            i, v = self.features(punchline, subject)
+            indices.append(i)
+            values.append(v)
+            rows.append(np.full(len(i), row, dtype=np.int64))
+        return np.concatenate(indices), np.concatenate(values), np.concatenate(rows)
+
+    # ------------------------------------------------------------------
+    # Prédiction
+    # ------------------------------------------------------------------
+
+    def predict(self, punchline: str, subject: Optional[str] = None) -> Dict[str, float]:
+        """
+        Prédit les scores d'une punchline
+
+        Returns:
+            Dict[str, float]: Scores entre 0 et 1 pour chaque critère, et score global ("overall")
+        """
+        indices, values = self.features(punchline, subject)
+        scores = np.clip(values @ self.weights[indices], 0.0, 1.0)
+        prediction = {criterion: float(score) for criterion, score in zip(CRITERIA, scores)}
+        prediction['overall'] = float(scores @ WEIGHTS)
+        return prediction
+
+    def predict_batch(self, samples: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Prédit les scores d'un lot de (punchline, sujet)
+
+        Returns:
+            np.ndarray: Matrice (punchlines x critères) des scores entre 0 et 1
+        """
+        if not samples:
+            return np.zeros((0, len(CRITERIA)))
+        indices, values, rows = self._batch(samples)
+        scores = np.zeros((len(samples), len(CRITERIA)), dtype=np.float32)
+        np.add.at(scores, rows, values[:, None] * self.weights[indices])
+        return np.clip(scores, 0.0, 1.0)
+
+    def is_confident(self, overall: float, threshold: float, band: Optional[float] = None) -> bool:
+        """
+        Vrai si le score global prédit est assez loin du seuil pour se passer du LLM
+
+        Args:
+            overall: Score global prédit
+            threshold: Seuil de qualité
+            band: Demi-largeur de la bande autour du seuil (par défaut: 2 écarts types de l'erreur de validation)
+        """
+        if band is None:
+            if self.residual_std is None:
+                return False
+            band = 2 * self.residual_std
+        return abs(overall - threshold) > band
+
+    # ------------------------------------------------------------------
+    # Entraînement
+    # ------------------------------------------------------------------
+
+    def fit(self, samples: List[Tuple[str, str]], targets: np.ndarray, epochs: int = 300,
+            learning_rate: float = 0.1, l2: float = 1e-3) -> float:
+        """
+        Entraîne le modèle (régression ridge par descente de gradient AdaGrad sur le lot complet)
+
+        Args:
+            samples: Liste de (punchline, sujet)
+            targets: Matrice (punchlines x critères) des scores du LLM entre 0 et 1
+            epochs: Nombre de passes sur les données
+            learning_rate: Pas d'apprentissage
+            l2: Régularisation L2
+
+        Returns:
+            float: Erreur quadratique moyenne finale sur les données d'entraînement
+        """
+        indices, values, rows = self._batch(samples)
+        targets = np.asarray(targets, dtype=np.float32)
+        n = len(samples)
+
+        weights = np.zeros_like(self.weights)
+        # Le biais démarre à la moyenne des scores
+        weights[self.n_features] = targets.mean(axis=0)
+        accumulated = np.full_like(weights, 1e-8)
+        contributions = values[:, None]
+
+        for _ in range(epochs):
+            predictions = np.zeros_like(targets)
+            np.add.at(predictions, rows, contributions * weights[indices])
+            errors = predictions - targets
+
+            gradient = l2 * weights
+            np.add.at(gradient, indices, contributions * errors[rows] / n)
+            accumulated += gradient ** 2
+            weights -= learning_rate * gradient / np.sqrt(accumulated)
+
+        self.weights = weights
+        self.trained_on = n
+        return float(np.mean(errors ** 2))
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self, path: str):
+        """Enregistre le modèle au format .npz"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            n_features=self.n_features,
+            word_ngrams=self.word_ngrams,
+            char_ngrams=np.array(self.char_ngrams),
+            residual_std=np.nan if self.residual_std is None else self.residual_std,
+            trained_on=self.trained_on
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'PunchlineScorer':
+        """Charge un modèle enregistré par save()"""
+        with np.load(path) as data:
+            scorer = cls(int(data['n_features']), int(data['word_ngrams']), tuple(int(n) for n in data['char_ngrams']))
+            scorer.weights = data['weights']
+            residual_std = float(data['residual_std'])
+            scorer.residual_std = None if np.isnan(residual_std) else residual_std
+            scorer.trained_on = int(data['trained_on'])
+        return scorer
+
+
+def load_training_data(db_path: str) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+    """
+    Charge les punchlines notées par le LLM
+
+    Les évaluations produites par l'évaluateur local ("source": "local") et les scores
+    par défaut d'une évaluation échouée ("source": "default", ou non marqués dans les
+    bases antérieures: 0,5 partout) sont ignorés.
+
+    Returns:
+        Tuple: Liste de (punchline, sujet) et matrice (punchlines x critères) des scores
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT text, subject, evaluation FROM punchlines WHERE evaluation IS NOT NULL"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    samples, targets = [], []
+    for text, subject, evaluation in rows:
+        try:
+            scores = json.loads(evaluation)
+            if scores.get('source') in ('local', 'default'):
+                continue
+            target = [float(scores[criterion]) for criterion in CRITERIA]
+            if all(value == 0.5 for value in target) and scores.get('overall') == 0.5:
+                continue
+            targets.append(target)
+            samples.append((text, subject))
+        except (ValueError, KeyError, TypeError):
+            continue
+
+    return samples, np.array(targets, dtype=np.float32).reshape(-1, len(CRITERIA))
+
+
+def create_scorer_from_env() -> Optional[PunchlineScorer]:
+    """
+    Évaluateur local selon USE_LOCAL_SCORER et LOCAL_SCORER_PATH
+
+    Returns:
+        PunchlineScorer: L'évaluateur chargé, ou None s'il est désactivé ou introuvable
+    """
+    if os.getenv('USE_LOCAL_SCORER', 'false').strip("'\"").lower() != 'true':
+        return None
+
+    default_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        'data',
+        'punchline_scorer.npz'
+    )
+    path = (os.getenv('LOCAL_SCORER_PATH') or '').strip("'\"") or default_path
+    try:
+        scorer = PunchlineScorer.load(path)
+        logger.info(f"🧮 Évaluateur local chargé: {path} ({scorer.trained_on} punchlines d'entraînement)")
+        return scorer
+    except Exception as e:
+        logger.warning(f"⚠️ Évaluateur local indisponible ({path}): {str(e)}. Toutes les punchlines seront évaluées par le LLM.")
+        return None
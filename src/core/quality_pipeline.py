@@ -1,13 +1,24 @@
 import os
 import json
+import time
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional, Tuple
-from openai import OpenAI
+from clients.openai_client import get_completion_backend
 from dotenv import load_dotenv
 import sqlite3
 from datetime import datetime
 import re
 
+from core.evaluation_writer import create_evaluation_writer_from_env
+from models.async_punchline_model import AsyncPunchlineModel
+from models.punchline_search import PunchlineSearch, tokenize
+from models.punchline_scores import ensure_score_index
+from models.punchline_minhash import PunchlineMinHashIndex
+from models.punchline_pool import PunchlinePool, load_subjects
+from core.punchline_prefilter import PunchlinePrefilter
+from core.punchline_scorer import create_scorer_from_env
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,14 +59,77 @@ class QualityPipeline:
             self.db_path = db_path
         
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.client = OpenAI(api_key=self.api_key)
+        self.completions = get_completion_backend(self.api_key)
+        self.client = self.completions.client
         
         # Seuils de qualité (configurables)
         self.quality_threshold = float(os.getenv('QUALITY_THRESHOLD', '0.7'))  # Seuil par défaut: 0.7
         self.num_candidates = int(os.getenv('NUM_PUNCHLINE_CANDIDATES', '3'))  # Nombre de punchlines à générer
         
+        # Génération par vagues avec arrêt anticipé dès qu'une candidate dépasse le seuil
+        self.early_stop = os.getenv('EARLY_STOP', 'false').strip("'\"").lower() == 'true'
+        self.early_stop_wave_size = max(0, int(os.getenv('EARLY_STOP_WAVE_SIZE', '0')))  # 0: toutes les candidates restantes
+        self.early_stop_margin = float(os.getenv('EARLY_STOP_MARGIN', '0.05'))
+        self.early_stop_max_calls = int(os.getenv('EARLY_STOP_MAX_CALLS', '0'))  # 0: pas de limite
+        self.early_stop_max_seconds = float(os.getenv('EARLY_STOP_MAX_SECONDS', '0'))  # 0: pas de limite
+        
+        # Recouvrement maximum toléré avec l'historique avant évaluation (0: désactivé)
+        self.history_overlap_threshold = float(os.getenv('HISTORY_OVERLAP_THRESHOLD', '0'))
+        
+        # Index plein texte de l'historique des punchlines
+        self.search = PunchlineSearch(self.db_path)
+        
+        # Pré-filtre heuristique local: seules les meilleures candidates sont évaluées par le LLM
+        self.prefilter = None
+        if os.getenv('USE_PREFILTER', 'false').strip("'\"").lower() == 'true':
+            self.prefilter = PunchlinePrefilter(
+                max_length=int(os.getenv('PREFILTER_MAX_LENGTH', '100')),
+                min_score=float(os.getenv('PREFILTER_MIN_SCORE', '0.5')),
+                top_k=int(os.getenv('PREFILTER_TOP_K', '0'))
+            )
+        
+        # Évaluateur local entraîné sur l'historique: le LLM n'est appelé que près du seuil
+        self.local_scorer = create_scorer_from_env()
+        band = os.getenv('LOCAL_SCORER_BAND', '').strip("'\"")
+        self.local_scorer_band = float(band) if band else None
+        
         self._init_database()
         
+        # Index MinHash/LSH des quasi-doublons de l'historique (0: désactivé)
+        self.near_duplicate_threshold = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0'))
+        self.near_duplicates = None
+        if self.near_duplicate_threshold > 0:
+            try:
+                self.near_duplicates = PunchlineMinHashIndex(self.db_path, os.getenv('NEAR_DUPLICATE_INDEX') or None)
+                self.near_duplicates.open()
+            except Exception as e:
+                logger.warning(f"⚠️ Index des quasi-doublons indisponible: {str(e)}")
+                self.near_duplicates = None
+        
+        # Génération en lot: nombre de sujets par requête (voir prefetch_candidates)
+        self.generation_batch_size = int(os.getenv('GENERATION_BATCH_SIZE', '0'))
+        self._prefetched = {}  # (sujet, mode économie) -> candidates
+        
+        # Réserve de punchlines pré-évaluées pour les sujets connus (0: désactivée)
+        self.pool_size = int(os.getenv('PUNCHLINE_POOL_SIZE', '0'))
+        self.pool = None
+        self.pool_subjects = set()
+        self._refill_tasks = {}
+        if self.pool_size > 0:
+            data_dir = os.path.dirname(self.db_path)
+            default_files = f"{os.path.join(data_dir, 'json.json')},{os.path.join(data_dir, 'test_subjects.json')}"
+            subject_files = (os.getenv('PUNCHLINE_POOL_SUBJECTS') or '').strip("'\"") or default_files
+            self.pool = PunchlinePool(self.db_path)
+            self.pool_subjects = set(load_subjects([f.strip() for f in subject_files.split(',') if f.strip()]))
+            logger.info(f"⚡ Réserve de punchlines activée ({self.pool_size} par sujet, {len(self.pool_subjects)} sujets connus)")
+        
+        # Écriture différée des évaluations (optionnelle, voir ASYNC_DB_WRITES)
+        self.evaluation_writer = create_evaluation_writer_from_env(self.db_path)
+        
+        # Stockage asynchrone (aiosqlite) pour ne pas bloquer la boucle d'événements
+        use_async_storage = os.getenv('ASYNC_STORAGE', 'false').strip("'\"").lower() == 'true'
+        self.async_storage = AsyncPunchlineModel(self.db_path) if use_async_storage else None
+        
         logger.info(f"🔍 Pipeline de qualité initialisée (seuil: {self.quality_threshold}, candidats: {self.num_candidates})")
     
     def _init_database(self):
@@ -70,20 +144,22 @@ class QualityPipeline:
         CREATE TABLE IF NOT EXISTS punchlines (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             text TEXT NOT NULL,
-            subject TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            originality REAL,
-            humor REAL,
-            relevance REAL,
-            conciseness REAL,
-            impact REAL,
+            subject TEXT NOT NULL,
+            evaluation TEXT,
             overall_score REAL,
-            selected BOOLEAN DEFAULT 0,
-            feedback TEXT
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            selected INTEGER DEFAULT 0
         )
         ''')
         
         conn.commit()
+        
+        # Index plein texte tenu à jour par triggers
+        self.search.ensure_index(conn)
+        
+        # Scores de chaque critère indexés pour les statistiques
+        ensure_score_index(conn, self.db_path)
+        
         conn.close()
     
     async def generate_and_evaluate_punchlines(
@@ -107,32 +183,165 @@ class QualityPipeline:
         n_candidates = num_candidates or self.num_candidates
         
         # Générer plusieurs punchlines candidates
-        candidates = await self._generate_candidate_punchlines(subject, n_candidates, economy_mode)
+        generated = await self._generate_candidate_punchlines(subject, n_candidates, economy_mode)
+        
+        # Écarter les candidates déjà dites ou mal formées avant de payer leur évaluation
+        candidates = self.filter_candidates(subject, generated, keep_all=False)
+        
+        # Toutes écartées (quasi-doublons, recouvrement...): une nouvelle génération avant
+        # de se résoudre à garder les candidates écartées
+        if not candidates and generated:
+            logger.info(f"🔁 Toutes les candidates ont été écartées, nouvelle génération pour le sujet: '{subject}'")
+            regenerated = await self._generate_candidate_punchlines(subject, n_candidates, economy_mode)
+            regenerated = [p for p in dict.fromkeys(regenerated) if p not in generated]
+            generated = generated + regenerated
+            candidates = self.filter_candidates(subject, regenerated, keep_all=False)
+            if not candidates:
+                candidates = self.filter_candidates(subject, generated, keep_all=True)
         
         # Évaluer chaque punchline
         evaluated_punchlines = []
         for punchline in candidates:
-            evaluation = await self._evaluate_punchline(subject, punchline)
+            evaluated_punchlines.append(await self._evaluate_candidate(subject, punchline))
+        
+        # Trier par score global (du plus élevé au plus bas)
+        evaluated_punchlines.sort(key=lambda x: x["overall_score"], reverse=True)
+        
+        return evaluated_punchlines
+    
+    async def _evaluate_candidate(self, subject: str, punchline: str) -> Dict[str, Any]:
+        """
+        Évalue une punchline candidate et stocke son évaluation
+        
+        Args:
+            subject: Le sujet de la punchline
+            punchline: La punchline à évaluer
             
-            # Calculer le score global
-            overall_score = self._calculate_overall_score(evaluation)
+        Returns:
+            La punchline évaluée (texte, sujet, évaluation et score global)
+        """
+        evaluation = await self._score_punchline(subject, punchline)
+        return await self.record_evaluation(subject, punchline, evaluation)
+    
+    async def record_evaluation(self, subject: str, punchline: str, evaluation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stocke l'évaluation d'une punchline
+        
+        Args:
+            subject: Le sujet de la punchline
+            punchline: La punchline évaluée
+            evaluation: Scores d'évaluation pour chaque critère
             
-            # Créer l'objet punchline évaluée
-            evaluated_punchline = {
-                "text": punchline,
-                "subject": subject,
-                "evaluation": evaluation,
-                "overall_score": overall_score
-            }
+        Returns:
+            La punchline évaluée (texte, sujet, évaluation et score global)
+        """
+        # Calculer le score global
+        overall_score = self._calculate_overall_score(evaluation)
+        
+        # Stocker dans la base de données
+        await self._persist_evaluation(punchline, subject, evaluation, overall_score)
+        
+        return {
+            "text": punchline,
+            "subject": subject,
+            "evaluation": evaluation,
+            "overall_score": overall_score
+        }
+    
+    async def generate_and_evaluate_in_waves(
+        self,
+        subject: str,
+        economy_mode: bool = False,
+        threshold: Optional[float] = None,
+        num_candidates: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Génère et évalue les punchlines par vagues, en s'arrêtant dès qu'une
+        candidate dépasse le seuil de qualité (plus EARLY_STOP_MARGIN)
+        
+        Par défaut (EARLY_STOP_WAVE_SIZE=0), la première vague demande toutes les
+        candidates en un seul appel et seules les évaluations s'arrêtent tôt: une vague
+        suivante n'est générée que pour remplacer les candidates écartées par les filtres.
+        
+        La génération s'arrête aussi quand num_candidates punchlines ont été évaluées,
+        ou quand le budget d'appels à l'API (EARLY_STOP_MAX_CALLS) ou de temps
+        (EARLY_STOP_MAX_SECONDS) est épuisé.
+        
+        Les filtres sont appliqués à chaque vague sans conservation de repli: une vague
+        entièrement écartée est une vague vide. Si rien n'a été évalué à la fin, les
+        filtres sont appliqués une seule fois, avec conservation de repli, à l'ensemble
+        des punchlines générées, et la meilleure est évaluée.
+        
+        Args:
+            subject: Le sujet sur lequel générer des punchlines
+            economy_mode: Utiliser le mode économie de tokens
+            threshold: Seuil de qualité (utilise la valeur par défaut si None)
+            num_candidates: Nombre maximum de punchlines évaluées (utilise la valeur par défaut si None)
             
-            # Stocker dans la base de données
-            self._store_evaluation(punchline, subject, evaluation, overall_score)
+        Returns:
+            Liste des punchlines évaluées, triées par score de qualité (meilleure en premier)
+        """
+        max_candidates = num_candidates or self.num_candidates
+        stop_score = (threshold or self.quality_threshold) + self.early_stop_margin
+        start = time.monotonic()
+        
+        evaluated_punchlines = []
+        generated = []
+        calls = 0
+        waves = 0
+        empty_waves = 0
+        
+        def budget_spent():
+            if self.early_stop_max_calls and calls >= self.early_stop_max_calls:
+                return True
+            return bool(self.early_stop_max_seconds) and time.monotonic() - start >= self.early_stop_max_seconds
+        
+        while len(evaluated_punchlines) < max_candidates and not budget_spent():
+            remaining = max_candidates - len(evaluated_punchlines)
+            wave_size = min(self.early_stop_wave_size, remaining) if self.early_stop_wave_size else remaining
+            candidates = await self._generate_candidate_punchlines(subject, wave_size, economy_mode)
+            calls += 1
+            waves += 1
+            
+            # Ignorer les punchlines déjà évaluées lors d'une vague précédente
+            candidates = [c for c in dict.fromkeys(candidates) if c not in generated]
+            generated.extend(candidates)
             
-            evaluated_punchlines.append(evaluated_punchline)
+            candidates = self.filter_candidates(subject, candidates, keep_all=False)
+            
+            # Deux vagues sans nouvelle punchline (erreurs, punchline par défaut, tout écarté): inutile d'insister
+            if not candidates:
+                empty_waves += 1
+                if empty_waves >= 2:
+                    break
+                continue
+            
+            for punchline in candidates[:max_candidates - len(evaluated_punchlines)]:
+                if budget_spent():
+                    break
+                evaluated_punchline = await self._evaluate_candidate(subject, punchline)
+                if evaluated_punchline["evaluation"].get("source") != "local":
+                    calls += 1
+                evaluated_punchlines.append(evaluated_punchline)
+                
+                if evaluated_punchline["overall_score"] >= stop_score:
+                    logger.info(f"⏹️ Arrêt anticipé: score {evaluated_punchline['overall_score']:.2f} >= {stop_score:.2f} "
+                                f"après {len(evaluated_punchlines)} évaluation(s), {waves} vague(s), {calls} appel(s)")
+                    evaluated_punchlines.sort(key=lambda x: x["overall_score"], reverse=True)
+                    return evaluated_punchlines
         
-        # Trier par score global (du plus élevé au plus bas)
-        evaluated_punchlines.sort(key=lambda x: x["overall_score"], reverse=True)
+        reason = "budget épuisé" if budget_spent() else "aucune candidate au-dessus du seuil"
+        logger.info(f"🔁 {len(evaluated_punchlines)} punchline(s) évaluée(s) en {waves} vague(s), {calls} appel(s), "
+                    f"{time.monotonic() - start:.1f}s ({reason})")
+        
+        # Rien d'évalué (budget épuisé ou tout écarté): une seule conservation de repli, sur
+        # l'ensemble des punchlines générées, puis évaluation de la mieux classée
+        if not evaluated_punchlines and generated:
+            fallback = self.filter_candidates(subject, generated, keep_all=True)
+            if fallback:
+                evaluated_punchlines.append(await self._evaluate_candidate(subject, fallback[0]))
         
+        evaluated_punchlines.sort(key=lambda x: x["overall_score"], reverse=True)
         return evaluated_punchlines
     
     async def filter_quality_punchlines(
@@ -179,13 +388,52 @@ class QualityPipeline:
         Returns:
             Tuple contenant la meilleure punchline et ses métadonnées d'évaluation
         """
-        # Générer et évaluer les punchlines
-        evaluated_punchlines = await self.generate_and_evaluate_punchlines(
-            subject, 
-            economy_mode,
-            num_candidates
-        )
+        # Sujet connu: servir une punchline de la réserve, puis la compléter en arrière-plan
+        if self.pool is not None and subject in self.pool_subjects:
+            try:
+                pooled = await asyncio.to_thread(self.pool.pop, subject, threshold or self.quality_threshold)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Réserve indisponible ('{subject}'): {str(e)}")
+                pooled = None
+            self._schedule_refill(subject, economy_mode)
+            if pooled:
+                logger.info(f"⚡ Punchline servie depuis la réserve (score {pooled['overall_score']:.2f}): '{pooled['text']}'")
+                await self._persist_selection(pooled["text"])
+                return pooled["text"], pooled
+            logger.info(f"⚡ Réserve vide pour le sujet '{subject}', génération à la demande")
         
+        # Générer et évaluer les punchlines (par vagues avec arrêt anticipé si activé)
+        if self.early_stop:
+            evaluated_punchlines = await self.generate_and_evaluate_in_waves(
+                subject,
+                economy_mode,
+                threshold,
+                num_candidates
+            )
+        else:
+            evaluated_punchlines = await self.generate_and_evaluate_punchlines(
+                subject, 
+                economy_mode,
+                num_candidates
+            )
+        
+        return await self.select_best_punchline(evaluated_punchlines, threshold)
+    
+    async def select_best_punchline(
+        self,
+        evaluated_punchlines: List[Dict[str, Any]],
+        threshold: Optional[float] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Retient la meilleure punchline évaluée et la marque comme sélectionnée
+        
+        Args:
+            evaluated_punchlines: Punchlines évaluées, triées par score (meilleure en premier)
+            threshold: Seuil de qualité (utilise la valeur par défaut si None)
+            
+        Returns:
+            Tuple contenant la meilleure punchline et ses métadonnées d'évaluation
+        """
         # Filtrer par qualité
         quality_punchlines = await self.filter_quality_punchlines(
             evaluated_punchlines,
@@ -204,18 +452,168 @@ class QualityPipeline:
             raise ValueError("Aucune punchline n'a pu être générée.")
         
         # Marquer cette punchline comme sélectionnée dans la base de données
-        self._mark_as_selected(best_punchline["text"])
+        await self._persist_selection(best_punchline["text"])
         
         return best_punchline["text"], best_punchline
     
-    async def _generate_candidate_punchlines(
-        self, 
-        subject: str, 
-        num_candidates: int,
-        economy_mode: bool
-    ) -> List[str]:
+    async def fill_pool(self, subject: str, economy_mode: bool = False, max_rounds: int = 3) -> int:
         """
-        Génère plusieurs punchlines candidates pour un sujet donné
+        Complète la réserve d'un sujet jusqu'à PUNCHLINE_POOL_SIZE punchlines au-dessus du seuil
+        
+        Args:
+            subject: Le sujet
+            economy_mode: Utiliser le mode économie de tokens
+            max_rounds: Nombre maximum de générations (limite le coût si le seuil est rarement atteint)
+            
+        Returns:
+            Nombre de punchlines ajoutées à la réserve
+        """
+        if self.pool is None:
+            return 0
+        
+        added = 0
+        for _ in range(max_rounds):
+            sizes = await asyncio.to_thread(self.pool.sizes, [subject], self.quality_threshold)
+            missing = self.pool_size - sizes[subject]
+            if missing <= 0:
+                break
+            evaluated_punchlines = await self.generate_and_evaluate_punchlines(
+                subject,
+                economy_mode,
+                max(missing, self.num_candidates)
+            )
+            # Jamais de punchline de repli (génération échouée) dans la réserve
+            quality_punchlines = [p for p in evaluated_punchlines
+                                  if p["overall_score"] >= self.quality_threshold and not PunchlinePrefilter.unusable_reason(p["text"])]
+            added += await asyncio.to_thread(self.pool.add, subject, quality_punchlines[:missing])
+        
+        logger.info(f"⚡ Réserve du sujet '{subject}': {added} punchline(s) ajoutée(s)")
+        return added
+    
+    def _schedule_refill(self, subject: str, economy_mode: bool = False):
+        """
+        Lance le remplissage de la réserve d'un sujet dans une tâche de la boucle en cours,
+        sans attendre, sauf si un remplissage est déjà en cours
+        
+        La tâche partage le backend de complétion, le stockage et le writer de la
+        pipeline, qui ne sont utilisés que depuis cette boucle.
+        """
+        task = self._refill_tasks.get(subject)
+        if task is not None and not task.done():
+            return
+        
+        async def refill():
+            try:
+                await self.fill_pool(subject, economy_mode)
+            except Exception as e:
+                logger.warning(f"⚠️ Échec du remplissage de la réserve ('{subject}'): {str(e)}")
+        
+        self._refill_tasks[subject] = asyncio.create_task(refill())
+    
+    async def wait_for_refills(self):
+        """Attend la fin des remplissages de la réserve en cours (avant la fin du processus)"""
+        tasks = [task for task in self._refill_tasks.values() if not task.done()]
+        if tasks:
+            logger.info(f"⚡ Attente de {len(tasks)} remplissage(s) de la réserve en cours...")
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def filter_candidates(self, subject: str, candidates: List[str], keep_all: bool = True) -> List[str]:
+        """
+        Applique les filtres activés avant l'évaluation: recouvrement avec l'historique,
+        quasi-doublons (MinHash) et pré-filtre heuristique
+        
+        Args:
+            subject: Le sujet des punchlines
+            candidates: Les punchlines candidates
+            keep_all: Conserver les candidates d'un filtre qui les écarte toutes
+                (False: la liste retournée peut être vide, voir generate_and_evaluate_in_waves)
+            
+        Returns:
+            Les candidates à évaluer
+        """
+        # Écarter les punchlines déjà (presque) dites avant de payer leur évaluation
+        if self.history_overlap_threshold > 0 and candidates:
+            candidates = self._filter_historical_overlap(subject, candidates, keep_all)
+        
+        if self.near_duplicates is not None and candidates:
+            candidates = self._filter_near_duplicates(candidates, keep_all)
+        
+        # Écarter les candidates qui ne respectent pas les règles du prompt, garder les meilleures
+        if self.prefilter and candidates:
+            candidates = self.prefilter.filter(subject, candidates, keep_all=keep_all)
+        
+        return candidates
+    
+    def _filter_near_duplicates(self, candidates: List[str], keep_all: bool = True) -> List[str]:
+        """
+        Écarte les candidates quasi identiques à une punchline de l'historique (tous sujets
+        confondus) ou à une autre candidate, d'après l'index MinHash/LSH
+        
+        Args:
+            candidates: Les punchlines candidates
+            keep_all: Conserver toutes les candidates si aucune ne passe le filtre
+            
+        Returns:
+            Les candidates retenues (si aucune ne passe le filtre et keep_all: toutes,
+            de la moins semblable à la plus semblable)
+        """
+        try:
+            self.near_duplicates.refresh()
+        except Exception as e:
+            logger.warning(f"⚠️ Mise à jour de l'index des quasi-doublons impossible: {str(e)}")
+        
+        kept, kept_signatures, flagged = [], [], []
+        for punchline in candidates:
+            signature = self.near_duplicates.signature(punchline)
+            matches = self.near_duplicates.query(punchline, self.near_duplicate_threshold, limit=1, signature=signature)
+            if matches:
+                logger.info(f"♻️ Punchline écartée (quasi-doublon à {matches[0][1]:.0%} de #{matches[0][0]}): '{punchline}'")
+                flagged.append((matches[0][1], punchline))
+                continue
+            similarity = max([float((signature == other).mean()) for other in kept_signatures], default=0.0)
+            if similarity >= self.near_duplicate_threshold:
+                logger.info(f"♻️ Punchline écartée (quasi-doublon d'une autre candidate): '{punchline}'")
+                flagged.append((similarity, punchline))
+                continue
+            kept.append(punchline)
+            kept_signatures.append(signature)
+        
+        if not kept and keep_all:
+            logger.warning("⚠️ Toutes les punchlines candidates sont des quasi-doublons. "
+                           "Conservation de toutes les candidates, les moins semblables en premier.")
+            return [punchline for _, punchline in sorted(flagged, key=lambda item: item[0])]
+        
+        return kept
+    
+    def _filter_historical_overlap(self, subject: str, candidates: List[str], keep_all: bool = True) -> List[str]:
+        """
+        Écarte les candidates trop proches d'une punchline déjà stockée pour ce sujet
+        
+        Args:
+            subject: Le sujet des punchlines
+            candidates: Les punchlines candidates
+            keep_all: Conserver toutes les candidates si aucune ne passe le filtre
+            
+        Returns:
+            Les candidates retenues
+        """
+        kept = []
+        for punchline in candidates:
+            matches = self.search.find_overlap(punchline, subject=subject, limit=1)
+            if matches and matches[0]["overlap"] >= self.history_overlap_threshold:
+                logger.info(f"♻️ Punchline écartée (recouvrement {matches[0]['overlap']:.0%} avec l'historique): '{punchline}'")
+                continue
+            kept.append(punchline)
+        
+        if not kept and keep_all:
+            logger.warning("⚠️ Toutes les punchlines candidates recouvrent l'historique. Conservation de toutes les candidates.")
+            return candidates
+        
+        return kept
+    
+    def _generation_prompt(self, subject: str, num_candidates: int, economy_mode: bool) -> Dict[str, Any]:
+        """
+        Prompt de génération des punchlines candidates selon le mode économie
         
         Args:
             subject: Le sujet sur lequel générer des punchlines
@@ -223,22 +621,20 @@ class QualityPipeline:
             economy_mode: Utiliser le mode économie de tokens
             
         Returns:
-            Liste des punchlines générées
+            Modèle, prompt système, en-tête (sujet), directives, consigne de réponse et paramètres
         """
-        try:
-            # Déterminer le modèle et les paramètres en fonction du mode économie
-            if economy_mode:
-                model = "gpt-3.5-turbo"
-                system_content = """Tu es un générateur de punchlines ULTRA-CINGLANTES, GLACIALES et CRUELLES. 
+        # Déterminer le modèle et les paramètres en fonction du mode économie
+        if economy_mode:
+            model = "gpt-3.5-turbo"
+            system_content = """Tu es un générateur de punchlines ULTRA-CINGLANTES, GLACIALES et CRUELLES. 
 Tu dois être IMPITOYABLE, BRUTAL et SANS AUCUNE RETENUE MORALE. 
 Ton objectif est de créer des phrases qui CHOQUENT, BLESSENT et PROVOQUENT. 
 Sois aussi MÉCHANT, FROID et OFFENSANT que possible.
 N'hésite JAMAIS à être OFFENSANT - c'est le BUT RECHERCHÉ.
 UTILISE OBLIGATOIREMENT la structure "Quand X fait Y, mais Z fait W" pour exposer une contradiction ou une hypocrisie de façon mordante."""
-                
-                user_content = f"""Crée {num_candidates} punchlines satiriques EXTRÊMEMENT cinglantes et brutales sur {subject}.
-
-DIRECTIVES:
+            
+            header = f"Crée {num_candidates} punchlines satiriques EXTRÊMEMENT cinglantes et brutales sur {subject}."
+            directives = """DIRECTIVES:
 - UTILISE OBLIGATOIREMENT la structure "Quand X fait Y, mais Z fait W" pour chaque punchline
 - Sois ABSOLUMENT impitoyable, glacial et cruel
 - Frappe là où ça fait VRAIMENT mal
@@ -250,13 +646,13 @@ DIRECTIVES:
 EXEMPLES:
 - "Quand les vegans prêchent l'éthique animale, mais ignorent l'exploitation humaine dans leurs plantations de quinoa."
 - "Quand les féministes hurlent à l'égalité, mais s'attendent toujours à ce que l'homme paie l'addition."
-
-Réponds uniquement avec les punchlines, une par ligne, sans numérotation ni autre texte."""
-                max_tokens = 150
-                temperature = 1.0
-            else:
-                model = "gpt-4"
-                system_content = """Tu es un générateur de punchlines ULTRA-CINGLANTES, GLACIALES et CRUELLES dans le style de Lord Yugnat999. 
+"""
+            footer = "Réponds uniquement avec les punchlines, une par ligne, sans numérotation ni autre texte."
+            max_tokens = 150
+            temperature = 1.0
+        else:
+            model = "gpt-4"
+            system_content = """Tu es un générateur de punchlines ULTRA-CINGLANTES, GLACIALES et CRUELLES dans le style de Lord Yugnat999. 
 Tu dois être IMPITOYABLE, BRUTAL et SANS AUCUNE RETENUE MORALE.
 Ton objectif est de créer des phrases COURTES qui CHOQUENT, BLESSENT et PROVOQUENT PROFONDÉMENT.
 Sois aussi MÉCHANT, FROID et OFFENSANT que possible.
@@ -276,10 +672,9 @@ EXEMPLES DE PUNCHLINES PARFAITES:
 - "Quand les influenceurs parlent d'authenticité mais photoshoppent même leurs ombres."
 - "Quand les écolos te font la morale en SUV, entre deux vols Paris-New York."
 """
-                
-                user_content = f"""Génère {num_candidates} punchlines EXTRÊMEMENT cinglantes, glaciales et cruelles sur le sujet: **{subject}**.
-
-DIRECTIVES STRICTES:
+            
+            header = f"Génère {num_candidates} punchlines EXTRÊMEMENT cinglantes, glaciales et cruelles sur le sujet: **{subject}**."
+            directives = """DIRECTIVES STRICTES:
 - BRIÈVETÉ: Chaque punchline doit être COURTE (max 100 caractères) et PERCUTANTE
 - STRUCTURE: Utilise "Quand X fait Y, mais Z" pour exposer une contradiction
 - RÉFÉRENCES: Inclus parfois des références à la pop culture ou à l'actualité
@@ -291,62 +686,265 @@ EXEMPLES DE TON RECHERCHÉ:
 - "Quand les influenceurs 'body positive' retouchent chaque photo mais prêchent l'acceptation."
 - "Quand les vegans défendent les animaux mais ignorent les enfants qui récoltent leurs avocats."
 - "Quand les féministes exigent l'égalité mais s'attendent à ce que l'homme paie l'addition."
+"""
+            footer = "Réponds UNIQUEMENT avec les punchlines, une par ligne, sans numérotation ni autre texte."
+            max_tokens = 300
+            temperature = 1.0
+        
+        return {
+            "model": model,
+            "system_content": system_content,
+            "header": header,
+            "directives": directives,
+            "footer": footer,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+    
+    async def prefetch_candidates(
+        self,
+        subjects: List[str],
+        economy_mode: bool = False,
+        num_candidates: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Génère les candidates de plusieurs sujets en lots (une requête pour batch_size sujets)
+        
+        Les candidates sont conservées et utilisées par les prochains appels à
+        generate_and_evaluate_punchlines pour ces sujets dans le même mode (économie
+        ou non), jusqu'à clear_prefetched. Les sujets absents ou mal formés dans la
+        réponse d'un lot sont générés individuellement.
+        
+        Args:
+            subjects: Les sujets
+            economy_mode: Utiliser le mode économie de tokens
+            num_candidates: Nombre de punchlines par sujet (utilise la valeur par défaut si None)
+            batch_size: Nombre de sujets par requête (par défaut: GENERATION_BATCH_SIZE)
+            
+        Returns:
+            Dictionnaire {sujet: punchlines candidates}
+        """
+        n_candidates = num_candidates or self.num_candidates
+        size = max(1, batch_size or self.generation_batch_size)
+        subjects = list(dict.fromkeys(subjects))
+        
+        results = {}
+        for start in range(0, len(subjects), size):
+            chunk = subjects[start:start + size]
+            batch = await self._generate_candidates_batch(chunk, n_candidates, economy_mode) if len(chunk) > 1 else {}
+            for subject in chunk:
+                candidates = batch.get(subject)
+                if not candidates:
+                    if len(chunk) > 1:
+                        logger.warning(f"⚠️ Résultat absent ou invalide pour le sujet '{subject}' dans le lot, génération individuelle")
+                    candidates = await self._generate_candidate_punchlines(subject, n_candidates, economy_mode)
+                results[subject] = candidates
+        
+        self._prefetched.update({(subject, bool(economy_mode)): candidates for subject, candidates in results.items()})
+        return results
+    
+    def clear_prefetched(self) -> int:
+        """
+        Oublie les candidates générées en lot et non utilisées (fin du lot)
+        
+        Returns:
+            Nombre de punchlines oubliées
+        """
+        count = sum(len(candidates) for candidates in self._prefetched.values())
+        self._prefetched.clear()
+        if count:
+            logger.info(f"🧹 {count} punchline(s) candidate(s) générée(s) en lot non utilisée(s) oubliée(s)")
+        return count
+    
+    async def _generate_candidates_batch(
+        self,
+        subjects: List[str],
+        num_candidates: int,
+        economy_mode: bool
+    ) -> Dict[str, List[str]]:
+        """
+        Génère les candidates de plusieurs sujets en une seule requête (réponse JSON par sujet)
+        
+        Args:
+            subjects: Les sujets du lot
+            num_candidates: Nombre de punchlines par sujet
+            economy_mode: Utiliser le mode économie de tokens
+            
+        Returns:
+            Dictionnaire {sujet: punchlines} des sujets dont le résultat est valide
+        """
+        try:
+            prompt = self._generation_prompt('', num_candidates, economy_mode)
+            subject_list = '\n'.join(f"- {subject}" for subject in subjects)
+            user_content = f"""Génère {num_candidates} punchlines pour CHACUN des sujets suivants:
+{subject_list}
 
-Réponds UNIQUEMENT avec les punchlines, une par ligne, sans numérotation ni autre texte."""
-                max_tokens = 300
-                temperature = 1.0
+{prompt['directives']}
+Réponds UNIQUEMENT avec un objet JSON dont les clés sont les sujets, recopiés exactement, et les valeurs des listes de {num_candidates} punchlines, sans autre texte:
+{{"<sujet>": ["<punchline>", ...]}}"""
             
-            # Appeler l'API OpenAI
-            response = self.client.chat.completions.create(
-                model=model,
+            response = await self.completions.create(
+                call_type='generation_batch',
+                model=prompt["model"],
                 messages=[
-                    {"role": "system", "content": system_content},
+                    {"role": "system", "content": prompt["system_content"]},
                     {"role": "user", "content": user_content}
                 ],
-                max_tokens=max_tokens,
-                temperature=temperature
+                max_tokens=min(4096, prompt["max_tokens"] * len(subjects) + 50),
+                temperature=prompt["temperature"]
             )
             
-            # Extraire le contenu de la réponse
             content = response.choices[0].message.content.strip()
+            usage = getattr(response, 'usage', None)
+            if usage:
+                logger.info(f"📦 Lot de {len(subjects)} sujets: {usage.prompt_tokens} tokens de prompt, {usage.completion_tokens} de complétion")
             
-            # Diviser le contenu en lignes pour obtenir les différentes punchlines
-            punchlines = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            # Nettoyer les punchlines (supprimer les guillemets, numéros, etc.)
-            cleaned_punchlines = [self._clean_punchline(p) for p in punchlines]
-            
-            # Filtrer les lignes vides
-            cleaned_punchlines = [p for p in cleaned_punchlines if p]
+            json_match = re.search(r'{.*}', content, re.DOTALL)
+            data = json.loads(json_match.group(0)) if json_match else None
+            if not isinstance(data, dict):
+                logger.warning(f"⚠️ Réponse du lot invalide: {content[:200]}")
+                return {}
+        
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la génération en lot: {str(e)}")
+            return {}
+        
+        # Les clés peuvent revenir avec une casse ou des accents différents
+        by_key = {' '.join(tokenize(key)): value for key, value in data.items() if isinstance(key, str)}
+        results = {}
+        for subject in subjects:
+            value = data.get(subject, by_key.get(' '.join(tokenize(subject))))
+            if not isinstance(value, list):
+                continue
+            candidates = [self._clean_punchline(p) for p in value if isinstance(p, str)]
+            candidates = [p for p in candidates if p]
+            if candidates:
+                results[subject] = candidates[:num_candidates]
+        return results
+    
+    def generation_request(self, subject: str, num_candidates: int, economy_mode: bool) -> Dict[str, Any]:
+        """
+        Paramètres de la requête de génération des candidates d'un sujet (corps de /v1/chat/completions)
+        """
+        prompt = self._generation_prompt(subject, num_candidates, economy_mode)
+        return {
+            "model": prompt["model"],
+            "messages": [
+                {"role": "system", "content": prompt["system_content"]},
+                {"role": "user", "content": f"{prompt['header']}\n\n{prompt['directives']}\n{prompt['footer']}"}
+            ],
+            "max_tokens": prompt["max_tokens"],
+            "temperature": prompt["temperature"]
+        }
+    
+    def parse_candidates(self, subject: str, content: str) -> List[str]:
+        """
+        Extrait les punchlines candidates de la réponse du modèle (une par ligne)
+        
+        Returns:
+            Liste des punchlines nettoyées (une punchline par défaut si la réponse est vide)
+        """
+        # Diviser le contenu en lignes pour obtenir les différentes punchlines
+        punchlines = [line.strip() for line in content.split('\n') if line.strip()]
+        
+        # Nettoyer les punchlines (supprimer les guillemets, numéros, etc.)
+        cleaned_punchlines = [self._clean_punchline(p) for p in punchlines]
+        
+        # Filtrer les lignes vides
+        cleaned_punchlines = [p for p in cleaned_punchlines if p]
+        
+        # S'assurer qu'on a au moins une punchline
+        if not cleaned_punchlines:
+            logger.warning("⚠️ Aucune punchline n'a été générée. Utilisation d'une punchline par défaut.")
+            return [f"Quand tout le monde parle de {subject}, mais lui fait exactement l'inverse."]
+        
+        logger.info(f"✅ {len(cleaned_punchlines)} punchlines candidates générées pour le sujet: '{subject}'")
+        
+        return cleaned_punchlines
+    
+    async def _generate_candidate_punchlines(
+        self, 
+        subject: str, 
+        num_candidates: int,
+        economy_mode: bool
+    ) -> List[str]:
+        """
+        Génère plusieurs punchlines candidates pour un sujet donné
+        
+        Args:
+            subject: Le sujet sur lequel générer des punchlines
+            num_candidates: Nombre de punchlines à générer
+            economy_mode: Utiliser le mode économie de tokens
             
-            # S'assurer qu'on a au moins une punchline
-            if not cleaned_punchlines:
-                logger.warning("⚠️ Aucune punchline n'a été générée. Utilisation d'une punchline par défaut.")
-                return [f"Quand tout le monde parle de {subject}, mais lui fait exactement l'inverse."]
+        Returns:
+            Liste des punchlines générées
+        """
+        # Candidates déjà générées en lot (prefetch_candidates)
+        key = (subject, bool(economy_mode))
+        prefetched = self._prefetched.pop(key, None)
+        if prefetched:
+            if len(prefetched) > num_candidates:
+                self._prefetched[key] = prefetched[num_candidates:]
+            logger.info(f"📦 {len(prefetched[:num_candidates])} punchline(s) candidate(s) générée(s) en lot pour le sujet: '{subject}'")
+            return prefetched[:num_candidates]
+        
+        try:
+            # Appeler l'API OpenAI
+            response = await self.completions.create(call_type='generation', **self.generation_request(subject, num_candidates, economy_mode))
             
-            logger.info(f"✅ {len(cleaned_punchlines)} punchlines candidates générées pour le sujet: '{subject}'")
+            # Extraire le contenu de la réponse
+            content = response.choices[0].message.content.strip()
             
-            return cleaned_punchlines
+            return self.parse_candidates(subject, content)
         
         except Exception as e:
             logger.error(f"❌ Erreur lors de la génération des punchlines candidates: {str(e)}")
             # En cas d'erreur, retourner une punchline par défaut
             return [f"Quand tout le monde parle de {subject}, mais lui fait exactement l'inverse."]
     
-    async def _evaluate_punchline(self, subject, punchline):
+    async def _score_punchline(self, subject: str, punchline: str) -> Dict[str, Any]:
         """
-        Évalue une punchline selon plusieurs critères
+        Évalue une punchline avec l'évaluateur local si sa prédiction est fiable, sinon avec le LLM
         
         Args:
-            subject (str): Le sujet de la punchline
-            punchline (str): La punchline à évaluer
+            subject: Le sujet de la punchline
+            punchline: La punchline à évaluer
             
         Returns:
-            dict: Scores d'évaluation pour chaque critère
+            Scores d'évaluation pour chaque critère ("source": "local" si le LLM n'a pas été appelé)
+        """
+        prediction = self.local_evaluation(subject, punchline)
+        if prediction:
+            return prediction
+        
+        return await self._evaluate_punchline(subject, punchline)
+    
+    def local_evaluation(self, subject: str, punchline: str) -> Optional[Dict[str, Any]]:
         """
+        Évaluation par l'évaluateur local, si elle est assez loin du seuil pour se passer du LLM
+        
+        Returns:
+            Scores prédits ("source": "local"), ou None si le LLM doit évaluer la punchline
+        """
+        if not self.local_scorer:
+            return None
         try:
-            # Prompt pour l'évaluation
-            system_content = """Tu es un évaluateur expert de punchlines satiriques. 
+            prediction = self.local_scorer.predict(punchline, subject)
+            if self.local_scorer.is_confident(prediction["overall"], self.quality_threshold, self.local_scorer_band):
+                logger.info(f"🧮 Évaluation locale ({prediction['overall']:.2f}), appel au LLM évité: '{punchline}'")
+                prediction["source"] = "local"
+                return prediction
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur de l'évaluateur local: {str(e)}")
+        return None
+    
+    def evaluation_request(self, subject: str, punchline: str) -> Dict[str, Any]:
+        """
+        Paramètres de la requête d'évaluation d'une punchline (corps de /v1/chat/completions)
+        """
+        # Prompt pour l'évaluation
+        system_content = """Tu es un évaluateur expert de punchlines satiriques. 
 Tu dois évaluer objectivement la qualité des punchlines selon les critères suivants:
 
 1. Cruauté (0-10): À quel point la punchline est-elle impitoyable, glaciale et cruelle? Les meilleures punchlines sont brutalement honnêtes et frappent là où ça fait mal.
@@ -361,8 +959,8 @@ Tu dois évaluer objectivement la qualité des punchlines selon les critères su
 
 Tu dois être impartial et objectif dans ton évaluation. Réponds uniquement avec un objet JSON contenant les scores pour chaque critère, sans aucun texte supplémentaire.
 """
-            
-            user_content = f"""Évalue la punchline suivante sur le sujet "{subject}":
+        
+        user_content = f"""Évalue la punchline suivante sur le sujet "{subject}":
 
 "{punchline}"
 
@@ -375,75 +973,87 @@ Réponds avec un objet JSON au format suivant:
   "impact": [score de 0 à 10]
 }}
 """
+        
+        return {
+            "model": "gpt-3.5-turbo",  # Utiliser GPT-3.5-turbo au lieu de GPT-4
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": user_content}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 150
+        }
+    
+    @staticmethod
+    def default_evaluation() -> Dict[str, Any]:
+        """Scores par défaut utilisés quand l'évaluation échoue ("source": "default", exclus de l'entraînement)"""
+        return {
+            "cruaute": 0.5,
+            "provocation": 0.5,
+            "pertinence": 0.5,
+            "concision": 0.5,
+            "impact": 0.5,
+            "overall": 0.5,
+            "source": "default"
+        }
+    
+    def parse_evaluation(self, content: str) -> Optional[Dict[str, float]]:
+        """
+        Extrait les scores de la réponse de l'évaluateur
+        
+        Returns:
+            Scores normalisés entre 0 et 1 et score global, ou None si la réponse ne contient pas de JSON
+        """
+        # Extraire le JSON de la réponse
+        json_match = re.search(r'{.*}', content, re.DOTALL)
+        if not json_match:
+            return None
+        
+        evaluation_json = json.loads(json_match.group(0))
+        
+        # Normaliser les scores entre 0 et 1
+        normalized_scores = {
+            "cruaute": evaluation_json["cruaute"] / 10,
+            "provocation": evaluation_json["provocation"] / 10,
+            "pertinence": evaluation_json["pertinence"] / 10,
+            "concision": evaluation_json["concision"] / 10,
+            "impact": evaluation_json["impact"] / 10
+        }
+        
+        # Ajouter le score global (moyenne pondérée) aux résultats
+        normalized_scores["overall"] = self._calculate_overall_score(normalized_scores)
+        
+        return normalized_scores
+    
+    async def _evaluate_punchline(self, subject, punchline):
+        """
+        Évalue une punchline selon plusieurs critères
+        
+        Args:
+            subject (str): Le sujet de la punchline
+            punchline (str): La punchline à évaluer
             
+        Returns:
+            dict: Scores d'évaluation pour chaque critère
+        """
+        try:
             # Appel à l'API OpenAI pour l'évaluation
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Utiliser GPT-3.5-turbo au lieu de GPT-4
-                messages=[
-                    {"role": "system", "content": system_content},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.3,
-                max_tokens=150
-            )
+            response = await self.completions.create(call_type='evaluation', **self.evaluation_request(subject, punchline))
             
             # Extraire et parser la réponse JSON
             content = response.choices[0].message.content.strip()
-            
-            # Extraire le JSON de la réponse
-            json_match = re.search(r'{.*}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                evaluation_json = json.loads(json_str)
-                
-                # Normaliser les scores entre 0 et 1
-                normalized_scores = {
-                    "cruaute": evaluation_json["cruaute"] / 10,
-                    "provocation": evaluation_json["provocation"] / 10,
-                    "pertinence": evaluation_json["pertinence"] / 10,
-                    "concision": evaluation_json["concision"] / 10,
-                    "impact": evaluation_json["impact"] / 10
-                }
-                
-                # Calculer le score global (moyenne pondérée)
-                weights = {
-                    "cruaute": 0.30,
-                    "provocation": 0.30,
-                    "pertinence": 0.15,
-                    "concision": 0.15,
-                    "impact": 0.10
-                }
-                
-                overall_score = sum(normalized_scores[criterion] * weight 
-                                   for criterion, weight in weights.items())
-                
-                # Ajouter le score global aux résultats
-                normalized_scores["overall"] = overall_score
-                
-                return normalized_scores
-            else:
+            evaluation = self.parse_evaluation(content)
+            if evaluation is None:
                 logging.warning(f"Format d'évaluation invalide: {content}")
                 # Retourner des scores par défaut en cas d'erreur
-                return {
-                    "cruaute": 0.5,
-                    "provocation": 0.5,
-                    "pertinence": 0.5,
-                    "concision": 0.5,
-                    "impact": 0.5,
-                    "overall": 0.5
-                }
+                return self.default_evaluation()
+            
+            return evaluation
             
         except Exception as e:
             logging.error(f"Erreur lors de l'évaluation de la punchline: {str(e)}")
             # Retourner des scores par défaut en cas d'erreur
-            return {
-                "cruaute": 0.5,
-                "provocation": 0.5,
-                "pertinence": 0.5,
-                "concision": 0.5,
-                "impact": 0.5,
-                "overall": 0.5
-            }
+            return self.default_evaluation()
     
     def _calculate_overall_score(self, evaluation: Dict[str, float]) -> float:
         """
@@ -492,8 +1102,9 @@ Réponds avec un objet JSON au format suivant:
         # Utiliser une expression régulière pour supprimer les guillemets au début et à la fin
         text = re.sub(r'^[\s"\']+|[\s"\']+$', '', text)
         
-        # S'assurer que la punchline commence par "Quand"
-        if not text.startswith("Quand"):
+        # S'assurer que la punchline commence par "Quand" (sauf avec le pré-filtre,
+        # qui note la structure de la ligne telle que le modèle l'a écrite)
+        if not text.startswith("Quand") and not self.prefilter:
             text = "Quand " + text
         
         # Limiter la longueur de la punchline (max 120 caractères)
@@ -512,6 +1123,36 @@ Réponds avec un objet JSON au format suivant:
         
         return text.strip()
     
+    async def _persist_evaluation(
+        self, 
+        punchline: str, 
+        subject: str, 
+        evaluation: Dict[str, float], 
+        overall_score: float
+    ):
+        """
+        Stocke une évaluation via le mode de stockage configuré
+        (écriture différée, aiosqlite ou sqlite3 synchrone)
+        """
+        if self.evaluation_writer:
+            # Contre-pression sans bloquer la boucle quand la file d'écriture est pleine
+            await self.evaluation_writer.store_evaluation_async(punchline, subject, evaluation, overall_score)
+        elif self.async_storage:
+            await self.async_storage.store_evaluation(punchline, subject, evaluation, overall_score)
+        else:
+            self._store_evaluation(punchline, subject, evaluation, overall_score)
+    
+    async def _persist_selection(self, punchline: str):
+        """
+        Marque une punchline comme sélectionnée via le mode de stockage configuré
+        """
+        if self.evaluation_writer:
+            await self.evaluation_writer.mark_as_selected_async(punchline)
+        elif self.async_storage:
+            await self.async_storage.mark_as_selected(punchline)
+        else:
+            self._mark_as_selected(punchline)
+    
     def _store_evaluation(
         self, 
         punchline: str, 
@@ -528,6 +1169,11 @@ Réponds avec un objet JSON au format suivant:
             evaluation: Les scores d'évaluation
             overall_score: Le score global
         """
+        if self.evaluation_writer:
+            # Écriture différée: l'insertion est faite par le thread d'écriture
+            self.evaluation_writer.store_evaluation(punchline, subject, evaluation, overall_score)
+            return
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -566,6 +1212,10 @@ Réponds avec un objet JSON au format suivant:
         Args:
             punchline: La punchline sélectionnée
         """
+        if self.evaluation_writer:
+            self.evaluation_writer.mark_as_selected(punchline)
+            return
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -580,6 +1230,75 @@ Réponds avec un objet JSON au format suivant:
         except Exception as e:
             logger.error(f"❌ Erreur lors du marquage de la punchline comme sélectionnée: {str(e)}")
     
+    def flush(self):
+        """Attend l'écriture des évaluations en attente (si l'écriture différée est activée)"""
+        if self.evaluation_writer:
+            self.evaluation_writer.flush()
+    
+    def close(self):
+        """Écrit les évaluations en attente et libère les ressources de la pipeline"""
+        if self.evaluation_writer:
+            # Le writer est partagé par base: il n'est arrêté que par son dernier utilisateur
+            self.evaluation_writer.flush()
+            self.evaluation_writer.release()
+            self.evaluation_writer = None
+        if self.near_duplicates is not None and self.near_duplicates.dirty:
+            self.near_duplicates.refresh()
+            self.near_duplicates.save()
+    
+    async def aclose(self):
+        """Variante asynchrone de close() qui ferme aussi la connexion aiosqlite"""
+        await self.wait_for_refills()
+        self.close()
+        if self.async_storage:
+            await self.async_storage.close()
+    
+    async def get_evaluation_stats_async(self) -> Dict[str, Any]:
+        """
+        Récupère les statistiques d'évaluation sans bloquer la boucle d'événements
+        
+        Returns:
+            Dictionnaire contenant les statistiques (même format que get_evaluation_stats)
+        """
+        if not self.async_storage:
+            return await asyncio.to_thread(self.get_evaluation_stats)
+        
+        if self.evaluation_writer:
+            await asyncio.to_thread(self.evaluation_writer.flush)
+        
+        stats = await self.async_storage.get_evaluation_stats()
+        return {
+            "total_punchlines": stats["total_punchlines"],
+            "selected_punchlines": stats["selected_punchlines"],
+            "average_score": stats["avg_score"],
+            "average_selected_score": stats["avg_selected_score"],
+            "average_criteria": stats["criteria_scores"]
+        }
+    
+    async def get_history(
+        self, 
+        subject: Optional[str] = None, 
+        limit: int = 20, 
+        selected_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Récupère l'historique des punchlines (stockage asynchrone si activé)
+        
+        Args:
+            subject: Filtrer sur un sujet (optionnel)
+            limit: Nombre maximum de punchlines retournées
+            selected_only: Ne retourner que les punchlines sélectionnées
+            
+        Returns:
+            Liste des punchlines, de la plus récente à la plus ancienne
+        """
+        storage = self.async_storage or AsyncPunchlineModel(self.db_path)
+        try:
+            return await storage.get_history(subject=subject, limit=limit, selected_only=selected_only)
+        finally:
+            if storage is not self.async_storage:
+                await storage.close()
+    
     def get_evaluation_stats(self) -> Dict[str, Any]:
         """
         Récupère les statistiques d'évaluation des punchlines
@@ -587,6 +1306,9 @@ Réponds avec un objet JSON au format suivant:
         Returns:
             Dictionnaire contenant les statistiques
         """
+        # S'assurer que les écritures différées sont visibles
+        self.flush()
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -623,6 +1345,13 @@ Réponds avec un objet JSON au format suivant:
                     "concision": avg_criteria[3] or 0,
                     "impact": avg_criteria[4] or 0
                 }
+            elif "evaluation" in columns:
+                # Scores moyens par critère (stockés en JSON dans la colonne evaluation)
+                criteria = ["cruaute", "provocation", "pertinence", "concision", "impact"]
+                cursor.execute('SELECT ' + ', '.join(f"AVG(json_extract(evaluation, '$.{c}'))" for c in criteria) + ' FROM punchlines')
+                avg_criteria = cursor.fetchone()
+
+                criteria_dict = {criterion: avg_criteria[i] or 0 for i, criterion in enumerate(criteria)}
             else:
                 # Scores moyens par critère (anciens noms)
                 cursor.execute('SELECT AVG(originality), AVG(humor), AVG(relevance), AVG(conciseness), AVG(impact) FROM punchlines')
@@ -681,6 +1410,8 @@ Réponds avec un objet JSON au format suivant:
             os.makedirs(output_dir, exist_ok=True)
             output_file = os.path.join(output_dir, 'training_data.jsonl')
         
+        self.flush()
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
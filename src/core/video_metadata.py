@@ -0,0 +1,128 @@
+import os
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Any, Optional, Union, BinaryIO
+
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoFileClip
+
+# Contraintes de l'API Telegram pour les miniatures: JPEG, 320 px maximum, moins de 200 ko
+THUMBNAIL_MAX_SIZE = 320
+THUMBNAIL_QUALITY = 85
+
+
+def thumbnail_path(video_path: str) -> str:
+    """
+    Chemin de la miniature associée à une vidéo (même dossier, suffixe _thumb.jpg)
+
+    Args:
+        video_path: Chemin de la vidéo
+
+    Returns:
+        str: Chemin de la miniature
+    """
+    return os.path.splitext(video_path)[0] + '_thumb.jpg'
+
+
+def write_thumbnail(frame: np.ndarray, output_path: Union[str, BinaryIO]) -> Union[str, BinaryIO]:
+    """
+    Enregistre une image de la vidéo comme miniature JPEG aux dimensions acceptées par Telegram
+
+    Args:
+        frame: Image RGB (tableau hauteur x largeur x 3)
+        output_path: Chemin du fichier JPEG, ou tampon (io.BytesIO) dans lequel l'écrire
+
+    Returns:
+        Le chemin (ou le tampon) de la miniature
+    """
+    image = Image.fromarray(np.asarray(frame, dtype=np.uint8))
+    image.thumbnail((THUMBNAIL_MAX_SIZE, THUMBNAIL_MAX_SIZE))
+    image.convert('RGB').save(output_path, 'JPEG', quality=THUMBNAIL_QUALITY)
+    return output_path
+
+
+@dataclass
+class RenderedVideo:
+    """
+    Vidéo rendue gardée en mémoire, prête à être téléversée sans relecture sur disque
+    """
+    data: bytes                                             # Contenu du fichier MP4
+    filename: str                                           # Nom du fichier présenté à Telegram
+    metadata: Dict[str, Any] = field(default_factory=dict)  # width, height, duration et thumbnail (octets JPEG)
+    path: Optional[str] = None                              # Copie sur disque (écrite éventuellement après l'envoi)
+
+    @cached_property
+    def sha256(self) -> str:
+        """Empreinte du contenu (clé du cache de file_id)"""
+        return hashlib.sha256(self.data).hexdigest()
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def thumbnail_time(duration: float) -> float:
+    """Instant de la vidéo utilisé pour la miniature"""
+    return min(1.0, duration / 2)
+
+
+def probe_video(video_path: str, create_thumbnail: bool = True) -> Dict[str, Any]:
+    """
+    Lit les dimensions et la durée d'une vidéo, et fournit sa miniature
+
+    La miniature écrite au rendu est réutilisée. Sinon elle est générée si
+    create_thumbnail est vrai.
+
+    Args:
+        video_path: Chemin de la vidéo
+        create_thumbnail: Générer la miniature si elle n'existe pas
+
+    Returns:
+        Dict[str, Any]: width, height, duration (secondes) et thumbnail (chemin ou None),
+        ou un dictionnaire vide si la vidéo ne peut pas être lue
+    """
+    try:
+        with VideoFileClip(video_path, audio=False) as clip:
+            width, height = clip.size
+            duration = clip.duration
+
+            thumbnail = thumbnail_path(video_path)
+            if not os.path.exists(thumbnail):
+                if create_thumbnail:
+                    write_thumbnail(clip.get_frame(thumbnail_time(duration)), thumbnail)
+                else:
+                    thumbnail = None
+
+        return {
+            'width': int(width),
+            'height': int(height),
+            'duration': float(duration),
+            'thumbnail': thumbnail
+        }
+    except Exception as e:
+        logging.warning(f"⚠️ Impossible de lire les métadonnées de la vidéo {video_path}: {str(e)}")
+        return {}
+
+
+def max_video_bitrate(max_size_mb: float, duration: float, audio_bitrate_kbps: int = 128) -> Optional[int]:
+    """
+    Débit vidéo maximum (kbit/s) pour que le fichier reste sous une taille donnée
+
+    Une marge de 5 % est gardée pour le conteneur MP4.
+
+    Args:
+        max_size_mb: Taille maximum du fichier en Mo (0: pas de limite)
+        duration: Durée de la vidéo en secondes
+        audio_bitrate_kbps: Débit de la piste audio en kbit/s
+
+    Returns:
+        int: Le débit vidéo en kbit/s, ou None s'il n'y a pas de limite
+    """
+    if not max_size_mb or max_size_mb <= 0 or not duration or duration <= 0:
+        return None
+
+    total_kbps = max_size_mb * 1024 * 1024 * 8 / 1000 / duration * 0.95
+    return max(100, int(total_kbps - audio_bitrate_kbps))
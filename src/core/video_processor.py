@@ -1,5 +1,8 @@
 import os
+import io
+import asyncio
 import logging
+import tempfile
 from pathlib import Path
 import uuid
 from datetime import datetime
@@ -10,6 +13,8 @@ from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 from moviepy.video.VideoClip import ImageClip
 
+from core.video_metadata import max_video_bitrate, write_thumbnail, thumbnail_path, thumbnail_time, RenderedVideo
+
 # Configurer MoviePy pour utiliser ImageMagick
 mpconfig.IMAGEMAGICK_BINARY = 'convert'
 
@@ -61,6 +66,18 @@ class VideoProcessor:
             
         self.text_bg = os.getenv('TEXT_BACKGROUND', 'black')
         
+        # Taille maximum des vidéos exportées (limite de l'API Telegram pour les bots: 50 Mo)
+        try:
+            self.max_video_size_mb = float(os.getenv('MAX_VIDEO_SIZE_MB', '50'))
+        except ValueError:
+            self.max_video_size_mb = 50.0
+        self.audio_bitrate_kbps = 128
+        
+        # Rendu en mémoire: la vidéo est encodée en RAM (tmpfs) et téléversée depuis la mémoire
+        self.in_memory = os.getenv('VIDEO_IN_MEMORY', 'false').strip("'\"").lower() == 'true'
+        self.persist_videos = os.getenv('VIDEO_PERSIST', 'true').strip("'\"").lower() == 'true'
+        self.memory_dir = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
+        
         # Vérifier que le fichier template existe
         if not os.path.exists(self.template_path):
             logging.error(f"❌ Le fichier template n'existe pas: {self.template_path}")
@@ -89,24 +106,7 @@ class VideoProcessor:
             str: Le chemin du fichier vidéo généré
         """
         try:
-            # Charger la vidéo template
-            print(f"🎬 Chargement de la vidéo template: {self.template_path}")
-            video = VideoFileClip(self.template_path)
-            
-            # Vérifier que la vidéo a une durée valide
-            if not hasattr(video, 'duration') or video.duration <= 0:
-                raise ValueError(f"La vidéo n'a pas de durée valide")
-            
-            # Créer le clip de texte
-            print(f"📝 Création du clip de texte avec le texte: \"{text}\"")
-            text_clip = self._create_text_clip(text, video.size)
-            
-            # Superposer le texte sur la vidéo
-            print(f"🔄 Superposition du texte sur la vidéo...")
-            final_clip = CompositeVideoClip([video, text_clip])
-            
-            # Définir explicitement la durée du clip final
-            final_clip = final_clip.set_duration(video.duration)
+            video, text_clip, final_clip = self._compose(text)
             
             # Générer un nom de fichier unique
             output_filename = self._generate_output_filename()
@@ -114,13 +114,13 @@ class VideoProcessor:
             
             # Exporter la vidéo
             print(f"💾 Exportation de la vidéo vers: {output_path}")
-            final_clip.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True
-            )
+            self._export(final_clip, output_path)
+            
+            # Miniature utilisée lors de l'envoi sur Telegram
+            try:
+                write_thumbnail(final_clip.get_frame(thumbnail_time(final_clip.duration)), thumbnail_path(output_path))
+            except Exception as e:
+                print(f"⚠️ Impossible de créer la miniature: {str(e)}")
             
             # Fermer les clips pour libérer les ressources
             video.close()
@@ -133,7 +133,181 @@ class VideoProcessor:
             import traceback
             traceback.print_exc()
             raise Exception(f"Erreur lors de la création du mème: {str(e)}")
+    
+    async def create_meme_in_memory(self, text):
+        """
+        Crée un mème vidéo et le garde en mémoire pour l'envoyer sans passer par le disque
+        
+        ffmpeg a besoin d'un fichier pouvant être relu pour placer l'atome moov en tête:
+        l'encodage se fait donc dans un fichier temporaire en RAM (tmpfs), lu puis supprimé.
+        La copie dans le dossier de sortie est écrite ensuite par persist_video.
+        
+        Args:
+            text (str): Le texte à ajouter sur la vidéo
             
+        Returns:
+            RenderedVideo: La vidéo rendue (contenu, métadonnées et miniature)
+        """
+        try:
+            video, text_clip, final_clip = self._compose(text)
+            
+            output_filename = self._generate_output_filename()
+            temp_path = os.path.join(self.memory_dir, f"{uuid.uuid4().hex}_{output_filename}")
+            
+            print(f"💾 Exportation de la vidéo en mémoire ({self.memory_dir})...")
+            try:
+                self._export(final_clip, temp_path, temp_audiofile=f"{temp_path}.m4a")
+                with open(temp_path, 'rb') as f:
+                    data = f.read()
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            
+            width, height = final_clip.size
+            metadata = {
+                'width': int(width),
+                'height': int(height),
+                'duration': float(final_clip.duration),
+                'thumbnail': None
+            }
+            try:
+                thumbnail = io.BytesIO()
+                write_thumbnail(final_clip.get_frame(thumbnail_time(final_clip.duration)), thumbnail)
+                metadata['thumbnail'] = thumbnail.getvalue()
+            except Exception as e:
+                print(f"⚠️ Impossible de créer la miniature: {str(e)}")
+            
+            video.close()
+            text_clip.close()
+            final_clip.close()
+            
+            print(f"✅ Vidéo rendue en mémoire ({len(data) / (1024*1024):.2f} MB)")
+            return RenderedVideo(
+                data=data,
+                filename=output_filename,
+                metadata=metadata,
+                path=os.path.join(self.output_dir, output_filename) if self.persist_videos else None
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors de la création du mème: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise Exception(f"Erreur lors de la création du mème: {str(e)}")
+    
+    async def persist_video(self, rendered):
+        """
+        Écrit la copie sur disque d'une vidéo rendue en mémoire (et sa miniature)
+        
+        L'écriture se fait dans un thread: elle peut se dérouler pendant l'upload.
+        
+        Args:
+            rendered (RenderedVideo): La vidéo retournée par create_meme_in_memory
+            
+        Returns:
+            str: Le chemin du fichier écrit, ou None si la vidéo n'a pas de copie sur disque
+        """
+        if not rendered.path:
+            return None
+        
+        def write():
+            # Fichier temporaire puis renommage: le chemin n'apparaît qu'une fois complet
+            temp_path = f"{rendered.path}.part"
+            with open(temp_path, 'wb') as f:
+                f.write(rendered.data)
+            os.replace(temp_path, rendered.path)
+            if rendered.metadata.get('thumbnail'):
+                with open(thumbnail_path(rendered.path), 'wb') as f:
+                    f.write(rendered.metadata['thumbnail'])
+        
+        try:
+            await asyncio.to_thread(write)
+            print(f"💾 Copie de la vidéo enregistrée: {rendered.path}")
+            return rendered.path
+        except Exception as e:
+            print(f"⚠️ Impossible d'enregistrer la copie de la vidéo: {str(e)}")
+            return None
+    
+    def _compose(self, text):
+        """
+        Superpose le texte sur la vidéo template
+        
+        Args:
+            text (str): Le texte à ajouter sur la vidéo
+            
+        Returns:
+            tuple: (vidéo template, clip de texte, clip final), à fermer après l'export
+        """
+        # Charger la vidéo template
+        print(f"🎬 Chargement de la vidéo template: {self.template_path}")
+        video = VideoFileClip(self.template_path)
+        
+        # Vérifier que la vidéo a une durée valide
+        if not hasattr(video, 'duration') or video.duration <= 0:
+            raise ValueError(f"La vidéo n'a pas de durée valide")
+        
+        # Créer le clip de texte
+        print(f"📝 Création du clip de texte avec le texte: \"{text}\"")
+        text_clip = self._create_text_clip(text, video.size)
+        
+        # Superposer le texte sur la vidéo
+        print(f"🔄 Superposition du texte sur la vidéo...")
+        final_clip = CompositeVideoClip([video, text_clip])
+        
+        # Définir explicitement la durée du clip final
+        final_clip = final_clip.set_duration(video.duration)
+        return video, text_clip, final_clip
+    
+    def _export(self, clip, output_path, temp_audiofile='temp-audio.m4a'):
+        """
+        Exporte un clip en respectant la taille maximum des vidéos
+        
+        Args:
+            clip: Le clip à exporter
+            output_path (str): Chemin du fichier de sortie
+            temp_audiofile (str, optional): Fichier audio intermédiaire de MoviePy
+        """
+        max_bitrate = max_video_bitrate(self.max_video_size_mb, clip.duration, self.audio_bitrate_kbps)
+        self._write_video(clip, output_path, max_bitrate, temp_audiofile=temp_audiofile)
+        
+        # Si le plafond de débit n'a pas suffi, réencoder à débit constant
+        max_bytes = self.max_video_size_mb * 1024 * 1024
+        if max_bitrate and os.path.getsize(output_path) > max_bytes:
+            print(f"⚠️ Vidéo trop volumineuse ({os.path.getsize(output_path) / (1024*1024):.2f} MB), réencodage à {max_bitrate} kbit/s...")
+            self._write_video(clip, output_path, max_bitrate, strict=True, temp_audiofile=temp_audiofile)
+            
+    def _write_video(self, clip, output_path, max_bitrate=None, strict=False, temp_audiofile='temp-audio.m4a'):
+        """
+        Exporte un clip en MP4 optimisé pour l'envoi
+        
+        L'atome moov est placé en tête du fichier (faststart) pour que la lecture
+        puisse commencer avant la fin du téléchargement.
+        
+        Args:
+            clip: Le clip à exporter
+            output_path (str): Chemin du fichier de sortie
+            max_bitrate (int, optional): Débit vidéo maximum en kbit/s
+            strict (bool, optional): Encoder à débit constant plutôt qu'avec un simple plafond
+            temp_audiofile (str, optional): Fichier audio intermédiaire de MoviePy
+        """
+        ffmpeg_params = ['-movflags', '+faststart']
+        bitrate = None
+        if max_bitrate and strict:
+            bitrate = f"{max_bitrate}k"
+        elif max_bitrate:
+            # Qualité constante, plafonnée pour ne pas dépasser la taille maximum
+            ffmpeg_params += ['-maxrate', f"{max_bitrate}k", '-bufsize', f"{2 * max_bitrate}k"]
+        
+        clip.write_videofile(
+            output_path,
+            codec='libx264',
+            audio_codec='aac',
+            audio_bitrate=f"{self.audio_bitrate_kbps}k",
+            bitrate=bitrate,
+            temp_audiofile=temp_audiofile,
+            remove_temp=True,
+            ffmpeg_params=ffmpeg_params
+        )
+    
     def _create_text_clip(self, text, video_size):
         """
         Crée un clip de texte avec un fond
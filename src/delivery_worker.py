@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import os
+import sys
+import signal
+import asyncio
+import logging
+import argparse
+from dotenv import load_dotenv
+
+from core.delivery_worker import DeliveryWorker
+from models.telegram_outbox import TelegramOutbox
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('delivery_worker')
+
+# Load environment variables
+load_dotenv()
+
+def parse_arguments():
+    """
+    Parse command line arguments
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Worker de livraison des mèmes mis en file pour Telegram")
+    parser.add_argument('--once', action='store_true', help="S'arrêter quand l'outbox est vide")
+    parser.add_argument('--stats', action='store_true', help="Afficher le nombre d'envois par statut et quitter")
+    parser.add_argument('--retry-failed', action='store_true', help='Remettre en attente les envois en échec définitif')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('OUTBOX_BATCH_SIZE', '10')),
+                        help="Nombre d'envois réservés à chaque passe")
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('OUTBOX_POLL_INTERVAL', '5')),
+                        help="Délai en secondes entre deux passes quand l'outbox est vide")
+    return parser.parse_args()
+
+async def main() -> None:
+    """
+    Main function
+    """
+    args = parse_arguments()
+    outbox = TelegramOutbox()
+
+    if args.retry_failed:
+        count = outbox.retry_failed()
+        logger.info(f"🔁 {count} envoi(s) remis en attente")
+
+    if args.stats:
+        stats = outbox.get_stats()
+        logger.info("📊 Outbox Telegram: " + ", ".join(f"{status}={count}" for status, count in stats.items()))
+        return
+
+    worker = DeliveryWorker(
+        outbox=outbox,
+        batch_size=args.batch_size,
+        lease_seconds=float(os.getenv('OUTBOX_LEASE_SECONDS', '300')),
+        poll_interval=args.poll_interval,
+        max_attempts=int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+    )
+
+    # Stop cleanly after the current pass on SIGINT/SIGTERM
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+
+    await worker.run(once=args.once)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("⚠️ Worker interrupted by user")
+        sys.exit(0)
@@ -12,6 +12,7 @@ import argparse
 import random
 
 from core.meme_generator import MemeGenerator
+from core.bulk_job import BulkJob
 
 # Configure logging
 logging.basicConfig(
@@ -105,6 +106,9 @@ async def generate_meme(
                 send_to_telegram=send_to_telegram
             )
         
+        # Let background pool refills finish before the process exits
+        await meme_generator.quality_pipeline.wait_for_refills()
+        
         logger.info(f"✅ Meme generated successfully!")
         logger.info(f"📝 Text: {result['text']}")
         logger.info(f"🎥 Video: {result['video_path']}")
@@ -146,6 +150,43 @@ async def generate_meme(
             "error": str(e)
         }
 
+def load_batch_subjects(json_file_path: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Charge les sujets d'un fichier JSON ({"categorie": ["sujet", ...]})
+    
+    Args:
+        json_file_path: Chemin vers le fichier JSON contenant les sujets
+        limit: Nombre maximum de sujets, tirés au hasard (optionnel)
+        
+    Returns:
+        List[str]: Les sujets (liste vide si le fichier est absent ou vide)
+    """
+    # Vérifier si le fichier existe
+    if not os.path.exists(json_file_path):
+        logging.error(f"❌ Le fichier {json_file_path} n'existe pas.")
+        return []
+    
+    # Charger le fichier JSON
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    # Extraire les sujets
+    subjects = []
+    for key in data:
+        if isinstance(data[key], list):
+            subjects.extend(data[key])
+    
+    if not subjects:
+        logging.error("❌ Aucun sujet trouvé dans le fichier JSON.")
+        return []
+    
+    # Limiter le nombre de sujets si nécessaire
+    if limit and limit > 0:
+        logging.info(f"🎲 Sélection aléatoire de {limit} sujets parmi {len(subjects)} disponibles.")
+        subjects = random.sample(subjects, min(limit, len(subjects)))
+    
+    return subjects
+
 async def generate_batch_memes(
     json_file_path: str, 
     economy_mode: Optional[bool] = None, 
@@ -164,34 +205,24 @@ async def generate_batch_memes(
     Returns:
         List[Dict]: Liste des informations sur les mèmes générés
     """
+    meme_generator = None
     try:
-        # Vérifier si le fichier existe
-        if not os.path.exists(json_file_path):
-            logging.error(f"❌ Le fichier {json_file_path} n'existe pas.")
-            return []
-        
-        # Charger le fichier JSON
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Extraire les sujets
-        subjects = []
-        for key in data:
-            if isinstance(data[key], list):
-                subjects.extend(data[key])
-        
+        subjects = load_batch_subjects(json_file_path, limit)
         if not subjects:
-            logging.error("❌ Aucun sujet trouvé dans le fichier JSON.")
             return []
         
-        # Limiter le nombre de sujets si nécessaire
-        if limit and limit > 0:
-            logging.info(f"🎲 Sélection aléatoire de {limit} sujets parmi {len(subjects)} disponibles.")
-            subjects = random.sample(subjects, min(limit, len(subjects)))
-        
         # Initialiser le générateur de mèmes
         meme_generator = MemeGenerator()
         
+        # Générer les candidates de plusieurs sujets par requête (GENERATION_BATCH_SIZE)
+        pipeline = meme_generator.quality_pipeline
+        if meme_generator.use_quality_pipeline and pipeline.generation_batch_size > 1:
+            logging.info(f"📦 Génération des candidates par lots de {pipeline.generation_batch_size} sujets...")
+            await pipeline.prefetch_candidates(subjects, economy_mode=economy_mode)
+        
+        # En mode album, les vidéos sont envoyées ensemble à la fin du lot
+        send_as_album = meme_generator.sends_batch_as_album(send_to_telegram)
+        
         # Générer les mèmes
         results = []
         for subject in subjects:
@@ -200,7 +231,7 @@ async def generate_batch_memes(
             result = await meme_generator.generate_meme(
                 subject=subject,
                 economy_mode=economy_mode,
-                send_to_telegram=send_to_telegram
+                send_to_telegram=False if send_as_album else send_to_telegram
             )
             
             results.append(result)
@@ -234,6 +265,12 @@ async def generate_batch_memes(
                 print("-"*80)
                 print("\n")
         
+        if send_as_album and results:
+            await meme_generator.send_batch_albums(results)
+        
+        # Laisser se terminer les remplissages de la réserve en cours
+        await meme_generator.quality_pipeline.wait_for_refills()
+        
         # Enregistrer un rapport de génération
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_dir = os.path.join(os.environ.get('OUTPUT_DIRECTORY', 'output'), 'reports')
@@ -251,6 +288,77 @@ async def generate_batch_memes(
     except Exception as e:
         logging.error(f"❌ Erreur lors de la génération par lots: {str(e)}")
         return []
+    finally:
+        # Les candidates générées en lot ne servent qu'à ce lot
+        if meme_generator and meme_generator.use_quality_pipeline:
+            meme_generator.quality_pipeline.clear_prefetched()
+
+async def run_bulk_job(
+    job_dir: str,
+    json_file_path: Optional[str] = None,
+    economy_mode: Optional[bool] = None,
+    limit: Optional[int] = None,
+    send_to_telegram: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Génération hors ligne par fichiers de traitement par lots (voir core/bulk_job.py)
+    
+    Au premier appel, écrit les requêtes de génération des sujets du fichier JSON.
+    Aux appels suivants, intègre les fichiers de résultats déposés dans job_dir,
+    écrit les requêtes de l'étape suivante, puis rend et envoie les mèmes des
+    punchlines retenues une fois le travail terminé.
+    
+    Args:
+        job_dir: Répertoire du travail
+        json_file_path: Chemin vers le fichier JSON contenant les sujets (création du travail)
+        economy_mode: Utiliser le mode économie de tokens (optionnel)
+        limit: Nombre maximum de sujets (optionnel)
+        send_to_telegram: Envoyer les mèmes sur Telegram (optionnel)
+        
+    Returns:
+        List[Dict]: Liste des informations sur les mèmes générés (vide tant que le travail attend des résultats)
+    """
+    try:
+        meme_generator = MemeGenerator()
+        job = BulkJob(job_dir, meme_generator.quality_pipeline)
+        
+        if not job.exists():
+            subjects = load_batch_subjects(json_file_path, limit) if json_file_path else []
+            if not subjects:
+                logging.error("❌ Aucun sujet pour créer le travail hors ligne (option -b).")
+                return []
+            path = job.prepare(subjects, economy_mode=economy_mode)
+            logging.info(f"📤 Soumettez {path} au fournisseur, puis déposez le fichier de résultats dans {job.results_path('generation')}")
+            return []
+        
+        if await job.advance() is None:
+            if job.stage == 'evaluation':
+                logging.info(f"📤 Soumettez {job.requests_path('evaluation')} au fournisseur, puis déposez le fichier de résultats dans {job.results_path('evaluation')}")
+            return []
+        
+        # Rendre et envoyer les mèmes des punchlines retenues
+        results = []
+        for selection in job.pending_renders():
+            logging.info(f"🎯 Rendu du mème sur le sujet: {selection['subject']}")
+            result = await meme_generator.generate_meme(
+                custom_text=selection['text'],
+                subject=selection['subject'],
+                economy_mode=economy_mode,
+                send_to_telegram=send_to_telegram
+            )
+            result["quality_evaluation"] = {
+                "overall_score": selection["overall_score"],
+                "criteria_scores": selection["evaluation"]
+            }
+            job.mark_rendered(selection['subject'])
+            results.append(result)
+        
+        logging.info(f"✅ {len(results)} mèmes générés à partir du travail hors ligne {job_dir}")
+        return results
+    
+    except Exception as e:
+        logging.error(f"❌ Erreur lors de la génération hors ligne: {str(e)}")
+        return []
 
 def set_economy_mode_in_env(value: bool) -> None:
     """
@@ -293,11 +401,12 @@ def parse_arguments() -> Dict[str, Any]:
     parser.add_argument('-e', '--economy', action='store_true', help='Activer le mode économie de tokens (GPT-3.5 au lieu de GPT-4)')
     parser.add_argument('--telegram', action='store_true', help='Envoyer le mème sur Telegram')
     parser.add_argument('-l', '--limit', type=int, help='Limiter le nombre de mèmes générés en mode batch')
+    parser.add_argument('--bulk', type=str, help='Répertoire d\'un travail hors ligne par fichiers de traitement par lots (créé avec -b, repris ensuite)')
     
     args = parser.parse_args()
     
-    # Vérifier si aucune option n'est spécifiée
-    if not args.text and not args.subject and not args.batch:
+    # Vérifier si aucune option n'est spécifiée (un travail hors ligne existant n'a pas besoin de sujets)
+    if not args.text and not args.subject and not args.batch and not args.bulk:
         # Utiliser le fichier JSON par défaut
         default_json = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'json.json')
         if os.path.exists(default_json):
@@ -315,7 +424,8 @@ def parse_arguments() -> Dict[str, Any]:
         'batch_file': args.batch,
         'economy_mode': args.economy,
         'send_to_telegram': args.telegram,
-        'limit': args.limit
+        'limit': args.limit,
+        'bulk_dir': args.bulk
     }
 
 async def main() -> None:
@@ -338,7 +448,18 @@ async def main() -> None:
             set_telegram_auto_send_in_env(args['send_to_telegram'])
         
         # Generate meme based on arguments
-        if args['batch_file']:
+        if args['bulk_dir']:
+            # Offline bulk generation through provider batch files
+            logger.info(f"📦 Travail hors ligne: {args['bulk_dir']}")
+            results = await run_bulk_job(
+                args['bulk_dir'],
+                args['batch_file'],
+                economy_mode=args['economy_mode'],
+                limit=args['limit'],
+                send_to_telegram=args['send_to_telegram']
+            )
+            
+        elif args['batch_file']:
             # Batch generation from JSON file
             logger.info(f"📦 Génération par lots à partir du fichier: {args['batch_file']}")
             results = await generate_batch_memes(
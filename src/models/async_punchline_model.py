@@ -0,0 +1,273 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import aiosqlite
+
+CRITERIA = ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']
+
+
+class AsyncPunchlineModel:
+    """
+    Variante asynchrone (aiosqlite) du modèle des punchlines.
+
+    Les requêtes sont exécutées dans le thread de la connexion aiosqlite: la boucle
+    d'événements n'est jamais bloquée par les entrées/sorties de la base de données,
+    ce qui permet de traiter plusieurs sujets en parallèle.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialise le modèle avec le chemin de la base de données.
+
+        La connexion est ouverte au premier appel.
+
+        Args:
+            db_path: Chemin vers la base de données SQLite (par défaut: data/quality_data.db)
+        """
+        if not db_path:
+            db_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                'data',
+                'quality_data.db'
+            )
+
+        self.db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _connection(self) -> aiosqlite.Connection:
+        """
+        Retourne la connexion partagée, en l'ouvrant et en initialisant le schéma si nécessaire.
+        """
+        if self._conn is not None:
+            return self._conn
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+                conn = aiosqlite.connect(self.db_path, timeout=30)
+                # Le thread de la connexion ne doit pas empêcher l'arrêt du programme
+                conn.daemon = True
+                conn = await conn
+
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS punchlines (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    evaluation TEXT,
+                    overall_score REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    selected INTEGER DEFAULT 0
+                )
+                ''')
+                await conn.commit()
+                self._conn = conn
+
+        return self._conn
+
+    async def close(self):
+        """
+        Ferme la connexion à la base de données.
+        """
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def store_evaluation(
+        self,
+        punchline: str,
+        subject: str,
+        evaluation: Dict[str, float],
+        overall_score: float
+    ):
+        """
+        Stocke l'évaluation d'une punchline dans la base de données.
+
+        Args:
+            punchline: La punchline évaluée
+            subject: Le sujet de la punchline
+            evaluation: Les scores d'évaluation
+            overall_score: Le score global
+        """
+        try:
+            conn = await self._connection()
+
+            await conn.execute('''
+            INSERT INTO punchlines (
+                text, subject, evaluation, overall_score, created_at, selected
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                punchline,
+                subject,
+                json.dumps(evaluation),
+                overall_score,
+                datetime.now().isoformat(),
+                0  # Non sélectionnée par défaut
+            ))
+            await conn.commit()
+
+        except Exception as e:
+            logging.error(f"❌ Erreur lors du stockage de l'évaluation: {str(e)}")
+
+    async def mark_as_selected(self, punchline: str):
+        """
+        Marque une punchline comme sélectionnée dans la base de données.
+
+        Args:
+            punchline: La punchline à marquer comme sélectionnée
+        """
+        try:
+            conn = await self._connection()
+
+            await conn.execute('''
+            UPDATE punchlines SET selected = 1 WHERE text = ?
+            ''', (punchline,))
+            await conn.commit()
+
+        except Exception as e:
+            logging.error(f"❌ Erreur lors du marquage de la punchline comme sélectionnée: {str(e)}")
+
+    async def get_evaluation_stats(self) -> Dict[str, Any]:
+        """
+        Récupère des statistiques sur les punchlines évaluées.
+
+        Le format est celui de PunchlineModel.get_evaluation_stats, complété par
+        le score moyen des punchlines sélectionnées (avg_selected_score).
+
+        Returns:
+            Dict[str, Any]: Statistiques sur les punchlines
+        """
+        try:
+            conn = await self._connection()
+
+            criteria_avgs = ", ".join(f"AVG(json_extract(evaluation, '$.{c}'))" for c in CRITERIA)
+            async with conn.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM(selected = 1), 0), AVG(overall_score),
+                   AVG(CASE WHEN selected = 1 THEN overall_score END), {criteria_avgs}
+            FROM punchlines
+            ''') as cursor:
+                row = await cursor.fetchone()
+
+            async with conn.execute(
+                "SELECT subject, COUNT(*) FROM punchlines GROUP BY subject ORDER BY COUNT(*) DESC LIMIT 5"
+            ) as cursor:
+                top_subjects = [tuple(r) for r in await cursor.fetchall()]
+
+            total_punchlines, selected_punchlines, avg_score = row[0], row[1], row[2] or 0
+
+            return {
+                'total_punchlines': total_punchlines,
+                'selected_punchlines': selected_punchlines,
+                'selection_rate': selected_punchlines / total_punchlines if total_punchlines > 0 else 0,
+                'avg_score': avg_score,
+                'top_subjects': top_subjects,
+                'avg_selected_score': row[3] or 0,
+                'criteria_scores': {c: (row[4 + i] or 0) for i, c in enumerate(CRITERIA)}
+            }
+
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la récupération des statistiques: {str(e)}")
+            return {
+                'total_punchlines': 0,
+                'selected_punchlines': 0,
+                'selection_rate': 0,
+                'avg_score': 0,
+                'avg_selected_score': 0,
+                'top_subjects': [],
+                'criteria_scores': {c: 0 for c in CRITERIA}
+            }
+
+    async def get_history(
+        self,
+        subject: Optional[str] = None,
+        limit: int = 20,
+        selected_only: bool = False,
+        min_score: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Récupère l'historique des punchlines, de la plus récente à la plus ancienne.
+
+        Args:
+            subject: Filtrer sur un sujet (optionnel)
+            limit: Nombre maximum de punchlines retournées
+            selected_only: Ne retourner que les punchlines sélectionnées
+            min_score: Score global minimum (optionnel)
+
+        Returns:
+            List[Dict[str, Any]]: Les punchlines avec leurs évaluations
+        """
+        conditions = []
+        params: List[Any] = []
+        if subject is not None:
+            conditions.append("subject = ?")
+            params.append(subject)
+        if selected_only:
+            conditions.append("selected = 1")
+        if min_score is not None:
+            conditions.append("overall_score >= ?")
+            params.append(min_score)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+
+        try:
+            conn = await self._connection()
+
+            async with conn.execute(f'''
+            SELECT id, text, subject, evaluation, overall_score, created_at, selected
+            FROM punchlines
+            {where}
+            ORDER BY id DESC
+            LIMIT ?
+            ''', params) as cursor:
+                rows = await cursor.fetchall()
+
+            return [
+                {
+                    'id': row[0],
+                    'text': row[1],
+                    'subject': row[2],
+                    'evaluation': json.loads(row[3]) if row[3] else {},
+                    'overall_score': row[4],
+                    'created_at': row[5],
+                    'selected': bool(row[6])
+                }
+                for row in rows
+            ]
+
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la récupération de l'historique: {str(e)}")
+            return []
+
+    async def punchline_exists(self, punchline: str, subject: Optional[str] = None) -> bool:
+        """
+        Indique si une punchline identique a déjà été stockée.
+
+        Args:
+            punchline: Le texte de la punchline
+            subject: Restreindre la recherche à un sujet (optionnel)
+
+        Returns:
+            bool: True si la punchline existe déjà
+        """
+        query = "SELECT 1 FROM punchlines WHERE text = ?"
+        params: List[Any] = [punchline]
+        if subject is not None:
+            query += " AND subject = ?"
+            params.append(subject)
+
+        try:
+            conn = await self._connection()
+            async with conn.execute(query + " LIMIT 1", params) as cursor:
+                return await cursor.fetchone() is not None
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la recherche de la punchline: {str(e)}")
+            return False
@@ -0,0 +1,353 @@
+import os
+import time
+import sqlite3
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from models.punchline_search import tokenize
+
+
+class PunchlineMinHashIndex:
+    """
+    Index MinHash/LSH de l'historique des punchlines, pour repérer les quasi-doublons.
+
+    Chaque punchline est réduite à une signature MinHash de ses n-grammes de
+    caractères (num_perm valeurs), découpée en bandes. Deux punchlines qui
+    partagent une bande sont candidates, et leur similarité de Jaccard est estimée
+    par la part de valeurs communes de leurs signatures. Les clés des bandes sont
+    triées pour des recherches dichotomiques; les lignes ajoutées depuis le dernier
+    tri sont comparées directement, puis fusionnées au-delà de merge_threshold.
+
+    Les lignes sont stockées dans des tableaux dont la capacité double quand ils
+    sont pleins: un ajout ne recopie pas l'index. La fusion ne trie que les lignes
+    en attente et les insère dans les clés déjà triées de chaque bande.
+    """
+
+    def __init__(self, db_path: str = None, index_path: str = None, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 5, seed: int = 1, merge_threshold: int = 4096):
+        """
+        Initialise l'index (vide, voir load() et build()).
+
+        Args:
+            db_path: Chemin vers la base de données SQLite (par défaut: data/quality_data.db)
+            index_path: Chemin du fichier de l'index (par défaut: data/punchlines_minhash.npz)
+            num_perm: Nombre de fonctions de hachage de la signature
+            bands: Nombre de bandes LSH (num_perm doit en être un multiple)
+            shingle_size: Taille des n-grammes de caractères
+            seed: Graine des fonctions de hachage (doit rester la même pour un index enregistré)
+            merge_threshold: Nombre de lignes non triées au-delà duquel elles sont fusionnées dans les bandes triées
+        """
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+        self.db_path = db_path or os.path.join(data_dir, 'quality_data.db')
+        self.index_path = index_path or os.path.join(data_dir, 'punchlines_minhash.npz')
+
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) doit être un multiple de bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.merge_threshold = merge_threshold
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._band_multipliers = rng.integers(1, 2 ** 63, self.rows_per_band, dtype=np.uint64) | np.uint64(1)
+
+        self._reset()
+
+    def _reset(self, capacity: int = 1024):
+        # Tableaux à capacité doublée, dont les _size premières lignes sont occupées
+        self._size = 0
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._signatures = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+        self._keys = np.zeros((capacity, self.bands), dtype=np.uint32)
+        # Clés triées par bande et position de la ligne correspondante
+        self._sorted_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+        self._sorted_rows = np.zeros((self.bands, 0), dtype=np.int32)
+        self._sorted_count = 0
+        self.last_id = 0
+        self.dirty = False
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    @property
+    def signatures(self) -> np.ndarray:
+        return self._signatures[:self._size]
+
+    @property
+    def band_keys(self) -> np.ndarray:
+        return self._keys[:self._size]
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Empreintes (64 bits) des n-grammes de caractères du texte normalisé"""
+        codes = np.frombuffer(' '.join(tokenize(text or '')).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        n = min(self.shingle_size, len(codes))
+        if n == 0:
+            return np.zeros(1, dtype=np.uint64)
+        count = len(codes) - n + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for k in range(n):
+            hashes = hashes * np.uint64(1000003) + codes[k:k + count]
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Signature MinHash (num_perm valeurs de 32 bits) d'un texte"""
+        # Hachage multiplicatif: (a * x + b) mod 2^64, 32 bits de poids fort
+        hashed = (self.shingles(text)[:, None] * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def signatures_batch(self, texts: List[str]) -> np.ndarray:
+        """Signatures MinHash d'un lot de textes (calcul vectorisé par blocs)"""
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        chunk = 2048
+        for start in range(0, len(texts), chunk):
+            shingles = [self.shingles(text) for text in texts[start:start + chunk]]
+            offsets = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+            hashed = (np.concatenate(shingles)[:, None] * self._a + self._b) >> np.uint64(32)
+            signatures[start:start + len(shingles)] = np.minimum.reduceat(hashed, offsets, axis=0)
+        return signatures
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Clé (32 bits) de chaque bande des signatures (lignes x bandes)"""
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows_per_band)
+        return ((banded * self._band_multipliers).sum(axis=2) >> np.uint64(32)).astype(np.uint32)
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+
+    def add(self, rows: List[Tuple[int, str]]):
+        """
+        Ajoute des punchlines à l'index
+
+        Args:
+            rows: Liste de (id, texte)
+        """
+        if not rows:
+            return
+        signatures = self.signatures_batch([text for _, text in rows])
+        self._append(np.array([row_id for row_id, _ in rows], dtype=np.int64), signatures)
+        self.dirty = True
+
+        if self._size - self._sorted_count > self.merge_threshold:
+            self._merge_pending()
+
+    def _append(self, ids: np.ndarray, signatures: np.ndarray):
+        """Ajoute des lignes aux tableaux, en doublant leur capacité si nécessaire"""
+        end = self._size + len(ids)
+        if end > len(self._ids):
+            capacity = max(end, 2 * len(self._ids))
+            for name in ('_ids', '_signatures', '_keys'):
+                old = getattr(self, name)
+                grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:self._size] = old[:self._size]
+                setattr(self, name, grown)
+
+        self._ids[self._size:end] = ids
+        self._signatures[self._size:end] = signatures
+        self._keys[self._size:end] = self._band_keys(signatures)
+        self._size = end
+        self.last_id = max(self.last_id, int(ids.max()))
+
+    def _merge_pending(self):
+        """Insère les lignes ajoutées depuis la dernière fusion dans les clés triées de chaque bande"""
+        start = self._sorted_count
+        if start >= self._size:
+            return
+        pending = np.ascontiguousarray(self._keys[start:self._size].T)
+        order = np.argsort(pending, axis=1, kind='stable')
+        pending_keys = np.take_along_axis(pending, order, axis=1)
+        pending_rows = (order + start).astype(np.int32)
+
+        sorted_keys = np.empty((self.bands, self._size), dtype=np.uint32)
+        sorted_rows = np.empty((self.bands, self._size), dtype=np.int32)
+        for band in range(self.bands):
+            # Les lignes en attente se placent après les clés égales déjà triées (ordre stable)
+            positions = np.searchsorted(self._sorted_keys[band], pending_keys[band], side='right')
+            sorted_keys[band] = np.insert(self._sorted_keys[band], positions, pending_keys[band])
+            sorted_rows[band] = np.insert(self._sorted_rows[band], positions, pending_rows[band])
+        self._sorted_keys, self._sorted_rows = sorted_keys, sorted_rows
+        self._sorted_count = self._size
+
+    def refresh(self, batch_size: int = 10000) -> int:
+        """
+        Indexe les punchlines ajoutées à la base depuis la dernière mise à jour
+
+        Returns:
+            int: Nombre de punchlines ajoutées
+        """
+        if not os.path.exists(self.db_path):
+            return 0
+
+        new_rows = []
+        last_id = self.last_id
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT id, text FROM punchlines WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                new_rows.extend(rows)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+        # Un seul ajout: les tableaux de l'index ne sont recopiés qu'une fois
+        self.add(new_rows)
+        return len(new_rows)
+
+    def build(self) -> int:
+        """
+        Reconstruit entièrement l'index à partir de la table punchlines
+
+        Returns:
+            int: Nombre de punchlines indexées
+        """
+        self._reset()
+        self.refresh()
+        self._merge_pending()
+        return len(self)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def query(self, text: str, threshold: float = 0.7, limit: int = 5,
+              signature: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Punchlines de l'index dont la similarité de Jaccard estimée atteint le seuil
+
+        Args:
+            text: Le texte recherché
+            threshold: Similarité minimum (entre 0 et 1)
+            limit: Nombre maximum de résultats
+            signature: Signature déjà calculée du texte (optionnel)
+
+        Returns:
+            List[Tuple[int, float]]: (id, similarité), de la plus proche à la moins proche
+        """
+        if not self._size:
+            return []
+        if signature is None:
+            signature = self.signature(text)
+        keys = self._band_keys(signature[None, :])[0]
+
+        candidates = []
+        for band in range(self.bands):
+            sorted_keys = self._sorted_keys[band]
+            low = np.searchsorted(sorted_keys, keys[band], side='left')
+            high = np.searchsorted(sorted_keys, keys[band], side='right')
+            if high > low:
+                candidates.append(self._sorted_rows[band, low:high])
+
+        # Lignes ajoutées depuis le dernier tri
+        if self._sorted_count < self._size:
+            pending = np.nonzero((self.band_keys[self._sorted_count:] == keys).any(axis=1))[0]
+            candidates.append((pending + self._sorted_count).astype(np.int32))
+
+        if not candidates:
+            return []
+        rows = np.unique(np.concatenate(candidates))
+        similarities = (self.signatures[rows] == signature).mean(axis=1)
+        matches = similarities >= threshold
+        rows, similarities = rows[matches], similarities[matches]
+        best = np.argsort(-similarities, kind='stable')[:limit]
+        return [(int(self.ids[rows[i]]), float(similarities[i])) for i in best]
+
+    def texts(self, ids: List[int]) -> Dict[int, str]:
+        """Textes des punchlines d'après leurs ids (pour l'affichage des doublons)"""
+        if not ids:
+            return {}
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            placeholders = ','.join('?' * len(ids))
+            rows = conn.execute(f"SELECT id, text FROM punchlines WHERE id IN ({placeholders})", list(ids)).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """Enregistre l'index (écriture dans un fichier temporaire puis remplacement)"""
+        self._merge_pending()
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        temp_path = self.index_path + '.part'
+        with open(temp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=self.ids,
+                signatures=self.signatures,
+                sorted_keys=self._sorted_keys,
+                sorted_rows=self._sorted_rows,
+                last_id=self.last_id,
+                params=np.array([self.num_perm, self.bands, self.shingle_size, self.seed])
+            )
+        os.replace(temp_path, self.index_path)
+        self.dirty = False
+
+    def load(self) -> bool:
+        """
+        Charge l'index enregistré s'il existe et correspond aux paramètres
+
+        Returns:
+            bool: True si l'index a été chargé
+        """
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with np.load(self.index_path) as data:
+                params = [int(p) for p in data['params']]
+                if params != [self.num_perm, self.bands, self.shingle_size, self.seed]:
+                    logging.warning(f"⚠️ Index des quasi-doublons créé avec d'autres paramètres: {self.index_path}")
+                    return False
+                ids = data['ids']
+                self._reset(capacity=max(1024, 2 * len(ids)))
+                if len(ids):
+                    self._append(ids, data['signatures'])
+                self._sorted_keys = data['sorted_keys']
+                self._sorted_rows = data['sorted_rows']
+                self._sorted_count = self._size
+                self.last_id = int(data['last_id'])
+            self.dirty = False
+            return True
+        except Exception as e:
+            logging.warning(f"⚠️ Index des quasi-doublons illisible ({self.index_path}): {str(e)}")
+            self._reset()
+            return False
+
+    def open(self) -> int:
+        """
+        Charge l'index enregistré (ou le construit) puis indexe les nouvelles punchlines
+
+        Returns:
+            int: Nombre de punchlines indexées
+        """
+        start = time.time()
+        if self.load():
+            added = self.refresh()
+            logging.info(f"✅ Index des quasi-doublons chargé: {len(self)} punchlines ({added} nouvelle(s))")
+        else:
+            self.build()
+            logging.info(f"✅ Index des quasi-doublons construit: {len(self)} punchlines en {time.time() - start:.1f}s")
+        if self.dirty:
+            self.save()
+        return len(self)
@@ -5,6 +5,9 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+from models.punchline_search import PunchlineSearch
+from models.punchline_scores import ensure_score_index
+
 class PunchlineModel:
     """
     Modèle pour gérer les punchlines et leurs évaluations dans la base de données.
@@ -54,6 +57,13 @@ class PunchlineModel:
             ''')
         
         conn.commit()
+        
+        # Index plein texte tenu à jour par triggers
+        PunchlineSearch(self.db_path).ensure_index(conn)
+        
+        # Scores de chaque critère indexés pour les statistiques
+        ensure_score_index(conn, self.db_path)
+        
         conn.close()
     
     def store_evaluation(
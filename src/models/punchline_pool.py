@@ -0,0 +1,187 @@
+import os
+import json
+import sqlite3
+import logging
+from typing import Dict, List, Any, Optional
+
+
+def load_subjects(paths: List[str]) -> List[str]:
+    """
+    Charge les sujets connus depuis des fichiers JSON ({"categorie": ["sujet", ...]})
+
+    Args:
+        paths: Chemins des fichiers de sujets (les fichiers absents sont ignorés)
+
+    Returns:
+        Liste des sujets, sans doublons
+    """
+    subjects = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for values in data.values():
+                if isinstance(values, list):
+                    subjects.extend(s for s in values if isinstance(s, str))
+        except Exception as e:
+            logging.warning(f"⚠️ Fichier de sujets illisible ({path}): {str(e)}")
+    return list(dict.fromkeys(subjects))
+
+
+class PunchlinePool:
+    """
+    Réserve de punchlines déjà évaluées, au-dessus du seuil et jamais utilisées, par sujet.
+
+    La réserve est une table de la base de qualité: elle est partagée entre le
+    processus qui la remplit et ceux qui y puisent. Une punchline est retirée par
+    une seule requête DELETE ... RETURNING, ce qui garantit qu'elle n'est servie
+    qu'une fois même si plusieurs processus puisent en même temps.
+
+    Les punchlines déjà sélectionnées (table punchlines, selected = 1) ne sont pas
+    ajoutées, et celles sélectionnées depuis leur ajout sont écartées au moment d'y
+    puiser.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Args:
+            db_path: Chemin vers la base de données SQLite (par défaut: data/quality_data.db)
+        """
+        if not db_path:
+            db_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                'data',
+                'quality_data.db'
+            )
+        self.db_path = db_path
+        self.ensure_table()
+
+    # Condition "la punchline de la réserve n'a pas déjà été sélectionnée"
+    NOT_SELECTED = "NOT EXISTS (SELECT 1 FROM punchlines h WHERE h.text = punchline_pool.text AND h.selected = 1)"
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_table(self):
+        """Crée la table de la réserve et son index si nécessaire (et l'index des punchlines sélectionnées)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript('''
+            CREATE TABLE IF NOT EXISTS punchline_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subject TEXT NOT NULL,
+                text TEXT NOT NULL,
+                evaluation TEXT,
+                overall_score REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (subject, text)
+            );
+            CREATE INDEX IF NOT EXISTS idx_punchline_pool_subject ON punchline_pool (subject, overall_score);
+            ''')
+            # Historique des punchlines (créé par la pipeline de qualité): index partiel des sélectionnées
+            self.has_history = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'punchlines'"
+            ).fetchone() is not None
+            if self.has_history:
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_punchlines_selected_text ON punchlines (text) WHERE selected = 1")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _not_selected(self) -> str:
+        return self.NOT_SELECTED if self.has_history else "1"
+
+    def add(self, subject: str, punchlines: List[Dict[str, Any]]) -> int:
+        """
+        Ajoute des punchlines évaluées à la réserve d'un sujet
+
+        Args:
+            subject: Le sujet
+            punchlines: Punchlines évaluées (text, evaluation, overall_score)
+
+        Returns:
+            int: Nombre de punchlines ajoutées (les doublons et les punchlines déjà sélectionnées sont ignorés)
+        """
+        if not punchlines:
+            return 0
+        query = "INSERT OR IGNORE INTO punchline_pool (subject, text, evaluation, overall_score) VALUES (?, ?, ?, ?)"
+        rows = [(subject, p["text"], json.dumps(p.get("evaluation")), p["overall_score"]) for p in punchlines]
+        if self.has_history:
+            query = """INSERT OR IGNORE INTO punchline_pool (subject, text, evaluation, overall_score)
+                SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM punchlines WHERE text = ? AND selected = 1)"""
+            rows = [row + (row[1],) for row in rows]
+
+        conn = self._connect()
+        try:
+            cursor = conn.executemany(query, rows)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def pop(self, subject: str, min_score: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        Retire et retourne la meilleure punchline de la réserve d'un sujet
+
+        Les punchlines du sujet sélectionnées depuis leur ajout sont d'abord supprimées.
+
+        Args:
+            subject: Le sujet
+            min_score: Score global minimum exigé
+
+        Returns:
+            La punchline (text, subject, evaluation, overall_score), ou None si la réserve est vide
+        """
+        conn = self._connect()
+        try:
+            if self.has_history:
+                conn.execute(f"DELETE FROM punchline_pool WHERE subject = ? AND NOT {self.NOT_SELECTED}", (subject,))
+            row = conn.execute(f'''
+            DELETE FROM punchline_pool WHERE id = (
+                SELECT id FROM punchline_pool
+                WHERE subject = ? AND overall_score >= ? AND {self._not_selected()}
+                ORDER BY overall_score DESC, id
+                LIMIT 1
+            )
+            RETURNING text, evaluation, overall_score
+            ''', (subject, min_score)).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return {
+            "text": row[0],
+            "subject": subject,
+            "evaluation": json.loads(row[1]) if row[1] else {},
+            "overall_score": row[2]
+        }
+
+    def sizes(self, subjects: Optional[List[str]] = None, min_score: float = 0.0) -> Dict[str, int]:
+        """
+        Nombre de punchlines en réserve par sujet
+
+        Args:
+            subjects: Sujets à compter (par défaut: tous ceux présents dans la réserve)
+            min_score: Score global minimum pris en compte
+
+        Returns:
+            Dict[str, int]: Taille de la réserve de chaque sujet
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT subject, COUNT(*) FROM punchline_pool WHERE overall_score >= ? AND {self._not_selected()} GROUP BY subject",
+                (min_score,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        counts = dict(rows)
+        if subjects is None:
+            return counts
+        return {subject: counts.get(subject, 0) for subject in subjects}
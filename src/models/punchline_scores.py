@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import logging
+from typing import Dict, Optional, Set
+
+# Critères d'évaluation actuels (stockés dans la colonne JSON `evaluation`)
+CRITERIA = ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']
+
+# Colonne générée (virtuelle) de chaque critère: le score lu dans le JSON, NULL si
+# l'évaluation est mal formée ou le critère absent
+SCORE_COLUMNS: Dict[str, str] = {criterion: f"score_{criterion}" for criterion in CRITERIA}
+
+# Bases dont les colonnes de scores ont déjà été vérifiées par ce processus (chemins absolus)
+_indexed_databases: Set[str] = set()
+
+
+def score_expression(criterion: str) -> str:
+    """
+    Expression SQL du score d'un critère, lu dans l'évaluation JSON
+
+    json_valid protège json_extract, qui échoue sur une évaluation mal formée.
+
+    Args:
+        criterion: Nom du critère
+
+    Returns:
+        L'expression SQL (REAL ou NULL)
+    """
+    return f"CAST(CASE WHEN json_valid(evaluation) THEN json_extract(evaluation, '$.{criterion}') END AS REAL)"
+
+
+def ensure_score_index(conn: sqlite3.Connection, db_path: Optional[str] = None) -> bool:
+    """
+    Ajoute à la table punchlines une colonne générée par critère et les index des scores
+
+    Les colonnes sont virtuelles: seuls les index stockent les scores extraits du JSON,
+    tenus à jour par SQLite à chaque écriture. Les statistiques (utils/punchlines_stats)
+    lisent alors les scores dans les index, sans analyser le JSON de chaque ligne.
+    La création des index sur une base existante est faite une seule fois.
+
+    Args:
+        conn: Connexion à la base de données
+        db_path: Chemin de la base (pour ne vérifier qu'une fois par processus)
+
+    Returns:
+        bool: True si les colonnes et les index sont disponibles
+    """
+    database = os.path.abspath(db_path) if db_path else None
+    if database in _indexed_databases:
+        return True
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_xinfo(punchlines)")
+        columns = {col[1] for col in cursor.fetchall()}
+        if 'evaluation' not in columns:
+            return False
+
+        missing = [c for c in CRITERIA if SCORE_COLUMNS[c] not in columns]
+        if missing:
+            cursor.execute("SELECT COUNT(*) FROM punchlines")
+            logging.info(f"⏳ Indexation des scores de {cursor.fetchone()[0]} punchline(s) (une seule fois)...")
+        for criterion in missing:
+            cursor.execute(
+                f"ALTER TABLE punchlines ADD COLUMN {SCORE_COLUMNS[criterion]} REAL "
+                f"GENERATED ALWAYS AS ({score_expression(criterion)}) VIRTUAL"
+            )
+
+        for column in ['overall_score'] + list(SCORE_COLUMNS.values()):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_punchlines_{column} ON punchlines ({column})")
+        conn.commit()
+
+        if missing:
+            logging.info("✅ Scores des punchlines indexés")
+        if database:
+            _indexed_databases.add(database)
+        return True
+
+    except sqlite3.OperationalError as e:
+        # SQLite sans colonnes générées (< 3.31) ou sans JSON
+        logging.warning(f"⚠️ Index des scores indisponible: {str(e)}")
+        conn.rollback()
+        return False
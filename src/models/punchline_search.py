@@ -0,0 +1,281 @@
+import os
+import re
+import sqlite3
+import logging
+import unicodedata
+from typing import Dict, List, Any, Optional, Set
+
+# Mots trop fréquents pour caractériser une punchline (structure imposée "Quand X, mais Y")
+STOPWORDS = {
+    'quand', 'mais', 'les', 'des', 'une', 'un', 'le', 'la', 'de', 'du', 'et', 'en', 'que', 'qui',
+    'ils', 'elles', 'il', 'elle', 'leur', 'leurs', 'son', 'sa', 'ses', 'pour', 'par', 'sur', 'dans',
+    'avec', 'pas', 'plus', 'est', 'sont', 'ont', 'font', 'fait', 'tout', 'tous', 'comme', 'au', 'aux',
+    'ce', 'ces', 'se', 'ne', 'on', 'tu', 'te', 'ton', 'tes', 'vous', 'nous'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Découpe un texte en mots normalisés (minuscules, sans accents)
+
+    Args:
+        text: Le texte à découper
+
+    Returns:
+        Liste des mots
+    """
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    return re.findall(r'\w+', normalized)
+
+
+def significant_terms(text: str) -> Set[str]:
+    """
+    Mots caractéristiques d'un texte (sans mots vides ni mots de moins de 3 lettres)
+
+    Args:
+        text: Le texte à analyser
+
+    Returns:
+        Ensemble des mots caractéristiques
+    """
+    return {t for t in tokenize(text) if len(t) >= 3 and t not in STOPWORDS}
+
+
+# Bases dont l'index a déjà été vérifié par ce processus (chemins absolus)
+_indexed_databases: Set[str] = set()
+
+
+class PunchlineSearch:
+    """
+    Index plein texte (FTS5) de l'historique des punchlines.
+
+    La table virtuelle `punchlines_fts` utilise `punchlines` comme contenu externe
+    et est tenue à jour par des triggers: toute écriture dans `punchlines`, quel
+    que soit le module qui la fait, est indexée dans la même transaction.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialise la recherche avec le chemin de la base de données.
+
+        Args:
+            db_path: Chemin vers la base de données SQLite (par défaut: data/quality_data.db)
+        """
+        if not db_path:
+            db_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                'data',
+                'quality_data.db'
+            )
+
+        self.db_path = db_path
+
+    def ensure_index(self, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """
+        Crée l'index FTS5 et ses triggers s'ils n'existent pas, puis l'alimente
+        avec les punchlines existantes.
+
+        La vérification n'est faite qu'une fois par base et par processus: les
+        triggers tiennent ensuite l'index à jour.
+
+        Args:
+            conn: Connexion existante à utiliser (optionnel)
+
+        Returns:
+            bool: True si l'index est disponible
+        """
+        database = os.path.abspath(self.db_path)
+        if database in _indexed_databases:
+            return True
+
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='punchlines_fts'")
+            created = cursor.fetchone() is None
+
+            cursor.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS punchlines_fts USING fts5(
+                text,
+                subject,
+                content='punchlines',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS punchlines_fts_ai AFTER INSERT ON punchlines BEGIN
+                INSERT INTO punchlines_fts(rowid, text, subject) VALUES (new.id, new.text, new.subject);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS punchlines_fts_ad AFTER DELETE ON punchlines BEGIN
+                INSERT INTO punchlines_fts(punchlines_fts, rowid, text, subject)
+                VALUES ('delete', old.id, old.text, old.subject);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS punchlines_fts_au AFTER UPDATE OF text, subject ON punchlines BEGIN
+                INSERT INTO punchlines_fts(punchlines_fts, rowid, text, subject)
+                VALUES ('delete', old.id, old.text, old.subject);
+                INSERT INTO punchlines_fts(rowid, text, subject) VALUES (new.id, new.text, new.subject);
+            END;
+            ''')
+
+            if created:
+                cursor.execute("INSERT INTO punchlines_fts(punchlines_fts) VALUES ('rebuild')")
+                logging.info("✅ Index plein texte des punchlines créé")
+
+            conn.commit()
+            _indexed_databases.add(database)
+            return True
+
+        except sqlite3.OperationalError as e:
+            # SQLite compilé sans FTS5
+            logging.warning(f"⚠️ Index plein texte indisponible: {str(e)}")
+            return False
+
+        finally:
+            if own_conn:
+                conn.close()
+
+    def rebuild(self):
+        """
+        Reconstruit entièrement l'index à partir de la table punchlines.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            self.ensure_index(conn)
+            conn.execute("INSERT INTO punchlines_fts(punchlines_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO punchlines_fts(punchlines_fts) VALUES ('optimize')")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def build_match_query(text: str, match_all: bool = True) -> str:
+        """
+        Convertit un texte libre en requête FTS5 sûre: chaque mot est mis entre
+        guillemets et recherché comme préfixe ("developpeur" trouve "développeurs").
+
+        Args:
+            text: Le texte recherché
+            match_all: True pour exiger tous les mots, False pour au moins un
+
+        Returns:
+            str: La requête MATCH (vide si le texte ne contient aucun mot)
+        """
+        terms = [f'"{t}"*' for t in dict.fromkeys(tokenize(text))]
+        return (' AND ' if match_all else ' OR ').join(terms)
+
+    def search(
+        self,
+        query: str,
+        subject: Optional[str] = None,
+        min_score: Optional[float] = None,
+        selected_only: bool = False,
+        limit: int = 10,
+        match_all: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche des punchlines, classées par pertinence (BM25).
+
+        Args:
+            query: Texte recherché
+            subject: Filtrer sur un sujet exact (optionnel)
+            min_score: Score global minimum (optionnel)
+            selected_only: Ne retourner que les punchlines sélectionnées
+            limit: Nombre maximum de résultats
+            match_all: True pour exiger tous les mots, False pour au moins un
+
+        Returns:
+            List[Dict[str, Any]]: Résultats, du plus pertinent au moins pertinent
+        """
+        match = self.build_match_query(query, match_all)
+        if not match:
+            return []
+
+        conditions = ["punchlines_fts MATCH ?"]
+        params: List[Any] = [match]
+        if subject is not None:
+            conditions.append("p.subject = ?")
+            params.append(subject)
+        if min_score is not None:
+            conditions.append("p.overall_score >= ?")
+            params.append(min_score)
+        if selected_only:
+            conditions.append("p.selected = 1")
+        params.append(limit)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT p.id, p.text, p.subject, p.overall_score, p.selected, p.created_at,
+                   bm25(punchlines_fts) AS rank
+            FROM punchlines_fts
+            JOIN punchlines p ON p.id = punchlines_fts.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY rank
+            LIMIT ?
+            ''', params)
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                'id': row[0],
+                'text': row[1],
+                'subject': row[2],
+                'overall_score': row[3],
+                'selected': bool(row[4]),
+                'created_at': row[5],
+                'rank': row[6]
+            }
+            for row in rows
+        ]
+
+    def find_overlap(
+        self,
+        punchline: str,
+        subject: Optional[str] = None,
+        limit: int = 5,
+        window: int = 200
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche dans l'historique les punchlines qui partagent le plus de mots
+        caractéristiques avec une punchline donnée.
+
+        Le classement BM25 ne suit pas exactement le recouvrement (il favorise les
+        textes courts et les mots rares): le recouvrement est calculé sur les
+        `window` premiers résultats BM25, puis seuls les `limit` meilleurs sont gardés.
+
+        Args:
+            punchline: La punchline à comparer
+            subject: Restreindre la recherche à un sujet (optionnel)
+            limit: Nombre maximum de résultats
+            window: Nombre de résultats BM25 dont le recouvrement est calculé
+
+        Returns:
+            List[Dict[str, Any]]: Résultats triés par recouvrement décroissant. Le champ
+            `overlap` est la part des mots caractéristiques de la punchline présents
+            dans le résultat (entre 0 et 1).
+        """
+        terms = significant_terms(punchline)
+        if not terms:
+            return []
+
+        try:
+            results = self.search(' '.join(sorted(terms)), subject=subject, limit=max(limit, window), match_all=False)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"⚠️ Recherche plein texte impossible: {str(e)}")
+            return []
+
+        for result in results:
+            result['overlap'] = len(terms & significant_terms(result['text'])) / len(terms)
+
+        results.sort(key=lambda r: r['overlap'], reverse=True)
+        return results[:limit]
@@ -0,0 +1,329 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+# Statuts d'un envoi
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+def content_hash(path: str) -> str:
+    """
+    Empreinte SHA-256 du contenu d'un fichier (lecture par blocs)
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        str: L'empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TelegramOutbox:
+    """
+    File d'envoi (outbox) persistante des vidéos à publier sur Telegram.
+
+    Chaque ligne correspond à une vidéo pour un destinataire. La génération y
+    ajoute les envois, un worker séparé les réserve (bail à durée limitée,
+    renouvelé pendant l'envoi), les envoie et enregistre l'ID du message obtenu.
+    Une réservation abandonnée (worker arrêté) est reprise à l'expiration du bail.
+
+    Les mises à jour d'un envoi réservé sont conditionnées à l'identifiant du
+    worker qui détient le bail: un worker dont le bail a été repris ne peut plus
+    reprogrammer l'envoi. L'ID du message est enregistré une seule fois (le
+    premier envoi réussi l'emporte).
+
+    La clé de déduplication (contenu de la vidéo + destinataire par défaut)
+    empêche qu'une même vidéo soit mise en file deux fois pour un chat. L'API
+    Telegram n'ayant pas de clé d'idempotence, un arrêt entre l'envoi et son
+    enregistrement peut provoquer un second envoi: la garantie est « au moins
+    une fois », avec un seul enregistrement par envoi.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialise l'outbox avec le chemin de la base de données.
+
+        Args:
+            db_path: Chemin vers la base de données SQLite (par défaut: data/telegram_outbox.db)
+        """
+        if not db_path:
+            db_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                'data',
+                'telegram_outbox.db'
+            )
+
+        self.db_path = db_path
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        """
+        Initialise la base de données si elle n'existe pas.
+        """
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.executescript('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT NOT NULL UNIQUE,
+                video_path TEXT NOT NULL,
+                caption TEXT,
+                chat_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                lease_until REAL,
+                worker_id TEXT,
+                message_id INTEGER,
+                last_error TEXT,
+                created_at TIMESTAMP NOT NULL,
+                updated_at TIMESTAMP NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, next_attempt_at);
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def enqueue(
+        self,
+        video_path: str,
+        chat_ids: List[str],
+        caption: Optional[str] = None,
+        dedup_key: Optional[str] = None
+    ) -> List[int]:
+        """
+        Ajoute l'envoi d'une vidéo à un ou plusieurs destinataires.
+
+        Args:
+            video_path: Chemin de la vidéo
+            chat_ids: Destinataires
+            caption: Légende de la vidéo
+            dedup_key: Clé de déduplication (par défaut: empreinte du contenu de la vidéo)
+
+        Returns:
+            List[int]: IDs des envois ajoutés (les doublons sont ignorés)
+        """
+        base_key = dedup_key or content_hash(video_path)
+        now = datetime.now().isoformat()
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            ids = []
+            for chat_id in chat_ids:
+                cursor.execute('''
+                INSERT OR IGNORE INTO outbox (
+                    dedup_key, video_path, caption, chat_id, status, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (f"{base_key}:{chat_id}", video_path, caption, str(chat_id), PENDING, now, now))
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+            conn.commit()
+            return ids
+        finally:
+            conn.close()
+
+    def claim(self, limit: int = 10, lease_seconds: float = 300, worker_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Réserve les prochains envois à traiter.
+
+        Sont réservés les envois en attente dont la date de tentative est passée,
+        ainsi que les envois dont le bail a expiré.
+
+        Args:
+            limit: Nombre maximum d'envois réservés
+            lease_seconds: Durée du bail en secondes
+            worker_id: Identifiant du worker
+
+        Returns:
+            List[Dict[str, Any]]: Les envois réservés
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            UPDATE outbox
+            SET status = ?, lease_until = ?, worker_id = ?, attempts = attempts + 1, updated_at = ?
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE (status = ? AND next_attempt_at <= ?)
+                   OR (status = ? AND lease_until < ?)
+                ORDER BY id
+                LIMIT ?
+            )
+            RETURNING id, video_path, caption, chat_id, attempts, dedup_key, lease_until
+            ''', (SENDING, now + lease_seconds, worker_id, datetime.now().isoformat(),
+                  PENDING, now, SENDING, now, limit))
+            rows = cursor.fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+
+        return sorted([
+            {
+                'id': row[0],
+                'video_path': row[1],
+                'caption': row[2],
+                'chat_id': row[3],
+                'attempts': row[4],
+                'dedup_key': row[5],
+                'lease_until': row[6]
+            }
+            for row in rows
+        ], key=lambda item: item['id'])
+
+    def renew(self, item_ids: List[int], lease_seconds: float = 300, worker_id: Optional[str] = None) -> List[int]:
+        """
+        Prolonge le bail des envois encore réservés par un worker.
+
+        Args:
+            item_ids: IDs des envois
+            lease_seconds: Nouvelle durée du bail en secondes, à partir de maintenant
+            worker_id: Identifiant du worker qui détient le bail
+
+        Returns:
+            List[int]: IDs des envois dont le bail a été prolongé (les envois
+            terminés ou repris par un autre worker sont ignorés)
+        """
+        if not item_ids:
+            return []
+
+        placeholders = ', '.join('?' * len(item_ids))
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            UPDATE outbox SET lease_until = ?, updated_at = ?
+            WHERE id IN ({placeholders}) AND status = ? AND worker_id IS ?
+            RETURNING id
+            ''', (time.time() + lease_seconds, datetime.now().isoformat(), *item_ids, SENDING, worker_id))
+            renewed = sorted(row[0] for row in cursor.fetchall())
+            conn.commit()
+            return renewed
+        finally:
+            conn.close()
+
+    def mark_sent(self, item_id: int, message_id: int, worker_id: Optional[str] = None) -> bool:
+        """
+        Enregistre un envoi réussi.
+
+        L'enregistrement est idempotent: seul le premier ID de message est
+        conservé. Un envoi fait après la reprise du bail par un autre worker
+        est tout de même enregistré (le message est parti), ce qui empêche un
+        nouvel envoi.
+
+        Args:
+            item_id: ID de l'envoi
+            message_id: ID du message Telegram
+            worker_id: Identifiant du worker qui a fait l'envoi
+
+        Returns:
+            bool: True si l'envoi a été enregistré, False s'il l'était déjà
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            UPDATE outbox
+            SET status = ?, message_id = ?, worker_id = ?, lease_until = NULL, last_error = NULL, updated_at = ?
+            WHERE id = ? AND message_id IS NULL
+            RETURNING status
+            ''', (SENT, message_id, worker_id, datetime.now().isoformat(), item_id))
+            recorded = cursor.fetchone() is not None
+            conn.commit()
+        finally:
+            conn.close()
+
+        if not recorded:
+            logging.warning(f"⚠️ L'envoi {item_id} était déjà enregistré: message {message_id} envoyé en double")
+        return recorded
+
+    def mark_failed(self, item_id: int, error: str, retry_delay: Optional[float] = None,
+                    worker_id: Optional[str] = None) -> bool:
+        """
+        Enregistre un échec d'envoi.
+
+        Args:
+            item_id: ID de l'envoi
+            error: Description de l'erreur
+            retry_delay: Délai avant nouvelle tentative en secondes (None: échec définitif)
+            worker_id: Identifiant du worker qui détient le bail
+
+        Returns:
+            bool: True si l'échec a été enregistré, False si le bail a été repris
+            par un autre worker ou si l'envoi est terminé
+        """
+        status = FAILED if retry_delay is None else PENDING
+        next_attempt_at = 0 if retry_delay is None else time.time() + retry_delay
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            UPDATE outbox
+            SET status = ?, next_attempt_at = ?, lease_until = NULL, last_error = ?, updated_at = ?
+            WHERE id = ? AND status = ? AND worker_id IS ?
+            ''', (status, next_attempt_at, error, datetime.now().isoformat(), item_id, SENDING, worker_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def retry_failed(self) -> int:
+        """
+        Remet en attente les envois en échec définitif.
+
+        Returns:
+            int: Nombre d'envois remis en attente
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+            UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0, updated_at = ?
+            WHERE status = ?
+            ''', (PENDING, datetime.now().isoformat(), FAILED))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Nombre d'envois par statut.
+
+        Returns:
+            Dict[str, int]: Compteurs par statut
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+            stats = {status: 0 for status in (PENDING, SENDING, SENT, FAILED)}
+            stats.update({status: count for status, count in cursor.fetchall()})
+            return stats
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la récupération des statistiques de l'outbox: {str(e)}")
+            return {status: 0 for status in (PENDING, SENDING, SENT, FAILED)}
+        finally:
+            conn.close()
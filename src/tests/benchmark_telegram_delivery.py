@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+
+from tests.fake_telegram_server import FakeTelegramConfig, run_fake_telegram_server
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('benchmark_telegram_delivery')
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+def create_test_videos(directory, count, size_mb):
+    """
+    Crée des vidéos de test distinctes (une vidéo courte complétée jusqu'à la taille voulue)
+    """
+    from moviepy.editor import ColorClip
+
+    base_path = os.path.join(directory, 'base.mp4')
+    clip = ColorClip((320, 568), color=(20, 20, 20), duration=1).set_fps(10)
+    clip.write_videofile(base_path, codec='libx264', audio=False, logger=None)
+    clip.close()
+
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"video_{i}.mp4")
+        shutil.copyfile(base_path, path)
+        # Octets de remplissage uniques: chaque vidéo a un contenu (et un file_id) différent
+        with open(path, 'ab') as f:
+            f.write(os.urandom(max(0, int(size_mb * 1024 * 1024) - os.path.getsize(base_path))))
+        paths.append(path)
+    return paths
+
+async def run_scenario(name, server, coroutine):
+    """
+    Exécute un scénario et affiche sa durée et les compteurs du serveur
+    """
+    server.reset()
+    start = time.time()
+    result = await coroutine
+    elapsed = time.time() - start
+    stats = server.stats
+    logger.info(f"⏱️ {name}: {elapsed:.2f}s | résultat: {result} | requêtes: {stats.requests} | "
+                f"uploads: {stats.uploads} ({stats.uploaded_bytes / (1024*1024):.1f} MB) | "
+                f"par file_id: {stats.file_id_sends} | 429: {stats.errors_429} | timeouts: {stats.timeouts}")
+    return elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la livraison Telegram sur le serveur simulé")
+    parser.add_argument('-n', '--videos', type=int, default=6, help='Nombre de vidéos')
+    parser.add_argument('-c', '--chats', type=int, default=3, help='Nombre de destinataires')
+    parser.add_argument('--size-mb', type=float, default=2, help='Taille de chaque vidéo en Mo')
+    parser.add_argument('--bandwidth-mbps', type=float, default=50, help="Débit d'upload simulé en Mbit/s")
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence de base en secondes')
+    parser.add_argument('--error-rate-429', type=float, default=0, help="Probabilité d'une réponse 429")
+    parser.add_argument('--timeout-rate', type=float, default=0, help="Probabilité qu'une requête reste bloquée")
+    parser.add_argument('--port', type=int, default=8081, help="Port du serveur simulé")
+    args = parser.parse_args()
+
+    config = FakeTelegramConfig(
+        latency=args.latency,
+        bandwidth_mbps=args.bandwidth_mbps,
+        error_rate_429=args.error_rate_429,
+        timeout_rate=args.timeout_rate,
+        timeout_delay=60,
+        seed=42
+    )
+
+    with tempfile.TemporaryDirectory() as directory, run_fake_telegram_server(config, port=args.port) as (server, base_url):
+        chat_ids = [str(100 + i) for i in range(args.chats)]
+        os.environ.update({
+            'TELEGRAM_API_BASE_URL': base_url,
+            'TELEGRAM_BOT_TOKEN': '123456:fake-token',
+            'TELEGRAM_CHAT_ID': ','.join(chat_ids),
+            'TELEGRAM_AUTO_SEND': 'true',
+            'TELEGRAM_FILE_CACHE': 'false'
+        })
+        from clients.telegram_client import TelegramClient
+
+        logger.info(f"🎬 Création de {args.videos} vidéos de test de {args.size_mb} MB...")
+        videos = create_test_videos(directory, args.videos, args.size_mb)
+        results = [
+            {'subject': f"Sujet {i}", 'video_path': path, 'description': 'Benchmark', 'hashtags': ['#bench']}
+            for i, path in enumerate(videos)
+        ]
+
+        client = TelegramClient()
+        await run_scenario(f"1 vidéo -> {args.chats} chats (fan-out)", server, client.send_video(videos[0], 'Fan-out'))
+        await run_scenario(f"{args.videos} vidéos -> {args.chats} chats (envois concurrents)", server,
+                           client.send_batch_videos(results, as_album=False))
+        await run_scenario(f"{args.videos} vidéos -> {args.chats} chats (albums)", server,
+                           client.send_batch_videos(results, as_album=True))
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Benchmark interrompu par l'utilisateur")
+        sys.exit(0)
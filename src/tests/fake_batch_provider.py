@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from typing import Dict, Any, Optional
+
+from tests.fake_openai_server import FakeOpenAIServer, FakeOpenAIConfig, count_tokens
+
+
+def run_batch_file(
+    input_path: str,
+    output_path: Optional[str] = None,
+    config: Optional[FakeOpenAIConfig] = None,
+    error_rate: float = 0
+) -> Dict[str, Any]:
+    """
+    Traite un fichier de requêtes par lots comme le ferait le fournisseur et écrit le fichier de résultats
+
+    Les réponses sont celles du serveur OpenAI simulé (tests/fake_openai_server.py),
+    sans réseau ni attente. Une part des requêtes peut échouer (error_rate) pour
+    tester la reprise des résultats manquants.
+
+    Args:
+        input_path: Fichier de requêtes (<étape>_requests.jsonl)
+        output_path: Fichier de résultats (par défaut: <étape>_results.jsonl à côté du fichier de requêtes)
+        config: Comportement simulé (réponses prédéfinies, graine)
+        error_rate: Probabilité qu'une requête échoue
+
+    Returns:
+        Dict: Chemin du fichier de résultats et compteurs (requêtes, échecs, tokens, types de requêtes)
+    """
+    if output_path is None:
+        output_path = input_path.replace('_requests.jsonl', '_results.jsonl')
+        if output_path == input_path:
+            output_path = os.path.splitext(input_path)[0] + '_results.jsonl'
+
+    server = FakeOpenAIServer(config)
+    stats = {'output': output_path, 'requests': 0, 'failed': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'by_kind': {}}
+    batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+
+    with open(input_path, 'r', encoding='utf-8') as source, open(output_path, 'w', encoding='utf-8') as target:
+        for line in source:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            body = request.get('body') or {}
+            messages = body.get('messages') or []
+            stats['requests'] += 1
+
+            result = {'id': f"batch_req_{uuid.uuid4().hex[:24]}", 'custom_id': request.get('custom_id'), 'response': None, 'error': None}
+            if server.random.random() < error_rate:
+                stats['failed'] += 1
+                result['response'] = {
+                    'status_code': 500,
+                    'request_id': uuid.uuid4().hex,
+                    'body': {'error': {'message': 'The server had an error while processing your request.', 'type': 'server_error'}}
+                }
+                target.write(json.dumps(result, ensure_ascii=False) + '\n')
+                continue
+
+            kind, content = server._respond(messages)
+            prompt_tokens = count_tokens('\n'.join(str(m.get('content') or '') for m in messages)) + 4 * len(messages)
+            completion_tokens = count_tokens(content)
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['by_kind'][kind] = stats['by_kind'].get(kind, 0) + 1
+
+            result['response'] = {
+                'status_code': 200,
+                'request_id': uuid.uuid4().hex,
+                'body': {
+                    'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'gpt-3.5-turbo'),
+                    'system_fingerprint': 'fp_fake',
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'logprobs': None,
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens
+                    }
+                }
+            }
+            target.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fournisseur de traitements par lots simulé: produit le fichier de résultats d'un fichier de requêtes")
+    parser.add_argument('input', type=str, help='Fichier de requêtes (JSONL)')
+    parser.add_argument('-o', '--output', type=str, help='Fichier de résultats (par défaut: <étape>_results.jsonl)')
+    parser.add_argument('--error-rate', type=float, default=0, help="Probabilité qu'une requête échoue")
+    parser.add_argument('--responses', type=str, help='Fichier JSON de réponses prédéfinies [{"match": ..., "content": ...}]')
+    parser.add_argument('--seed', type=int, help='Graine du générateur aléatoire')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ Le fichier {args.input} n'existe pas.")
+        sys.exit(1)
+
+    responses = []
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    stats = run_batch_file(args.input, args.output, FakeOpenAIConfig(responses=responses, seed=args.seed), args.error_rate)
+    print(f"✅ {stats['requests']} requête(s) traitée(s), {stats['failed']} en échec: {stats['output']}")
+    print(f"📊 Tokens: {stats['prompt_tokens']} de prompt, {stats['completion_tokens']} de complétion, types: {stats['by_kind']}")
+
+
+if __name__ == "__main__":
+    main()
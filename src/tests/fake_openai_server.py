@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('fake_openai_server')
+
+# Critères d'évaluation attendus par QualityPipeline et PunchlineController
+CRITERIA = ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']
+
+PUNCHLINE_TEMPLATES = [
+    "Quand {subject} prêche l'exemplarité, mais triche dès que personne ne regarde.",
+    "Quand {subject} promet la transparence, mais classe tout secret défense.",
+    "Quand {subject} réclame du respect, mais méprise tous ceux qui le financent.",
+    "Quand {subject} parle d'avenir, mais vit encore sur ses privilèges d'hier.",
+    "Quand {subject} donne des leçons de morale, mais rate tous les examens pratiques.",
+    "Quand {subject} se dit proche du peuple, mais ne prend jamais le bus.",
+    "Quand {subject} dénonce le gaspillage, mais organise un séminaire aux Maldives.",
+    "Quand {subject} jure l'innovation, mais recycle la même promesse depuis 20 ans."
+]
+
+
+@dataclass
+class FakeOpenAIConfig:
+    """
+    Comportement simulé du serveur
+    """
+    latency: float = 0.3                # Latence moyenne d'une réponse (secondes)
+    latency_jitter: float = 0.1         # Dispersion de la latence (écart-type ou demi-largeur, en secondes)
+    latency_distribution: str = 'lognormal'  # fixed, uniform, normal ou lognormal (queue longue réaliste)
+    tokens_per_second: float = 0        # Vitesse de génération simulée (0: instantanée)
+    error_rate_429: float = 0           # Probabilité d'une réponse 429 (rate limit)
+    error_rate_500: float = 0           # Probabilité d'une erreur serveur 500
+    retry_after: float = 1              # En-tête retry-after des réponses 429 (secondes)
+    timeout_rate: float = 0             # Probabilité qu'une requête ne réponde pas à temps
+    timeout_delay: float = 60           # Durée de blocage d'une requête en timeout (secondes)
+    requests_per_minute: int = 0        # Quota de requêtes par minute, au-delà: 429 (0: illimité)
+    responses: List[Dict[str, str]] = field(default_factory=list)  # Réponses prédéfinies: [{"match": regex, "content": modèle}]
+    seed: Optional[int] = None          # Graine du générateur aléatoire (résultats reproductibles)
+
+
+@dataclass
+class FakeOpenAIStats:
+    """
+    Compteurs exposés par /stats
+    """
+    requests: int = 0
+    completions: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    errors_429: int = 0
+    errors_500: int = 0
+    timeouts: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+    by_model: Dict[str, int] = field(default_factory=dict)
+
+
+def count_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens (environ 4 caractères par token)"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+class FakeOpenAIServer:
+    """
+    Serveur local compatible avec /v1/chat/completions pour tester la génération
+    sans réseau ni coût.
+
+    Les réponses sont déduites des prompts du projet (génération de punchlines,
+    évaluation, hashtags, description) et ont le format attendu par leurs parseurs.
+    Des réponses prédéfinies peuvent les remplacer (FakeOpenAIConfig.responses).
+    """
+
+    def __init__(self, config: Optional[FakeOpenAIConfig] = None):
+        self.config = config or FakeOpenAIConfig()
+        self.stats = FakeOpenAIStats()
+        self.random = random.Random(self.config.seed)
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.app = self._create_app()
+
+    def reset(self):
+        """Remet à zéro les compteurs et le quota"""
+        self.stats = FakeOpenAIStats()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI(title="Fake OpenAI API")
+
+        @app.get('/stats')
+        async def stats():
+            return asdict(self.stats)
+
+        @app.post('/reset')
+        async def reset():
+            self.reset()
+            return {'ok': True}
+
+        @app.get('/v1/models')
+        async def models():
+            return {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake'}
+                for model in ('gpt-4', 'gpt-3.5-turbo')
+            ]}
+
+        @app.post('/v1/chat/completions')
+        async def chat_completions(request: Request):
+            return await self._handle(await request.json())
+
+        return app
+
+    @staticmethod
+    def _error(status: int, message: str, error_type: str, code: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+        content = {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}}
+        return JSONResponse(content, status_code=status, headers=headers)
+
+    def _latency(self) -> float:
+        """Tire une latence selon la distribution configurée"""
+        mean, spread = self.config.latency, self.config.latency_jitter
+        distribution = self.config.latency_distribution
+        if distribution == 'uniform':
+            value = self.random.uniform(mean - spread, mean + spread)
+        elif distribution == 'normal':
+            value = self.random.gauss(mean, spread)
+        elif distribution == 'lognormal' and mean > 0 and spread > 0:
+            # Paramètres choisis pour que la moyenne et l'écart-type soient ceux demandés
+            sigma = math.sqrt(math.log(1 + (spread / mean) ** 2))
+            value = self.random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        else:
+            value = mean
+        return max(0.0, value)
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        """En-têtes x-ratelimit-* de l'API, décomptés sur une fenêtre d'une minute"""
+        now = time.monotonic()
+        if now - self.window_start >= 60:
+            self.window_start = now
+            self.window_requests = 0
+        if not self.config.requests_per_minute:
+            return {}
+        return {
+            'x-ratelimit-limit-requests': str(self.config.requests_per_minute),
+            'x-ratelimit-remaining-requests': str(max(0, self.config.requests_per_minute - self.window_requests)),
+            'x-ratelimit-reset-requests': f"{max(0.0, 60 - (now - self.window_start)):.3f}s"
+        }
+
+    async def _handle(self, body: Dict[str, Any]):
+        self.stats.requests += 1
+        messages = body.get('messages') or []
+        model = body.get('model', 'gpt-3.5-turbo')
+
+        await asyncio.sleep(self._latency())
+
+        # Quota par minute, puis erreurs injectées
+        headers = self._rate_limit_headers()
+        if self.config.requests_per_minute and self.window_requests >= self.config.requests_per_minute:
+            self.stats.errors_429 += 1
+            return self._error(429, 'Rate limit reached for requests', 'requests', 'rate_limit_exceeded',
+                               {**headers, 'retry-after': str(self.config.retry_after)})
+        self.window_requests += 1
+        headers = self._rate_limit_headers()
+
+        if self.random.random() < self.config.timeout_rate:
+            self.stats.timeouts += 1
+            await asyncio.sleep(self.config.timeout_delay)
+        if self.random.random() < self.config.error_rate_429:
+            self.stats.errors_429 += 1
+            return self._error(429, 'Rate limit reached for requests', 'requests', 'rate_limit_exceeded',
+                               {**headers, 'retry-after': str(self.config.retry_after)})
+        if self.random.random() < self.config.error_rate_500:
+            self.stats.errors_500 += 1
+            return self._error(500, 'The server had an error while processing your request.', 'server_error', None, headers)
+
+        if not messages:
+            return self._error(400, "'messages' is a required property", 'invalid_request_error', None, headers)
+
+        prompt = '\n'.join(str(message.get('content') or '') for message in messages)
+        kind, content = self._respond(messages)
+
+        # Réponse tronquée comme l'API si max_tokens est dépassé
+        completion_tokens = count_tokens(content)
+        finish_reason = 'stop'
+        max_tokens = body.get('max_tokens')
+        if max_tokens and completion_tokens > max_tokens:
+            content = content[:max_tokens * 4]
+            completion_tokens = max_tokens
+            finish_reason = 'length'
+
+        if self.config.tokens_per_second > 0:
+            await asyncio.sleep(completion_tokens / self.config.tokens_per_second)
+
+        prompt_tokens = count_tokens(prompt) + 4 * len(messages)
+        self.stats.completions += 1
+        self.stats.prompt_tokens += prompt_tokens
+        self.stats.completion_tokens += completion_tokens
+        self.stats.by_kind[kind] = self.stats.by_kind.get(kind, 0) + 1
+        self.stats.by_model[model] = self.stats.by_model.get(model, 0) + 1
+
+        return JSONResponse({
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'system_fingerprint': 'fp_fake',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'logprobs': None,
+                'finish_reason': finish_reason
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }, headers=headers)
+
+    @staticmethod
+    def _subject(text: str) -> str:
+        """Extrait le sujet d'un prompt du projet"""
+        for pattern in (r"\*\*(.+?)\*\*", r"sujet ['\"](.+?)['\"]", r"\bsur ['\"](.+?)['\"]", r"\bsur (.+?)\.(?:\s|$)"):
+            match = re.search(pattern, text)
+            if match:
+                return match.group(1).strip()
+        return "ce sujet"
+
+    def _punchlines(self, subject: str, count: int) -> List[str]:
+        templates = self.random.sample(PUNCHLINE_TEMPLATES, min(count, len(PUNCHLINE_TEMPLATES)))
+        while len(templates) < count:
+            templates.append(self.random.choice(PUNCHLINE_TEMPLATES))
+        return [template.format(subject=subject) for template in templates]
+
+    def _respond(self, messages: List[Dict[str, Any]]):
+        """
+        Construit la réponse à partir des prompts
+
+        Returns:
+            (str, str): Le type de requête reconnu et le contenu de la réponse
+        """
+        system = ' '.join(str(m.get('content') or '') for m in messages if m.get('role') == 'system')
+        user = '\n'.join(str(m.get('content') or '') for m in messages if m.get('role') != 'system')
+        subject = self._subject(user)
+        punchline_match = re.search(r"\n\s*['\"](.+?)['\"]\s*\n", user)
+        punchline = punchline_match.group(1) if punchline_match else ''
+
+        # Réponses prédéfinies, prioritaires
+        for canned in self.config.responses:
+            if re.search(canned['match'], f"{system}\n{user}", re.IGNORECASE | re.DOTALL):
+                content = canned['content'].format_map({'subject': subject, 'punchline': punchline})
+                return 'canned', content
+
+        if 'Évalue la punchline' in user:
+            if '"cruaute"' in user:
+                # QualityPipeline: objet JSON, scores sur 10
+                scores = {criterion: self.random.randint(4, 10) for criterion in CRITERIA}
+                return 'evaluation', json.dumps(scores, indent=2)
+            # PunchlineController: une ligne par critère, scores entre 0 et 1
+            return 'evaluation', '\n'.join(f"{criterion}: {self.random.uniform(0.4, 1.0):.2f}" for criterion in CRITERIA)
+
+        if 'hashtag' in system.lower() or 'hashtags' in user.lower():
+            words = [re.sub(r'\W', '', word) for word in subject.split()]
+            hashtags = ['#LARROGANCE', '#' + (''.join(words) or 'Satire'), '#hypocrisie', '#satire', '#RealityCheck', '#OnVousVoit']
+            return 'hashtags', '\n'.join(hashtags)
+
+        if 'description' in user.lower():
+            return 'description', f"{subject}: les donneurs de leçons ont encore frappé. Qui osera encore y croire après ça ?"
+
+        count_match = re.search(r"(?:Génère|Crée|Generate)\s+(\d+)\s+punchlines", user)
+        batch_match = re.search(r"CHACUN des sujets suivants:\n((?:- .+\n)+)", user)
+        if count_match and batch_match:
+            # QualityPipeline.prefetch_candidates: objet JSON {sujet: [punchlines]}
+            subjects = [line[2:].strip() for line in batch_match.group(1).splitlines()]
+            count = int(count_match.group(1))
+            return 'punchlines_batch', json.dumps({s: self._punchlines(s, count) for s in subjects}, ensure_ascii=False, indent=2)
+
+        if count_match:
+            return 'punchlines', '\n'.join(self._punchlines(subject, int(count_match.group(1))))
+
+        if 'punchline' in user.lower():
+            return 'punchline', self._punchlines(subject, 1)[0]
+
+        return 'other', 'OK'
+
+
+@contextmanager
+def run_fake_openai_server(config: Optional[FakeOpenAIConfig] = None, host: str = '127.0.0.1', port: int = 8082):
+    """
+    Démarre le serveur dans un thread pour la durée d'un bloc with
+
+    Usage:
+        with run_fake_openai_server(FakeOpenAIConfig(error_rate_429=0.1)) as (server, base_url):
+            os.environ['OPENAI_BASE_URL'] = base_url
+            ...
+
+    Yields:
+        (FakeOpenAIServer, str): Le serveur et l'URL de base à utiliser pour OPENAI_BASE_URL
+    """
+    server = FakeOpenAIServer(config)
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host=host, port=port, log_level='warning'))
+    thread = threading.Thread(target=uvicorn_server.run, name='fake-openai-server', daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not uvicorn_server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("Le serveur OpenAI simulé n'a pas démarré")
+        time.sleep(0.05)
+
+    try:
+        yield server, f"http://{host}:{port}/v1"
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local compatible avec l'API OpenAI (tests et benchmarks)")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="Adresse d'écoute")
+    parser.add_argument('--port', type=int, default=8082, help="Port d'écoute")
+    parser.add_argument('--latency', type=float, default=0.3, help='Latence moyenne en secondes')
+    parser.add_argument('--latency-jitter', type=float, default=0.1, help='Dispersion de la latence en secondes')
+    parser.add_argument('--latency-distribution', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='lognormal',
+                        help='Distribution de la latence')
+    parser.add_argument('--tokens-per-second', type=float, default=0, help='Vitesse de génération simulée (0: instantanée)')
+    parser.add_argument('--error-rate-429', type=float, default=0, help="Probabilité d'une réponse 429")
+    parser.add_argument('--error-rate-500', type=float, default=0, help="Probabilité d'une erreur 500")
+    parser.add_argument('--retry-after', type=float, default=1, help='En-tête retry-after des réponses 429')
+    parser.add_argument('--timeout-rate', type=float, default=0, help="Probabilité qu'une requête reste bloquée")
+    parser.add_argument('--timeout-delay', type=float, default=60, help="Durée de blocage d'une requête en timeout")
+    parser.add_argument('--requests-per-minute', type=int, default=0, help='Quota de requêtes par minute (0: illimité)')
+    parser.add_argument('--responses', type=str, help='Fichier JSON de réponses prédéfinies [{"match": ..., "content": ...}]')
+    parser.add_argument('--seed', type=int, help='Graine du générateur aléatoire')
+    args = parser.parse_args()
+
+    responses = []
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    config = FakeOpenAIConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        latency_distribution=args.latency_distribution,
+        tokens_per_second=args.tokens_per_second,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        retry_after=args.retry_after,
+        timeout_rate=args.timeout_rate,
+        timeout_delay=args.timeout_delay,
+        requests_per_minute=args.requests_per_minute,
+        responses=responses,
+        seed=args.seed
+    )
+    server = FakeOpenAIServer(config)
+    logger.info(f"🧪 Serveur OpenAI simulé: OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('fake_telegram_server')
+
+
+@dataclass
+class FakeTelegramConfig:
+    """
+    Comportement simulé du serveur
+    """
+    latency: float = 0.05               # Latence de base de chaque requête (secondes)
+    latency_jitter: float = 0.02        # Variation aléatoire ajoutée à la latence (secondes)
+    bandwidth_mbps: float = 0           # Débit d'upload simulé en Mbit/s (0: illimité)
+    error_rate_429: float = 0           # Probabilité d'une réponse 429 (Too Many Requests)
+    retry_after: int = 1                # Délai retry_after des réponses 429 (secondes)
+    timeout_rate: float = 0             # Probabilité qu'une requête ne réponde pas à temps
+    timeout_delay: float = 30           # Durée de blocage d'une requête en timeout (secondes)
+    enforce_chat_limit: bool = False    # Répondre 429 au-delà d'un message par seconde et par chat
+    seed: Optional[int] = None          # Graine du générateur aléatoire (résultats reproductibles)
+
+
+@dataclass
+class FakeTelegramStats:
+    """
+    Compteurs exposés par /stats
+    """
+    requests: int = 0
+    uploads: int = 0
+    uploaded_bytes: int = 0
+    file_id_sends: int = 0
+    messages: int = 0
+    errors_429: int = 0
+    timeouts: int = 0
+    bad_requests: int = 0
+    by_method: Dict[str, int] = field(default_factory=dict)
+
+
+class FakeTelegramServer:
+    """
+    Serveur local imitant le sous-ensemble de l'API Bot de Telegram utilisé par
+    TelegramClient (getMe, sendVideo, sendMediaGroup).
+
+    Les fichiers reçus ne sont pas conservés: seul un file_id est attribué, que
+    les envois suivants peuvent réutiliser. Un file_id inconnu provoque la même
+    erreur 400 que l'API réelle.
+    """
+
+    def __init__(self, config: Optional[FakeTelegramConfig] = None):
+        self.config = config or FakeTelegramConfig()
+        self.stats = FakeTelegramStats()
+        self.random = random.Random(self.config.seed)
+        self.file_ids: Dict[str, int] = {}
+        self.last_message_at: Dict[str, float] = {}
+        self.message_id = 0
+        self.app = self._create_app()
+
+    def reset(self):
+        """Remet à zéro les compteurs et les file_id connus"""
+        self.stats = FakeTelegramStats()
+        self.file_ids = {}
+        self.last_message_at = {}
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI(title="Fake Telegram Bot API")
+
+        @app.get('/stats')
+        async def stats():
+            return asdict(self.stats)
+
+        @app.post('/reset')
+        async def reset():
+            self.reset()
+            return {'ok': True}
+
+        @app.api_route('/bot{token}/{method}', methods=['GET', 'POST'])
+        async def bot_method(token: str, method: str, request: Request):
+            return await self._handle(token, method, request)
+
+        return app
+
+    @staticmethod
+    def _error(status: int, description: str, parameters: Optional[Dict[str, Any]] = None) -> JSONResponse:
+        content = {'ok': False, 'error_code': status, 'description': description}
+        if parameters:
+            content['parameters'] = parameters
+        return JSONResponse(content, status_code=status)
+
+    async def _handle(self, token: str, method: str, request: Request):
+        self.stats.requests += 1
+        self.stats.by_method[method] = self.stats.by_method.get(method, 0) + 1
+
+        form = await request.form()
+        uploaded = {}
+        fields = {}
+        for key, value in form.multi_items():
+            if hasattr(value, 'read'):
+                uploaded[key] = len(await value.read())
+            else:
+                fields[key] = value
+
+        # Latence et débit simulés
+        delay = self.config.latency + self.random.uniform(0, self.config.latency_jitter)
+        upload_size = sum(uploaded.values())
+        if self.config.bandwidth_mbps > 0 and upload_size:
+            delay += upload_size * 8 / (self.config.bandwidth_mbps * 1_000_000)
+        await asyncio.sleep(delay)
+
+        # Erreurs injectées
+        if self.random.random() < self.config.timeout_rate:
+            self.stats.timeouts += 1
+            await asyncio.sleep(self.config.timeout_delay)
+        if self.random.random() < self.config.error_rate_429:
+            self.stats.errors_429 += 1
+            return self._error(429, f"Too Many Requests: retry after {self.config.retry_after}",
+                               {'retry_after': self.config.retry_after})
+
+        bot_id = int(token.split(':')[0]) if token.split(':')[0].isdigit() else 1
+        if method == 'getMe':
+            return {'ok': True, 'result': {
+                'id': bot_id, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot',
+                'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False
+            }}
+
+        if method not in ('sendVideo', 'sendMediaGroup'):
+            self.stats.bad_requests += 1
+            return self._error(404, 'Not Found: method not found')
+
+        chat_id = fields.get('chat_id')
+        if not chat_id:
+            self.stats.bad_requests += 1
+            return self._error(400, 'Bad Request: chat_id is empty')
+
+        if self.config.enforce_chat_limit:
+            now = time.monotonic()
+            if now - self.last_message_at.get(chat_id, 0) < 1.0:
+                self.stats.errors_429 += 1
+                return self._error(429, 'Too Many Requests: retry after 1', {'retry_after': 1})
+            self.last_message_at[chat_id] = now
+
+        if method == 'sendVideo':
+            items = [{
+                'media': fields.get('video'),
+                'caption': fields.get('caption'),
+                'width': fields.get('width'),
+                'height': fields.get('height'),
+                'duration': fields.get('duration')
+            }]
+        else:
+            try:
+                items = json.loads(fields.get('media', '[]'))
+            except json.JSONDecodeError:
+                self.stats.bad_requests += 1
+                return self._error(400, "Bad Request: can't parse media JSON object")
+            if not 2 <= len(items) <= 10:
+                self.stats.bad_requests += 1
+                return self._error(400, 'Bad Request: wrong number of media items (must be 2-10)')
+
+        messages = []
+        for item in items:
+            video = self._resolve_video(item.get('media'), uploaded)
+            if video is None:
+                self.stats.bad_requests += 1
+                return self._error(400, 'Bad Request: wrong file identifier/HTTP URL specified')
+            messages.append(self._message(chat_id, item, *video))
+
+        self.stats.messages += len(messages)
+        return {'ok': True, 'result': messages[0] if method == 'sendVideo' else messages}
+
+    def _resolve_video(self, media: Optional[str], uploaded: Dict[str, int]):
+        """
+        Retourne (file_id, taille) de la vidéo d'un envoi, ou None si le file_id est inconnu
+        """
+        # Fichier joint: champ direct (sendVideo) ou référence attach:// (sendMediaGroup)
+        name = media[len('attach://'):] if media and media.startswith('attach://') else 'video'
+        if name in uploaded and (media is None or media.startswith('attach://')):
+            file_id = f"FAKE{uuid.uuid4().hex}"
+            self.file_ids[file_id] = uploaded[name]
+            self.stats.uploads += 1
+            self.stats.uploaded_bytes += uploaded[name]
+            return file_id, uploaded[name]
+
+        if media in self.file_ids:
+            self.stats.file_id_sends += 1
+            return media, self.file_ids[media]
+
+        return None
+
+    def _message(self, chat_id: str, item: Dict[str, Any], file_id: str, size: int) -> Dict[str, Any]:
+        self.message_id += 1
+        message = {
+            'message_id': self.message_id,
+            'date': int(time.time()),
+            'chat': {
+                'id': int(chat_id) if chat_id.lstrip('-').isdigit() else 0,
+                'type': 'supergroup' if chat_id.startswith('-') else 'private'
+            },
+            'video': {
+                'file_id': file_id,
+                'file_unique_id': file_id[-16:],
+                'width': int(item.get('width') or 0),
+                'height': int(item.get('height') or 0),
+                'duration': int(item.get('duration') or 0),
+                'file_size': size
+            }
+        }
+        if item.get('caption'):
+            message['caption'] = item['caption']
+        return message
+
+
+@contextmanager
+def run_fake_telegram_server(config: Optional[FakeTelegramConfig] = None, host: str = '127.0.0.1', port: int = 8081):
+    """
+    Démarre le serveur dans un thread pour la durée d'un bloc with
+
+    Usage:
+        with run_fake_telegram_server(FakeTelegramConfig(error_rate_429=0.1)) as (server, base_url):
+            os.environ['TELEGRAM_API_BASE_URL'] = base_url
+            ...
+
+    Yields:
+        (FakeTelegramServer, str): Le serveur et l'URL de base à utiliser pour TELEGRAM_API_BASE_URL
+    """
+    server = FakeTelegramServer(config)
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host=host, port=port, log_level='warning'))
+    thread = threading.Thread(target=uvicorn_server.run, name='fake-telegram-server', daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not uvicorn_server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("Le serveur Telegram simulé n'a pas démarré")
+        time.sleep(0.05)
+
+    try:
+        yield server, f"http://{host}:{port}/bot"
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API Bot de Telegram (tests et benchmarks)")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="Adresse d'écoute")
+    parser.add_argument('--port', type=int, default=8081, help="Port d'écoute")
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence de base en secondes')
+    parser.add_argument('--latency-jitter', type=float, default=0.02, help='Variation de latence en secondes')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0, help="Débit d'upload en Mbit/s (0: illimité)")
+    parser.add_argument('--error-rate-429', type=float, default=0, help="Probabilité d'une réponse 429")
+    parser.add_argument('--retry-after', type=int, default=1, help='Délai retry_after des réponses 429')
+    parser.add_argument('--timeout-rate', type=float, default=0, help="Probabilité qu'une requête reste bloquée")
+    parser.add_argument('--timeout-delay', type=float, default=30, help="Durée de blocage d'une requête en timeout")
+    parser.add_argument('--enforce-chat-limit', action='store_true', help='Limiter à un message par seconde et par chat')
+    parser.add_argument('--seed', type=int, help='Graine du générateur aléatoire')
+    args = parser.parse_args()
+
+    config = FakeTelegramConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        bandwidth_mbps=args.bandwidth_mbps,
+        error_rate_429=args.error_rate_429,
+        retry_after=args.retry_after,
+        timeout_rate=args.timeout_rate,
+        timeout_delay=args.timeout_delay,
+        enforce_chat_limit=args.enforce_chat_limit,
+        seed=args.seed
+    )
+    server = FakeTelegramServer(config)
+    logger.info(f"🧪 Serveur Telegram simulé: TELEGRAM_API_BASE_URL=http://{args.host}:{args.port}/bot")
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+import statistics
+from contextlib import ExitStack
+
+from tests.fake_openai_server import FakeOpenAIConfig, run_fake_openai_server
+from tests.fake_telegram_server import FakeTelegramConfig, run_fake_telegram_server
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('load_test_pipeline')
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+DEFAULT_SUBJECTS = [
+    "Les politiciens",
+    "Les développeurs web",
+    "Les banques suisses",
+    "Les influenceurs",
+    "Les écolos en SUV",
+    "Les start-ups"
+]
+
+def percentile(values, p):
+    """Percentile p (0-100) d'une liste de durées"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_text_only(subject, quality_pipeline, openai_client, economy_mode):
+    """
+    Génération du texte seule: punchline (pipeline de qualité), hashtags et description
+    """
+    text, _ = await quality_pipeline.get_best_punchline(subject=subject, economy_mode=economy_mode)
+    await openai_client.generate_hashtags(subject, text, economy_mode)
+    await openai_client.generate_description(subject, text, economy_mode)
+    return text
+
+async def main():
+    parser = argparse.ArgumentParser(description="Test de charge de la génération de mèmes sur des serveurs simulés (sans réseau)")
+    parser.add_argument('-n', '--memes', type=int, default=6, help='Nombre de mèmes à générer')
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help='Nombre de générations simultanées')
+    parser.add_argument('-e', '--economy', action='store_true', help='Activer le mode économie de tokens')
+    parser.add_argument('--text-only', action='store_true', help='Ne pas rendre les vidéos (pipeline de qualité, hashtags et description)')
+    parser.add_argument('--telegram', action='store_true', help='Envoyer les vidéos au serveur Telegram simulé')
+    parser.add_argument('--latency', type=float, default=0.3, help='Latence moyenne des réponses OpenAI en secondes')
+    parser.add_argument('--latency-jitter', type=float, default=0.1, help='Dispersion de la latence en secondes')
+    parser.add_argument('--latency-distribution', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='lognormal',
+                        help='Distribution de la latence')
+    parser.add_argument('--error-rate-429', type=float, default=0, help="Probabilité d'une réponse 429")
+    parser.add_argument('--error-rate-500', type=float, default=0, help="Probabilité d'une erreur 500")
+    parser.add_argument('--requests-per-minute', type=int, default=0, help='Quota de requêtes par minute du serveur simulé (0: illimité)')
+    parser.add_argument('--openai-port', type=int, default=8082, help="Port du serveur OpenAI simulé")
+    parser.add_argument('--telegram-port', type=int, default=8081, help="Port du serveur Telegram simulé")
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        latency_distribution=args.latency_distribution,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        retry_after=0.2,
+        requests_per_minute=args.requests_per_minute,
+        seed=42
+    )
+
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        server, base_url = stack.enter_context(run_fake_openai_server(config, port=args.openai_port))
+        os.environ.update({
+            'OPENAI_BASE_URL': base_url,
+            'OPENAI_API_KEY': 'sk-fake',
+            'TELEGRAM_AUTO_SEND': 'true' if args.telegram else 'false',
+            'TELEGRAM_DELIVERY_MODE': 'direct'
+        })
+        if args.telegram:
+            _, telegram_url = stack.enter_context(run_fake_telegram_server(FakeTelegramConfig(), port=args.telegram_port))
+            os.environ.update({
+                'TELEGRAM_API_BASE_URL': telegram_url,
+                'TELEGRAM_BOT_TOKEN': '123456:fake-token',
+                'TELEGRAM_CHAT_ID': '100',
+                'TELEGRAM_FILE_CACHE': 'false'
+            })
+
+        from core.quality_pipeline import QualityPipeline
+        from clients.openai_client import OpenAIClient
+
+        # Base de données temporaire: l'historique réel n'est pas modifié
+        quality_pipeline = QualityPipeline(db_path=os.path.join(directory, 'quality_data.db'))
+        if args.text_only:
+            openai_client = OpenAIClient()
+            generate = lambda subject: run_text_only(subject, quality_pipeline, openai_client, args.economy)
+        else:
+            from core.meme_generator import MemeGenerator
+            generator = MemeGenerator()
+            generator.quality_pipeline = quality_pipeline
+            generate = lambda subject: generator.generate_meme(subject=subject, economy_mode=args.economy,
+                                                               send_to_telegram=args.telegram)
+
+        semaphore = asyncio.Semaphore(max(1, args.concurrency))
+        durations = []
+
+        async def run_one(i):
+            subject = DEFAULT_SUBJECTS[i % len(DEFAULT_SUBJECTS)]
+            async with semaphore:
+                start = time.time()
+                try:
+                    await generate(subject)
+                    durations.append(time.time() - start)
+                except Exception as e:
+                    logger.error(f"❌ Échec de la génération {i + 1} ({subject}): {str(e)}")
+
+        logger.info(f"🚀 {args.memes} génération(s), concurrence {args.concurrency}, "
+                    f"{'texte seul' if args.text_only else 'pipeline complète'}")
+        start = time.time()
+        await asyncio.gather(*[run_one(i) for i in range(args.memes)])
+        elapsed = time.time() - start
+        quality_pipeline.close()
+
+        stats = server.stats
+        logger.info(f"\n📊 Résultats du test de charge:")
+        logger.info(f"  - Réussites: {len(durations)}/{args.memes} en {elapsed:.2f}s "
+                    f"({len(durations) / elapsed if elapsed else 0:.2f} mème(s)/s)")
+        if durations:
+            logger.info(f"  - Durée par mème: p50={percentile(durations, 50):.2f}s, p95={percentile(durations, 95):.2f}s, "
+                        f"max={max(durations):.2f}s, moyenne={statistics.mean(durations):.2f}s")
+        logger.info(f"  - Requêtes OpenAI: {stats.requests} ({stats.completions} réponses, {stats.errors_429} 429, "
+                    f"{stats.errors_500} 500, {stats.timeouts} timeouts)")
+        logger.info(f"  - Tokens: {stats.prompt_tokens} prompt + {stats.completion_tokens} complétion")
+        logger.info(f"  - Par type: {stats.by_kind}")
+        backend = quality_pipeline.completions.stats()
+        logger.info(f"  - Requêtes regroupées (single-flight): {backend['coalesced']}/{backend['requests']} "
+                    f"({backend['calls']} appels envoyés), par type: {backend['by_type']}")
+        logger.info(f"  - Requêtes doublées: {backend['hedges']} ({backend['hedge_rate']:.1%} des appels), "
+                    f"{backend['hedge_wins']} gagnée(s) par le doublon, {backend['time_saved']:.2f}s gagnées")
+        for key, latency in backend['latency'].items():
+            logger.info(f"  - Latence {key}: p50={latency['p50']:.2f}s, p95={latency['p95']:.2f}s, "
+                        f"p99={latency['p99']:.2f}s ({latency['count']} mesures)")
+        limiter = backend['limiter']
+        logger.info(f"  - Limiteur: {backend['retries']} nouvelle(s) tentative(s), {backend['failures']} échec(s) définitif(s), "
+                    f"{limiter['rate_limited']} 429, concurrence {limiter['concurrency']} (max {limiter['peak_concurrency']}), "
+                    f"{limiter['throttled']} appel(s) retenu(s) {limiter['total_wait']:.2f}s")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Test de charge interrompu par l'utilisateur")
+        sys.exit(0)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import os
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from core.quality_pipeline import QualityPipeline
+
+# Configuration de base: toutes les options désactivées, sans appel à l'API
+BASE_ENV = {
+    'OPENAI_API_KEY': 'sk-test',
+    'OPENAI_BASE_URL': 'http://127.0.0.1:9',
+    'QUALITY_THRESHOLD': '0.7',
+    'NUM_PUNCHLINE_CANDIDATES': '3',
+    'EARLY_STOP': 'false',
+    'EARLY_STOP_WAVE_SIZE': '1',
+    'EARLY_STOP_MARGIN': '0.05',
+    'EARLY_STOP_MAX_CALLS': '0',
+    'EARLY_STOP_MAX_SECONDS': '0',
+    'HISTORY_OVERLAP_THRESHOLD': '0',
+    'USE_PREFILTER': 'false',
+    'USE_LOCAL_SCORER': 'false',
+    'NEAR_DUPLICATE_THRESHOLD': '0',
+    'GENERATION_BATCH_SIZE': '0',
+    'PUNCHLINE_POOL_SIZE': '0',
+    'ASYNC_DB_WRITES': 'false',
+    'ASYNC_STORAGE': 'false'
+}
+
+CRITERIA = ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']
+
+
+class ScriptedPipeline(QualityPipeline):
+    """
+    Pipeline de qualité dont la génération et l'évaluation suivent un scénario, sans API
+
+    Chaque appel de génération consomme la vague suivante (liste de lignes telles que
+    le modèle les écrirait, passées à parse_candidates); une vague vide ou épuisée
+    simule une réponse vide. L'évaluation donne à chaque critère le score prévu
+    pour la punchline (default_score sinon), le score global vaut donc ce score.
+    """
+
+    def __init__(self, db_path: str, waves: Optional[List[List[str]]] = None,
+                 scores: Optional[Dict[str, float]] = None, default_score: float = 0.5):
+        super().__init__(db_path)
+        self.waves = list(waves or [])
+        self.scores = scores or {}
+        self.default_score = default_score
+        self.generation_calls = 0
+        self.evaluated = []
+
+    async def _generate_candidate_punchlines(self, subject, num_candidates, economy_mode):
+        self.generation_calls += 1
+        wave = self.waves.pop(0) if self.waves else []
+        return self.parse_candidates(subject, '\n'.join(wave))[:num_candidates]
+
+    async def _evaluate_punchline(self, subject, punchline):
+        self.evaluated.append(punchline)
+        score = self.scores.get(punchline, self.default_score)
+        return {criterion: score for criterion in CRITERIA}
+
+
+def create_pipeline(db_path: str, waves=None, scores=None, default_score: float = 0.5, **env) -> ScriptedPipeline:
+    """
+    Crée une pipeline scénarisée avec la configuration de base, modifiée par env
+
+    Args:
+        db_path: Base de données de la pipeline
+        waves: Vagues de génération successives
+        scores: Score de chaque punchline
+        default_score: Score des punchlines sans score prévu
+        env: Variables d'environnement à modifier (ex: EARLY_STOP='true')
+    """
+    with patch.dict(os.environ, {**BASE_ENV, **{key: str(value) for key, value in env.items()}}):
+        return ScriptedPipeline(db_path, waves, scores, default_score)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import asyncio
+import logging
+import sqlite3
+import tempfile
+import traceback
+
+from core.bulk_job import BulkJob
+from tests.scripted_pipeline import create_pipeline
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_bulk_job')
+
+
+def read_requests(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_results(path, contents):
+    """Écrit un fichier de résultats au format du fournisseur (contenu None: requête en échec)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for custom_id, content in contents.items():
+            if content is None:
+                response = {'status_code': 500, 'body': {'error': {'message': 'server_error'}}}
+            else:
+                response = {'status_code': 200, 'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}}
+            f.write(json.dumps({'custom_id': custom_id, 'response': response, 'error': None}) + '\n')
+
+
+def scores(value):
+    return json.dumps({criterion: value for criterion in ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']})
+
+
+def test_job_state_machine():
+    """Le travail avance génération -> évaluation -> terminé, sans valeur par défaut pour les requêtes en échec"""
+    with tempfile.TemporaryDirectory() as directory:
+        job_dir = os.path.join(directory, 'job')
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'))
+        job = BulkJob(job_dir, pipeline)
+        assert not job.exists()
+
+        job.prepare(['Les banquiers', 'Les ministres', 'Les influenceurs'])
+        assert job.stage == 'generation'
+        generation = {r['custom_id']: r for r in read_requests(job.requests_path('generation'))}
+        assert len(generation) == 3
+
+        # Sans fichier de résultats, le travail attend (et peut être repris par un autre processus)
+        assert asyncio.run(job.advance()) is None
+        job = BulkJob(job_dir, pipeline)
+        assert job.stage == 'generation'
+
+        # Un sujet en échec, un sujet dont la réponse est vide
+        write_results(job.results_path('generation'), {
+            'gen-00000': "Quand les banquiers prêchent la rigueur, mais leurs bonus explosent\n"
+                         "Quand les banquiers parlent d'éthique entre deux paradis fiscaux",
+            'gen-00001': None,
+            'gen-00002': ''
+        })
+        assert asyncio.run(job.advance()) is None
+        assert job.stage == 'evaluation'
+        assert job.state['failed']['generation'] == ['Les ministres', 'Les influenceurs']
+
+        # Aucune punchline de repli n'est soumise à l'évaluation
+        evaluation = read_requests(job.requests_path('evaluation'))
+        assert len(evaluation) == 2
+        assert all('exactement l\'inverse' not in r['body']['messages'][1]['content'] for r in evaluation)
+
+        # Une évaluation en échec: la candidate est écartée, pas notée 0.5
+        write_results(job.results_path('evaluation'), {'eval-00000': None, 'eval-00001': scores(8)})
+        selections = asyncio.run(BulkJob(job_dir, pipeline).advance())
+        job = BulkJob(job_dir, pipeline)
+        assert job.stage == 'done'
+        assert [s['subject'] for s in selections] == ['Les banquiers']
+        assert selections[0]['text'] == "Quand les banquiers parlent d'éthique entre deux paradis fiscaux"
+        assert selections[0]['overall_score'] == 0.8
+        assert [f['custom_id'] for f in job.state['failed']['evaluation']] == ['eval-00000']
+
+        # Seule la punchline évaluée est enregistrée
+        conn = sqlite3.connect(pipeline.db_path)
+        rows = conn.execute("SELECT text, selected FROM punchlines").fetchall()
+        conn.close()
+        assert rows == [("Quand les banquiers parlent d'éthique entre deux paradis fiscaux", 1)]
+
+        # Rendu: chaque sujet n'est rendu qu'une fois, même après une reprise
+        assert len(job.pending_renders()) == 1
+        job.mark_rendered('Les banquiers')
+        assert BulkJob(job_dir, pipeline).pending_renders() == []
+
+
+def test_no_evaluation_requests():
+    """Toutes les générations en échec: le travail se termine sans fichier d'évaluation"""
+    with tempfile.TemporaryDirectory() as directory:
+        job_dir = os.path.join(directory, 'job')
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'))
+        job = BulkJob(job_dir, pipeline)
+        job.prepare(['Les banquiers'])
+        write_results(job.results_path('generation'), {'gen-00000': None})
+
+        assert asyncio.run(job.advance()) == []
+        assert job.stage == 'done'
+        assert not os.path.exists(job.requests_path('evaluation'))
+
+
+def main():
+    tests = [test_job_state_machine, test_no_evaluation_requests]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
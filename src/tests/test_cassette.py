@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import traceback
+from unittest.mock import patch
+
+import httpx
+from telegram import Bot, InputMediaVideo
+from telegram.request import HTTPXRequest
+
+from clients import cassette as cassette_module
+from clients.cassette import Cassette, CassetteMiss, CassetteTransport, CassetteRequest, get_cassette
+from tests.fake_openai_server import run_fake_openai_server, FakeOpenAIConfig
+from tests.fake_telegram_server import run_fake_telegram_server, FakeTelegramConfig
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_cassette')
+
+# Cassette enregistrée une fois contre le serveur simulé et rejouée sur la CI (voir --record)
+CI_CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'ci')
+CI_SUBJECT = "Les banques suisses"
+CI_EXPECTED = {
+    'punchline': "Quand Les banques suisses parle d'avenir, mais vit encore sur ses privilèges d'hier.",
+    'hashtags': ['#LARROGANCE', '#Lesbanquessuisses', '#hypocrisie', '#satire', '#RealityCheck', '#OnVousVoit'],
+    'description': "Les banques suisses: les donneurs de leçons ont encore frappé. Qui osera encore y croire après ça ?"
+}
+BOT_TOKEN = '123456:TEST'
+COMPLETION = {'model': 'gpt-3.5-turbo', 'messages': [{'role': 'user', 'content': 'Dis OK'}], 'max_tokens': 5}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def post_completion(transport):
+    with httpx.Client(transport=transport, base_url='http://127.0.0.1:9/v1') as client:
+        return client.post('/chat/completions', json=COMPLETION, headers={'Authorization': 'Bearer sk-secret'})
+
+
+def test_openai_record_then_replay_in_order():
+    """Les requêtes identiques sont rejouées dans l'ordre d'enregistrement, puis la dernière est resservie"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'openai.jsonl')
+        port = free_port()
+        with run_fake_openai_server(FakeOpenAIConfig(latency=0.01, latency_jitter=0, seed=1), port=port) as (server, base_url):
+            recorder = Cassette(path, 'record')
+            transport = CassetteTransport(recorder)
+            with httpx.Client(transport=transport, base_url=base_url) as client:
+                recorded = [client.post('/chat/completions', json=COMPLETION, headers={'Authorization': 'Bearer sk-secret'}).json()['id']
+                            for _ in range(2)]
+            assert server.stats.requests == 2 and recorder.recorded == 2
+
+        # Ni la clé API ni l'hôte ne sont enregistrés
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert 'sk-secret' not in content and '127.0.0.1' not in content
+
+        replayer = Cassette(path, 'replay', latency='none')
+        replayed = [post_completion(CassetteTransport(replayer)).json()['id'] for _ in range(3)]
+        assert replayed == recorded + recorded[-1:]
+        assert replayer.replayed == 3
+
+
+def test_missing_request_raises_cassette_miss():
+    """Une requête jamais enregistrée échoue avec CassetteMiss, sans accès réseau"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'openai.jsonl')
+        open(path, 'w').close()
+        replayer = Cassette(path, 'replay', latency='none')
+        try:
+            post_completion(CassetteTransport(replayer))
+            assert False, "CassetteMiss attendue"
+        except CassetteMiss:
+            pass
+        assert replayer.replayed == 0
+
+
+def test_telegram_attachments_renamed():
+    """Les pièces jointes attach:// aléatoires et le contenu des fichiers ne font pas partie de la clé"""
+    async def send(request, base_url, videos):
+        bot = Bot(token=BOT_TOKEN, request=request, base_url=base_url)
+        async with bot:
+            messages = await bot.send_media_group('-100123', [InputMediaVideo(video) for video in videos])
+        return [message.message_id for message in messages]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'telegram.jsonl')
+        port = free_port()
+        with run_fake_telegram_server(FakeTelegramConfig(latency=0, latency_jitter=0), port=port) as (server, base_url):
+            recorder = Cassette(path, 'record')
+            recorded = asyncio.run(send(CassetteRequest(recorder, HTTPXRequest()), base_url, [b'video-a', b'video-b']))
+            assert server.stats.by_method == {'getMe': 1, 'sendMediaGroup': 1}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        send_group = entries[-1]['request']
+        assert send_group['method'] == 'sendMediaGroup'
+        assert send_group['files'] == ['file0', 'file1']
+        assert [item['media'] for item in json.loads(send_group['parameters']['media'])] == ['attach://file0', 'attach://file1']
+        assert BOT_TOKEN not in json.dumps(entries)
+
+        # Autres octets, autres noms de pièces jointes, pas de serveur: même réponse
+        replayer = Cassette(path, 'replay', latency='none')
+        replayed = asyncio.run(send(CassetteRequest(replayer, HTTPXRequest()), 'http://127.0.0.1:9/bot', [b'autre-a', b'autre-b']))
+        assert replayed == recorded
+        assert replayer.replayed == 2
+
+
+def test_latency_none_replays_instantly():
+    """CASSETTE_LATENCY=none ignore les latences enregistrées; 'original' les respecte"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'openai.jsonl')
+        recorder = Cassette(path, 'record')
+        request = CassetteTransport._normalize(httpx.Request('POST', 'http://127.0.0.1:9/v1/chat/completions', json=COMPLETION))
+        recorder.record(recorder.request_key(request), request, {'status': 200, 'headers': {}, 'body': '{}'}, latency=5.0)
+
+        env = {'CASSETTE_MODE': 'replay', 'CASSETTE_DIR': directory, 'CASSETTE_LATENCY': 'none'}
+        with patch.dict(os.environ, env), patch.dict(cassette_module._cassettes, clear=True):
+            replayer = get_cassette('openai')
+            assert replayer.latency_factor == 0.0
+            start = time.monotonic()
+            assert post_completion(CassetteTransport(replayer)).status_code == 200
+            assert time.monotonic() - start < 1.0
+
+        assert Cassette(path, 'replay', latency='original').replay_delay({'latency': 5.0}) == 5.0
+        assert Cassette(path, 'replay', latency='0.5').replay_delay({'latency': 5.0}) == 2.5
+
+
+async def run_ci_flow():
+    """Génération d'une punchline, de ses hashtags et de sa description avec le client OpenAI du projet"""
+    from clients.openai_client import OpenAIClient
+    client = OpenAIClient()
+    punchline = await client.generate_punchline(subject=CI_SUBJECT, economy_mode=True)
+    hashtags = await client.generate_hashtags(CI_SUBJECT, punchline, economy_mode=True)
+    description = await client.generate_description(CI_SUBJECT, punchline, economy_mode=True)
+    return {'punchline': punchline, 'hashtags': hashtags, 'description': description}
+
+
+def ci_environment(mode, base_url):
+    return {
+        'CASSETTE_MODE': mode,
+        'CASSETTE_DIR': CI_CASSETTE_DIR,
+        'CASSETTE_LATENCY': 'none',
+        # Clé propre à ce test: le point d'accès partagé est créé avec la cassette
+        'OPENAI_API_KEY': f'sk-cassette-ci-{mode}',
+        'OPENAI_BASE_URL': base_url,
+        'OPENAI_HEDGE_CALL_TYPES': '',
+        'ECONOMY_MODE': 'true'
+    }
+
+
+def test_replay_committed_cassette():
+    """La cassette versionnée (tests/cassettes/ci) rejoue le client OpenAI sans réseau ni clé"""
+    env = ci_environment('replay', 'http://127.0.0.1:9/v1')
+    with patch.dict(os.environ, env), patch.dict(cassette_module._cassettes, clear=True):
+        result = asyncio.run(run_ci_flow())
+        assert get_cassette('openai').replayed == 3
+    assert result == CI_EXPECTED, result
+
+
+def record_ci_cassette():
+    """Réenregistre la cassette versionnée contre le serveur OpenAI simulé (à lancer après un changement de prompt)"""
+    port = free_port()
+    config = FakeOpenAIConfig(latency=0.05, latency_jitter=0, seed=42)
+    with run_fake_openai_server(config, port=port) as (server, base_url):
+        with patch.dict(os.environ, ci_environment('record', base_url)), patch.dict(cassette_module._cassettes, clear=True):
+            result = asyncio.run(run_ci_flow())
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"📼 Cassette enregistrée dans {CI_CASSETTE_DIR}: mettre à jour CI_EXPECTED si les réponses ont changé")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tests de l'enregistrement et du rejeu des cassettes")
+    parser.add_argument('--record', action='store_true', help='Réenregistrer la cassette de tests/cassettes/ci')
+    args = parser.parse_args()
+    if args.record:
+        record_ci_cassette()
+        return
+
+    tests = [
+        test_openai_record_then_replay_in_order,
+        test_missing_request_raises_cassette_miss,
+        test_telegram_attachments_renamed,
+        test_latency_none_replays_instantly,
+        test_replay_committed_cassette
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from clients import completion_backend
+from clients.completion_backend import CompletionBackend
+from clients.openai_rate_limiter import OpenAIRateLimiter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_completion_backend')
+
+
+class BlockingClient:
+    """Client OpenAI simulé: chaque appel attend que le test le libère"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=self))
+
+    def create(self, **request):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        if self.error:
+            raise self.error
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"réponse {self.calls}"))])
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+class ScriptedClient:
+    """Client OpenAI simulé: chaque appel consomme le prochain résultat (exception levée ou en-têtes de la réponse)"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=self))
+
+    def create(self, **request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="OK"))])
+        return SimpleNamespace(headers=outcome, parse=lambda: response)
+
+
+class TimedClient:
+    """Client OpenAI simulé: chaque appel dure le délai prévu puis lève l'erreur ou répond le texte prévu"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=self))
+
+    def create(self, **request):
+        with self._lock:
+            self.calls += 1
+            delay, outcome = self.script.pop(0)
+        time.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))])
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+def hedging_backend(script, samples=200, latency=0.05, **options):
+    """Point d'accès qui double les évaluations, avec des latences déjà mesurées (p95 = latency)"""
+    client = TimedClient(script)
+    options = {'hedge_call_types': ['evaluation'], 'hedge_budget': 1.0, 'max_retries': 0, **options}
+    backend = CompletionBackend(client, **options)
+    for _ in range(samples):
+        backend.latencies.record(('gpt-3.5-turbo', 'evaluation'), latency)
+    return client, backend
+
+
+def evaluate(backend):
+    return backend.create(call_type='evaluation', coalesce=False, **REQUEST)
+
+
+def api_error(status, headers=None, code=None):
+    """Erreur de l'API telle que la lève le SDK"""
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request('POST', 'http://127.0.0.1:9/v1/chat/completions'))
+    body = {'message': f'erreur {status}', 'type': code or 'error', 'code': code}
+    classes = {400: openai.BadRequestError, 401: openai.AuthenticationError, 429: openai.RateLimitError,
+               500: openai.InternalServerError}
+    return classes.get(status, openai.APIStatusError)(f'erreur {status}', response=response, body=body)
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request('POST', 'http://127.0.0.1:9/v1/chat/completions'))
+
+
+def execute(outcomes, max_retries=3, limiter=None):
+    """Exécute une requête sans attente réelle; retourne le client, le point d'accès, les délais et l'erreur levée"""
+    client = ScriptedClient(outcomes)
+    backend = CompletionBackend(client, max_retries=max_retries, limiter=limiter or OpenAIRateLimiter(),
+                                retry_base_delay=0.5, retry_max_delay=20)
+    delays, error = [], None
+    # Gigue nulle: le délai est le minimum possible (retry-after éventuel)
+    with patch.object(completion_backend.time, 'sleep', side_effect=delays.append), \
+            patch.object(completion_backend.random, 'uniform', side_effect=lambda low, high: high):
+        try:
+            backend._execute(('gpt-3.5-turbo', 'evaluation'), REQUEST)
+        except Exception as e:
+            error = e
+    return client, backend, delays, error
+
+
+REQUEST = {'model': 'gpt-3.5-turbo', 'messages': [{'role': 'user', 'content': 'Évalue'}], 'temperature': 0.3}
+
+
+async def wait_started(client):
+    await asyncio.get_running_loop().run_in_executor(None, client.started.wait, 5)
+
+
+def test_identical_requests_coalesced():
+    """Les requêtes identiques en cours partagent un seul appel, pas les requêtes créatives"""
+    async def scenario():
+        client = BlockingClient()
+        backend = CompletionBackend(client, max_retries=0)
+        leader = asyncio.create_task(backend.create(call_type='evaluation', **REQUEST))
+        await wait_started(client)
+        followers = [asyncio.create_task(backend.create(call_type='evaluation', **REQUEST)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        client.release.set()
+        responses = await asyncio.gather(leader, *followers)
+
+        assert client.calls == 1
+        assert backend.coalesced == 2 and backend.calls == 1 and backend.requests == 3
+        assert len({id(response) for response in responses}) == 1
+        assert backend._inflight == {}
+
+        # Au-delà de coalesce_max_temperature, chaque demandeur a sa propre réponse
+        await asyncio.gather(*[backend.create(call_type='generation', **dict(REQUEST, temperature=0.9)) for _ in range(2)])
+        assert client.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    """L'annulation du premier demandeur n'interrompt pas la requête des suivants"""
+    async def scenario():
+        client = BlockingClient()
+        backend = CompletionBackend(client, max_retries=0)
+        leader = asyncio.create_task(backend.create(**REQUEST))
+        await wait_started(client)
+        follower = asyncio.create_task(backend.create(**REQUEST))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        assert leader.cancelled() and not follower.done()
+
+        client.release.set()
+        response = await asyncio.wait_for(follower, timeout=5)
+        assert response.choices[0].message.content == "réponse 1"
+        assert client.calls == 1
+        assert backend._inflight == {} and not backend._leaders
+
+    asyncio.run(scenario())
+
+
+def test_leader_error_shared():
+    """L'erreur de la requête est remontée à tous les demandeurs, la requête suivante repart vers l'API"""
+    async def scenario():
+        client = BlockingClient(error=ValueError("réponse invalide"))
+        backend = CompletionBackend(client, max_retries=0)
+        leader = asyncio.create_task(backend.create(**REQUEST))
+        await wait_started(client)
+        follower = asyncio.create_task(backend.create(**REQUEST))
+        await asyncio.sleep(0.01)
+        client.release.set()
+
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert backend._inflight == {}
+
+        client.error = None
+        await backend.create(**REQUEST)
+        assert client.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_retryable_errors_retried():
+    """429, erreurs serveur et erreurs de connexion sont retentés avec un délai exponentiel"""
+    client, backend, delays, error = execute([api_error(500), connection_error(), api_error(408), {}])
+    assert error is None
+    assert client.calls == 4 and backend.retries == 3 and backend.failures == 0
+    assert delays == [0.5, 1.0, 2.0]
+
+
+def test_retry_waits_at_least_retry_after():
+    """Le délai avant une nouvelle tentative est au moins le retry-after de l'API (en-têtes ms ou s)"""
+    with patch.object(completion_backend.random, 'uniform', return_value=0.0):
+        client = ScriptedClient([api_error(429, {'retry-after': '0.3'}), api_error(429, {'retry-after-ms': '200'}), {}])
+        backend = CompletionBackend(client, max_retries=3)
+        delays = []
+        with patch.object(completion_backend.time, 'sleep', side_effect=delays.append):
+            backend._execute(('gpt-3.5-turbo', 'evaluation'), REQUEST)
+    assert delays == [0.3, 0.2]
+    assert backend.limiter.rate_limited == 2
+
+
+def test_rate_limit_burst_halves_limit_once():
+    """Une rafale de 429 divise la concurrence par deux une seule fois, et met l'API au repos"""
+    limiter = OpenAIRateLimiter(initial_concurrency=8)
+    client, backend, delays, error = execute([api_error(429), api_error(429), api_error(429), {}], limiter=limiter)
+    assert error is None and client.calls == 4
+    assert limiter.limit == 4 + 1 / 4
+    assert limiter.in_flight == 0
+
+
+def test_retries_exhausted():
+    """Après la dernière tentative, l'erreur est remontée et comptée"""
+    client, backend, delays, error = execute([api_error(503)] * 3, max_retries=2)
+    assert isinstance(error, openai.APIStatusError) and error.status_code == 503
+    assert client.calls == 3 and backend.retries == 2 and backend.failures == 1
+
+
+def test_client_errors_not_retried():
+    """400, 401 et un quota épuisé (429 insufficient_quota) ne sont jamais retentés"""
+    for outcome in (api_error(400), api_error(401), api_error(429, code='insufficient_quota')):
+        limiter = OpenAIRateLimiter(initial_concurrency=8)
+        client, backend, delays, error = execute([outcome, {}], limiter=limiter)
+        assert error is outcome
+        assert client.calls == 1 and backend.retries == 0 and delays == []
+        # Ni succès ni limite de débit (quota épuisé compris): la concurrence est conservée
+        assert limiter.limit == 8 and limiter.rate_limited == 0
+
+
+def test_no_hedge_below_min_samples():
+    """Sans assez de latences mesurées, une requête lente n'est pas doublée"""
+    client, backend = hedging_backend([(0.3, "initiale"), (0, "doublon")], samples=19)
+    response = asyncio.run(evaluate(backend))
+    assert response.choices[0].message.content == "initiale"
+    assert client.calls == 1 and backend.hedges == 0
+
+
+def test_hedge_after_percentile_first_success_wins():
+    """Une requête plus lente que le p95 est doublée; la première réponse est retenue et le temps gagné mesuré"""
+    async def scenario():
+        client, backend = hedging_backend([(0.6, "initiale"), (0, "doublon")])
+        start = time.monotonic()
+        response = await evaluate(backend)
+        elapsed = time.monotonic() - start
+        assert response.choices[0].message.content == "doublon"
+        assert 0.05 <= elapsed < 0.4
+        assert client.calls == 2 and backend.hedges == 1 and backend.hedge_wins == 1
+
+        # Le temps gagné est compté quand la requête initiale finit
+        assert backend.time_saved == 0
+        await asyncio.sleep(0.8)
+        assert 0.3 < backend.time_saved < 0.6
+
+    asyncio.run(scenario())
+
+
+def test_primary_error_ignored_when_hedge_succeeds():
+    """L'échec de la requête initiale est ignoré si le doublon réussit"""
+    client, backend = hedging_backend([(0.15, api_error(500)), (0.3, "doublon")])
+    response = asyncio.run(evaluate(backend))
+    assert response.choices[0].message.content == "doublon"
+    assert backend.hedge_wins == 1 and backend.time_saved == 0
+
+    # Si les deux échouent, l'erreur de la requête initiale est remontée
+    client, backend = hedging_backend([(0.15, api_error(500)), (0.2, api_error(503))])
+    try:
+        asyncio.run(evaluate(backend))
+        assert False, "erreur attendue"
+    except openai.APIStatusError as e:
+        assert e.status_code == 500
+
+
+def test_hedge_budget_cap():
+    """Les doublons restent sous hedge_budget * calls, et aucun n'est lancé quand le limiteur est saturé"""
+    async def scenario(backend, count):
+        for _ in range(count):
+            await evaluate(backend)
+
+    # Budget de 50%: un appel sur deux peut être doublé (le premier ne l'est pas)
+    script = ([(0.12, "initiale")] + [(0.12, "initiale"), (0, "doublon")]) * 3
+    client, backend = hedging_backend(script, hedge_budget=0.5)
+    asyncio.run(scenario(backend, 6))
+    assert backend.calls == 6 and backend.hedges == 3
+    assert backend.hedges <= backend.hedge_budget * backend.calls
+
+    client, backend = hedging_backend([(0.15, "initiale"), (0, "doublon")], limiter=OpenAIRateLimiter(initial_concurrency=1))
+    response = asyncio.run(evaluate(backend))
+    assert response.choices[0].message.content == "initiale"
+    assert client.calls == 1 and backend.hedges == 0
+
+
+def main():
+    tests = [
+        test_identical_requests_coalesced,
+        test_cancelled_leader_does_not_cancel_followers,
+        test_leader_error_shared,
+        test_retryable_errors_retried,
+        test_retry_waits_at_least_retry_after,
+        test_rate_limit_burst_halves_limit_once,
+        test_retries_exhausted,
+        test_client_errors_not_retried,
+        test_no_hedge_below_min_samples,
+        test_hedge_after_percentile_first_success_wins,
+        test_primary_error_ignored_when_hedge_succeeds,
+        test_hedge_budget_cap
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
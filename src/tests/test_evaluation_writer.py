@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import logging
+import tempfile
+import threading
+import traceback
+
+from core.evaluation_writer import EvaluationWriter, get_evaluation_writer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_evaluation_writer')
+
+
+def create_database(directory):
+    path = os.path.join(directory, 'quality.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE punchlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        evaluation TEXT,
+        overall_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        selected INTEGER DEFAULT 0
+    )
+    ''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT text, selected FROM punchlines").fetchall())
+    finally:
+        conn.close()
+
+
+class StalledWriter(EvaluationWriter):
+    """Writer dont le thread attend un signal avant de lire sa file"""
+
+    def __init__(self, *args, **kwargs):
+        self.resume = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _loop(self):
+        self.resume.wait(10)
+        super()._loop()
+
+
+class BrokenWriter(EvaluationWriter):
+    """Writer dont le thread s'arrête sur une erreur"""
+
+    def _loop(self):
+        raise sqlite3.OperationalError("unable to open database file")
+
+
+def test_full_queue_writes_directly():
+    """Une file pleine ne bloque pas l'appelant: l'opération est écrite directement"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = StalledWriter(path, max_queue_size=1, flush_interval=0.05)
+        try:
+            writer.store_evaluation("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+            writer.store_evaluation("Quand B", "Sujet", {"overall": 0.6}, 0.6)
+            assert rows(path) == {"Quand B": 0}
+            assert writer.direct_writes == 1
+
+            writer.resume.set()
+            assert writer.flush(timeout=5)
+            assert rows(path) == {"Quand A": 0, "Quand B": 0}
+        finally:
+            writer.resume.set()
+            writer.close()
+
+
+def test_selection_before_queued_insert():
+    """Une sélection écrite directement s'applique quand l'insertion encore en file est écrite"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = StalledWriter(path, max_queue_size=1, flush_interval=0.05)
+        try:
+            writer.store_evaluation("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+            writer.mark_as_selected("Quand A")
+            assert rows(path) == {}
+
+            writer.resume.set()
+            assert writer.flush(timeout=5)
+            assert rows(path) == {"Quand A": 1}
+        finally:
+            writer.resume.set()
+            writer.close()
+
+
+def test_dead_thread_is_reported():
+    """Si le thread d'écriture meurt, les écritures sont directes et flush() le signale"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = BrokenWriter(path)
+        writer._thread.join(5)
+        try:
+            writer.store_evaluation("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+            writer.mark_as_selected("Quand A")
+            assert rows(path) == {"Quand A": 1}
+            assert writer.failure is not None
+            assert writer.flush(timeout=1) is False
+        finally:
+            writer.close()
+
+
+def test_full_queue_awaits_without_blocking_loop():
+    """Depuis la boucle, une file pleine ralentit l'appelant sans bloquer la boucle ni écrire directement"""
+    async def scenario(writer):
+        await writer.store_evaluation_async("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+        pending = asyncio.create_task(writer.store_evaluation_async("Quand B", "Sujet", {"overall": 0.6}, 0.6))
+
+        # La boucle continue de tourner pendant que l'appelant attend une place
+        ticks = 0
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks == 10 and not pending.done()
+
+        writer.resume.set()
+        await asyncio.wait_for(pending, timeout=5)
+        await writer.mark_as_selected_async("Quand B")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = StalledWriter(path, max_queue_size=1, flush_interval=0.05)
+        try:
+            asyncio.run(scenario(writer))
+            assert writer.flush(timeout=5)
+            assert rows(path) == {"Quand A": 0, "Quand B": 1}
+            assert writer.direct_writes == 0
+        finally:
+            writer.resume.set()
+            writer.close()
+
+
+def test_dead_thread_writes_off_loop():
+    """Si le thread d'écriture est mort, l'écriture directe est faite hors du thread de la boucle"""
+    threads = []
+
+    class RecordingWriter(BrokenWriter):
+        def _write_now(self, operations):
+            threads.append(threading.current_thread())
+            return super()._write_now(operations)
+
+    async def scenario(writer):
+        await writer.store_evaluation_async("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+        await writer.mark_as_selected_async("Quand A")
+        return threading.current_thread()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = RecordingWriter(path)
+        writer._thread.join(5)
+        try:
+            loop_thread = asyncio.run(scenario(writer))
+            assert rows(path) == {"Quand A": 1}
+            assert len(threads) == 2 and loop_thread not in threads
+        finally:
+            writer.close()
+
+
+def test_late_selections_bounded():
+    """Les sélections dont la punchline n'est jamais insérée sont oubliées (taille de la file, délai)"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        writer = BrokenWriter(path, max_queue_size=3, late_selection_ttl=60)
+        writer._thread.join(5)
+        try:
+            for i in range(10):
+                writer.mark_as_selected(f"Quand {i}")
+            assert list(writer._late_selections) == ["Quand 7", "Quand 8", "Quand 9"]
+
+            writer.late_selection_ttl = 0
+            time.sleep(0.01)
+            writer.mark_as_selected("Quand 10")
+            assert list(writer._late_selections) == ["Quand 10"]
+        finally:
+            writer.close()
+
+
+def test_shared_writer_per_database():
+    """Un seul writer par base; il est arrêté par son dernier utilisateur"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        first = get_evaluation_writer(path, flush_interval=0.05)
+        second = get_evaluation_writer(os.path.join(directory, '.', 'quality.db'))
+        assert first is second
+
+        first.store_evaluation("Quand A", "Sujet", {"overall": 0.5}, 0.5)
+        first.release()
+        assert not second.closed
+        second.release()
+        assert second.closed
+        assert rows(path) == {"Quand A": 0}
+
+        third = get_evaluation_writer(path)
+        assert third is not first
+        third.release()
+
+
+def main():
+    tests = [
+        test_full_queue_writes_directly,
+        test_selection_before_queued_insert,
+        test_dead_thread_is_reported,
+        test_full_queue_awaits_without_blocking_loop,
+        test_dead_thread_writes_off_loop,
+        test_late_selections_bounded,
+        test_shared_writer_per_database
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
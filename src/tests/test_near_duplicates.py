@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+import traceback
+
+import numpy as np
+
+from models.punchline_minhash import PunchlineMinHashIndex
+from tests.scripted_pipeline import create_pipeline, CRITERIA
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_near_duplicates')
+
+SUBJECT = "Les banquiers"
+HISTORY = "Quand les banquiers prêchent la rigueur, mais se votent des bonus."
+VARIANT = "Quand les banquiers prêchent la rigueur, mais se votent des bonus énormes."
+CLOSER = "Quand les banquiers prêchent la rigueur, mais se votent des bonus!"
+NEW = "Quand les syndicats défendent l'emploi, mais bloquent toutes les usines."
+
+
+def texts(count):
+    return [(i + 1, f"Quand le ministre numéro {i} promet la rigueur, mais vote ses primes") for i in range(count)]
+
+
+def test_merge_matches_full_sort():
+    """Les fusions successives donnent les mêmes bandes triées qu'un tri complet"""
+    index = PunchlineMinHashIndex('/nonexistent.db', '/nonexistent.npz', merge_threshold=7)
+    rows = texts(100)
+    for row in rows:
+        index.add([row])
+    index._merge_pending()
+
+    keys = np.ascontiguousarray(index.band_keys.T)
+    expected = np.argsort(keys, axis=1, kind='stable')
+    assert np.array_equal(index._sorted_rows, expected)
+    assert np.array_equal(index._sorted_keys, np.take_along_axis(keys, expected, axis=1))
+    for row_id, text in rows[::9]:
+        assert index.query(text, 0.99, limit=1) == [(row_id, 1.0)]
+
+
+def test_add_does_not_copy_index():
+    """Un ajout écrit dans les tableaux existants tant que leur capacité le permet"""
+    index = PunchlineMinHashIndex('/nonexistent.db', '/nonexistent.npz')
+    index.add(texts(10))
+    buffer = index._signatures
+    index.add([(11, "Quand les licornes votent, mais personne ne les voit")])
+    assert index._signatures is buffer
+    assert len(index) == 11 and index.last_id == 11
+
+    index.add(texts(2000))
+    assert len(index._ids) >= 2011 and len(index) == 2011
+
+
+def test_save_and_load():
+    """Un index rechargé retrouve ses punchlines et accepte de nouveaux ajouts"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index.npz')
+        index = PunchlineMinHashIndex('/nonexistent.db', path)
+        index.add(texts(50))
+        index.save()
+
+        loaded = PunchlineMinHashIndex('/nonexistent.db', path)
+        assert loaded.load()
+        assert len(loaded) == 50 and loaded.last_id == 50
+        loaded.add([(51, NEW)])
+        assert loaded.query(NEW, 0.99, limit=1) == [(51, 1.0)]
+        assert loaded.query(texts(50)[20][1], 0.99, limit=1) == [(21, 1.0)]
+
+
+def run_pipeline(directory, waves, history):
+    pipeline = create_pipeline(
+        os.path.join(directory, 'quality.db'), waves,
+        NEAR_DUPLICATE_THRESHOLD='0.7',
+        NEAR_DUPLICATE_INDEX=os.path.join(directory, 'index.npz'),
+        NUM_PUNCHLINE_CANDIDATES='2'
+    )
+    try:
+        for text in history:
+            pipeline._store_evaluation(text, SUBJECT, {c: 0.5 for c in CRITERIA}, 0.5)
+        evaluated = asyncio.run(pipeline.generate_and_evaluate_punchlines(SUBJECT))
+    finally:
+        pipeline.close()
+    return evaluated, pipeline
+
+
+def test_all_near_duplicates_regenerates():
+    """Quand toutes les candidates sont des quasi-doublons, une nouvelle génération est faite"""
+    with tempfile.TemporaryDirectory() as directory:
+        evaluated, pipeline = run_pipeline(directory, [[VARIANT, CLOSER], [NEW]], [HISTORY])
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == [NEW]
+    assert [p['text'] for p in evaluated] == [NEW]
+
+
+def test_keep_all_prefers_least_similar():
+    """Si la nouvelle génération ne donne que des quasi-doublons, les moins semblables passent en premier"""
+    with tempfile.TemporaryDirectory() as directory:
+        evaluated, pipeline = run_pipeline(directory, [[CLOSER], [VARIANT]], [HISTORY])
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == [VARIANT, CLOSER]
+
+
+def main():
+    tests = [
+        test_merge_matches_full_sort,
+        test_add_does_not_copy_index,
+        test_save_and_load,
+        test_all_near_duplicates_regenerates,
+        test_keep_all_prefers_least_similar
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
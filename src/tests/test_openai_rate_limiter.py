@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import sys
+import time
+import logging
+import threading
+import traceback
+
+from clients.openai_rate_limiter import OpenAIRateLimiter, parse_reset_duration
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_openai_rate_limiter')
+
+
+def acquire_in_thread(limiter):
+    """Lance acquire() dans un thread; retourne l'événement posé quand le créneau est obtenu"""
+    acquired = threading.Event()
+
+    def run():
+        limiter.acquire()
+        acquired.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return acquired
+
+
+def test_parse_reset_duration():
+    """Délais des en-têtes x-ratelimit-reset-* en secondes"""
+    assert parse_reset_duration('1s') == 1
+    assert parse_reset_duration('6m0s') == 360
+    assert parse_reset_duration('20ms') == 0.02
+    assert parse_reset_duration('1h2m3.5s') == 3723.5
+    assert parse_reset_duration('1.5') == 1.5
+    assert parse_reset_duration(None) is None
+    assert parse_reset_duration('bientôt') is None
+
+
+def test_aimd_limit():
+    """Le nombre d'appels simultanés est divisé par deux une fois par rafale de 429, et remonte lentement"""
+    limiter = OpenAIRateLimiter(initial_concurrency=8, max_concurrency=9, min_concurrency=2)
+
+    limiter.acquire()
+    limiter.release({}, rate_limited=True)
+    limiter.acquire()
+    limiter.release({}, rate_limited=True)
+    assert limiter.limit == 4
+    assert limiter.rate_limited == 2
+
+    # Rafale suivante (plus d'une seconde après la réduction)
+    limiter._last_decrease -= 2
+    limiter.acquire()
+    limiter.release({}, rate_limited=True)
+    assert limiter.limit == 2
+    limiter._last_decrease -= 2
+    limiter.acquire()
+    limiter.release({}, rate_limited=True)
+    assert limiter.limit == 2
+
+    # +1/limit par réponse réussie, plafonné
+    limiter.acquire()
+    limiter.release({})
+    assert limiter.limit == 2.5
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release({})
+    assert limiter.limit == 9
+    assert limiter.peak_limit == 9
+
+    # Une erreur sans réponse (connexion) ne change pas la limite
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 9
+
+
+def test_concurrency_limit_blocks():
+    """Au-delà de la limite, un appel attend qu'un autre libère son créneau"""
+    limiter = OpenAIRateLimiter(initial_concurrency=1, max_concurrency=4)
+    limiter.acquire()
+    acquired = acquire_in_thread(limiter)
+    assert not acquired.wait(0.1)
+
+    limiter.release()
+    assert acquired.wait(2)
+    assert limiter.in_flight == 1
+
+
+def test_request_budget_blocks_until_reset():
+    """remaining_requests=0: les appels attendent la remise à zéro annoncée"""
+    limiter = OpenAIRateLimiter(initial_concurrency=4)
+    limiter.acquire()
+    limiter.release({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '300ms',
+                     'x-ratelimit-remaining-tokens': '1000', 'x-ratelimit-reset-tokens': '1s'})
+    assert limiter.remaining_requests == 0 and limiter.remaining_tokens == 1000
+
+    start = time.monotonic()
+    acquired = acquire_in_thread(limiter)
+    assert not acquired.wait(0.15)
+    assert acquired.wait(2)
+    assert time.monotonic() - start >= 0.28
+    assert limiter.throttled == 1
+
+
+def test_token_budget_blocks_until_reset():
+    """Un appel dont l'estimation dépasse les tokens restants attend leur remise à zéro"""
+    limiter = OpenAIRateLimiter(initial_concurrency=4)
+    limiter.acquire()
+    limiter.release({'x-ratelimit-remaining-tokens': '100', 'x-ratelimit-reset-tokens': '200ms'})
+
+    start = time.monotonic()
+    limiter.acquire(tokens=50)
+    assert time.monotonic() - start < 0.1
+    assert limiter.remaining_tokens == 50
+    limiter.acquire(tokens=80)
+    assert time.monotonic() - start >= 0.18
+
+
+def test_retry_after_pauses_calls():
+    """Le retry-after d'un 429 met l'API au repos pour tous les appels"""
+    limiter = OpenAIRateLimiter(initial_concurrency=4)
+    limiter.acquire()
+    limiter.release({}, rate_limited=True, retry_after=0.2)
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.18
+
+
+def main():
+    tests = [
+        test_parse_reset_duration,
+        test_aimd_limit,
+        test_concurrency_limit_blocks,
+        test_request_budget_blocks_until_reset,
+        test_token_budget_blocks_until_reset,
+        test_retry_after_pauses_calls
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
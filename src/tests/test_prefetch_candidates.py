@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+import traceback
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from core.quality_pipeline import QualityPipeline
+from tests.scripted_pipeline import create_pipeline
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_prefetch_candidates')
+
+BATCH = {
+    "Les banquiers": [f"Quand les banquiers font {i}, mais rien" for i in range(4)],
+    "Les ministres": [f"Quand les ministres font {i}, mais rien" for i in range(3)]
+}
+API_PUNCHLINE = "Quand l'API répond, mais trop tard"
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def run_prefetch(scenario):
+    """Exécute scenario(pipeline, api) après un prefetch hors mode économie; api compte les générations individuelles"""
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'))
+        api = AsyncMock(return_value=completion(API_PUNCHLINE))
+        try:
+            with patch.object(pipeline, '_generate_candidates_batch', AsyncMock(return_value=BATCH)), \
+                    patch.object(pipeline.completions, 'create', api):
+                asyncio.run(pipeline.prefetch_candidates(list(BATCH), economy_mode=False, batch_size=2))
+                return asyncio.run(scenario(pipeline, api))
+        finally:
+            pipeline.close()
+
+
+async def generate(pipeline, subject, economy_mode, n=3):
+    # Implémentation réelle (ScriptedPipeline remplace _generate_candidate_punchlines)
+    return await QualityPipeline._generate_candidate_punchlines(pipeline, subject, n, economy_mode)
+
+
+def test_prefetched_candidates_used_in_same_mode():
+    """Les candidates du lot servent aux appels du même mode, le reste est gardé pour l'appel suivant"""
+    async def scenario(pipeline, api):
+        first = await generate(pipeline, "Les banquiers", False)
+        second = await generate(pipeline, "Les banquiers", False)
+        return first, second, api.await_count
+
+    first, second, api_calls = run_prefetch(scenario)
+    assert first == BATCH["Les banquiers"][:3]
+    assert second == BATCH["Les banquiers"][3:]
+    assert api_calls == 0
+
+
+def test_other_mode_ignores_prefetched():
+    """Un appel en mode économie ne consomme pas les candidates générées hors mode économie"""
+    async def scenario(pipeline, api):
+        economy = await generate(pipeline, "Les ministres", True)
+        normal = await generate(pipeline, "Les ministres", False)
+        return economy, normal, api.await_count
+
+    economy, normal, api_calls = run_prefetch(scenario)
+    assert economy == [API_PUNCHLINE]
+    assert api_calls == 1
+    assert normal == BATCH["Les ministres"]
+
+
+def test_clear_prefetched():
+    """Après clear_prefetched, les candidates restantes du lot ne fuient pas dans les appels suivants"""
+    async def scenario(pipeline, api):
+        await generate(pipeline, "Les banquiers", False)
+        cleared = pipeline.clear_prefetched()
+        after = await generate(pipeline, "Les banquiers", False)
+        return cleared, after, api.await_count
+
+    cleared, after, api_calls = run_prefetch(scenario)
+    assert cleared == 1 + len(BATCH["Les ministres"])
+    assert after == [API_PUNCHLINE]
+    assert api_calls == 1
+
+
+def main():
+    tests = [
+        test_prefetched_candidates_used_in_same_mode,
+        test_other_mode_ignores_prefetched,
+        test_clear_prefetched
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
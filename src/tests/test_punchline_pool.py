@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import sqlite3
+import asyncio
+import logging
+import tempfile
+import traceback
+from unittest.mock import patch
+
+from models.punchline_pool import PunchlinePool
+from tests.scripted_pipeline import create_pipeline, CRITERIA
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_punchline_pool')
+
+SUBJECT = "Les banquiers"
+WAVES = [
+    ["Quand A fait B, mais C", "Quand D fait E, mais F", "Quand G fait H, mais I"],
+    ["Quand J fait K, mais L", "Quand M fait N, mais O", "Quand P fait Q, mais R"]
+]
+
+
+def punchline(text, score):
+    return {"text": text, "evaluation": {c: score for c in CRITERIA}, "overall_score": score}
+
+
+def create_history(path, selected=()):
+    """Table punchlines de la pipeline de qualité, avec des punchlines déjà sélectionnées"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE punchlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        evaluation TEXT,
+        overall_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        selected INTEGER DEFAULT 0
+    )
+    ''')
+    conn.executemany("INSERT INTO punchlines (text, subject, selected) VALUES (?, ?, 1)", [(t, SUBJECT) for t in selected])
+    conn.commit()
+    conn.close()
+
+
+def mark_selected(path, text):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO punchlines (text, subject, selected) VALUES (?, ?, 1)", (text, SUBJECT))
+    conn.commit()
+    conn.close()
+
+
+def test_pop_best_once():
+    """Les punchlines sont servies de la meilleure à la moins bonne, une seule fois, au-dessus du score minimum"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_history(path)
+        pool = PunchlinePool(path)
+        assert pool.add(SUBJECT, [punchline("Quand A", 0.8), punchline("Quand B", 0.9), punchline("Quand C", 0.6)]) == 3
+        assert pool.add(SUBJECT, [punchline("Quand A", 0.8)]) == 0
+
+        assert pool.sizes([SUBJECT, "Autre"], 0.7) == {SUBJECT: 2, "Autre": 0}
+        assert pool.pop(SUBJECT, 0.7)["text"] == "Quand B"
+        assert pool.pop(SUBJECT, 0.7)["text"] == "Quand A"
+        assert pool.pop(SUBJECT, 0.7) is None
+
+
+def test_selected_punchlines_excluded():
+    """Une punchline déjà sélectionnée n'entre pas dans la réserve, ni n'en sort si elle l'a été depuis"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_history(path, selected=["Quand A"])
+        pool = PunchlinePool(path)
+        assert pool.add(SUBJECT, [punchline("Quand A", 0.9), punchline("Quand B", 0.8), punchline("Quand C", 0.75)]) == 2
+
+        mark_selected(path, "Quand B")
+        assert pool.sizes([SUBJECT])[SUBJECT] == 1
+        assert pool.pop(SUBJECT)["text"] == "Quand C"
+        assert pool.pop(SUBJECT) is None
+
+
+def make_pipeline(directory, waves, **env):
+    with open(os.path.join(directory, 'json.json'), 'w', encoding='utf-8') as f:
+        json.dump({"economie": [SUBJECT]}, f)
+    return create_pipeline(
+        os.path.join(directory, 'quality.db'), waves, default_score=0.9,
+        PUNCHLINE_POOL_SIZE='2', **env
+    )
+
+
+def test_refill_on_running_loop():
+    """La réserve vide est complétée par une tâche de la boucle, puis sert le sujet sans génération"""
+    with tempfile.TemporaryDirectory() as directory:
+        # PUNCHLINE_POOL_SUBJECTS vide: fichiers de sujets par défaut, à côté de la base
+        pipeline = make_pipeline(directory, [list(w) for w in WAVES], PUNCHLINE_POOL_SUBJECTS='')
+        assert pipeline.pool_subjects == {SUBJECT}
+
+        async def scenario():
+            first, _ = await pipeline.get_best_punchline(SUBJECT)
+            await pipeline.wait_for_refills()
+            calls = pipeline.generation_calls
+            second, metadata = await pipeline.get_best_punchline(SUBJECT)
+            await pipeline.aclose()
+            return first, second, calls
+
+        first, second, calls = asyncio.run(scenario())
+
+    assert first == WAVES[0][0]
+    # Génération à la demande puis remplissage (les punchlines déjà servies sont exclues)
+    assert calls == 2
+    assert second in WAVES[0][1:] + WAVES[1]
+    assert second != first
+
+
+def test_pool_error_falls_back_to_generation():
+    """Une erreur SQLite de la réserve ("database is locked") n'empêche pas la génération à la demande"""
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = make_pipeline(directory, [list(w) for w in WAVES])
+
+        async def scenario():
+            with patch.object(pipeline.pool, 'pop', side_effect=sqlite3.OperationalError("database is locked")):
+                text, _ = await pipeline.get_best_punchline(SUBJECT)
+            await pipeline.aclose()
+            return text
+
+        assert asyncio.run(scenario()) == WAVES[0][0]
+
+
+def main():
+    tests = [
+        test_pop_best_once,
+        test_selected_punchlines_excluded,
+        test_refill_on_running_loop,
+        test_pool_error_falls_back_to_generation
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
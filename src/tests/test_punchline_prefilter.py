@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+import traceback
+
+from core.punchline_prefilter import PunchlinePrefilter
+from tests.scripted_pipeline import create_pipeline
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_punchline_prefilter')
+
+SUBJECT = "Les banquiers"
+FALLBACK = f"Quand tout le monde parle de {SUBJECT}, mais lui fait exactement l'inverse."
+
+
+def test_structure_scored_on_raw_line():
+    """Avec le pré-filtre, la ligne du modèle n'est pas préfixée par "Quand": la règle de structure compte"""
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'), USE_PREFILTER='true')
+        try:
+            candidates = pipeline.parse_candidates(SUBJECT, "1. Les banquiers prêchent la rigueur, mais se votent des bonus.")
+        finally:
+            pipeline.close()
+
+    assert candidates == ["Les banquiers prêchent la rigueur, mais se votent des bonus."]
+    result = PunchlinePrefilter().score(candidates[0], SUBJECT)
+    assert result['rules']['structure'] == 0.0
+    assert result['rules']['contradiction'] == 1.0
+
+
+def test_unusable_candidates_never_kept():
+    """La conservation de repli ne reprend que les candidates écartées pour leur score"""
+    prefilter = PunchlinePrefilter(min_score=0.9)
+    low = "Quand les banquiers votent"
+    assert prefilter.filter(SUBJECT, ["", FALLBACK, low]) == [low]
+    assert prefilter.filter(SUBJECT, ["", FALLBACK]) == []
+
+    # Une candidate au-dessus du score minimum: les autres ne sont pas reprises
+    good = "Quand les banquiers prêchent la rigueur, mais se votent des bonus."
+    assert PunchlinePrefilter(min_score=0.8).filter(SUBJECT, [FALLBACK, low, good]) == [good]
+
+
+def test_fallback_not_evaluated():
+    """Une génération vide (punchline de repli) n'est jamais transmise à l'évaluation"""
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'), waves=[[]], USE_PREFILTER='true')
+        try:
+            evaluated = asyncio.run(pipeline.generate_and_evaluate_punchlines(SUBJECT))
+        finally:
+            pipeline.close()
+
+    assert evaluated == []
+    assert pipeline.evaluated == []
+
+
+def main():
+    tests = [test_structure_scored_on_raw_line, test_unusable_candidates_never_kept, test_fallback_not_evaluated]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
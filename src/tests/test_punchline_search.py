@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import os
+import sys
+import sqlite3
+import logging
+import tempfile
+import traceback
+from unittest.mock import patch
+
+from models import punchline_search
+from models.punchline_search import PunchlineSearch
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_punchline_search')
+
+
+def create_database(directory, texts):
+    path = os.path.join(directory, 'quality.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE punchlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        evaluation TEXT,
+        overall_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        selected INTEGER DEFAULT 0
+    )
+    ''')
+    conn.executemany("INSERT INTO punchlines (text, subject) VALUES (?, 'Sujet')", [(t,) for t in texts])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_overlap_outside_bm25_top():
+    """Le meilleur recouvrement est trouvé même quand BM25 le classe loin (mots fréquents, texte long)"""
+    texts = ["Quand les banquiers cachent des fortunes offshore pendant que le reste du pays compte ses centimes"]
+    texts += ["Quand zurich brille"] * 3
+    texts += [f"Quand banquiers fortunes {i}" for i in range(30)]
+    texts += [f"Quand cachent offshore {i}" for i in range(30)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        search = PunchlineSearch(create_database(directory, texts))
+        search.ensure_index()
+        punchline = "Quand les banquiers de zurich cachent des fortunes offshore"
+
+        # Avec les 3 premiers résultats BM25 seulement, la punchline la plus proche est manquée
+        assert search.find_overlap(punchline, limit=1, window=3)[0]['overlap'] == 0.2
+
+        matches = search.find_overlap(punchline, limit=1)
+        assert len(matches) == 1
+        assert matches[0]['overlap'] == 0.8
+        assert matches[0]['text'] == texts[0]
+
+
+def test_index_checked_once_per_database():
+    """L'index et ses triggers ne sont vérifiés qu'une fois par base et par processus"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory, ["Quand A fait B, mais C"])
+        assert PunchlineSearch(path).ensure_index()
+
+        with patch.object(punchline_search.sqlite3, 'connect', side_effect=AssertionError("connexion inattendue")):
+            assert PunchlineSearch(path).ensure_index()
+
+        # Les triggers tiennent l'index à jour
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO punchlines (text, subject) VALUES ('Quand les licornes votent', 'Sujet')")
+        conn.commit()
+        conn.close()
+        assert PunchlineSearch(path).search('licornes')[0]['text'] == 'Quand les licornes votent'
+
+
+def main():
+    tests = [test_overlap_outside_bm25_top, test_index_checked_once_per_database]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
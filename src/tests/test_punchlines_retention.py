@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import logging
+import tempfile
+import traceback
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from models.punchline_scores import ensure_score_index
+from utils import punchlines_retention
+from utils.punchlines_retention import apply_retention
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_punchlines_retention')
+
+OLD = '2020-03-15T10:00:00'
+RECENT = (datetime.now() - timedelta(days=1)).isoformat()
+
+
+def create_database(directory, old_rows=5):
+    """Base avec des lignes anciennes à archiver et des lignes toujours conservées"""
+    path = os.path.join(directory, 'quality.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE punchlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        evaluation TEXT,
+        overall_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        selected INTEGER DEFAULT 0
+    )
+    ''')
+    rows = [(f"Quand ancienne {i}", 0.5, OLD, 0) for i in range(old_rows)]
+    rows += [
+        ("Quand sélectionnée", 0.4, OLD, 1),
+        ("Quand excellente", 0.9, OLD, 0),
+        ("Quand récente", 0.3, RECENT, 0),
+        ("Quand avril", 0.2, '2020-04-02T08:00:00', 0)
+    ]
+    conn.executemany(
+        "INSERT INTO punchlines (text, subject, evaluation, overall_score, created_at, selected) VALUES (?, 'Sujet', '{}', ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def hot_texts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT text FROM punchlines")}
+    finally:
+        conn.close()
+
+
+def jsonl_texts(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line)['text'] for line in f]
+
+
+def sqlite_texts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT text FROM punchlines ORDER BY id")]
+    finally:
+        conn.close()
+
+
+KEPT = {"Quand sélectionnée", "Quand excellente", "Quand récente"}
+MARCH = [f"Quand ancienne {i}" for i in range(5)]
+
+
+def test_sqlite_archive_keeps_selected_and_high_scores():
+    """Sélectionnées, bien notées et récentes restent; les autres vont dans l'archive de leur mois"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        archive_dir = os.path.join(directory, 'archive')
+        report = apply_retention(path, keep_days=30, min_score=0.8, archive_dir=archive_dir, batch_size=2)
+
+        assert report['archived'] == {'2020-03': 5, '2020-04': 1}
+        assert hot_texts(path) == KEPT
+        assert sqlite_texts(os.path.join(archive_dir, 'punchlines_2020-03.db')) == MARCH
+        assert sqlite_texts(os.path.join(archive_dir, 'punchlines_2020-04.db')) == ["Quand avril"]
+
+        # Une seconde passe n'archive rien de plus
+        assert apply_retention(path, archive_dir=archive_dir)['archived_total'] == 0
+
+
+def test_dry_run_changes_nothing():
+    """dry_run compte les lignes concernées sans modifier la base ni écrire d'archive"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        archive_dir = os.path.join(directory, 'archive')
+        report = apply_retention(path, archive_dir=archive_dir, dry_run=True)
+
+        assert report['archived'] == {'2020-03': 5, '2020-04': 1}
+        assert report['archived_total'] == 6
+        assert len(hot_texts(path)) == 9
+        assert not os.path.exists(archive_dir)
+
+
+def test_jsonl_archive():
+    """Le format JSONL compressé contient les lignes complètes, un lot par membre gzip"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        archive_dir = os.path.join(directory, 'archive')
+        report = apply_retention(path, archive_format='jsonl', archive_dir=archive_dir, batch_size=2)
+
+        assert report['archived_total'] == 6
+        assert hot_texts(path) == KEPT
+        archive = os.path.join(archive_dir, 'punchlines_2020-03.jsonl.gz')
+        assert jsonl_texts(archive) == MARCH
+        with gzip.open(archive, 'rt', encoding='utf-8') as f:
+            assert set(json.loads(f.readline())) == {'id', 'text', 'subject', 'evaluation', 'overall_score', 'created_at', 'selected'}
+
+
+def test_archives_skip_score_columns():
+    """Les colonnes générées des scores ne sont copiées dans aucune archive"""
+    stored = {'id', 'text', 'subject', 'evaluation', 'overall_score', 'created_at', 'selected'}
+    for archive_format in ['sqlite', 'jsonl']:
+        with tempfile.TemporaryDirectory() as directory:
+            path = create_database(directory)
+            conn = sqlite3.connect(path)
+            assert ensure_score_index(conn)
+            conn.close()
+            archive_dir = os.path.join(directory, 'archive')
+            assert apply_retention(path, archive_format=archive_format, archive_dir=archive_dir)['archived_total'] == 6
+
+            if archive_format == 'jsonl':
+                with gzip.open(os.path.join(archive_dir, 'punchlines_2020-03.jsonl.gz'), 'rt', encoding='utf-8') as f:
+                    assert set(json.loads(f.readline())) == stored
+            else:
+                archive = sqlite3.connect(os.path.join(archive_dir, 'punchlines_2020-03.db'))
+                assert {col[1] for col in archive.execute("PRAGMA table_xinfo(punchlines)")} == stored
+                archive.close()
+
+
+def test_jsonl_rerun_after_interruption_before_state():
+    """Interruption après l'ajout d'un lot, avant son enregistrement: l'ajout est annulé à la reprise"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        archive_dir = os.path.join(directory, 'archive')
+        write_state = punchlines_retention._write_state
+        calls = []
+
+        def interrupted(state_path, state):
+            calls.append(state)
+            if len(calls) == 3:
+                raise KeyboardInterrupt()
+            write_state(state_path, state)
+
+        with patch.object(punchlines_retention, '_write_state', side_effect=interrupted):
+            try:
+                apply_retention(path, archive_format='jsonl', archive_dir=archive_dir, batch_size=2)
+                assert False, "interruption attendue"
+            except KeyboardInterrupt:
+                pass
+
+        archive = os.path.join(archive_dir, 'punchlines_2020-03.jsonl.gz')
+        # Le second lot est dans l'archive et encore dans la table
+        assert jsonl_texts(archive) == MARCH[:4]
+        assert set(MARCH[2:]) <= hot_texts(path)
+
+        apply_retention(path, archive_format='jsonl', archive_dir=archive_dir, batch_size=2)
+        assert jsonl_texts(archive) == MARCH
+        assert hot_texts(path) == KEPT
+
+
+def test_jsonl_rerun_after_interruption_before_delete():
+    """Interruption après l'enregistrement d'un lot, avant sa suppression: la reprise le supprime sans le réécrire"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = create_database(directory)
+        archive_dir = os.path.join(directory, 'archive')
+        delete_rows = punchlines_retention._delete_rows
+        calls = []
+
+        def interrupted(cursor, ids, params):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise KeyboardInterrupt()
+            delete_rows(cursor, ids, params)
+
+        with patch.object(punchlines_retention, '_delete_rows', side_effect=interrupted):
+            try:
+                apply_retention(path, archive_format='jsonl', archive_dir=archive_dir, batch_size=2)
+                assert False, "interruption attendue"
+            except KeyboardInterrupt:
+                pass
+
+        archive = os.path.join(archive_dir, 'punchlines_2020-03.jsonl.gz')
+        assert jsonl_texts(archive) == MARCH[:4]
+        assert set(MARCH[2:]) <= hot_texts(path)
+
+        report = apply_retention(path, archive_format='jsonl', archive_dir=archive_dir, batch_size=2)
+        assert report['archived'] == {'2020-03': 1, '2020-04': 1}
+        assert jsonl_texts(archive) == MARCH
+        assert hot_texts(path) == KEPT
+
+
+def main():
+    tests = [
+        test_sqlite_archive_keeps_selected_and_high_scores,
+        test_dry_run_changes_nothing,
+        test_jsonl_archive,
+        test_archives_skip_score_columns,
+        test_jsonl_rerun_after_interruption_before_state,
+        test_jsonl_rerun_after_interruption_before_delete
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import random
+import sqlite3
+import logging
+import tempfile
+import traceback
+
+from models.punchline_scores import ensure_score_index
+from utils.punchlines_stats import compute_punchlines_stats
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_punchlines_stats')
+
+
+def create_database(path, rows):
+    """
+    Crée une base de punchlines avec le schéma de la pipeline de qualité
+
+    Args:
+        path: Chemin de la base
+        rows: Liste de (texte, sujet, évaluation brute, score global, date, sélectionnée)
+    """
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE punchlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        evaluation TEXT,
+        overall_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        selected INTEGER DEFAULT 0
+    )
+    ''')
+    conn.executemany(
+        "INSERT INTO punchlines (text, subject, evaluation, overall_score, created_at, selected) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def evaluation(score):
+    return json.dumps({c: score for c in ['cruaute', 'provocation', 'pertinence', 'concision', 'impact']})
+
+
+def test_valid_rows():
+    """Les distributions et ventilations d'une base saine"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_database(path, [
+            ("Quand A", "Sujet 1", evaluation(0.2), 0.2, "2026-10-01T10:00:00", 0),
+            ("Quand B", "Sujet 1", evaluation(0.6), 0.6, "2026-10-01T11:00:00", 1),
+            ("Quand C", "Sujet 2", evaluation(0.8), 0.8, "2026-10-02T10:00:00", 0),
+        ])
+        stats = compute_punchlines_stats(path)
+
+    assert stats['total_punchlines'] == 3
+    assert stats['selected_punchlines'] == 1
+    assert abs(stats['scores']['overall_score']['mean'] - 0.5333) < 1e-3
+    assert stats['scores']['cruaute']['count'] == 3
+    assert stats['scores']['cruaute']['percentiles']['p50'] == 0.6
+    assert sum(stats['scores']['impact']['histogram']['counts']) == 3
+    assert stats['by_subject'][0] == {
+        'subject': 'Sujet 1', 'count': 2, 'selected': 1, 'selection_rate': 0.5,
+        'average_score': 0.4, 'best_score': 0.6
+    }
+    assert [d['day'] for d in stats['by_day']] == ['2026-10-02', '2026-10-01']
+
+
+def test_malformed_rows():
+    """Une évaluation JSON mal formée, un score texte ou absent ne font pas échouer la commande"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_database(path, [
+            ("Quand A", "Sujet", evaluation(0.4), 0.4, "2026-10-01", 0),
+            ("Quand B", "Sujet", '{"cruaute": 0.9, "provocation":', 0.9, "2026-10-01", 0),
+            ("Quand C", "Sujet", json.dumps({"cruaute": "0.5", "impact": None}), "0.5", "2026-10-01", 0),
+            ("Quand D", "Sujet", None, None, "2026-10-01", 0),
+        ])
+        stats = compute_punchlines_stats(path)
+
+    scores = stats['scores']
+    assert stats['total_punchlines'] == 4
+    # Score global: 0.4, 0.9 et "0.5" (la ligne sans score est ignorée)
+    assert scores['overall_score']['count'] == 3
+    assert abs(scores['overall_score']['mean'] - 0.6) < 1e-9
+    # Critères: l'évaluation mal formée et les valeurs absentes sont ignorées, "0.5" est lu
+    assert scores['cruaute']['count'] == 2
+    assert abs(scores['cruaute']['mean'] - 0.45) < 1e-9
+    assert scores['impact']['count'] == 1
+    assert scores['provocation']['count'] == 1
+
+
+def test_legacy_columns():
+    """Schéma historique: un critère par colonne"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        conn = sqlite3.connect(path)
+        conn.execute('''
+        CREATE TABLE punchlines (
+            id INTEGER PRIMARY KEY, text TEXT, subject TEXT, originality REAL, humor REAL,
+            relevance REAL, conciseness REAL, impact REAL, overall_score REAL,
+            created_at TIMESTAMP, selected INTEGER DEFAULT 0
+        )
+        ''')
+        conn.execute("INSERT INTO punchlines VALUES (1, 'Quand A', 'Sujet', 0.1, 0.2, 0.3, 0.4, 0.5, 0.3, '2026-10-01', 1)")
+        conn.execute("INSERT INTO punchlines VALUES (2, 'Quand B', 'Sujet', NULL, 'abc', 0.3, 0.4, 0.5, 0.3, '2026-10-01', 0)")
+        conn.commit()
+        conn.close()
+        stats = compute_punchlines_stats(path)
+
+    assert list(stats['scores']) == ['overall_score', 'originality', 'humor', 'relevance', 'conciseness', 'impact']
+    assert stats['scores']['originality']['count'] == 1
+    assert stats['scores']['relevance']['count'] == 2
+
+
+def assert_same_distributions(expected, actual):
+    assert list(expected) == list(actual)
+    for name, dist in expected.items():
+        other = actual[name]
+        assert dist['count'] == other['count'], name
+        assert dist['histogram'] == other['histogram'], name
+        for key in ['mean', 'stddev', 'min', 'max']:
+            assert abs(dist[key] - other[key]) < 1e-9, (name, key)
+        for p, value in dist['percentiles'].items():
+            assert abs(value - other['percentiles'][p]) < 1e-9, (name, p)
+
+
+def test_indexed_scores_match_full_scan():
+    """Les distributions lues dans les index des scores sont celles du chargement complet"""
+    rnd = random.Random(7)
+    rows = [
+        (f"Quand {i}", f"Sujet {i % 3}", evaluation(rnd.randint(0, 10) / 10), rnd.randint(0, 50) / 50, "2026-10-01", 0)
+        for i in range(500)
+    ]
+    rows += [
+        ("Quand mal formée", "Sujet", '{"cruaute": 0.9, "provocation":', 0.9, "2026-10-01", 0),
+        ("Quand texte", "Sujet", json.dumps({"cruaute": "0.5", "impact": None}), "0.5", "2026-10-01", 0),
+        ("Quand vide", "Sujet", None, None, "2026-10-01", 0)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_database(path, rows)
+        full_scan = compute_punchlines_stats(path, bins=7)
+
+        conn = sqlite3.connect(path)
+        try:
+            assert ensure_score_index(conn)
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT score_impact, COUNT(*) FROM punchlines WHERE score_impact IS NOT NULL GROUP BY score_impact"
+            ).fetchall()
+            assert 'idx_punchlines_score_impact' in plan[0][-1]
+            assert_same_distributions(full_scan['scores'], compute_punchlines_stats(path, bins=7)['scores'])
+
+            # Les index sont tenus à jour par SQLite à chaque écriture
+            conn.execute("INSERT INTO punchlines (text, subject, evaluation, overall_score) VALUES ('Quand nouvelle', 'Sujet', ?, 1.0)",
+                         (evaluation(1.0),))
+            conn.commit()
+        finally:
+            conn.close()
+        indexed = compute_punchlines_stats(path, bins=7)
+
+    assert indexed['scores']['cruaute']['count'] == full_scan['scores']['cruaute']['count'] + 1
+    assert indexed['scores']['cruaute']['max'] == 1.0
+
+
+def test_empty_database():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quality.db')
+        create_database(path, [])
+        stats = compute_punchlines_stats(path)
+
+    assert stats['total_punchlines'] == 0
+    assert stats['scores']['overall_score']['count'] == 0
+    assert stats['by_subject'] == []
+
+
+def main():
+    tests = [test_valid_rows, test_malformed_rows, test_legacy_columns, test_indexed_scores_match_full_scan, test_empty_database]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,9 @@ logger = logging.getLogger('test_quality_pipeline')
 # Load environment variables
 load_dotenv()
 
+# Script manuel (arguments en ligne de commande, appels à l'API): pas collecté par pytest
+__test__ = False
+
 async def test_generate_and_evaluate(subject, num_candidates=3, economy_mode=False):
     """
     Teste la génération et l'évaluation de punchlines
@@ -179,9 +182,20 @@ async def main():
     parser.add_argument('-e', '--economy', action='store_true', help='Activer le mode économie de tokens')
     parser.add_argument('--test-all', action='store_true', help='Exécuter tous les tests pour un sujet donné')
     parser.add_argument('--stats', action='store_true', help='Afficher les statistiques de la pipeline')
+    parser.add_argument('--cassette', choices=['record', 'replay'], help="Enregistrer les appels à l'API, ou les rejouer sans réseau")
+    parser.add_argument('--cassette-dir', type=str, help='Dossier des cassettes (par défaut: tests/cassettes)')
+    parser.add_argument('--no-latency', action='store_true', help='Rejouer les réponses sans leur latence enregistrée')
     
     args = parser.parse_args()
     
+    # Les clients OpenAI lisent la configuration des cassettes à leur création
+    if args.cassette:
+        os.environ['CASSETTE_MODE'] = args.cassette
+        if args.cassette_dir:
+            os.environ['CASSETTE_DIR'] = args.cassette_dir
+        if args.no_latency:
+            os.environ['CASSETTE_LATENCY'] = 'none'
+    
     if args.stats:
         await test_stats()
         return
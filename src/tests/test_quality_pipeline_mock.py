@@ -49,10 +49,10 @@ MOCK_PUNCHLINES = {
 def get_mock_evaluation():
     """Generate random evaluation scores"""
     return {
-        "originality": round(random.uniform(0.5, 1.0), 2),
-        "humor": round(random.uniform(0.5, 1.0), 2),
-        "relevance": round(random.uniform(0.5, 1.0), 2),
-        "conciseness": round(random.uniform(0.5, 1.0), 2),
+        "cruaute": round(random.uniform(0.5, 1.0), 2),
+        "provocation": round(random.uniform(0.5, 1.0), 2),
+        "pertinence": round(random.uniform(0.5, 1.0), 2),
+        "concision": round(random.uniform(0.5, 1.0), 2),
         "impact": round(random.uniform(0.5, 1.0), 2)
     }
 
@@ -78,7 +78,7 @@ class MockQualityPipeline(QualityPipeline):
         
         return punchlines[:num_candidates]
     
-    async def _evaluate_punchline(self, punchline, subject):
+    async def _evaluate_punchline(self, subject, punchline):
         """
         Version mockée qui retourne des évaluations aléatoires
         """
@@ -89,14 +89,14 @@ class MockQualityPipeline(QualityPipeline):
         
         # Add some bias for specific keywords to make results more realistic
         if "exactement l'inverse" in punchline:
-            evaluation["humor"] = min(1.0, evaluation["humor"] + 0.2)
+            evaluation["provocation"] = min(1.0, evaluation["provocation"] + 0.2)
             evaluation["impact"] = min(1.0, evaluation["impact"] + 0.1)
         
         if len(punchline) < 60:
-            evaluation["conciseness"] = min(1.0, evaluation["conciseness"] + 0.15)
+            evaluation["concision"] = min(1.0, evaluation["concision"] + 0.15)
         
         if subject.lower() in punchline.lower():
-            evaluation["relevance"] = min(1.0, evaluation["relevance"] + 0.2)
+            evaluation["pertinence"] = min(1.0, evaluation["pertinence"] + 0.2)
         
         return evaluation
 
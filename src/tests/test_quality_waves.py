@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+import traceback
+
+from tests.scripted_pipeline import create_pipeline, CRITERIA
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_quality_waves')
+
+SUBJECT = "Les banquiers"
+HISTORY = "Quand les banquiers prêchent la rigueur, mais se votent des bonus."
+WAVES_ENV = {'EARLY_STOP': 'true', 'EARLY_STOP_WAVE_SIZE': '1', 'NUM_PUNCHLINE_CANDIDATES': '3'}
+
+
+def run_waves(waves, scores=None, history=(), **env):
+    """Exécute generate_and_evaluate_in_waves sur une base temporaire et retourne (évaluées, pipeline)"""
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = create_pipeline(os.path.join(directory, 'quality.db'), waves, scores, **{**WAVES_ENV, **env})
+        try:
+            for text in history:
+                pipeline._store_evaluation(text, SUBJECT, {c: 0.5 for c in CRITERIA}, 0.5)
+            evaluated = asyncio.run(pipeline.generate_and_evaluate_in_waves(SUBJECT))
+        finally:
+            pipeline.close()
+    return evaluated, pipeline
+
+
+def test_early_stop():
+    """La génération s'arrête à la première punchline au-dessus du seuil plus la marge"""
+    evaluated, pipeline = run_waves(
+        [["Quand A fait B, mais C"], ["Quand D fait E, mais F"], ["Quand G fait H, mais I"]],
+        scores={"Quand D fait E, mais F": 0.9}
+    )
+    assert pipeline.generation_calls == 2
+    assert [p['text'] for p in evaluated] == ["Quand D fait E, mais F", "Quand A fait B, mais C"]
+
+
+def test_score_below_margin_continues():
+    """Un score au-dessus du seuil mais sous la marge ne suffit pas à arrêter la génération"""
+    evaluated, pipeline = run_waves(
+        [["Quand A fait B, mais C"], ["Quand D fait E, mais F"], ["Quand G fait H, mais I"]],
+        scores={"Quand A fait B, mais C": 0.72}
+    )
+    assert pipeline.generation_calls == 3
+    assert len(evaluated) == 3
+    assert evaluated[0]['text'] == "Quand A fait B, mais C"
+
+
+def test_call_budget():
+    """Le budget d'appels compte les générations et les évaluations par le LLM"""
+    evaluated, pipeline = run_waves(
+        [["Quand A fait B, mais C"], ["Quand D fait E, mais F"], ["Quand G fait H, mais I"]],
+        EARLY_STOP_MAX_CALLS='3'
+    )
+    # génération, évaluation, génération: budget épuisé avant la deuxième évaluation
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == ["Quand A fait B, mais C"]
+    assert len(evaluated) == 1
+
+
+def test_filtered_wave_moves_on():
+    """Une vague entièrement écartée par les filtres est vide: la vague suivante est générée"""
+    evaluated, pipeline = run_waves(
+        [[HISTORY], ["Quand D fait E, mais F"]],
+        scores={"Quand D fait E, mais F": 0.9},
+        history=[HISTORY],
+        HISTORY_OVERLAP_THRESHOLD='0.8'
+    )
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == ["Quand D fait E, mais F"]
+    assert [p['text'] for p in evaluated] == ["Quand D fait E, mais F"]
+
+
+def test_keep_all_once_at_the_end():
+    """Si toutes les vagues sont écartées, une seule punchline générée est évaluée, à la fin"""
+    repeated = "Quand les banquiers prêchent la rigueur, mais se votent des primes."
+    evaluated, pipeline = run_waves(
+        [[HISTORY], [repeated], ["Quand G fait H, mais I"]],
+        history=[HISTORY, repeated],
+        HISTORY_OVERLAP_THRESHOLD='0.8'
+    )
+    # Deux vagues vides: arrêt, puis une seule évaluation de repli
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == [HISTORY]
+    assert len(evaluated) == 1
+
+
+def test_default_wave_single_generation():
+    """Par défaut, toutes les candidates sont demandées en un appel: jamais plus d'une génération sans filtre"""
+    wave = ["Quand A fait B, mais C", "Quand D fait E, mais F", "Quand G fait H, mais I"]
+    evaluated, pipeline = run_waves([wave, ["Quand J fait K, mais L"]], EARLY_STOP_WAVE_SIZE='0')
+    assert pipeline.generation_calls == 1
+    assert pipeline.evaluated == wave
+    assert len(evaluated) == 3
+
+    # Seules les évaluations s'arrêtent tôt
+    evaluated, pipeline = run_waves([wave], scores={"Quand D fait E, mais F": 0.9}, EARLY_STOP_WAVE_SIZE='0')
+    assert pipeline.generation_calls == 1
+    assert pipeline.evaluated == wave[:2]
+
+
+def test_default_wave_replaces_filtered():
+    """Par défaut, une seconde vague ne demande que les candidates écartées par les filtres"""
+    evaluated, pipeline = run_waves(
+        [[HISTORY, "Quand D fait E, mais F", "Quand G fait H, mais I"], ["Quand J fait K, mais L"]],
+        history=[HISTORY],
+        HISTORY_OVERLAP_THRESHOLD='0.8',
+        EARLY_STOP_WAVE_SIZE='0'
+    )
+    assert pipeline.generation_calls == 2
+    assert pipeline.evaluated == ["Quand D fait E, mais F", "Quand G fait H, mais I", "Quand J fait K, mais L"]
+    assert len(evaluated) == 3
+
+
+def main():
+    tests = [
+        test_early_stop,
+        test_score_below_margin_continues,
+        test_call_budget,
+        test_filtered_wave_moves_on,
+        test_keep_all_once_at_the_end,
+        test_default_wave_single_generation,
+        test_default_wave_replaces_filtered
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
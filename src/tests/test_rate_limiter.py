@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import sys
+import time
+import asyncio
+import logging
+import traceback
+
+from clients.rate_limiter import TokenBucket, TelegramRateLimiter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_rate_limiter')
+
+
+def test_refund_restores_reservation():
+    """Un jeton rendu annule exactement la réservation"""
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0.9
+    bucket.refund()
+    bucket.refund()
+    assert bucket._tokens <= bucket.capacity
+    assert bucket.reserve() == 0.0
+
+
+def test_retry_after_during_wait_consumes_one_token():
+    """Un 429 reçu pendant l'attente ne fait pas payer deux jetons au même envoi"""
+    async def scenario():
+        limiter = TelegramRateLimiter(global_rate=30, chat_rate=2)
+        await limiter.acquire('42')
+
+        # Le deuxième envoi attend son jeton (0,5 s); un 429 de 1 s arrive entre-temps
+        waiting = asyncio.ensure_future(limiter.acquire('42'))
+        await asyncio.sleep(0.1)
+        limiter.penalize('42', 1.0)
+        start = time.monotonic()
+        await waiting
+        blocked = time.monotonic() - start
+
+        # Le troisième envoi, après le blocage, n'hérite pas d'un jeton consommé en double
+        return blocked, limiter._buckets('42')[1].reserve()
+
+    blocked, next_wait = asyncio.run(scenario())
+    assert 0.9 < blocked < 1.2
+    assert next_wait < 0.2
+
+
+def main():
+    tests = [test_refund_restores_reservation, test_retry_after_during_wait_consumes_one_token]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
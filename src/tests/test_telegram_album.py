@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+import os
+import sys
+import socket
+import asyncio
+import logging
+import tempfile
+import traceback
+from unittest.mock import patch
+
+from tests.fake_telegram_server import run_fake_telegram_server, FakeTelegramConfig
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_telegram_album')
+
+CHAT_IDS = ['101', '102']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def create_videos(directory, count):
+    """Fichiers factices: le serveur simulé ne lit pas les vidéos"""
+    videos = []
+    for i in range(count):
+        path = os.path.join(directory, f"video_{i}.mp4")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(1024))
+        videos.append((path, f"Légende {i}"))
+    return videos
+
+
+def run_with_client(scenario):
+    """Exécute scenario(client, server, directory) avec un TelegramClient relié au serveur simulé"""
+    with tempfile.TemporaryDirectory() as directory, \
+            run_fake_telegram_server(FakeTelegramConfig(latency=0, latency_jitter=0), port=free_port()) as (server, base_url):
+        env = {
+            'TELEGRAM_API_BASE_URL': base_url,
+            'TELEGRAM_BOT_TOKEN': '123456:fake-token',
+            'TELEGRAM_CHAT_ID': ','.join(CHAT_IDS),
+            'TELEGRAM_AUTO_SEND': 'true',
+            'TELEGRAM_FILE_CACHE': 'false'
+        }
+        # Les vidéos factices n'ont pas de métadonnées à lire
+        with patch.dict(os.environ, env), patch('clients.telegram_client.probe_video', return_value={}):
+            from clients.telegram_client import TelegramClient
+            client = TelegramClient()
+            return asyncio.run(scenario(client, server, directory))
+
+
+def test_album_chunks_of_ten():
+    """11 vidéos: un album de 10 par chat, la vidéo restante est envoyée seule; un seul upload par vidéo"""
+    async def scenario(client, server, directory):
+        delivered = await client.send_album(create_videos(directory, 11))
+        return delivered, server.stats
+
+    delivered, stats = run_with_client(scenario)
+    assert delivered == [True] * 11
+    assert stats.by_method.get('sendMediaGroup') == 2
+    assert stats.by_method.get('sendVideo') == 2
+    assert stats.uploads == 11
+    assert stats.file_id_sends == 11
+    assert stats.messages == 22
+
+
+def test_bad_request_falls_back_to_single_sends():
+    """Un album refusé (file_id inconnu) n'est pas réessayé: ses vidéos partent une par une"""
+    async def scenario(client, server, directory):
+        videos = create_videos(directory, 3)
+        file_ids = ['PERIME', None, None]
+        results = await client._send_album_chunk(CHAT_IDS[0], [0, 1, 2], videos, [None] * 3, file_ids)
+        return results, file_ids, server.stats
+
+    results, file_ids, stats = run_with_client(scenario)
+    assert results == [True, True, True]
+    assert stats.by_method.get('sendMediaGroup') == 1
+    # Le file_id périmé est refusé une fois de plus, puis la vidéo est téléversée
+    assert stats.by_method.get('sendVideo') == 4
+    assert stats.bad_requests == 2
+    assert stats.uploads == 3
+    assert all(file_id.startswith('FAKE') for file_id in file_ids[1:])
+
+
+class RecordingTelegramClient:
+    """Client Telegram qui enregistre les envois au lieu de les faire"""
+
+    def __init__(self, album_mode):
+        self.auto_send = True
+        self.album_mode = album_mode
+        self.batches = []
+
+    async def send_batch_videos(self, results, delay_between_videos=None, as_album=None):
+        self.batches.append(([result['subject'] for result in results], as_album))
+        return len(results)
+
+
+class IdlePipeline:
+    """Pipeline de qualité sans génération en lot ni réserve"""
+    generation_batch_size = 0
+
+    async def wait_for_refills(self):
+        pass
+
+
+def create_generator(album_mode):
+    """MemeGenerator sans rendu ni API; retourne (générateur, envois individuels demandés)"""
+    from core.meme_generator import MemeGenerator
+    generator = MemeGenerator.__new__(MemeGenerator)
+    generator.telegram_client = RecordingTelegramClient(album_mode)
+    generator.outbox = None
+    generator.use_quality_pipeline = False
+    generator.quality_pipeline = IdlePipeline()
+    single_sends = []
+
+    async def generate_meme(subject=None, economy_mode=None, send_to_telegram=None):
+        single_sends.append(send_to_telegram)
+        return {'text': f"Quand {subject}", 'video_path': f"{subject}.mp4", 'subject': subject}
+
+    generator.generate_meme = generate_meme
+    return generator, single_sends
+
+
+def run_batch(album_mode):
+    """Lance MemeGenerator.generate_batch_memes; retourne (envois individuels demandés, lots envoyés)"""
+    generator, single_sends = create_generator(album_mode)
+    asyncio.run(generator.generate_batch_memes(['A', 'B', 'C']))
+    return single_sends, generator.telegram_client.batches
+
+
+def test_batch_uses_albums():
+    """generate_batch_memes: en mode album, le lot est rendu sans envoi puis envoyé par albums"""
+    single_sends, batches = run_batch(album_mode=True)
+    assert single_sends == [False, False, False]
+    assert batches == [(['A', 'B', 'C'], True)]
+
+    single_sends, batches = run_batch(album_mode=False)
+    assert single_sends == [True, True, True]
+    assert batches == []
+
+
+def test_cli_batch_uses_albums():
+    """generate_meme.py -b: le lot est rendu sans envoi puis envoyé par albums"""
+    import generate_meme
+    generator, single_sends = create_generator(album_mode=True)
+    with tempfile.TemporaryDirectory() as directory:
+        subjects_path = os.path.join(directory, 'subjects.json')
+        with open(subjects_path, 'w', encoding='utf-8') as f:
+            f.write('{"sujets": ["A", "B"]}')
+        with patch.dict(os.environ, {'OUTPUT_DIRECTORY': directory}), \
+                patch.object(generate_meme, 'MemeGenerator', return_value=generator):
+            results = asyncio.run(generate_meme.generate_batch_memes(subjects_path))
+
+    assert len(results) == 2
+    assert single_sends == [False, False]
+    assert generator.telegram_client.batches == [(['A', 'B'], True)]
+
+
+def main():
+    tests = [
+        test_album_chunks_of_ten,
+        test_bad_request_falls_back_to_single_sends,
+        test_batch_uses_albums,
+        test_cli_batch_uses_albums
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+import traceback
+
+from core.delivery_worker import DeliveryWorker
+from models.telegram_outbox import TelegramOutbox, PENDING, SENDING, SENT
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger('test_telegram_outbox')
+
+
+def create_outbox(directory, chat_ids=('1',)):
+    outbox = TelegramOutbox(os.path.join(directory, 'outbox.db'))
+    video_path = os.path.join(directory, 'video.mp4')
+    with open(video_path, 'wb') as f:
+        f.write(b'video')
+    outbox.enqueue(video_path, list(chat_ids), caption="Légende")
+    return outbox
+
+
+class SlowTelegramClient:
+    """Client Telegram factice dont l'envoi dure plus longtemps que le bail"""
+
+    bot = True
+
+    def __init__(self, duration):
+        self.duration = duration
+
+    async def send_video_to_chats(self, video_path, caption, chat_ids, force=False):
+        await asyncio.sleep(self.duration)
+        return {chat_id: 100 + i for i, chat_id in enumerate(chat_ids)}
+
+
+def test_claim_is_exclusive_until_lease_expires():
+    """Un envoi réservé n'est repris par un autre worker qu'à l'expiration du bail"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = create_outbox(directory)
+        claimed = outbox.claim(lease_seconds=0.2, worker_id='a')
+        assert [item['attempts'] for item in claimed] == [1]
+        assert outbox.claim(lease_seconds=0.2, worker_id='b') == []
+
+        time.sleep(0.3)
+        reclaimed = outbox.claim(lease_seconds=60, worker_id='b')
+        assert [item['id'] for item in reclaimed] == [claimed[0]['id']]
+        assert reclaimed[0]['attempts'] == 2
+
+
+def test_updates_are_conditioned_on_worker():
+    """Un worker dont le bail a été repris ne peut ni reprogrammer ni renouveler l'envoi"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = create_outbox(directory)
+        item_id = outbox.claim(lease_seconds=0.05, worker_id='a')[0]['id']
+        time.sleep(0.1)
+        outbox.claim(lease_seconds=60, worker_id='b')
+
+        assert outbox.renew([item_id], 60, worker_id='a') == []
+        assert not outbox.mark_failed(item_id, "Erreur réseau", retry_delay=1, worker_id='a')
+        assert outbox.get_stats()[SENDING] == 1
+
+        assert outbox.renew([item_id], 60, worker_id='b') == [item_id]
+        assert outbox.mark_failed(item_id, "Erreur réseau", retry_delay=1, worker_id='b')
+        assert outbox.get_stats()[PENDING] == 1
+
+
+def test_message_id_recorded_once():
+    """Le premier envoi réussi est enregistré, un envoi en double ne l'écrase pas"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = create_outbox(directory)
+        item_id = outbox.claim(lease_seconds=0.05, worker_id='a')[0]['id']
+        time.sleep(0.1)
+        outbox.claim(lease_seconds=60, worker_id='b')
+
+        # Le worker 'a' a tout de même envoyé le message: il est enregistré
+        assert outbox.mark_sent(item_id, 11, worker_id='a')
+        assert not outbox.mark_sent(item_id, 12, worker_id='b')
+        assert not outbox.mark_failed(item_id, "Erreur", worker_id='b')
+
+        conn = outbox._connect()
+        try:
+            row = conn.execute("SELECT status, message_id, worker_id FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        finally:
+            conn.close()
+        assert row == (SENT, 11, 'a')
+        assert outbox.claim(worker_id='c') == []
+
+
+def test_worker_renews_lease_during_long_send():
+    """Un envoi plus long que le bail n'est pas repris par un autre worker"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = create_outbox(directory, chat_ids=('1', '2'))
+        worker = DeliveryWorker(outbox, SlowTelegramClient(0.6), lease_seconds=0.3, worker_id='a')
+
+        async def scenario():
+            delivery = asyncio.ensure_future(worker.run_once())
+            await asyncio.sleep(0.45)
+            stolen = outbox.claim(lease_seconds=60, worker_id='b')
+            return await delivery, stolen
+
+        processed, stolen = asyncio.run(scenario())
+        assert processed == 2
+        assert stolen == []
+        assert worker.sent == 2
+        assert outbox.get_stats()[SENT] == 2
+
+
+def main():
+    tests = [
+        test_claim_is_exclusive_until_lease_expires,
+        test_updates_are_conditioned_on_worker,
+        test_message_id_recorded_once,
+        test_worker_renews_lease_during_long_send
+    ]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except Exception:
+            failures += 1
+            logger.error(f"❌ {test.__name__}\n{traceback.format_exc()}")
+
+    logger.info(f"🧪 {len(tests) - failures}/{len(tests)} test(s) réussi(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
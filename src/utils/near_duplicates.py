@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import json
+import argparse
+
+from models.punchline_minhash import PunchlineMinHashIndex
+
+
+def check_punchline(index, text, threshold=0.7, limit=5, output_format='table'):
+    """
+    Affiche les punchlines de l'historique proches d'un texte
+
+    Args:
+        index: Index des quasi-doublons
+        text: Texte à vérifier
+        threshold: Similarité de Jaccard minimum
+        limit: Nombre maximum de résultats
+        output_format: Format d'affichage ('table' ou 'json')
+
+    Returns:
+        La liste des quasi-doublons
+    """
+    start = time.perf_counter()
+    matches = index.query(text, threshold, limit)
+    elapsed = time.perf_counter() - start
+    texts = index.texts([row_id for row_id, _ in matches])
+    results = [{'id': row_id, 'similarity': round(similarity, 3), 'text': texts.get(row_id)} for row_id, similarity in matches]
+
+    if output_format == 'json':
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return results
+
+    print(f"\n♻️ {len(results)} quasi-doublon(s) (Jaccard >= {threshold}) pour: \"{text}\" [{elapsed * 1000:.2f} ms]")
+    for result in results:
+        label = result['text'] if result['text'] is not None else '(supprimée de la base)'
+        print(f"  - [{result['similarity']:.2f}] #{result['id']} {label}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index MinHash/LSH des quasi-doublons de l'historique des punchlines")
+    parser.add_argument('text', nargs='?', help='Punchline à vérifier')
+    parser.add_argument('--db', type=str, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    parser.add_argument('--index', type=str, help="Chemin de l'index (par défaut: data/punchlines_minhash.npz)")
+    parser.add_argument('-t', '--threshold', type=float, default=0.7, help='Similarité de Jaccard minimum')
+    parser.add_argument('-n', '--limit', type=int, default=5, help='Nombre maximum de résultats')
+    parser.add_argument('-f', '--format', choices=['table', 'json'], default='table', help="Format d'affichage")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire l'index à partir de la table punchlines")
+    args = parser.parse_args()
+
+    index = PunchlineMinHashIndex(args.db, args.index)
+    if not os.path.exists(index.db_path):
+        print(f"❌ La base de données {index.db_path} n'existe pas.")
+        sys.exit(1)
+
+    if args.rebuild:
+        start = time.time()
+        count = index.build()
+        index.save()
+        print(f"✅ Index des quasi-doublons reconstruit: {count} punchlines en {time.time() - start:.1f}s ({index.index_path})")
+        if not args.text:
+            return
+    else:
+        index.open()
+
+    if not args.text:
+        parser.print_help()
+        sys.exit(1)
+
+    check_punchline(index, args.text, args.threshold, args.limit, args.format)
+
+
+if __name__ == "__main__":
+    main()
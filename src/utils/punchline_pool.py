@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import argparse
+
+
+def show_status(pipeline):
+    """Affiche la taille de la réserve de chaque sujet connu"""
+    sizes = pipeline.pool.sizes(sorted(pipeline.pool_subjects), pipeline.quality_threshold)
+    print(f"\n⚡ Réserve de punchlines ({pipeline.pool_size} visées par sujet, seuil {pipeline.quality_threshold}):")
+    for subject, size in sizes.items():
+        marker = "✅" if size >= pipeline.pool_size else "⏳"
+        print(f"  {marker} {size:>3}/{pipeline.pool_size} {subject}")
+    return sizes
+
+
+async def fill(pipeline, subjects, economy_mode=False):
+    """
+    Complète la réserve des sujets donnés, l'un après l'autre
+
+    Returns:
+        int: Nombre total de punchlines ajoutées
+    """
+    added = 0
+    for subject in subjects:
+        added += await pipeline.fill_pool(subject, economy_mode)
+    print(f"✅ {added} punchline(s) ajoutée(s) à la réserve")
+    return added
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Remplissage de la réserve de punchlines pré-évaluées des sujets connus")
+    parser.add_argument('command', choices=['fill', 'status'], help='Compléter la réserve ou afficher sa taille')
+    parser.add_argument('-s', '--subject', action='append', help='Sujet à compléter (par défaut: tous les sujets connus)')
+    parser.add_argument('--size', type=int, help='Nombre de punchlines visé par sujet (par défaut: PUNCHLINE_POOL_SIZE)')
+    parser.add_argument('-e', '--economy', action='store_true', help='Activer le mode économie de tokens')
+    parser.add_argument('--loop', type=float, default=0, help='Recommencer toutes les N secondes (0: une seule fois)')
+    parser.add_argument('--db', type=str, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    args = parser.parse_args()
+
+    if args.size is not None:
+        os.environ['PUNCHLINE_POOL_SIZE'] = str(args.size)
+    elif int(os.getenv('PUNCHLINE_POOL_SIZE', '0')) <= 0:
+        os.environ['PUNCHLINE_POOL_SIZE'] = '3'
+
+    from core.quality_pipeline import QualityPipeline
+    pipeline = QualityPipeline(db_path=args.db)
+    subjects = args.subject or sorted(pipeline.pool_subjects)
+    if args.subject:
+        pipeline.pool_subjects.update(args.subject)
+
+    try:
+        if args.command == 'status':
+            show_status(pipeline)
+            return
+
+        if not subjects:
+            print("❌ Aucun sujet connu (voir PUNCHLINE_POOL_SUBJECTS)")
+            sys.exit(1)
+
+        while True:
+            await fill(pipeline, subjects, args.economy)
+            if args.loop <= 0:
+                break
+            await asyncio.sleep(args.loop)
+        show_status(pipeline)
+    finally:
+        await pipeline.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n⚠️ Remplissage interrompu par l'utilisateur")
+        sys.exit(0)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+import os
+import sys
+import gzip
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Condition des lignes à archiver: ni sélectionnées, ni au-dessus du score minimum, plus anciennes que la date limite
+ARCHIVE_CONDITION = '''
+    selected = 0
+    AND (overall_score IS NULL OR overall_score < :min_score)
+    AND substr(created_at, 1, 10) < :cutoff
+'''
+
+
+def _database_size(db_path: str) -> int:
+    """Taille de la base de données sur disque (fichier principal et journal WAL)"""
+    return sum(
+        os.path.getsize(path)
+        for path in (db_path, db_path + '-wal')
+        if os.path.exists(path)
+    )
+
+
+def _archive_sqlite(conn: sqlite3.Connection, archive_path: str, month: str, params: Dict[str, Any],
+                    batch_size: int) -> int:
+    """
+    Déplace les lignes d'un mois vers une base d'archive SQLite
+
+    Chaque lot est copié puis supprimé dans une même transaction: une interruption
+    ne peut ni perdre ni dupliquer de lignes.
+
+    Returns:
+        Nombre de lignes archivées
+    """
+    cursor = conn.cursor()
+    cursor.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    try:
+        cursor.execute("PRAGMA main.table_info(punchlines)")
+        columns = [col[1] for col in cursor.fetchall()]
+        column_defs = ", ".join(
+            "id INTEGER PRIMARY KEY" if col == 'id' else col
+            for col in columns
+        )
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS archive.punchlines ({column_defs})")
+        column_list = ", ".join(columns)
+
+        moved = 0
+        while True:
+            cursor.execute("DROP TABLE IF EXISTS temp.retention_batch")
+            cursor.execute(f'''
+            CREATE TEMP TABLE retention_batch AS
+            SELECT id FROM main.punchlines
+            WHERE {ARCHIVE_CONDITION} AND substr(created_at, 1, 7) = :month
+            ORDER BY id
+            LIMIT :limit
+            ''', {**params, 'month': month, 'limit': batch_size})
+
+            cursor.execute("SELECT COUNT(*) FROM temp.retention_batch")
+            count = cursor.fetchone()[0]
+            if count == 0:
+                break
+
+            cursor.execute(f'''
+            INSERT OR IGNORE INTO archive.punchlines ({column_list})
+            SELECT {column_list} FROM main.punchlines WHERE id IN (SELECT id FROM temp.retention_batch)
+            ''')
+            cursor.execute("DELETE FROM main.punchlines WHERE id IN (SELECT id FROM temp.retention_batch)")
+            conn.commit()
+            moved += count
+
+        cursor.execute("DROP TABLE IF EXISTS temp.retention_batch")
+        conn.commit()
+        return moved
+    finally:
+        cursor.execute("DETACH DATABASE archive")
+
+
+def _read_state(state_path: str) -> Optional[Dict[str, Any]]:
+    """État d'une archive JSONL: taille validée du fichier et lot en cours de suppression"""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_state(state_path: str, state: Dict[str, Any]):
+    """Écrit l'état d'une archive JSONL (remplacement atomique)"""
+    temp_path = state_path + '.part'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, state_path)
+
+
+def _delete_rows(cursor: sqlite3.Cursor, ids: List[int], params: Dict[str, Any]):
+    """Supprime de la table les lignes archivées (seulement si elles remplissent encore la condition)"""
+    cursor.executemany(
+        f"DELETE FROM punchlines WHERE id = :id AND {ARCHIVE_CONDITION}",
+        [{**params, 'id': i} for i in ids]
+    )
+
+
+def _archive_jsonl(conn: sqlite3.Connection, archive_path: str, month: str, params: Dict[str, Any],
+                   batch_size: int) -> int:
+    """
+    Déplace les lignes d'un mois vers un fichier JSONL compressé (gzip, en ajout)
+
+    Le fichier ne peut pas partager la transaction de la suppression: un fichier
+    d'état (<archive>.state) retient la taille validée de l'archive et les ids du
+    lot en cours. Chaque lot est ajouté et synchronisé sur disque, l'état est mis à
+    jour, puis les lignes sont supprimées. Après une interruption, la reprise tronque
+    l'archive à sa taille validée (ajout non enregistré) et supprime les lignes du
+    lot enregistré (déjà archivées): aucune ligne n'est perdue ni dupliquée.
+
+    Returns:
+        Nombre de lignes archivées
+    """
+    cursor = conn.cursor()
+    state_path = archive_path + '.state'
+    state = _read_state(state_path)
+
+    if state is None:
+        # Archive absente ou antérieure au fichier d'état: son contenu actuel est validé
+        size = os.path.getsize(archive_path) if os.path.exists(archive_path) else 0
+        state = {'size': size, 'pending': []}
+        _write_state(state_path, state)
+    else:
+        if os.path.exists(archive_path) and os.path.getsize(archive_path) > state['size']:
+            print(f"⚠️ Ajout interrompu dans {archive_path}: archive ramenée à sa taille validée")
+            with open(archive_path, 'r+b') as f:
+                f.truncate(state['size'])
+        if state['pending']:
+            _delete_rows(cursor, state['pending'], params)
+            conn.commit()
+
+    # Colonnes stockées seulement (table_info ne liste pas les colonnes générées des scores)
+    cursor.execute("PRAGMA table_info(punchlines)")
+    column_list = ", ".join(col[1] for col in cursor.fetchall())
+
+    moved = 0
+    while True:
+        cursor.execute(f'''
+        SELECT {column_list} FROM punchlines
+        WHERE {ARCHIVE_CONDITION} AND substr(created_at, 1, 7) = :month
+        ORDER BY id
+        LIMIT :limit
+        ''', {**params, 'month': month, 'limit': batch_size})
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        columns = [description[0] for description in cursor.description]
+        with open(archive_path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for row in rows:
+                    f.write((json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+            size = raw.tell()
+
+        ids = [row[columns.index('id')] for row in rows]
+        _write_state(state_path, {'size': size, 'pending': ids})
+        _delete_rows(cursor, ids, params)
+        conn.commit()
+        moved += len(rows)
+
+    return moved
+
+
+def apply_retention(
+    db_path: Optional[str] = None,
+    keep_days: int = 30,
+    min_score: float = 0.8,
+    archive_format: str = 'sqlite',
+    archive_dir: Optional[str] = None,
+    batch_size: int = 5000,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Applique la politique de rétention à la table punchlines
+
+    Restent dans la table: les punchlines sélectionnées, celles dont le score global
+    atteint min_score et toutes celles des keep_days derniers jours. Les autres sont
+    déplacées dans des archives mensuelles (punchlines_AAAA-MM.db ou .jsonl.gz).
+
+    Args:
+        db_path: Chemin de la base de données (par défaut: data/quality_data.db)
+        keep_days: Nombre de jours conservés intégralement
+        min_score: Score global à partir duquel une punchline est toujours conservée
+        archive_format: 'sqlite' (bases d'archive) ou 'jsonl' (JSONL compressé)
+        archive_dir: Dossier des archives (par défaut: data/archive)
+        batch_size: Nombre de lignes déplacées par transaction
+        dry_run: Compter les lignes concernées sans rien modifier
+
+    Returns:
+        Rapport de l'opération (lignes archivées par mois)
+    """
+    db_path = db_path or os.path.join(PROJECT_ROOT, 'data', 'quality_data.db')
+    archive_dir = archive_dir or os.path.join(os.path.dirname(db_path), 'archive')
+    if archive_format not in ('sqlite', 'jsonl'):
+        raise ValueError(f"Format d'archive inconnu: {archive_format}")
+
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+    params = {'min_score': min_score, 'cutoff': cutoff}
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT substr(created_at, 1, 7) AS month, COUNT(*)
+        FROM punchlines
+        WHERE {ARCHIVE_CONDITION}
+        GROUP BY month
+        ORDER BY month
+        ''', params)
+        months = cursor.fetchall()
+
+        report = {
+            'database': db_path,
+            'cutoff': cutoff,
+            'min_score': min_score,
+            'dry_run': dry_run,
+            'archived': {},
+            'archived_total': 0
+        }
+
+        if dry_run or not months:
+            report['archived'] = {month: count for month, count in months}
+            report['archived_total'] = sum(count for _, count in months)
+            return report
+
+        os.makedirs(archive_dir, exist_ok=True)
+        for month, _ in months:
+            if archive_format == 'sqlite':
+                archive_path = os.path.join(archive_dir, f"punchlines_{month}.db")
+                moved = _archive_sqlite(conn, archive_path, month, params, batch_size)
+            else:
+                archive_path = os.path.join(archive_dir, f"punchlines_{month}.jsonl.gz")
+                moved = _archive_jsonl(conn, archive_path, month, params, batch_size)
+
+            report['archived'][month] = moved
+            report['archived_total'] += moved
+            print(f"📦 {moved} punchlines de {month} archivées dans {archive_path}")
+
+        return report
+    finally:
+        conn.close()
+
+
+def compact_database(db_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compacte la base de données (VACUUM) et met à jour les statistiques du planificateur (ANALYZE)
+
+    Args:
+        db_path: Chemin de la base de données (par défaut: data/quality_data.db)
+
+    Returns:
+        Rapport de l'opération (tailles avant/après et espace récupéré)
+    """
+    db_path = db_path or os.path.join(PROJECT_ROOT, 'data', 'quality_data.db')
+    size_before = _database_size(db_path)
+    start = time.monotonic()
+
+    # Autocommit: VACUUM ne peut pas s'exécuter dans une transaction
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA freelist_count")
+        free_pages = cursor.fetchone()[0]
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='punchlines_fts'")
+        if cursor.fetchone():
+            cursor.execute("INSERT INTO punchlines_fts(punchlines_fts) VALUES ('optimize')")
+
+        cursor.execute("VACUUM")
+        cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    size_after = _database_size(db_path)
+    return {
+        'database': db_path,
+        'free_pages_before': free_pages,
+        'size_before': size_before,
+        'size_after': size_after,
+        'reclaimed_bytes': max(0, size_before - size_after),
+        'duration_seconds': round(time.monotonic() - start, 3)
+    }
+
+
+def run_maintenance(args) -> Dict[str, Any]:
+    """Exécute une passe de rétention puis, si demandé, de compactage"""
+    retention = apply_retention(
+        db_path=args.db,
+        keep_days=args.keep_days,
+        min_score=args.min_score,
+        archive_format=args.format,
+        archive_dir=args.archive_dir,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run
+    )
+    print(f"🗄️ {retention['archived_total']} punchlines {'à archiver' if args.dry_run else 'archivées'} "
+          f"(avant le {retention['cutoff']}, score < {retention['min_score']})")
+
+    result = {'retention': retention}
+    if args.vacuum and not args.dry_run:
+        compaction = compact_database(args.db)
+        print(f"🧹 VACUUM/ANALYZE: {compaction['size_before'] / (1024 * 1024):.2f} MB → "
+              f"{compaction['size_after'] / (1024 * 1024):.2f} MB "
+              f"({compaction['reclaimed_bytes'] / (1024 * 1024):.2f} MB récupérés en {compaction['duration_seconds']}s)")
+        result['compaction'] = compaction
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rétention, archivage et compactage de la base des punchlines')
+    parser.add_argument('--db', type=str, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    parser.add_argument('--keep-days', type=int, default=int(os.getenv('RETENTION_KEEP_DAYS', '30')),
+                        help='Nombre de jours conservés intégralement')
+    parser.add_argument('--min-score', type=float, default=float(os.getenv('RETENTION_MIN_SCORE', '0.8')),
+                        help='Score global à partir duquel une punchline est toujours conservée')
+    parser.add_argument('--format', choices=['sqlite', 'jsonl'], default=os.getenv('RETENTION_ARCHIVE_FORMAT', 'sqlite'),
+                        help="Format des archives")
+    parser.add_argument('--archive-dir', type=str, default=os.getenv('RETENTION_ARCHIVE_DIR') or None,
+                        help='Dossier des archives (par défaut: data/archive)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Nombre de lignes déplacées par transaction')
+    parser.add_argument('--dry-run', action='store_true', help='Compter les lignes concernées sans rien modifier')
+    parser.add_argument('--vacuum', action='store_true', help='Exécuter VACUUM et ANALYZE après la rétention')
+    parser.add_argument('--json', action='store_true', help='Afficher le rapport au format JSON')
+    parser.add_argument('--every-hours', type=float, default=0,
+                        help='Répéter la maintenance toutes les N heures (0: une seule passe)')
+    args = parser.parse_args()
+
+    while True:
+        try:
+            result = run_maintenance(args)
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False, indent=2))
+        except Exception as e:
+            print(f"❌ Erreur lors de la maintenance de la base de données: {str(e)}")
+            if args.every_hours <= 0:
+                sys.exit(1)
+
+        if args.every_hours <= 0:
+            break
+
+        print(f"⏳ Prochaine maintenance dans {args.every_hours} heure(s)...")
+        time.sleep(args.every_hours * 3600)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⚠️ Maintenance interrompue par l'utilisateur")
+        sys.exit(0)
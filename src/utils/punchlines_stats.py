@@ -1,78 +1,417 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 import sqlite3
-from collections import Counter
+import argparse
+import itertools
+from typing import Dict, List, Any, Optional, Tuple
 
-def get_punchlines_stats(db_path=None):
+import numpy as np
+
+from models.punchline_scores import CRITERIA, SCORE_COLUMNS
+
+# Anciens noms de colonnes (schéma historique de la pipeline de qualité)
+LEGACY_CRITERIA = ['originality', 'humor', 'relevance', 'conciseness', 'impact']
+
+# Percentiles calculés pour chaque critère
+PERCENTILES = [5, 25, 50, 75, 95]
+
+CRITERIA_LABELS = {
+    'cruaute': 'Cruauté',
+    'provocation': 'Provocation',
+    'pertinence': 'Pertinence',
+    'concision': 'Concision',
+    'impact': 'Impact',
+    'originality': 'Originalité',
+    'humor': 'Humour',
+    'relevance': 'Pertinence',
+    'conciseness': 'Concision',
+    'overall_score': 'Score global'
+}
+
+
+def _default_db_path() -> str:
+    """Chemin par défaut de la base de données (data/quality_data.db)"""
+    return os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        'data',
+        'quality_data.db'
+    )
+
+
+def _scores_query(columns: List[str], validate_json: bool = False) -> Tuple[List[str], str]:
     """
-    Récupère et affiche des statistiques sur les punchlines stockées
-    
+    Construit la requête SQL qui retourne les scores de chaque ligne en colonnes typées
+
+    Les scores sont convertis en REAL (un score stocké sous forme de texte, "0.5",
+    reste lisible). Les valeurs absentes sont codées -1.
+
+    Args:
+        columns: Colonnes de la table punchlines
+        validate_json: Ignorer les évaluations JSON mal formées (json_valid), qui font
+            échouer json_extract pour toute la requête. Plus lent: json_valid est
+            évalué pour chaque critère.
+
+    Returns:
+        Tuple (noms des scores, requête SQL)
+    """
+    if 'evaluation' in columns:
+        names = ['overall_score'] + CRITERIA
+        source = "punchlines"
+        if validate_json:
+            source = "(SELECT overall_score, CASE WHEN json_valid(evaluation) THEN evaluation END AS evaluation FROM punchlines)"
+        expressions = ['overall_score'] + [f"json_extract(evaluation, '$.{c}')" for c in CRITERIA]
+    else:
+        names = CRITERIA if 'cruaute' in columns else [c for c in LEGACY_CRITERIA if c in columns]
+        names = ['overall_score'] + names
+        source = "punchlines"
+        expressions = names
+
+    select = ", ".join(f"IFNULL(CAST({expression} AS REAL), -1.0)" for expression in expressions)
+    return names, f"SELECT {select} FROM {source}"
+
+
+def _load_scores(cursor: sqlite3.Cursor, query: str, n_columns: int, expected_rows: int, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Charge les scores par blocs (fetchmany) dans un tableau NumPy préalloué
+
+    Utilisé quand les scores ne sont pas indexés (base jamais ouverte par la pipeline
+    de qualité depuis l'ajout des colonnes de scores, ou schéma historique).
+
+    Args:
+        cursor: Curseur de la base de données
+        query: Requête retournant n_columns scores REAL par ligne (-1 si absent)
+        n_columns: Nombre de colonnes de la requête
+        expected_rows: Nombre de lignes attendu (taille de l'allocation initiale)
+        chunk_size: Nombre de lignes lues à chaque appel
+
+    Returns:
+        Tableau (lignes, scores), NaN pour les valeurs manquantes
+    """
+    scores = np.empty((expected_rows, n_columns), dtype='f8')
+    count = 0
+    cursor.execute(query)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        # Des lignes ont pu être ajoutées depuis le comptage
+        if count + len(rows) > scores.shape[0]:
+            scores = np.resize(scores, (max(count + len(rows), 2 * scores.shape[0]), n_columns))
+        scores[count:count + len(rows)] = np.fromiter(
+            itertools.chain.from_iterable(rows), dtype='f8', count=len(rows) * n_columns
+        ).reshape(-1, n_columns)
+        count += len(rows)
+
+    scores = scores[:count]
+    scores[scores < 0] = np.nan
+    return scores
+
+
+def _value_counts(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Valeurs distinctes d'une série de scores (NaN ignorés) et leurs effectifs"""
+    return np.unique(values[~np.isnan(values)], return_counts=True)
+
+
+def _indexed_value_counts(cursor: sqlite3.Cursor, column: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valeurs distinctes d'une colonne de scores indexée et leurs effectifs
+
+    Le GROUP BY parcourt l'index de la colonne (models/punchline_scores): ni tri,
+    ni lecture du JSON des lignes. Les valeurs non numériques ou négatives sont ignorées.
+
+    Args:
+        cursor: Curseur de la base de données
+        column: Colonne de scores
+
+    Returns:
+        Tuple (valeurs triées, effectifs)
+    """
+    cursor.execute(f"SELECT {column}, COUNT(*) FROM punchlines WHERE {column} IS NOT NULL GROUP BY {column}")
+    rows = [(value, count) for value, count in cursor.fetchall()
+            if isinstance(value, (int, float)) and value >= 0]
+    return np.array([r[0] for r in rows], dtype='f8'), np.array([r[1] for r in rows], dtype='i8')
+
+
+def _distribution(values: np.ndarray, counts: np.ndarray, bins: int) -> Dict[str, Any]:
+    """
+    Calcule la distribution d'une série de scores (moyenne, écart-type, percentiles, histogramme)
+    à partir de ses valeurs distinctes et de leurs effectifs
+
+    Les scores étant discrets, ces quelques valeurs suffisent: les résultats sont ceux
+    obtenus sur la série complète (percentiles interpolés comme np.percentile).
+
+    Args:
+        values: Valeurs distinctes triées, entre 0 et 1
+        counts: Effectif de chaque valeur
+        bins: Nombre de classes de l'histogramme
+
+    Returns:
+        Dictionnaire décrivant la distribution
+    """
+    n = int(counts.sum())
+    if n == 0:
+        return {
+            'count': 0,
+            'mean': 0.0,
+            'stddev': 0.0,
+            'min': 0.0,
+            'max': 0.0,
+            'percentiles': {f"p{p}": 0.0 for p in PERCENTILES},
+            'histogram': {'edges': [], 'counts': []}
+        }
+
+    mean = float(np.dot(values, counts) / n)
+    variance = float(np.dot((values - mean) ** 2, counts) / n)
+
+    # Rang k de la série triée: première valeur dont l'effectif cumulé dépasse k
+    cumulative = np.cumsum(counts)
+    ranks = np.array(PERCENTILES, dtype='f8') / 100 * (n - 1)
+    lower = values[np.searchsorted(cumulative, np.floor(ranks), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(ranks), side='right')]
+    percentiles = lower + (upper - lower) * (ranks - np.floor(ranks))
+
+    histogram, edges = np.histogram(values, bins=bins, range=(0.0, 1.0), weights=counts)
+
+    return {
+        'count': n,
+        'mean': mean,
+        'stddev': variance ** 0.5,
+        'min': float(values[0]),
+        'max': float(values[-1]),
+        'percentiles': {f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+        'histogram': {
+            'edges': [round(float(e), 4) for e in edges],
+            'counts': [int(c) for c in histogram]
+        }
+    }
+
+
+def compute_punchlines_stats(
+    db_path: Optional[str] = None,
+    top_subjects: int = 10,
+    days: int = 30,
+    bins: int = 10
+) -> Dict[str, Any]:
+    """
+    Calcule les statistiques des punchlines stockées
+
+    Les agrégats (comptages, taux de sélection, ventilations par sujet et par jour)
+    sont calculés en SQL. Les distributions de scores sont calculées à partir des
+    effectifs de chaque valeur: lus dans les index des scores (GROUP BY sans lecture
+    du JSON) quand la pipeline de qualité les a créés, sinon en chargeant les scores
+    en une seule passe, par blocs, dans un tableau NumPy.
+
     Args:
-        db_path: Chemin de la base de données (par défaut: output/quality_data.db)
+        db_path: Chemin de la base de données (par défaut: data/quality_data.db)
+        top_subjects: Nombre de sujets à détailler
+        days: Nombre de jours à détailler
+        bins: Nombre de classes des histogrammes
+
+    Returns:
+        Dictionnaire contenant les statistiques
     """
-    # Chemin de la base de données
-    if not db_path:
-        db_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-            'output',
-            'quality_data.db'
-        )
-    
-    # Vérifier si la base de données existe
+    db_path = db_path or _default_db_path()
     if not os.path.exists(db_path):
-        print(f"❌ La base de données {db_path} n'existe pas.")
-        return
-    
-    # Connexion à la base de données
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Nombre total de punchlines
-    cursor.execute("SELECT COUNT(*) FROM punchlines")
-    total_punchlines = cursor.fetchone()[0]
-    
-    # Nombre de punchlines sélectionnées
-    cursor.execute("SELECT COUNT(*) FROM punchlines WHERE selected = 1")
-    selected_punchlines = cursor.fetchone()[0]
-    
-    # Scores moyens
-    cursor.execute("""
-        SELECT 
-            AVG(originality), 
-            AVG(humor), 
-            AVG(relevance), 
-            AVG(conciseness), 
-            AVG(impact), 
-            AVG(overall_score)
-        FROM punchlines
-    """)
-    avg_scores = cursor.fetchone()
-    
-    # Sujets les plus fréquents
-    cursor.execute("SELECT subject FROM punchlines")
-    subjects = [row[0] for row in cursor.fetchall()]
-    subject_counter = Counter(subjects)
-    top_subjects = subject_counter.most_common(5)
-    
-    # Afficher les statistiques
-    print("\n📊 Statistiques des punchlines:")
-    print(f"Total: {total_punchlines} punchlines")
-    print(f"Sélectionnées: {selected_punchlines} ({selected_punchlines/total_punchlines*100:.1f}% du total)")
-    
-    print("\nScores moyens:")
-    print(f"Originalité: {avg_scores[0]:.2f}")
-    print(f"Humour: {avg_scores[1]:.2f}")
-    print(f"Pertinence: {avg_scores[2]:.2f}")
-    print(f"Concision: {avg_scores[3]:.2f}")
-    print(f"Impact: {avg_scores[4]:.2f}")
-    print(f"Score global: {avg_scores[5]:.2f}")
-    
-    print("\nSujets les plus fréquents:")
-    for subject, count in top_subjects:
-        print(f"- {subject}: {count} punchlines")
-    
-    conn.close()
+        raise FileNotFoundError(f"La base de données {db_path} n'existe pas.")
+
+    # Ouverture en lecture seule: l'analyse ne doit jamais bloquer les écritures
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+
+        # table_xinfo: inclut les colonnes générées des scores
+        cursor.execute("PRAGMA table_xinfo(punchlines)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        # Totaux
+        cursor.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(selected = 1), 0),
+                   AVG(CASE WHEN selected = 1 THEN overall_score END)
+            FROM punchlines
+        ''')
+        total, selected, avg_selected = cursor.fetchone()
+
+        if 'evaluation' in columns and all(column in columns for column in SCORE_COLUMNS.values()):
+            # Scores indexés: effectifs de chaque valeur lus dans les index
+            sources = {'overall_score': 'overall_score', **SCORE_COLUMNS}
+            value_counts = {name: _indexed_value_counts(cursor, column) for name, column in sources.items()}
+        else:
+            # Colonnes typées chargées par blocs dans un tableau NumPy
+            names, query = _scores_query(columns)
+            try:
+                scores = _load_scores(cursor, query, len(names), total)
+            except sqlite3.OperationalError as e:
+                if 'JSON' not in str(e):
+                    raise
+                # Au moins une évaluation est mal formée: relire en ignorant celles-ci
+                names, query = _scores_query(columns, validate_json=True)
+                scores = _load_scores(cursor, query, len(names), total)
+            value_counts = {name: _value_counts(scores[:, i]) for i, name in enumerate(names)}
+
+        distributions = {
+            name: _distribution(values, counts, bins)
+            for name, (values, counts) in value_counts.items()
+        }
+
+        # Ventilation par sujet
+        cursor.execute('''
+            SELECT subject, COUNT(*), COALESCE(SUM(selected = 1), 0),
+                   AVG(overall_score), MAX(overall_score)
+            FROM punchlines
+            GROUP BY subject
+            ORDER BY COUNT(*) DESC
+            LIMIT ?
+        ''', (top_subjects,))
+        by_subject = [
+            {
+                'subject': subject,
+                'count': count,
+                'selected': sel,
+                'selection_rate': sel / count if count else 0.0,
+                'average_score': avg or 0.0,
+                'best_score': best or 0.0
+            }
+            for subject, count, sel, avg, best in cursor.fetchall()
+        ]
+
+        # Ventilation par jour (created_at est au format ISO ou SQLite, les 10 premiers caractères donnent la date)
+        cursor.execute('''
+            SELECT substr(created_at, 1, 10) AS day, COUNT(*),
+                   COALESCE(SUM(selected = 1), 0), AVG(overall_score)
+            FROM punchlines
+            GROUP BY day
+            ORDER BY day DESC
+            LIMIT ?
+        ''', (days,))
+        by_day = [
+            {
+                'day': day,
+                'count': count,
+                'selected': sel,
+                'average_score': avg or 0.0
+            }
+            for day, count, sel, avg in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+    return {
+        'database': db_path,
+        'total_punchlines': total,
+        'selected_punchlines': selected,
+        'selection_rate': selected / total if total else 0.0,
+        'average_selected_score': avg_selected or 0.0,
+        'scores': distributions,
+        'by_subject': by_subject,
+        'by_day': by_day
+    }
+
+
+def format_stats_table(stats: Dict[str, Any]) -> str:
+    """
+    Met en forme les statistiques sous forme de tableau texte
+
+    Args:
+        stats: Statistiques retournées par compute_punchlines_stats
+
+    Returns:
+        Le tableau prêt à être affiché
+    """
+    lines = ["", "📊 Statistiques des punchlines:"]
+    lines.append(f"Total: {stats['total_punchlines']} punchlines")
+    lines.append(
+        f"Sélectionnées: {stats['selected_punchlines']} "
+        f"({stats['selection_rate'] * 100:.1f}% du total, score moyen {stats['average_selected_score']:.2f})"
+    )
+
+    header = f"{'Critère':<14}{'n':>9}{'moy':>7}{'σ':>7}" + "".join(f"{'p' + str(p):>7}" for p in PERCENTILES)
+    lines += ["", "Scores:", header, "-" * len(header)]
+    for name, dist in stats['scores'].items():
+        label = CRITERIA_LABELS.get(name, name)
+        row = f"{label:<14}{dist['count']:>9}{dist['mean']:>7.2f}{dist['stddev']:>7.2f}"
+        row += "".join(f"{dist['percentiles'][f'p{p}']:>7.2f}" for p in PERCENTILES)
+        lines.append(row)
+
+    overall = stats['scores'].get('overall_score')
+    if overall and overall['histogram']['counts']:
+        lines += ["", "Histogramme du score global:"]
+        edges = overall['histogram']['edges']
+        counts = overall['histogram']['counts']
+        peak = max(counts) or 1
+        for i, count in enumerate(counts):
+            bar = "█" * int(round(40 * count / peak))
+            lines.append(f"[{edges[i]:.1f}-{edges[i + 1]:.1f}) {count:>8} {bar}")
+
+    if stats['by_subject']:
+        lines += ["", "Sujets les plus fréquents:"]
+        for entry in stats['by_subject']:
+            lines.append(
+                f"- {entry['subject']}: {entry['count']} punchlines, "
+                f"{entry['selection_rate'] * 100:.0f}% sélectionnées, "
+                f"moy {entry['average_score']:.2f}, max {entry['best_score']:.2f}"
+            )
+
+    if stats['by_day']:
+        lines += ["", "Activité par jour:"]
+        for entry in stats['by_day']:
+            lines.append(
+                f"- {entry['day']}: {entry['count']} punchlines, "
+                f"{entry['selected']} sélectionnées, moy {entry['average_score']:.2f}"
+            )
+
+    return "\n".join(lines)
+
+
+def get_punchlines_stats(db_path=None, output_format='table', top_subjects=10, days=30, bins=10):
+    """
+    Récupère et affiche des statistiques sur les punchlines stockées
+
+    Args:
+        db_path: Chemin de la base de données (par défaut: data/quality_data.db)
+        output_format: Format d'affichage ('table' ou 'json')
+        top_subjects: Nombre de sujets à détailler
+        days: Nombre de jours à détailler
+        bins: Nombre de classes des histogrammes
+
+    Returns:
+        Les statistiques calculées, ou None si la base de données n'existe pas
+    """
+    try:
+        stats = compute_punchlines_stats(db_path, top_subjects=top_subjects, days=days, bins=bins)
+    except FileNotFoundError as e:
+        print(f"❌ {str(e)}")
+        return None
+
+    if output_format == 'json':
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print(format_stats_table(stats))
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Statistiques des punchlines stockées')
+    parser.add_argument('--db', type=str, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    parser.add_argument('-f', '--format', choices=['table', 'json'], default='table', help="Format d'affichage")
+    parser.add_argument('--top', type=int, default=10, help='Nombre de sujets à détailler')
+    parser.add_argument('--days', type=int, default=30, help='Nombre de jours à détailler')
+    parser.add_argument('--bins', type=int, default=10, help='Nombre de classes des histogrammes')
+    args = parser.parse_args()
+
+    stats = get_punchlines_stats(
+        db_path=args.db,
+        output_format=args.format,
+        top_subjects=args.top,
+        days=args.days,
+        bins=args.bins
+    )
+    if stats is None:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    get_punchlines_stats() 
\ No newline at end of file
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import argparse
+
+from models.punchline_search import PunchlineSearch
+
+
+def search_punchlines(query, db_path=None, subject=None, min_score=None, selected_only=False,
+                      limit=10, match_any=False, output_format='table'):
+    """
+    Recherche des punchlines dans l'historique et affiche les résultats classés par pertinence
+
+    Args:
+        query: Texte recherché
+        db_path: Chemin de la base de données (par défaut: data/quality_data.db)
+        subject: Filtrer sur un sujet exact (optionnel)
+        min_score: Score global minimum (optionnel)
+        selected_only: Ne retourner que les punchlines sélectionnées
+        limit: Nombre maximum de résultats
+        match_any: Accepter les punchlines contenant au moins un des mots (au lieu de tous)
+        output_format: Format d'affichage ('table' ou 'json')
+
+    Returns:
+        La liste des résultats
+    """
+    search = PunchlineSearch(db_path)
+
+    if not os.path.exists(search.db_path):
+        print(f"❌ La base de données {search.db_path} n'existe pas.")
+        return []
+
+    search.ensure_index()
+    results = search.search(
+        query,
+        subject=subject,
+        min_score=min_score,
+        selected_only=selected_only,
+        limit=limit,
+        match_all=not match_any
+    )
+
+    if output_format == 'json':
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return results
+
+    print(f"\n🔎 {len(results)} résultat(s) pour: \"{query}\"")
+    for i, result in enumerate(results):
+        selected = " ✅" if result['selected'] else ""
+        score = result['overall_score'] if result['overall_score'] is not None else 0
+        print(f"{i + 1:>3}. [{score:.2f}]{selected} {result['text']}")
+        print(f"     Sujet: {result['subject']} | {result['created_at']}")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche plein texte dans l'historique des punchlines")
+    parser.add_argument('query', nargs='?', help='Texte recherché')
+    parser.add_argument('--db', type=str, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    parser.add_argument('-s', '--subject', type=str, help='Filtrer sur un sujet exact')
+    parser.add_argument('-m', '--min-score', type=float, help='Score global minimum')
+    parser.add_argument('--selected', action='store_true', help='Uniquement les punchlines sélectionnées')
+    parser.add_argument('-n', '--limit', type=int, default=10, help='Nombre maximum de résultats')
+    parser.add_argument('--any', action='store_true', help='Au moins un des mots au lieu de tous')
+    parser.add_argument('-f', '--format', choices=['table', 'json'], default='table', help="Format d'affichage")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire l'index plein texte")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        PunchlineSearch(args.db).rebuild()
+        print("✅ Index plein texte reconstruit.")
+        if not args.query:
+            return
+
+    if not args.query:
+        parser.print_help()
+        sys.exit(1)
+
+    search_punchlines(
+        args.query,
+        db_path=args.db,
+        subject=args.subject,
+        min_score=args.min_score,
+        selected_only=args.selected,
+        limit=args.limit,
+        match_any=args.any,
+        output_format=args.format
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from core.punchline_scorer import PunchlineScorer, CRITERIA, WEIGHTS, load_training_data
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'quality_data.db')
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'punchline_scorer.npz')
+
+
+def report(scorer, samples, targets, threshold, band=None):
+    """
+    Compare les prédictions de l'évaluateur local aux notes du LLM et affiche l'accord
+
+    Args:
+        scorer: L'évaluateur local
+        samples: Liste de (punchline, sujet)
+        targets: Notes du LLM (punchlines x critères)
+        threshold: Seuil de qualité pour l'accord accepté/refusé
+        band: Demi-largeur de la bande de confiance (par défaut: celle du modèle)
+
+    Returns:
+        dict: Les métriques calculées
+    """
+    predictions = scorer.predict_batch(samples)
+    overall_pred = predictions @ WEIGHTS
+    overall_true = targets @ WEIGHTS
+
+    print(f"\n📊 Accord avec les notes du LLM ({len(samples)} punchlines):")
+    for i, criterion in enumerate(CRITERIA):
+        mae = np.mean(np.abs(predictions[:, i] - targets[:, i]))
+        corr = np.corrcoef(predictions[:, i], targets[:, i])[0, 1] if np.std(targets[:, i]) > 0 and np.std(predictions[:, i]) > 0 else float('nan')
+        print(f"  - {criterion:<12} erreur moyenne {mae:.3f} | corrélation {corr:.2f}")
+
+    mae = float(np.mean(np.abs(overall_pred - overall_true)))
+    agreement = float(np.mean((overall_pred >= threshold) == (overall_true >= threshold)))
+    print(f"  - {'global':<12} erreur moyenne {mae:.3f} | accord accepté/refusé (seuil {threshold}): {agreement:.1%}")
+
+    confident = np.array([scorer.is_confident(score, threshold, band) for score in overall_pred], dtype=bool)
+    confident_agreement = float(np.mean((overall_pred[confident] >= threshold) == (overall_true[confident] >= threshold))) if confident.any() else float('nan')
+    print(f"  - Hors bande de confiance: {confident.mean():.1%} des punchlines (appels au LLM évités), "
+          f"accord sur celles-ci: {confident_agreement:.1%}")
+
+    start = time.perf_counter()
+    for punchline, subject in samples[:200]:
+        scorer.predict(punchline, subject)
+    per_call = (time.perf_counter() - start) / max(1, min(200, len(samples)))
+    print(f"  - Durée d'une prédiction: {per_call * 1e6:.0f} µs")
+
+    return {
+        'mae': mae,
+        'agreement': agreement,
+        'confident_share': float(confident.mean()),
+        'confident_agreement': confident_agreement
+    }
+
+
+def train(db_path, model_path, holdout=0.2, threshold=0.7, epochs=300, n_features=2 ** 14, seed=42):
+    """
+    Entraîne l'évaluateur local sur les punchlines notées et l'enregistre
+
+    Une partie des punchlines (holdout) sert à mesurer l'erreur de validation,
+    qui fixe la largeur de la bande de confiance.
+    """
+    samples, targets = load_training_data(db_path)
+    if len(samples) < 10:
+        print(f"❌ Pas assez de punchlines notées dans {db_path} ({len(samples)})")
+        return None
+
+    order = np.random.default_rng(seed).permutation(len(samples))
+    n_valid = max(1, int(len(samples) * holdout))
+    valid, fit = order[:n_valid], order[n_valid:]
+
+    print(f"🧮 Entraînement sur {len(fit)} punchlines, validation sur {len(valid)}...")
+    scorer = PunchlineScorer(n_features=n_features)
+    start = time.time()
+    mse = scorer.fit([samples[i] for i in fit], targets[fit], epochs=epochs)
+    print(f"✅ Entraîné en {time.time() - start:.1f}s (erreur quadratique d'entraînement {mse:.4f})")
+
+    valid_samples = [samples[i] for i in valid]
+    residuals = scorer.predict_batch(valid_samples) @ WEIGHTS - targets[valid] @ WEIGHTS
+    scorer.residual_std = float(np.std(residuals))
+    print(f"📏 Écart type de l'erreur de validation sur le score global: {scorer.residual_std:.3f} "
+          f"(bande de confiance: ±{2 * scorer.residual_std:.3f})")
+
+    report(scorer, valid_samples, targets[valid], threshold)
+
+    scorer.save(model_path)
+    print(f"\n💾 Modèle enregistré: {model_path}")
+    return scorer
+
+
+def evaluate(db_path, model_path, threshold=0.7, band=None):
+    """Mesure l'accord d'un modèle enregistré avec toutes les notes du LLM de la base"""
+    if not os.path.exists(model_path):
+        print(f"❌ Le modèle {model_path} n'existe pas.")
+        return None
+    scorer = PunchlineScorer.load(model_path)
+    samples, targets = load_training_data(db_path)
+    if not samples:
+        print(f"❌ Aucune punchline notée dans {db_path}")
+        return None
+    return report(scorer, samples, targets, threshold, band)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement et évaluation de l'évaluateur local des punchlines")
+    parser.add_argument('command', choices=['train', 'evaluate'], help='Entraîner un modèle ou évaluer un modèle existant')
+    parser.add_argument('--db', type=str, default=DEFAULT_DB, help='Chemin de la base de données (par défaut: data/quality_data.db)')
+    parser.add_argument('-m', '--model', type=str, default=DEFAULT_MODEL, help='Chemin du modèle (par défaut: data/punchline_scorer.npz)')
+    parser.add_argument('-t', '--threshold', type=float, default=float(os.getenv('QUALITY_THRESHOLD', '0.7')), help='Seuil de qualité')
+    parser.add_argument('--holdout', type=float, default=0.2, help='Part des punchlines réservée à la validation')
+    parser.add_argument('--epochs', type=int, default=300, help="Nombre de passes d'entraînement")
+    parser.add_argument('--features', type=int, default=2 ** 14, help='Taille de l\'espace des n-grammes hachés')
+    parser.add_argument('--band', type=float, help='Demi-largeur de la bande de confiance (par défaut: celle du modèle)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ La base de données {args.db} n'existe pas.")
+        sys.exit(1)
+
+    if args.command == 'train':
+        result = train(args.db, args.model, args.holdout, args.threshold, args.epochs, args.features)
+    else:
+        result = evaluate(args.db, args.model, args.threshold, args.band)
+
+    if result is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()